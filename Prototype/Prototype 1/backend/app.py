@@ -3,68 +3,666 @@ Medical Storage Management System - Flask Backend
 REST API endpoints for CRUD operations
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, g, send_from_directory
 from flask_cors import CORS
-import mysql.connector
-from mysql.connector import Error
-from datetime import datetime
+import atexit
+from datetime import date, timedelta
 import os
-from config import DB_CONFIG, FLASK_CONFIG
+import sys
+import time
+from config import (DB_CONFIG, STORAGE_CONFIG, FLASK_CONFIG, POOL_CONFIG, STATS_CONFIG, SEARCH_CONFIG,
+                    SUGGEST_CONFIG, BULK_CONFIG, EXPORT_CONFIG, EXPIRY_CONFIG, CACHE_CONFIG,
+                    ETAG_CONFIG, METRICS_CONFIG, BATCH_GET_CONFIG, MOVEMENT_CONFIG,
+                    DISPENSE_CONFIG, REORDER_CONFIG, CHANGES_CONFIG, COMPRESSION_CONFIG, REPLICA_CONFIG,
+                    JOBS_CONFIG, ARCHIVE_CONFIG, ASSETS_CONFIG)
+import events
+import metrics
+import threading
+from archive import archive_expired, archive_job
+from assets import AssetServer
+from background import PeriodicTask
+from bulk import BulkFormatError, format_for, iter_records, import_medicines
+from changes import ChangeNotifier, record_changes, format_event
+from compression import COMPRESSIBLE_TYPES, negotiate_encoding, compress
+from cache import TTLCache, MISSING, STALE, MemoryBackend, create_backend
+from db_pool import ConnectionPool, PoolTimeout
+from dispense import DispenseError, validate_order, dispense
+from expiry import ExpiryIndex
+from jobs import JobError, JobQueue, job_document
+from export import EXPORT_FORMATS, iter_batches, ndjson_chunks, csv_chunks
+from movements import ADJUSTED_REASON, MovementError, validate_movements, adjust_lots, apply_movements
+from reorder import run_reorder, reorder_job
+from reports import MAX_EXPIRY_DAYS, register_reports
+from replicas import Replica, ReplicaRouter, versions_cover
+from serialization import (serialize_rows, serialize_datetime, dumps, json_response, encode_list,
+                           negotiate_list_format)
+from suggest import SuggestIndex
+from validation import validate_medicine, validate_batch
+from versions import bump_version, make_etag, VersionTracker
+from profiler import SamplingProfiler
+from pagination import parse_fields, parse_page, paginate_rows, encode_cursor, add_pagination_headers
+from storage import (Error, IntegrityError, SUPPLIER_COLUMNS, MEDICINE_COLUMNS, SEARCH_COLUMNS,
+                     ARCHIVED_MEDICINE_COLUMNS, ARCHIVED_SEARCH_COLUMNS, ARCHIVED_MEDICINE_KEY, ARCHIVED_SEARCH_KEY,
+                     MOVEMENT_COLUMNS, BATCH_COLUMNS, REORDER_COLUMNS, SUPPLIER_KEY, MEDICINE_KEY,
+                     SEARCH_KEY, MOVEMENT_KEY, BATCH_KEY, REORDER_KEY, STATS_BREAKDOWNS, JOB_COLUMNS, QUANTITY_INDEX,
+                     create_storage, create_replica_storage)
 
 app = Flask(__name__)
-CORS(app)  # Enable CORS for all routes
+# Enable CORS for all routes; max_age caches the preflight that If-None-Match triggers
+CORS(app, expose_headers=['X-Next-Cursor', 'Link', 'ETag', 'Last-Modified', 'X-Change-Seq'], max_age=600)
 
+# MySQL or embedded SQLite; handlers run its repository methods on pooled connections
+store = create_storage(STORAGE_CONFIG, DB_CONFIG)
+# Connections are wrapped so every statement is timed for /api/metrics
+db_pool = ConnectionPool(lambda: metrics.TimedConnection(store.connect()), **POOL_CONFIG)
+atexit.register(db_pool.dispose)
 
-def get_db_connection():
-    """Establish database connection"""
+stats_cache = TTLCache(ttl=STATS_CONFIG['CACHE_TTL'])
+# Cached values are encoded JSON bodies, so they can live in Redis as well
+lookup_backend = create_backend(CACHE_CONFIG['REDIS_URL'], CACHE_CONFIG['MEDICINE_MAX_ENTRIES'])
+medicine_cache = TTLCache(ttl=CACHE_CONFIG['MEDICINE_TTL'], backend=lookup_backend, namespace='medicine:')
+supplier_cache = TTLCache(
+    ttl=CACHE_CONFIG['SUPPLIER_TTL'], namespace='suppliers:',
+    # A private store keeps supplier lists from being evicted by medicine records
+    backend=lookup_backend if lookup_backend.name != 'memory' else MemoryBackend(16)
+)
+suggest_index = SuggestIndex()
+expiry_index = ExpiryIndex()
+
+
+def get_db_connection(use_replica=True):
+    """
+    Borrow a pooled database connection for the current request.
+
+    GET requests read from the replica read_replica() picked, falling back to
+    the primary when it cannot hand out a connection.
+    """
+    replica = read_replica() if use_replica else None
+    if replica is not None:
+        try:
+            with metrics.phase('acquire'):
+                connection = replica.pool.connect()
+        except Error + (PoolTimeout,) as e:
+            print(f"Error connecting to read replica {replica.name}: {e}")
+            replica_router.mark_down(replica, e)
+            g.read_replica = None
+        else:
+            g.setdefault('db_connections', []).append(connection)
+            return connection
     try:
-        connection = mysql.connector.connect(**DB_CONFIG)
-        return connection
-    except Error as e:
-        print(f"Error connecting to MySQL: {e}")
+        with metrics.phase('acquire'):
+            connection = db_pool.connect()
+    except Error + (PoolTimeout,) as e:
+        print(f"Error connecting to the database: {e}")
         return None
+    g.setdefault('db_connections', []).append(connection)
+    return connection
+
+
+@app.teardown_appcontext
+def release_db_connections(exception=None):
+    """Return any connection a handler did not close back to the pool"""
+    for connection in g.pop('db_connections', []):
+        connection.close()
+
+
+@app.before_request
+def start_request_timer():
+    """Time the request by phase; see metrics.PHASES"""
+    # A WSGI worker thread serves one request at a time, so its stack can be sampled
+    metrics.start_request(request.endpoint or 'unmatched', request.method, threading.get_ident())
+
+
+@app.after_request
+def add_server_timing(response):
+    """Report phase timings to the client and record totals once the body is sent"""
+    timer = metrics.current_timer()
+    if timer is not None:
+        response.headers['Server-Timing'] = timer.server_timing()
+        # Lets the cross-origin frontend read Server-Timing in the browser's timing API
+        response.headers['Timing-Allow-Origin'] = '*'
+        response.call_on_close(lambda: metrics.finish_request(timer, response.status_code))
+    return response
+
+
+@app.after_request
+def compress_response(response):
+    """Compress JSON and columnar bodies for clients that accept it (runs before add_server_timing)"""
+    if response.mimetype not in COMPRESSIBLE_TYPES or response.is_streamed or response.direct_passthrough:
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = negotiate_encoding(request.headers.get('Accept-Encoding'))
+    if encoding is None or response.status_code != 200 or 'Content-Encoding' in response.headers:
+        return response
+    body = response.get_data()
+    if len(body) < COMPRESSION_CONFIG['MIN_SIZE']:
+        return response
+    response.set_data(compress(body, encoding, COMPRESSION_CONFIG))
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+
+profiler = SamplingProfiler(METRICS_CONFIG['PROFILE_INTERVAL_MS'] / 1000, metrics.registry.active_requests)
+profiler.start()
+
+
+# Expiry lists are ordered by (exp_date, medicine_id) from the in-memory index
+EXPIRY_FIELDS = list(MEDICINE_COLUMNS) + ['days_until_expiry']
+
+
+# ==================== WRITE SUBSCRIBERS ====================
+
+def fetch_index_rows(table, columns, ids=None):
+    """store.index_rows() on a pooled connection"""
+    connection = db_pool.connect()
+    try:
+        cursor = connection.cursor()
+        rows = store.index_rows(cursor, table, columns, ids)
+        cursor.close()
+        return rows
+    finally:
+        connection.close()
+
+
+def clear_stats_cache(action, ids):
+    """Drop cached aggregates after a committed medicine write"""
+    stats_cache.clear()
+
+
+def invalidate_medicine_cache(action, ids):
+    """Drop cached records for updated or deleted medicines"""
+    if action in ('update', 'delete', 'stock'):
+        for medicine_id in ids:
+            medicine_cache.delete(medicine_id)
+
+
+def invalidate_supplier_cache(action, ids):
+    """Drop the cached supplier lists after any supplier write"""
+    supplier_cache.clear()
+
+
+def refresh_medicine_suggestions(action, ids):
+    """Apply medicine writes to the suggestion index"""
+    if action == 'stock':
+        return
+    if action == 'bulk':
+        # Bulk imports do not report row IDs; reload everything off the request thread
+        threading.Thread(target=rebuild_suggest_index, name='suggest-rebuild-bulk', daemon=True).start()
+        return
+    if action == 'delete':
+        for medicine_id in ids:
+            suggest_index.remove_medicine(medicine_id)
+        return
+    rows = fetch_index_rows('medicines', ('medicine_id', 'name', 'company'), ids)
+    for medicine_id, name, company in rows:
+        suggest_index.upsert_medicine(medicine_id, name, company)
+    for medicine_id in set(ids).difference(row[0] for row in rows):
+        suggest_index.remove_medicine(medicine_id)
+
+
+def refresh_supplier_suggestions(action, ids):
+    """Apply supplier writes to the suggestion index"""
+    rows = fetch_index_rows('suppliers', ('supplier_id', 'supplier_name'), ids)
+    for supplier_id, supplier_name in rows:
+        suggest_index.upsert_supplier(supplier_id, supplier_name)
+
+
+def load_suggest_rows():
+    """Full (medicines, suppliers) load for rebuilding the suggestion index"""
+    connection = db_pool.connect()
+    try:
+        cursor = connection.cursor()
+        medicines = store.index_rows(cursor, 'medicines', ('medicine_id', 'name', 'company'))
+        suppliers = store.index_rows(cursor, 'suppliers', ('supplier_id', 'supplier_name'))
+        cursor.close()
+        return medicines, suppliers
+    finally:
+        connection.close()
+
+
+def rebuild_suggest_index():
+    """Reload the suggestion index from the database to catch writes by other processes"""
+    try:
+        suggest_index.rebuild(load_suggest_rows)
+    except Error + (PoolTimeout,) as e:
+        print(f"Error rebuilding suggestion index: {e}")
+
+
+def refresh_medicine_expiry(action, ids):
+    """Apply medicine writes to the expiry index"""
+    if action == 'stock':
+        return
+    if action == 'bulk':
+        threading.Thread(target=rebuild_expiry_index, name='expiry-rebuild-bulk', daemon=True).start()
+        return
+    if action == 'delete':
+        for medicine_id in ids:
+            expiry_index.remove(medicine_id)
+        return
+    rows = fetch_index_rows('medicines', ('medicine_id', 'exp_date'), ids)
+    for medicine_id, exp_date in rows:
+        expiry_index.upsert(medicine_id, exp_date)
+    for medicine_id in set(ids).difference(row[0] for row in rows):
+        expiry_index.remove(medicine_id)
+
+
+def load_expiry_rows():
+    """Full (medicine_id, exp_date) load for rebuilding the expiry index"""
+    return fetch_index_rows('medicines', ('medicine_id', 'exp_date'))
+
+
+def rebuild_expiry_index():
+    """Reload the expiry index from the database to catch writes by other processes"""
+    try:
+        expiry_index.rebuild(load_expiry_rows)
+    except Error + (PoolTimeout,) as e:
+        print(f"Error rebuilding expiry index: {e}")
+
+
+events.subscribe('medicines', clear_stats_cache)
+events.subscribe('medicines', invalidate_medicine_cache)
+events.subscribe('medicines', refresh_medicine_suggestions)
+events.subscribe('medicines', refresh_medicine_expiry)
+events.subscribe('suppliers', invalidate_supplier_cache)
+events.subscribe('suppliers', refresh_supplier_suggestions)
+
+# Build the in-memory indexes at startup, then periodically
+suggest_refresher = PeriodicTask('suggest-rebuild', SUGGEST_CONFIG['REBUILD_INTERVAL'], rebuild_suggest_index)
+suggest_refresher.start()
+expiry_refresher = PeriodicTask('expiry-rebuild', EXPIRY_CONFIG['REBUILD_INTERVAL'], rebuild_expiry_index)
+expiry_refresher.start()
+
+
+# ==================== CONDITIONAL GET ====================
+
+# Tables whose changes can alter a medicine representation (supplier columns are joined in)
+MEDICINE_TABLES = ('medicines', 'suppliers')
+
 
+def load_table_versions():
+    """Read {table: (version, last_modified)} from table_versions"""
+    connection = db_pool.connect()
+    try:
+        cursor = connection.cursor()
+        versions = store.table_versions(cursor)
+        cursor.close()
+        return versions
+    finally:
+        connection.close()
+
+
+def clear_caches_for_remote_write(table):
+    """Another process wrote to ``table``; drop what this process cached from it"""
+    # change_log and reorder_points counters also move on this process's own writes
+    if table not in MEDICINE_TABLES:
+        return
+    stats_cache.clear()
+    if table == 'medicines':
+        medicine_cache.clear()
+    elif table == 'suppliers':
+        supplier_cache.clear()
+
+
+def note_medicine_write(action, ids):
+    """Make this process's medicine writes visible to the next conditional GET"""
+    version_tracker.invalidate('medicines')
 
-def serialize_date(date_obj):
-    """Convert date objects to string format"""
-    if date_obj is None:
+
+def note_supplier_write(action, ids):
+    """Make this process's supplier writes visible to the next conditional GET"""
+    version_tracker.invalidate('suppliers')
+
+
+version_tracker = VersionTracker(
+    load_table_versions, max_age=ETAG_CONFIG['VERSION_MAX_AGE'],
+    on_change=clear_caches_for_remote_write
+)
+events.subscribe('medicines', note_medicine_write)
+events.subscribe('suppliers', note_supplier_write)
+
+
+def table_validators(tables, *parts):
+    """
+    (etag, last_modified) for the current URL read from ``tables``, or None.
+
+    ``parts`` adds anything else the response depends on (such as today's
+    date for expiry lists).
+    """
+    versions = read_versions()
+    if versions is None or any(table not in versions for table in tables):
         return None
-    if isinstance(date_obj, datetime):
-        return date_obj.strftime('%Y-%m-%d')
-    if isinstance(date_obj, str):
-        return date_obj
-    return str(date_obj)
+    # A compressed body is a different representation, so it needs its own ETag
+    encoding = negotiate_encoding(request.headers.get('Accept-Encoding'))
+    etag = make_etag(versions, tables, request.full_path, *parts, encoding)
+    return etag, max(versions[table][1] for table in tables)
+
 
+def is_not_modified(validators):
+    """True when the client's If-None-Match already holds the current ETag"""
+    return validators is not None and request.if_none_match.contains(validators[0])
 
-def serialize_datetime(datetime_obj):
-    """Convert datetime objects to string format"""
-    if datetime_obj is None:
+
+def with_validators(response, validators):
+    """Attach ETag/Last-Modified; no-cache makes browsers revalidate every time"""
+    if validators is not None:
+        response.set_etag(validators[0])
+        response.last_modified = validators[1]
+        response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+def not_modified_response(validators):
+    return with_validators(Response(status=304), validators)
+
+
+def list_format():
+    """The list format the request's Accept header asks for (see serialization.LIST_FORMATS)"""
+    return negotiate_list_format(request.headers.get('Accept'))
+
+
+def list_response(columns, rows, fields, fmt):
+    """List rows encoded as ``fmt``; the body depends on Accept, so caches must vary on it"""
+    response = Response(encode_list(columns, rows, fields, fmt), mimetype=fmt)
+    response.vary.add('Accept')
+    return response
+
+
+def current_change_seq(versions=None):
+    """Change feed position of a table_versions snapshot (the primary's by default), or None"""
+    if versions is None:
+        versions = version_tracker.get()
+    if versions is None or 'change_log' not in versions:
         return None
-    if isinstance(datetime_obj, datetime):
-        return datetime_obj.strftime('%Y-%m-%d %H:%M:%S')
-    return str(datetime_obj)
+    return versions['change_log'][0]
+
+
+def with_change_seq(response, change_seq):
+    """
+    X-Change-Seq: where a client holding this data starts following /api/changes.
+
+    Read before the data, so the data is at least that new; changes the
+    client then replays twice are idempotent.
+    """
+    if change_seq is not None:
+        response.headers['X-Change-Seq'] = str(change_seq)
+    return response
+
+
+# ==================== READ REPLICAS ====================
+
+def create_replica(address):
+    """A Replica with its own pool for one REPLICA_CONFIG['ADDRESSES'] entry"""
+    replica_store = create_replica_storage(STORAGE_CONFIG, DB_CONFIG, address)
+    pool = ConnectionPool(lambda: metrics.TimedConnection(replica_store.connect()), **POOL_CONFIG)
+    atexit.register(pool.dispose)
+    return Replica(address, replica_store, pool)
+
+
+if REPLICA_CONFIG['ADDRESSES']:
+    replica_router = ReplicaRouter(
+        [create_replica(address) for address in REPLICA_CONFIG['ADDRESSES']],
+        store.table_versions, version_tracker.get, REPLICA_CONFIG['MAX_LAG']
+    )
+    replica_checker = PeriodicTask('replica-health', REPLICA_CONFIG['CHECK_INTERVAL'], replica_router.check)
+    replica_checker.start()
+else:
+    replica_router = None
+
+# Clients that wrote in the last STICKY_SECONDS, shared between processes like the lookup caches
+recent_writers = TTLCache(
+    ttl=REPLICA_CONFIG['STICKY_SECONDS'], namespace='writer:',
+    backend=lookup_backend if lookup_backend.name != 'memory' else MemoryBackend(10000)
+)
+
+
+def client_key():
+    """Who a request comes from, for read-your-writes stickiness"""
+    return request.remote_addr or ''
+
+
+def read_replica():
+    """
+    The replica this request reads from, or None for the primary.
+
+    Chosen once per request: only GET and HEAD requests use replicas, and not
+    from a client that wrote within REPLICA_STICKY_SECONDS, so clients always
+    see their own writes.
+    """
+    if 'read_replica' not in g:
+        g.read_replica = None
+        if (replica_router is not None and request.method in ('GET', 'HEAD')
+                and recent_writers.get(client_key()) is MISSING):
+            g.read_replica = replica_router.choose()
+    return g.read_replica
+
+
+def read_versions():
+    """The table_versions snapshot matching the data this request reads"""
+    replica = read_replica()
+    return replica.versions if replica is not None else version_tracker.get()
+
+
+def cache_generation(cache, tables, replica):
+    """
+    ``cache.generation`` to pass to set() after reading ``tables`` from
+    ``replica`` (None for the primary), or STALE while that replica may still
+    lack a write this process knows about.
+    """
+    generation = cache.generation
+    if replica is None or versions_cover(replica.versions, version_tracker.get(), tables):
+        return generation
+    return STALE
+
+
+@app.after_request
+def note_client_write(response):
+    """Keep a client's reads on the primary for REPLICA_STICKY_SECONDS after it writes"""
+    if (replica_router is not None and request.method not in ('GET', 'HEAD', 'OPTIONS')
+            and response.status_code < 400):
+        recent_writers.set(client_key(), True)
+    return response
+
+
+# ==================== REORDER POINTS ====================
+
+def refresh_reorder_points():
+    """Recompute reorder points for medicines changed since the last run (see reorder.py)"""
+    try:
+        connection = db_pool.connect()
+    except Error + (PoolTimeout,) as e:
+        print(f"Error recomputing reorder points: {e}")
+        return
+    try:
+        summary = run_reorder(store, connection, REORDER_CONFIG)
+    except Error as e:
+        print(f"Error recomputing reorder points: {e}")
+        return
+    finally:
+        connection.close()
+    if summary['medicines']:
+        version_tracker.invalidate('reorder_points')
+
+
+reorder_refresher = PeriodicTask('reorder-points', REORDER_CONFIG['INTERVAL'], refresh_reorder_points)
+reorder_refresher.start()
+
+
+# ==================== ARCHIVE ====================
+
+def archive_expired_medicines():
+    """Move long-expired medicines out of the hot table (see archive.py)"""
+    try:
+        connection = db_pool.connect()
+    except Error + (PoolTimeout,) as e:
+        print(f"Error archiving expired medicines: {e}")
+        return
+    try:
+        moved = archive_expired(store, connection, ARCHIVE_CONFIG)
+    except Error as e:
+        print(f"Error archiving expired medicines: {e}")
+        return
+    finally:
+        connection.close()
+    if moved:
+        events.publish('medicines', 'delete', moved)
+
+
+medicine_archiver = PeriodicTask('medicine-archive', ARCHIVE_CONFIG['INTERVAL'], archive_expired_medicines)
+medicine_archiver.start()
+
+
+# ==================== CHANGE FEED ====================
+
+# Wakes /api/changes/stream generators after this process commits a write;
+# subscribed after note_*_write so the next version_tracker.get() reloads
+change_notifier = ChangeNotifier()
+events.subscribe('medicines', change_notifier.notify)
+events.subscribe('suppliers', change_notifier.notify)
+
+
+class ChangeFeedUnavailable(Exception):
+    """The database predates the change feed (run setup_database.py --migrate)"""
+
+
+class ChangeLogGap(Exception):
+    """Entries after the client's position were pruned; it must reload its data"""
+
+
+def read_changes(cursor, since, limit):
+    """
+    {'changes': [...], 'last_seq': n, 'more': bool} for changes after ``since``.
+
+    Each change carries the row's current data (null once it is deleted;
+    'bulk' entries tell the client to reload). Without ``since`` only the
+    current position is returned. Raises ChangeLogGap when ``since`` is no
+    longer covered by the log.
+    """
+    counter = store.last_change_seq(cursor)
+    if counter is None:
+        raise ChangeFeedUnavailable()
+    if since is None:
+        return {'changes': [], 'last_seq': counter, 'more': False}
+    if since > counter:
+        raise ChangeLogGap()
+    rows = store.list_changes(cursor, since, counter, limit + 1)
+    # Sequence numbers have no holes, so a missing since + 1 was pruned
+    if since < counter and (not rows or rows[0][0] != since + 1):
+        raise ChangeLogGap()
+    more = len(rows) > limit
+    rows = rows[:limit]
+
+    wanted = {'medicines': set(), 'suppliers': set()}
+    for _, table, row_id, action, _ in rows:
+        if action in ('insert', 'update') and table in wanted:
+            wanted[table].add(row_id)
+    data = {'medicines': {}, 'suppliers': {}}
+    if wanted['medicines']:
+        columns, found = store.medicines_by_ids(cursor, list(MEDICINE_COLUMNS), sorted(wanted['medicines']))
+        data['medicines'] = {row['medicine_id']: row for row in serialize_rows(columns, found)}
+    if wanted['suppliers']:
+        columns = list(SUPPLIER_COLUMNS)
+        found = store.index_rows(cursor, 'suppliers', columns, sorted(wanted['suppliers']))
+        data['suppliers'] = {row['supplier_id']: row for row in serialize_rows(columns, found)}
+
+    changes = [
+        {'seq': seq, 'table': table, 'id': row_id, 'action': action,
+         'changed_at': serialize_datetime(created_at), 'data': data.get(table, {}).get(row_id)}
+        for seq, table, row_id, action, created_at in rows
+    ]
+    return {'changes': changes, 'last_seq': rows[-1][0] if rows else since, 'more': more}
+
+
+def fetch_changes(since, limit):
+    """read_changes() on a pooled connection, borrowed only for the query"""
+    connection = db_pool.connect()
+    try:
+        cursor = connection.cursor()
+        payload = read_changes(cursor, since, limit)
+        cursor.close()
+        return payload
+    finally:
+        connection.close()
+
+
+def parse_count(raw, name):
+    """A non-negative integer query value, or None when absent"""
+    if raw is None or raw == '':
+        return None
+    if not raw.isdigit():
+        raise ValueError(f'{name} must be a non-negative integer')
+    return int(raw)
+
+
+def prune_change_log():
+    """Drop change_log entries older than CHANGES_CONFIG['RETENTION_HOURS']"""
+    try:
+        connection = db_pool.connect()
+    except Error + (PoolTimeout,) as e:
+        print(f"Error pruning the change log: {e}")
+        return
+    try:
+        cursor = connection.cursor()
+        before = store.database_now(cursor) - timedelta(hours=CHANGES_CONFIG['RETENTION_HOURS'])
+        store.prune_changes(cursor, before)
+        connection.commit()
+        cursor.close()
+    except Error as e:
+        connection.rollback()
+        print(f"Error pruning the change log: {e}")
+    finally:
+        connection.close()
+
+
+change_log_pruner = PeriodicTask('change-log-prune', CHANGES_CONFIG['PRUNE_INTERVAL'], prune_change_log)
+change_log_pruner.start()
+
+
+# ==================== BACKGROUND JOBS ====================
+
+# Bookkeeping goes through the pool; each running job opens a connection of its own
+job_queue = JobQueue(store, db_pool.connect, store.connect, JOBS_CONFIG)
+register_reports(job_queue)
+job_queue.register('reorder_points', reorder_job(REORDER_CONFIG))
+job_queue.register('archive_medicines', archive_job(ARCHIVE_CONFIG))
+job_queue.start()
 
 
 # ==================== SUPPLIER ENDPOINTS ====================
 
 @app.route('/api/suppliers', methods=['GET'])
 def get_suppliers():
-    """Get all suppliers"""
+    """Get suppliers (supports limit/cursor pagination and fields projection)"""
+    try:
+        fields = parse_fields(request.args.get('fields'), SUPPLIER_COLUMNS)
+        limit, after = parse_page(request.args, SUPPLIER_KEY)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    validators = table_validators(('suppliers',))
+    if is_not_modified(validators):
+        return not_modified_response(validators)
+
+    # Whole lists (the common case for the supplier dropdowns) are cached
+    cache_key = ','.join(fields)
+    if limit is None:
+        body = supplier_cache.get(cache_key)
+        if body is not MISSING:
+            return with_validators(json_response(body), validators), 200
+    generation = cache_generation(supplier_cache, ('suppliers',), read_replica())
+
     connection = get_db_connection()
     if not connection:
         return jsonify({'error': 'Database connection failed'}), 500
     
     try:
-        cursor = connection.cursor(dictionary=True)
-        cursor.execute("SELECT * FROM suppliers ORDER BY supplier_name")
-        suppliers = cursor.fetchall()
-        
-        # Serialize datetime objects
-        for supplier in suppliers:
-            supplier['created_at'] = serialize_datetime(supplier.get('created_at'))
-            supplier['updated_at'] = serialize_datetime(supplier.get('updated_at'))
+        cursor = connection.cursor()
+        columns, rows = store.list_suppliers(cursor, fields, limit, after)
+        rows, next_cursor = paginate_rows(rows, limit, SUPPLIER_KEY, columns)
+        body = dumps(serialize_rows(columns, rows, fields))
+        if limit is None:
+            supplier_cache.set(cache_key, body, generation)
         
-        return jsonify(suppliers), 200
+        return with_validators(add_pagination_headers(json_response(body), next_cursor), validators), 200
     except Error as e:
         return jsonify({'error': str(e)}), 500
     finally:
@@ -77,21 +675,22 @@ def get_suppliers():
 def add_supplier():
     """Add a new supplier"""
     data = request.json
+    # Validate required fields
+    if 'supplier_name' not in data or 'contact_no' not in data:
+        return jsonify({'error': 'Missing required fields: supplier_name, contact_no'}), 400
+    
     connection = get_db_connection()
     if not connection:
         return jsonify({'error': 'Database connection failed'}), 500
     
     try:
-        # Validate required fields
-        if 'supplier_name' not in data or 'contact_no' not in data:
-            return jsonify({'error': 'Missing required fields: supplier_name, contact_no'}), 400
-        
         cursor = connection.cursor()
-        query = "INSERT INTO suppliers (supplier_name, contact_no) VALUES (%s, %s)"
-        values = (data['supplier_name'], data['contact_no'])
-        cursor.execute(query, values)
+        supplier_id = store.add_supplier(cursor, data['supplier_name'], data['contact_no'])
+        bump_version(cursor, 'suppliers')
+        record_changes(cursor, 'suppliers', 'insert', [supplier_id])
         connection.commit()
-        return jsonify({'message': 'Supplier added successfully', 'id': cursor.lastrowid}), 201
+        events.publish('suppliers', 'insert', [supplier_id])
+        return jsonify({'message': 'Supplier added successfully', 'id': supplier_id}), 201
     except Error as e:
         connection.rollback()
         return jsonify({'error': str(e)}), 500
@@ -105,30 +704,33 @@ def add_supplier():
 
 @app.route('/api/medicines', methods=['GET'])
 def get_medicines():
-    """Get all medicines with supplier information"""
+    """Get medicines with supplier information (supports limit/cursor, fields and include_archived)"""
+    include_archived = request.args.get('include_archived', 'false').lower() in ('1', 'true', 'yes')
+    try:
+        fields = parse_fields(request.args.get('fields'),
+                              ARCHIVED_MEDICINE_COLUMNS if include_archived else MEDICINE_COLUMNS)
+        limit, after = parse_page(request.args, ARCHIVED_MEDICINE_KEY if include_archived else MEDICINE_KEY)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    fmt = list_format()
+    validators = table_validators(MEDICINE_TABLES, fmt)
+    change_seq = current_change_seq(read_versions())
+    if is_not_modified(validators):
+        return with_change_seq(not_modified_response(validators), change_seq)
+
     connection = get_db_connection()
     if not connection:
         return jsonify({'error': 'Database connection failed'}), 500
     
     try:
-        cursor = connection.cursor(dictionary=True)
-        query = """
-            SELECT m.*, s.supplier_name, s.contact_no
-            FROM medicines m
-            JOIN suppliers s ON m.supplier_id = s.supplier_id
-            ORDER BY m.name
-        """
-        cursor.execute(query)
-        medicines = cursor.fetchall()
-        
-        # Serialize date and datetime objects
-        for medicine in medicines:
-            medicine['mfg_date'] = serialize_date(medicine.get('mfg_date'))
-            medicine['exp_date'] = serialize_date(medicine.get('exp_date'))
-            medicine['created_at'] = serialize_datetime(medicine.get('created_at'))
-            medicine['updated_at'] = serialize_datetime(medicine.get('updated_at'))
+        cursor = connection.cursor()
+        columns, rows = store.list_medicines(cursor, fields, limit, after, include_archived)
+        key = ARCHIVED_MEDICINE_KEY if include_archived else MEDICINE_KEY
+        rows, next_cursor = paginate_rows(rows, limit, key, columns)
         
-        return jsonify(medicines), 200
+        response = add_pagination_headers(list_response(columns, rows, fields, fmt), next_cursor)
+        return with_change_seq(with_validators(response, validators), change_seq), 200
     except Error as e:
         return jsonify({'error': str(e)}), 500
     finally:
@@ -139,28 +741,28 @@ def get_medicines():
 
 @app.route('/api/medicines/<int:medicine_id>', methods=['GET'])
 def get_medicine(medicine_id):
-    """Get a specific medicine by ID"""
+    """Get a specific medicine by ID (read through the medicine cache)"""
+    validators = table_validators(MEDICINE_TABLES)
+    if is_not_modified(validators):
+        return not_modified_response(validators)
+
+    body = medicine_cache.get(medicine_id)
+    if body is not MISSING:
+        return with_validators(json_response(body), validators), 200
+    generation = cache_generation(medicine_cache, MEDICINE_TABLES, read_replica())
+
     connection = get_db_connection()
     if not connection:
         return jsonify({'error': 'Database connection failed'}), 500
     
     try:
-        cursor = connection.cursor(dictionary=True)
-        query = """
-            SELECT m.*, s.supplier_name, s.contact_no
-            FROM medicines m
-            JOIN suppliers s ON m.supplier_id = s.supplier_id
-            WHERE m.medicine_id = %s
-        """
-        cursor.execute(query, (medicine_id,))
-        medicine = cursor.fetchone()
+        cursor = connection.cursor()
+        columns, medicine = store.get_medicine(cursor, medicine_id)
         
         if medicine:
-            medicine['mfg_date'] = serialize_date(medicine.get('mfg_date'))
-            medicine['exp_date'] = serialize_date(medicine.get('exp_date'))
-            medicine['created_at'] = serialize_datetime(medicine.get('created_at'))
-            medicine['updated_at'] = serialize_datetime(medicine.get('updated_at'))
-            return jsonify(medicine), 200
+            body = dumps(serialize_rows(columns, [medicine])[0])
+            medicine_cache.set(medicine_id, body, generation)
+            return with_validators(json_response(body), validators), 200
         else:
             return jsonify({'error': 'Medicine not found'}), 404
     except Error as e:
@@ -171,35 +773,111 @@ def get_medicine(medicine_id):
             connection.close()
 
 
+def parse_ids(raw):
+    """
+    Medicine ids from a JSON list or a comma-separated string, in order, without duplicates.
+
+    Raises ValueError for anything but positive integers or for more than
+    BATCH_GET_CONFIG['MAX_IDS'] ids.
+    """
+    if isinstance(raw, str):
+        raw = [part.strip() for part in raw.split(',') if part.strip()]
+    if not isinstance(raw, list) or not raw:
+        raise ValueError('ids must be a non-empty list of medicine IDs')
+    ids = []
+    for value in raw:
+        if isinstance(value, str) and value.isdigit():
+            value = int(value)
+        if not isinstance(value, int) or isinstance(value, bool) or value < 1:
+            raise ValueError(f'Invalid medicine ID: {value}')
+        ids.append(value)
+    ids = list(dict.fromkeys(ids))
+    if len(ids) > BATCH_GET_CONFIG['MAX_IDS']:
+        raise ValueError(f"At most {BATCH_GET_CONFIG['MAX_IDS']} IDs per request")
+    return ids
+
+
+@app.route('/api/medicines/batch-get', methods=['GET', 'POST'])
+def batch_get_medicines():
+    """Get many medicines by ID (?ids=1,2,3 or a JSON body {"ids": [...]}) with one query"""
+    if request.method == 'POST':
+        data = request.get_json(silent=True)
+        raw = data.get('ids') if isinstance(data, dict) else None
+    else:
+        raw = request.args.get('ids')
+    try:
+        ids = parse_ids(raw)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    # A POST body is not part of the ETag, so only GET is conditional
+    validators = table_validators(MEDICINE_TABLES) if request.method == 'GET' else None
+    if is_not_modified(validators):
+        return not_modified_response(validators)
+
+    # Records come from the same cache and serialization as GET /api/medicines/<id>
+    bodies = dict(zip(ids, medicine_cache.get_many(ids)))
+    generation = cache_generation(medicine_cache, MEDICINE_TABLES, read_replica())
+    wanted = [medicine_id for medicine_id, body in bodies.items() if body is MISSING]
+
+    if wanted:
+        connection = get_db_connection()
+        if not connection:
+            return jsonify({'error': 'Database connection failed'}), 500
+        try:
+            cursor = connection.cursor()
+            columns, rows = store.get_medicines(cursor, wanted)
+            for medicine in serialize_rows(columns, rows):
+                body = dumps(medicine)
+                bodies[medicine['medicine_id']] = body
+                medicine_cache.set(medicine['medicine_id'], body, generation)
+        except Error as e:
+            return jsonify({'error': str(e)}), 500
+        finally:
+            if connection.is_connected():
+                cursor.close()
+                connection.close()
+
+    # Splice the encoded records in rather than decoding cached bodies again
+    found = b','.join(b'"%d":%s' % (medicine_id, body) for medicine_id, body in bodies.items()
+                      if body is not MISSING)
+    missing = [medicine_id for medicine_id, body in bodies.items() if body is MISSING]
+    body = b'{"medicines":{' + found + b'},"missing":' + dumps(missing) + b'}'
+    return with_validators(json_response(body), validators), 200
+
+
 @app.route('/api/medicines/search', methods=['GET'])
 def search_medicines():
-    """Search medicines by name, company, or supplier"""
-    search_term = request.args.get('q', '')
+    """Search medicines by name, company, or supplier, best matches first"""
+    search_term = request.args.get('q', '').strip()
+    include_archived = request.args.get('include_archived', 'false').lower() in ('1', 'true', 'yes')
+    try:
+        fields = parse_fields(request.args.get('fields'),
+                              ARCHIVED_SEARCH_COLUMNS if include_archived else SEARCH_COLUMNS)
+        limit, after = parse_page(request.args, ARCHIVED_SEARCH_KEY if include_archived else SEARCH_KEY)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if not search_term:
+        return list_response(fields, [], fields, list_format()), 200
+    limit = min(limit or SEARCH_CONFIG['MAX_RESULTS'], SEARCH_CONFIG['MAX_RESULTS'])
+
+    fmt = list_format()
+    validators = table_validators(MEDICINE_TABLES, fmt)
+    if is_not_modified(validators):
+        return not_modified_response(validators)
+
     connection = get_db_connection()
     if not connection:
         return jsonify({'error': 'Database connection failed'}), 500
     
     try:
-        cursor = connection.cursor(dictionary=True)
-        query = """
-            SELECT m.*, s.supplier_name, s.contact_no
-            FROM medicines m
-            JOIN suppliers s ON m.supplier_id = s.supplier_id
-            WHERE m.name LIKE %s OR m.company LIKE %s OR s.supplier_name LIKE %s
-            ORDER BY m.name
-        """
-        search_pattern = f'%{search_term}%'
-        cursor.execute(query, (search_pattern, search_pattern, search_pattern))
-        medicines = cursor.fetchall()
-        
-        # Serialize date objects
-        for medicine in medicines:
-            medicine['mfg_date'] = serialize_date(medicine.get('mfg_date'))
-            medicine['exp_date'] = serialize_date(medicine.get('exp_date'))
-            medicine['created_at'] = serialize_datetime(medicine.get('created_at'))
-            medicine['updated_at'] = serialize_datetime(medicine.get('updated_at'))
+        cursor = connection.cursor()
+        columns, rows = store.search_medicines(cursor, search_term, fields, limit, after, include_archived)
+        key = ARCHIVED_SEARCH_KEY if include_archived else SEARCH_KEY
+        rows, next_cursor = paginate_rows(rows, limit, key, columns)
+        response = list_response(columns, rows, fields, fmt)
         
-        return jsonify(medicines), 200
+        return with_validators(add_pagination_headers(response, next_cursor), validators), 200
     except Error as e:
         return jsonify({'error': str(e)}), 500
     finally:
@@ -208,36 +886,210 @@ def search_medicines():
             connection.close()
 
 
+@app.route('/api/medicines/suggest', methods=['GET'])
+def suggest_medicines():
+    """Typeahead suggestions (medicine, company, supplier) answered from memory"""
+    prefix = request.args.get('q', '')
+    limit = request.args.get('limit', SUGGEST_CONFIG['LIMIT'], type=int)
+    limit = max(1, min(limit, SUGGEST_CONFIG['MAX_LIMIT']))
+    
+    if not suggest_index.ready:
+        rebuild_suggest_index()
+        if not suggest_index.ready:
+            return jsonify({'error': 'Suggestion index is not available'}), 503
+    
+    return json_response(suggest_index.suggest(prefix, limit)), 200
+
+
+def parse_expiry_cursor(after):
+    """Turn decoded cursor values back into an (exp_date, medicine_id) index key"""
+    if after is None:
+        return None
+    try:
+        exp_date, medicine_id = after
+        return date.fromisoformat(exp_date), int(medicine_id)
+    except (TypeError, ValueError):
+        raise ValueError('Invalid cursor')
+
+
+def expiry_response(select, fields, limit, after):
+    """
+    Serve one page of an expiry list from the index.
+
+    ``select(after, limit)`` returns (exp_date, medicine_id) entries from the
+    index; only those rows are read from the database, by primary key.
+    """
+    if not expiry_index.ready:
+        rebuild_expiry_index()
+        if not expiry_index.ready:
+            return jsonify({'error': 'Expiry index is not available'}), 503
+
+    today = date.today()
+    fmt = list_format()
+    validators = table_validators(MEDICINE_TABLES, today, fmt)
+    if is_not_modified(validators):
+        return not_modified_response(validators)
+
+    entries = select(after, None if limit is None else limit + 1)
+    next_cursor = None
+    if limit is not None and len(entries) > limit:
+        entries = entries[:limit]
+        exp_date, medicine_id = entries[-1]
+        next_cursor = encode_cursor([exp_date, medicine_id])
+
+    columns_wanted = [name for name in fields if name != 'days_until_expiry']
+    columns, rows = fields, []
+    if entries:
+        connection = get_db_connection()
+        if not connection:
+            return jsonify({'error': 'Database connection failed'}), 500
+        try:
+            cursor = connection.cursor()
+            columns, found = store.medicines_by_ids(
+                cursor, columns_wanted, [medicine_id for _, medicine_id in entries]
+            )
+            id_position = columns.index('medicine_id')
+            by_id = {row[id_position]: row for row in found}
+        except Error as e:
+            return jsonify({'error': str(e)}), 500
+        finally:
+            if connection.is_connected():
+                cursor.close()
+                connection.close()
+        # Keep index order; rows deleted since the last index update are skipped
+        for exp_date, medicine_id in entries:
+            row = by_id.get(medicine_id)
+            if row is not None:
+                rows.append(row + ((exp_date - today).days,))
+        columns = columns + ('days_until_expiry',)
+
+    response = list_response(columns, rows, fields, fmt)
+    return with_validators(add_pagination_headers(response, next_cursor), validators), 200
+
+
 @app.route('/api/medicines/expiring', methods=['GET'])
 def get_expiring_medicines():
     """Get medicines expiring within specified days (default 30 days)"""
     days = request.args.get('days', 30, type=int)
+    # Past the calendar's end, today + days would not be a date at all
+    if not 0 <= days <= MAX_EXPIRY_DAYS:
+        return jsonify({'error': f'days must be an integer from 0 to {MAX_EXPIRY_DAYS}'}), 400
+    try:
+        fields = parse_fields(request.args.get('fields'), EXPIRY_FIELDS)
+        limit, after = parse_page(request.args)
+        after = parse_expiry_cursor(after)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    return expiry_response(
+        lambda after, limit: expiry_index.expiring(days, after=after, limit=limit),
+        fields, limit, after
+    )
+
+
+@app.route('/api/medicines/expired', methods=['GET'])
+def get_expired_medicines():
+    """Get medicines whose expiry date has already passed, oldest first"""
+    try:
+        fields = parse_fields(request.args.get('fields'), EXPIRY_FIELDS)
+        limit, after = parse_page(request.args)
+        after = parse_expiry_cursor(after)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    return expiry_response(
+        lambda after, limit: expiry_index.expired(after=after, limit=limit),
+        fields, limit, after
+    )
+
+
+@app.route('/api/medicines/expiry-summary', methods=['GET'])
+def get_expiry_summary():
+    """Counts of expired medicines and those expiring within 7, 30 and 90 days"""
+    if not expiry_index.ready:
+        rebuild_expiry_index()
+        if not expiry_index.ready:
+            return jsonify({'error': 'Expiry index is not available'}), 503
+    validators = table_validators(('medicines',), date.today())
+    if is_not_modified(validators):
+        return not_modified_response(validators)
+    return with_validators(json_response(expiry_index.summary()), validators), 200
+
+
+@app.route('/api/medicines/export', methods=['GET'])
+def export_medicines():
+    """Stream the full inventory as NDJSON or CSV (supports fields)"""
+    fmt = request.args.get('format', 'ndjson')
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'error': 'format must be ndjson or csv'}), 400
+    try:
+        fields = parse_fields(request.args.get('fields'), MEDICINE_COLUMNS)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    batch_size = EXPORT_CONFIG['BATCH_SIZE']
+
+    # The response outlives the request context, so this connection is not
+    # registered in g; the generator below returns it to the pool.
+    try:
+        with metrics.phase('acquire'):
+            connection = db_pool.connect()
+    except Error + (PoolTimeout,) as e:
+        print(f"Error connecting to the database: {e}")
+        return jsonify({'error': 'Database connection failed'}), 500
+
+    try:
+        # Unbuffered: rows stay on the server until fetchmany() asks for them
+        cursor = connection.cursor(buffered=False)
+        store.export_medicines(cursor, fields)
+    except Error as e:
+        connection.invalidate()
+        return jsonify({'error': str(e)}), 500
+
+    def generate():
+        finished = False
+        try:
+            batches = iter_batches(cursor, batch_size)
+            if fmt == 'csv':
+                yield from csv_chunks(batches, cursor.column_names, fields)
+            else:
+                yield from ndjson_chunks(batches, cursor.column_names, fields)
+            finished = True
+        except Error as e:
+            print(f"Error streaming medicine export: {e}")
+        finally:
+            if finished:
+                cursor.close()
+                connection.close()
+            else:
+                # Unread rows would be drained on rollback; drop the connection instead
+                connection.invalidate()
+
+    response = Response(generate(), mimetype=EXPORT_FORMATS[fmt])
+    response.headers['Content-Disposition'] = f'attachment; filename=medicines.{fmt}'
+    return response
+
+
+@app.route('/api/medicines', methods=['POST'])
+def add_medicine():
+    """Add a new medicine"""
+    values, error = validate_medicine(request.json)
+    if error:
+        return jsonify({'error': error}), 400
+    
     connection = get_db_connection()
     if not connection:
         return jsonify({'error': 'Database connection failed'}), 500
     
     try:
-        cursor = connection.cursor(dictionary=True)
-        query = """
-            SELECT m.*, s.supplier_name, s.contact_no,
-                   DATEDIFF(m.exp_date, CURDATE()) as days_until_expiry
-            FROM medicines m
-            JOIN suppliers s ON m.supplier_id = s.supplier_id
-            WHERE m.exp_date <= DATE_ADD(CURDATE(), INTERVAL %s DAY)
-            AND m.exp_date >= CURDATE()
-            ORDER BY m.exp_date
-        """
-        cursor.execute(query, (days,))
-        medicines = cursor.fetchall()
-        
-        for medicine in medicines:
-            medicine['mfg_date'] = serialize_date(medicine.get('mfg_date'))
-            medicine['exp_date'] = serialize_date(medicine.get('exp_date'))
-            medicine['created_at'] = serialize_datetime(medicine.get('created_at'))
-            medicine['updated_at'] = serialize_datetime(medicine.get('updated_at'))
-        
-        return jsonify(medicines), 200
+        cursor = connection.cursor()
+        medicine_id = store.insert_medicine(cursor, values)
+        bump_version(cursor, 'medicines')
+        record_changes(cursor, 'medicines', 'insert', [medicine_id])
+        connection.commit()
+        events.publish('medicines', 'insert', [medicine_id])
+        return jsonify({'message': 'Medicine added successfully', 'id': medicine_id}), 201
     except Error as e:
+        connection.rollback()
         return jsonify({'error': str(e)}), 500
     finally:
         if connection.is_connected():
@@ -245,51 +1097,128 @@ def get_expiring_medicines():
             connection.close()
 
 
-@app.route('/api/medicines', methods=['POST'])
-def add_medicine():
-    """Add a new medicine"""
-    data = request.json
+@app.route('/api/medicines/movements', methods=['POST'])
+def record_stock_movements():
+    """Apply a batch of {medicine_id, delta, reason} stock movements atomically"""
+    try:
+        movements = validate_movements(request.get_json(silent=True), MOVEMENT_CONFIG['MAX_BATCH'])
+    except MovementError as e:
+        return jsonify({'error': str(e)}), 400
+
     connection = get_db_connection()
     if not connection:
         return jsonify({'error': 'Database connection failed'}), 500
-    
+
+    try:
+        quantities, errors = apply_movements(store, connection, movements)
+    except Error as e:
+        return jsonify({'error': str(e)}), 500
+    finally:
+        connection.close()
+
+    if errors:
+        return jsonify({'error': 'Movements rolled back: no stock was changed', 'errors': errors}), 409
+    events.publish('medicines', 'stock', list(quantities))
+    return jsonify({
+        'message': f'Applied {len(movements)} movement(s)',
+        'applied': len(movements),
+        'quantities': [{'medicine_id': medicine_id, 'quantity': quantity}
+                       for medicine_id, quantity in quantities.items()]
+    }), 201
+
+
+@app.route('/api/medicines/<int:medicine_id>/movements', methods=['GET'])
+def get_stock_movements(medicine_id):
+    """A medicine's stock movement ledger, newest first (supports limit/cursor and fields)"""
+    try:
+        fields = parse_fields(request.args.get('fields'), MOVEMENT_COLUMNS)
+        limit, after = parse_page(request.args, MOVEMENT_KEY)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    validators = table_validators(('medicines',))
+    if is_not_modified(validators):
+        return not_modified_response(validators)
+
+    connection = get_db_connection()
+    if not connection:
+        return jsonify({'error': 'Database connection failed'}), 500
+
     try:
-        # Validate required fields
-        required_fields = ['name', 'company', 'mfg_date', 'exp_date', 'quantity', 'price', 'supplier_id']
-        for field in required_fields:
-            if field not in data:
-                return jsonify({'error': f'Missing required field: {field}'}), 400
-        
-        # Validate numeric fields
-        try:
-            quantity = int(data['quantity'])
-            price = float(data['price'])
-            supplier_id = int(data['supplier_id'])
-            
-            if quantity < 0:
-                return jsonify({'error': 'Quantity must be non-negative'}), 400
-            if price < 0:
-                return jsonify({'error': 'Price must be non-negative'}), 400
-        except (ValueError, TypeError):
-            return jsonify({'error': 'Invalid numeric value'}), 400
-        
         cursor = connection.cursor()
-        query = """
-            INSERT INTO medicines (name, company, mfg_date, exp_date, quantity, price, supplier_id)
-            VALUES (%s, %s, %s, %s, %s, %s, %s)
-        """
-        values = (
-            data['name'],
-            data['company'],
-            data['mfg_date'],
-            data['exp_date'],
-            quantity,
-            price,
-            supplier_id
-        )
-        cursor.execute(query, values)
+        columns, rows = store.list_movements(cursor, medicine_id, fields, limit, after)
+        rows, next_cursor = paginate_rows(rows, limit, MOVEMENT_KEY, columns)
+        movements = serialize_rows(columns, rows, fields)
+
+        return with_validators(add_pagination_headers(json_response(movements), next_cursor), validators), 200
+    except Error as e:
+        return jsonify({'error': str(e)}), 500
+    finally:
+        if connection.is_connected():
+            cursor.close()
+            connection.close()
+
+
+@app.route('/api/medicines/<int:medicine_id>/batches', methods=['GET'])
+def get_medicine_batches(medicine_id):
+    """A medicine's lots, soonest expiry first (supports limit/cursor and fields)"""
+    try:
+        fields = parse_fields(request.args.get('fields'), BATCH_COLUMNS)
+        limit, after = parse_page(request.args, BATCH_KEY)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    validators = table_validators(('medicines',))
+    if is_not_modified(validators):
+        return not_modified_response(validators)
+
+    connection = get_db_connection()
+    if not connection:
+        return jsonify({'error': 'Database connection failed'}), 500
+
+    try:
+        cursor = connection.cursor()
+        columns, rows = store.list_batches(cursor, medicine_id, fields, limit, after)
+        rows, next_cursor = paginate_rows(rows, limit, BATCH_KEY, columns)
+        batches = serialize_rows(columns, rows, fields)
+
+        return with_validators(add_pagination_headers(json_response(batches), next_cursor), validators), 200
+    except Error as e:
+        return jsonify({'error': str(e)}), 500
+    finally:
+        if connection.is_connected():
+            cursor.close()
+            connection.close()
+
+
+@app.route('/api/medicines/<int:medicine_id>/batches', methods=['POST'])
+def add_medicine_batch(medicine_id):
+    """Receive a lot of a medicine; its quantity is added to the medicine's stock"""
+    values, error = validate_batch(request.get_json(silent=True))
+    if error:
+        return jsonify({'error': error}), 400
+
+    connection = get_db_connection()
+    if not connection:
+        return jsonify({'error': 'Database connection failed'}), 500
+
+    try:
+        cursor = connection.cursor()
+        quantity = values[-1]
+        if medicine_id not in store.medicine_quantities(cursor, [medicine_id], lock=True):
+            connection.rollback()
+            return jsonify({'error': 'Medicine not found'}), 404
+        batch_id = store.add_batch(cursor, medicine_id, values)
+        store.sync_quantities(cursor, [medicine_id])
+        store.record_movements(cursor, [(medicine_id, quantity, 'received')])
+        bump_version(cursor, 'medicines')
+        record_changes(cursor, 'medicines', 'update', [medicine_id])
         connection.commit()
-        return jsonify({'message': 'Medicine added successfully', 'id': cursor.lastrowid}), 201
+        events.publish('medicines', 'stock', [medicine_id])
+        return jsonify({'message': 'Lot added successfully', 'id': batch_id}), 201
+    except IntegrityError:
+        connection.rollback()
+        return jsonify({'error': 'This lot number is already recorded for the medicine'}), 409
     except Error as e:
         connection.rollback()
         return jsonify({'error': str(e)}), 500
@@ -299,56 +1228,139 @@ def add_medicine():
             connection.close()
 
 
+@app.route('/api/medicines/dispense', methods=['POST'])
+def dispense_medicines():
+    """Dispense an order of {medicine_id, quantity} lines from lots, first expiry first"""
+    try:
+        lines = validate_order(request.get_json(silent=True), DISPENSE_CONFIG['MAX_LINES'])
+    except DispenseError as e:
+        return jsonify({'error': str(e)}), 400
+
+    connection = get_db_connection()
+    if not connection:
+        return jsonify({'error': 'Database connection failed'}), 500
+
+    try:
+        picks, errors = dispense(store, connection, lines)
+    except Error as e:
+        return jsonify({'error': str(e)}), 500
+    finally:
+        connection.close()
+
+    if errors:
+        return jsonify({'error': 'Order rolled back: no stock was dispensed', 'errors': errors}), 409
+    events.publish('medicines', 'stock', sorted({medicine_id for medicine_id, _ in lines}))
+    return json_response({
+        'message': f'Dispensed {len(lines)} line(s)',
+        'lines': [
+            {'medicine_id': medicine_id, 'quantity': quantity,
+             'lots': [{'batch_id': batch_id, 'lot_number': lot_number,
+                       'exp_date': exp_date.isoformat(), 'quantity': taken}
+                      for batch_id, lot_number, exp_date, taken in line_picks]}
+            for (medicine_id, quantity), line_picks in zip(lines, picks)
+        ]
+    }, 201)
+
+
+@app.route('/api/medicines/reorder', methods=['GET'])
+def get_reorder_points():
+    """Precomputed reorder points, fewest days of cover first (?due=true for those to reorder)"""
+    try:
+        fields = parse_fields(request.args.get('fields'), REORDER_COLUMNS)
+        limit, after = parse_page(request.args, REORDER_KEY)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    due_only = request.args.get('due', 'false').lower() in ('1', 'true', 'yes')
+
+    validators = table_validators(('reorder_points', 'medicines'))
+    if is_not_modified(validators):
+        return not_modified_response(validators)
+
+    connection = get_db_connection()
+    if not connection:
+        return jsonify({'error': 'Database connection failed'}), 500
+
+    try:
+        cursor = connection.cursor()
+        columns, rows = store.list_reorder_points(cursor, fields, due_only, limit, after)
+        rows, next_cursor = paginate_rows(rows, limit, REORDER_KEY, columns)
+        points = serialize_rows(columns, rows, fields)
+
+        return with_validators(add_pagination_headers(json_response(points), next_cursor), validators), 200
+    except Error as e:
+        return jsonify({'error': str(e)}), 500
+    finally:
+        if connection.is_connected():
+            cursor.close()
+            connection.close()
+
+
+@app.route('/api/medicines/bulk', methods=['POST'])
+def bulk_add_medicines():
+    """Import many medicines from a streamed JSON array, NDJSON or CSV body"""
+    fmt = format_for(request.content_type)
+    if fmt is None:
+        return jsonify({'error': 'Content-Type must be application/json, application/x-ndjson or text/csv'}), 415
+    skip_invalid = request.args.get('on_error', 'abort') == 'skip'
+    
+    connection = get_db_connection()
+    if not connection:
+        return jsonify({'error': 'Database connection failed'}), 500
+    
+    try:
+        summary = import_medicines(
+            connection,
+            iter_records(request.stream, fmt),
+            batch_size=BULK_CONFIG['BATCH_SIZE'],
+            skip_invalid=skip_invalid,
+            max_errors=BULK_CONFIG['MAX_ERRORS']
+        )
+    except BulkFormatError as e:
+        return jsonify({'error': str(e)}), 400
+    except Error as e:
+        return jsonify({'error': str(e)}), 500
+    finally:
+        connection.close()
+    
+    if summary['inserted']:
+        events.publish('medicines', 'bulk')
+    if not summary['committed']:
+        summary['message'] = 'Import rolled back: fix the listed rows or retry with on_error=skip'
+        return jsonify(summary), 422
+    summary['message'] = f"Imported {summary['inserted']} medicine(s)"
+    return jsonify(summary), 201 if summary['inserted'] else 200
+
+
 @app.route('/api/medicines/<int:medicine_id>', methods=['PUT'])
 def update_medicine(medicine_id):
     """Update an existing medicine"""
-    data = request.json
+    values, error = validate_medicine(request.json)
+    if error:
+        return jsonify({'error': error}), 400
+    
     connection = get_db_connection()
     if not connection:
         return jsonify({'error': 'Database connection failed'}), 500
     
     try:
-        # Validate required fields
-        required_fields = ['name', 'company', 'mfg_date', 'exp_date', 'quantity', 'price', 'supplier_id']
-        for field in required_fields:
-            if field not in data:
-                return jsonify({'error': f'Missing required field: {field}'}), 400
-        
-        # Validate numeric fields
-        try:
-            quantity = int(data['quantity'])
-            price = float(data['price'])
-            supplier_id = int(data['supplier_id'])
-            
-            if quantity < 0:
-                return jsonify({'error': 'Quantity must be non-negative'}), 400
-            if price < 0:
-                return jsonify({'error': 'Price must be non-negative'}), 400
-        except (ValueError, TypeError):
-            return jsonify({'error': 'Invalid numeric value'}), 400
-        
         cursor = connection.cursor()
-        query = """
-            UPDATE medicines
-            SET name = %s, company = %s, mfg_date = %s, exp_date = %s,
-                quantity = %s, price = %s, supplier_id = %s
-            WHERE medicine_id = %s
-        """
-        values = (
-            data['name'],
-            data['company'],
-            data['mfg_date'],
-            data['exp_date'],
-            quantity,
-            price,
-            supplier_id,
-            medicine_id
-        )
-        cursor.execute(query, values)
-        connection.commit()
-        
-        if cursor.rowcount == 0:
+        current = store.medicine_quantities(cursor, [medicine_id], lock=True)
+        if medicine_id not in current:
+            connection.rollback()
             return jsonify({'error': 'Medicine not found'}), 404
+        store.update_medicine(cursor, medicine_id, values)
+        # A new quantity is a stock adjustment: it goes through the lots and the ledger
+        delta = values[QUANTITY_INDEX] - current[medicine_id]
+        if delta:
+            errors = adjust_lots(store, cursor, {medicine_id: delta}, current)
+            if errors:
+                connection.rollback()
+                return jsonify({'error': 'Medicine not updated', 'errors': errors}), 409
+            store.record_movements(cursor, [(medicine_id, delta, ADJUSTED_REASON)])
+        bump_version(cursor, 'medicines')
+        record_changes(cursor, 'medicines', 'update', [medicine_id])
+        connection.commit()
+        events.publish('medicines', 'update', [medicine_id])
         
         return jsonify({'message': 'Medicine updated successfully'}), 200
     except Error as e:
@@ -362,19 +1374,22 @@ def update_medicine(medicine_id):
 
 @app.route('/api/medicines/<int:medicine_id>', methods=['DELETE'])
 def delete_medicine(medicine_id):
-    """Delete a medicine"""
+    """Delete a medicine (it is moved to the archive)"""
     connection = get_db_connection()
     if not connection:
         return jsonify({'error': 'Database connection failed'}), 500
     
     try:
         cursor = connection.cursor()
-        query = "DELETE FROM medicines WHERE medicine_id = %s"
-        cursor.execute(query, (medicine_id,))
+        deleted = store.delete_medicine(cursor, medicine_id)
+        if deleted:
+            bump_version(cursor, 'medicines')
+            record_changes(cursor, 'medicines', 'delete', [medicine_id])
         connection.commit()
         
-        if cursor.rowcount == 0:
+        if deleted == 0:
             return jsonify({'error': 'Medicine not found'}), 404
+        events.publish('medicines', 'delete', [medicine_id])
         
         return jsonify({'message': 'Medicine deleted successfully'}), 200
     except Error as e:
@@ -386,12 +1401,351 @@ def delete_medicine(medicine_id):
             connection.close()
 
 
+# ==================== CHANGE FEED ENDPOINTS ====================
+
+CHANGE_GAP_ERROR = 'Changes after this position are no longer retained; reload the data'
+
+
+@app.route('/api/changes', methods=['GET'])
+def get_changes():
+    """Medicine and supplier changes after ?since=<seq>, oldest first (?limit= caps the page)"""
+    try:
+        since = parse_count(request.args.get('since'), 'since')
+        limit = parse_count(request.args.get('limit'), 'limit')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    limit = min(limit or CHANGES_CONFIG['PAGE_SIZE'], CHANGES_CONFIG['PAGE_SIZE'])
+
+    # Always the primary, as the stream: a replica that has not reached a
+    # client's seq yet would look like a pruned log and force a false resync
+    connection = get_db_connection(use_replica=False)
+    if not connection:
+        return jsonify({'error': 'Database connection failed'}), 500
+
+    try:
+        cursor = connection.cursor()
+        return json_response(read_changes(cursor, since, limit)), 200
+    except ChangeLogGap:
+        return jsonify({'error': CHANGE_GAP_ERROR, 'resync': True}), 410
+    except ChangeFeedUnavailable:
+        return jsonify({'error': 'Change feed not set up; run python setup_database.py --migrate'}), 503
+    except Error as e:
+        return jsonify({'error': str(e)}), 500
+    finally:
+        if connection.is_connected():
+            cursor.close()
+            connection.close()
+
+
+@app.route('/api/changes/stream', methods=['GET'])
+def stream_changes():
+    """
+    Server-Sent Events: one 'change' event per change after ?since=<seq>.
+
+    Events carry the change's seq as their id, so a reconnecting browser
+    resumes from Last-Event-ID. A 'resync' event means the position was
+    pruned and the client must reload. The stream ends after
+    STREAM_MAX_SECONDS; EventSource reconnects on its own.
+    """
+    try:
+        # Sent by the browser when it reconnects, and newer than the ?since= it first used
+        since = parse_count(request.headers.get('Last-Event-ID') or request.args.get('since'), 'since')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    def generate():
+        position, seen = since, None
+        generation = change_notifier.generation
+        deadline = time.monotonic() + CHANGES_CONFIG['STREAM_MAX_SECONDS']
+        heartbeat_at = time.monotonic() + CHANGES_CONFIG['HEARTBEAT']
+        yield f"retry: {int(CHANGES_CONFIG['POLL_INTERVAL'] * 1000)}\n\n"
+        while True:
+            # Query only when the change_log counter moved (or cannot be read)
+            current = current_change_seq()
+            if position is None or current is None or current != seen:
+                try:
+                    payload = fetch_changes(position, CHANGES_CONFIG['PAGE_SIZE'])
+                except ChangeLogGap:
+                    yield format_event('resync', dumps({'error': CHANGE_GAP_ERROR}).decode('utf-8'))
+                    return
+                except Error + (PoolTimeout, ChangeFeedUnavailable) as e:
+                    print(f"Error streaming changes: {e!r}")
+                    return
+                for change in payload['changes']:
+                    yield format_event('change', dumps(change).decode('utf-8'), change['seq'])
+                position = payload['last_seq']
+                if payload['more']:
+                    continue
+                seen = current
+                heartbeat_at = time.monotonic() + CHANGES_CONFIG['HEARTBEAT']
+
+            now = time.monotonic()
+            if now >= deadline:
+                return
+            if now >= heartbeat_at:
+                # A comment line keeps proxies from closing an idle connection
+                yield ': keep-alive\n\n'
+                heartbeat_at = now + CHANGES_CONFIG['HEARTBEAT']
+            generation = change_notifier.wait(
+                generation, min(CHANGES_CONFIG['POLL_INTERVAL'], deadline - now, heartbeat_at - now)
+            )
+
+    response = Response(generate(), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    # Stops nginx from buffering the stream
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+
+# ==================== JOB ENDPOINTS ====================
+
+@app.route('/api/jobs', methods=['POST'])
+def submit_job():
+    """Queue a report or maintenance job; poll GET /api/jobs/<id> for its status"""
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or not data.get('kind'):
+        return jsonify({'error': f"kind is required ({', '.join(job_queue.kinds)})"}), 400
+
+    connection = get_db_connection()
+    if not connection:
+        return jsonify({'error': 'Database connection failed'}), 500
+
+    try:
+        cursor = connection.cursor()
+        job_id = job_queue.submit(cursor, data['kind'], data.get('params') or {})
+        connection.commit()
+        job_queue.notify()
+        job = job_document(store.get_job(cursor, job_id))
+        response = jsonify(job)
+        response.status_code = 202
+        response.headers['Location'] = f'/api/jobs/{job_id}'
+        return response
+    except JobError as e:
+        return jsonify({'error': str(e)}), 400
+    except Error as e:
+        connection.rollback()
+        return jsonify({'error': str(e)}), 500
+    finally:
+        if connection.is_connected():
+            cursor.close()
+            connection.close()
+
+
+def load_job(job_id):
+    """(jobs row, None) or (None, error response); always read from the primary"""
+    connection = get_db_connection(use_replica=False)
+    if not connection:
+        return None, (jsonify({'error': 'Database connection failed'}), 500)
+    try:
+        cursor = connection.cursor()
+        row = store.get_job(cursor, job_id)
+    except Error as e:
+        return None, (jsonify({'error': str(e)}), 500)
+    finally:
+        if connection.is_connected():
+            cursor.close()
+            connection.close()
+    if row is None:
+        return None, (jsonify({'error': 'Job not found'}), 404)
+    return row, None
+
+
+@app.route('/api/jobs/<int:job_id>', methods=['GET'])
+def get_job(job_id):
+    """Status, progress and result summary of a job"""
+    row, error = load_job(job_id)
+    if error:
+        return error
+    return jsonify(job_document(row))
+
+
+@app.route('/api/jobs/<int:job_id>/result', methods=['GET'])
+def download_job_result(job_id):
+    """Download the file a finished report job wrote"""
+    row, error = load_job(job_id)
+    if error:
+        return error
+    job = job_document(row)
+    if job['status'] in ('queued', 'running'):
+        return jsonify({'error': f"Job is {job['status']}", 'job': job}), 409
+    if job['result_url'] is None:
+        return jsonify({'error': 'Job has no result file', 'job': job}), 404
+    name = dict(zip(JOB_COLUMNS, row))['result_file']
+    # Result files never change once written, so conditional requests are cheap
+    return send_from_directory(os.path.dirname(job_queue.result_path(name)), name, as_attachment=True,
+                               mimetype=EXPORT_FORMATS.get(name.rsplit('.', 1)[-1]))
+
+
+# ==================== STATISTICS ENDPOINTS ====================
+
+@app.route('/api/stats', methods=['GET'])
+def get_stats():
+    """Dashboard totals computed with SQL aggregates (optionally broken down)"""
+    threshold = request.args.get('low_stock_threshold', STATS_CONFIG['LOW_STOCK_THRESHOLD'], type=int)
+    group_by = request.args.get('group_by') or None
+    if group_by is not None and group_by not in STATS_BREAKDOWNS:
+        return jsonify({'error': 'group_by must be one of: supplier, company'}), 400
+
+    cache_key = (threshold, group_by)
+    stats = stats_cache.get(cache_key)
+    if stats is not MISSING:
+        return json_response(stats), 200
+    generation = cache_generation(stats_cache, MEDICINE_TABLES, read_replica())
+
+    connection = get_db_connection()
+    if not connection:
+        return jsonify({'error': 'Database connection failed'}), 500
+
+    try:
+        cursor = connection.cursor(dictionary=True)
+        stats = store.inventory_stats(cursor, threshold)[0]
+        stats['low_stock_threshold'] = threshold
+        if group_by is not None:
+            stats['group_by'] = group_by
+            stats['breakdown'] = store.inventory_stats(cursor, threshold, group_by)
+        stats_cache.set(cache_key, stats, generation)
+        return json_response(stats), 200
+    except Error as e:
+        return jsonify({'error': str(e)}), 500
+    finally:
+        if connection.is_connected():
+            cursor.close()
+            connection.close()
+
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
-    """Health check endpoint"""
-    return jsonify({'status': 'healthy', 'message': 'Medical Storage Management System API is running'}), 200
+    """Health check with connection acquire and database round-trip latency"""
+    health = {'status': 'healthy', 'message': 'Medical Storage Management System API is running'}
+    started = time.perf_counter()
+    connection = get_db_connection(use_replica=False)
+    acquired = time.perf_counter()
+    if not connection:
+        health.update(status='unhealthy', database={'status': 'down', 'error': 'Database connection failed'})
+    else:
+        try:
+            cursor = connection.cursor()
+            cursor.execute("SELECT 1")
+            cursor.fetchall()
+            health['database'] = {
+                'status': 'up',
+                'acquire_ms': round((acquired - started) * 1000, 2),
+                'query_ms': round((time.perf_counter() - acquired) * 1000, 2)
+            }
+        except Error as e:
+            health.update(status='unhealthy', database={'status': 'down', 'error': str(e)})
+        finally:
+            if connection.is_connected():
+                cursor.close()
+                connection.close()
+    pool = db_pool.stats()
+    health['pool'] = {key: pool[key] for key in ('pool_size', 'max_overflow', 'opened', 'in_use', 'idle',
+                                                 'timeouts', 'wait_time_avg', 'wait_time_max')}
+    if replica_router is not None:
+        # Reads fall back to the primary, so a replica outage does not make the API unhealthy
+        health['replicas'] = [replica.status() for replica in replica_router.replicas]
+    return jsonify(health), 200 if health['status'] == 'healthy' else 503
+
+
+@app.route('/api/health/pool', methods=['GET'])
+def pool_stats():
+    """Connection pool sizing and wait-time statistics"""
+    return jsonify(db_pool.stats()), 200
+
+
+@app.route('/api/health/cache', methods=['GET'])
+def cache_stats():
+    """Hit/miss/eviction counters for each cache"""
+    return jsonify({
+        'medicines': medicine_cache.stats(),
+        'suppliers': supplier_cache.stats(),
+        'stats': stats_cache.stats()
+    }), 200
+
+
+# Pool stats that only grow, with their Prometheus counter names; the rest are gauges
+POOL_COUNTERS = {
+    'checkouts': 'checkouts_total',
+    'checkins': 'checkins_total',
+    'connects': 'connects_total',
+    'connect_errors': 'connect_errors_total',
+    'recycled': 'recycled_total',
+    'invalidated': 'invalidated_total',
+    'timeouts': 'timeouts_total',
+    'waits': 'waits_total',
+    'wait_time_total': 'wait_seconds_total'
+}
+
+
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    """Request, SQL statement, pool and cache metrics in the Prometheus text format"""
+    lines = metrics.registry.render()
+    pool = db_pool.stats()
+    for key, value in pool.items():
+        if key in POOL_COUNTERS:
+            name, kind = f'medvault_db_pool_{POOL_COUNTERS[key]}', 'counter'
+        else:
+            name, kind = f'medvault_db_pool_{key}', 'gauge'
+        lines += metrics.format_metric(name, kind, f'Connection pool {key}', [({}, value)])
+    if replica_router is not None:
+        replicas = replica_router.replicas
+        lines += metrics.format_metric(
+            'medvault_replica_up', 'gauge', 'Read replica usable for reads (1) or not (0), by replica',
+            [({'replica': replica.name}, int(replica.usable)) for replica in replicas]
+        )
+        lines += metrics.format_metric(
+            'medvault_replica_latency_seconds', 'gauge', 'Smoothed health-check round-trip, by replica',
+            [({'replica': replica.name}, replica.latency or 0.0) for replica in replicas]
+        )
+        lines += metrics.format_metric(
+            'medvault_replica_in_use', 'gauge', 'Replica pool connections in use, by replica',
+            [({'replica': replica.name}, replica.pool.in_use) for replica in replicas]
+        )
+    caches = {'medicines': medicine_cache, 'suppliers': supplier_cache, 'stats': stats_cache}
+    cache_stats = {name: cache.stats() for name, cache in caches.items()}
+    for key in ('hits', 'misses', 'invalidations', 'errors'):
+        lines += metrics.format_metric(
+            f'medvault_cache_{key}_total', 'counter', f'Cache {key}, by cache',
+            [({'cache': name}, stats[key]) for name, stats in cache_stats.items()]
+        )
+    return Response('\n'.join(lines) + '\n', mimetype='text/plain; version=0.0.4'), 200
+
+
+@app.route('/api/metrics/profile', methods=['GET'])
+def get_profile():
+    """Collapsed stacks from the sampling profiler (?reset=1 clears them)"""
+    if not profiler.enabled:
+        return jsonify({'error': 'Sampling profiler is disabled; set PROFILE_INTERVAL_MS'}), 404
+    reset = request.args.get('reset') == '1'
+    return Response(profiler.collapsed(reset=reset), mimetype='text/plain'), 200
+
+
+# ==================== FRONTEND ====================
+
+# Serving the pages from the API keeps their fetch() calls same-origin, so the
+# browser sends no CORS preflights; CORS stays enabled for pages opened from disk
+if ASSETS_CONFIG['SERVE']:
+    asset_server = AssetServer(ASSETS_CONFIG['SOURCE_DIR'], ASSETS_CONFIG['BUILD_DIR'])
+    if not asset_server.built:
+        print("Frontend assets are not built; serving them unminified (run python build_assets.py)")
+
+    @app.route('/', methods=['GET'])
+    @app.route('/<path:filename>', methods=['GET'])
+    def frontend(filename='index.html'):
+        """Pages, styles and scripts of the web UI"""
+        if filename == 'api' or filename.startswith('api/'):
+            return jsonify({'error': 'Not found'}), 404
+        return asset_server.response(filename, request.headers.get('Accept-Encoding'))
 
 
 if __name__ == '__main__':
-    app.run(debug=FLASK_CONFIG['DEBUG'], port=FLASK_CONFIG['PORT'], host=FLASK_CONFIG['HOST'])
+    if FLASK_CONFIG['SERVER_MODE'] == 'asgi':
+        # asgi.py imports this module as 'app'; register it so the caches and indexes are not loaded twice
+        sys.modules['app'] = sys.modules[__name__]
+        import asgi
+        import uvicorn
+        uvicorn.run(asgi.app, port=FLASK_CONFIG['PORT'], host=FLASK_CONFIG['HOST'])
+    else:
+        app.run(debug=FLASK_CONFIG['DEBUG'], port=FLASK_CONFIG['PORT'], host=FLASK_CONFIG['HOST'])
 
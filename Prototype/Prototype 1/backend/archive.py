@@ -0,0 +1,51 @@
+"""
+Archive tiering for Medical Storage Management System
+Moves medicines that expired more than EXPIRED_DAYS ago from the hot medicines
+table into medicines_archive in small batches, so list and search scans only
+cover live stock. Deleted medicines are archived by delete_medicine() itself.
+"""
+
+import time
+from datetime import date, timedelta
+
+from changes import record_changes
+from storage import Error
+from versions import bump_version
+
+
+def archive_expired(store, connection, config):
+    """
+    Archive medicines expired before today - EXPIRED_DAYS; returns the ids moved.
+
+    Each batch of BATCH_SIZE rows is locked, copied and deleted in its own
+    short transaction, followed by a PAUSE, so concurrent writers wait for one
+    batch at most. A run stops after MAX_BATCHES and the next run carries on.
+    """
+    before = date.today() - timedelta(days=config['EXPIRED_DAYS'])
+    moved = []
+    for _ in range(config['MAX_BATCHES']):
+        cursor = connection.cursor()
+        try:
+            ids = store.expired_medicine_ids(cursor, before, config['BATCH_SIZE'])
+            if ids:
+                store.archive_medicines(cursor, ids, 'expired')
+                bump_version(cursor, 'medicines')
+                record_changes(cursor, 'medicines', 'delete', ids)
+            connection.commit()
+        except Error:
+            connection.rollback()
+            raise
+        finally:
+            cursor.close()
+        moved.extend(ids)
+        if len(ids) < config['BATCH_SIZE']:
+            break
+        time.sleep(config['PAUSE'])
+    return moved
+
+
+def archive_job(config):
+    """Handler for the 'archive_medicines' background job (see jobs.py): one mover run"""
+    def run(context):
+        return {'archived': len(archive_expired(context.store, context.connection, config))}
+    return run
@@ -0,0 +1,460 @@
+"""
+Medical Storage Management System - async (ASGI) entry point
+Serves the read endpoints on asyncio with an aiomysql connection pool, so one
+process keeps many requests in flight while they wait on MySQL. Read replicas
+(DB_REPLICAS) get a pool each and are chosen as in the Flask app. Every other
+route (writes, bulk import, export, suggest, expiry lists, health) is passed to
+the Flask app unchanged, so the JSON contracts are the same in both modes.
+With STORAGE_BACKEND=sqlite there is no aiomysql pool and every route is
+served by the Flask app.
+
+Run from backend/:  SERVER_MODE=asgi python app.py
+               or:  uvicorn asgi:app --host 0.0.0.0 --port 5000
+"""
+
+import asyncio
+import contextlib
+import contextvars
+import time
+import warnings
+from functools import wraps
+
+import aiomysql
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import Response
+from starlette.routing import Mount, Route
+from werkzeug.http import http_date, parse_etags
+
+with warnings.catch_warnings():
+    # Deprecated in favour of a2wsgi, but it runs Flask in a thread pool without another dependency
+    warnings.simplefilter('ignore', DeprecationWarning)
+    from starlette.middleware.wsgi import WSGIMiddleware
+
+import app as flask_backend
+import metrics
+from app import MEDICINE_TABLES, store
+from cache import MISSING
+from compression import COMPRESSIBLE_TYPES, negotiate_encoding, compress
+from config import DB_CONFIG, POOL_CONFIG, ASYNC_POOL_CONFIG, STATS_CONFIG, SEARCH_CONFIG, COMPRESSION_CONFIG
+from pagination import parse_fields, parse_page, paginate_rows
+from serialization import serialize_rows, dumps, encode_list, negotiate_list_format
+from storage import (MEDICINE_COLUMNS, SUPPLIER_COLUMNS, SEARCH_COLUMNS, ARCHIVED_MEDICINE_COLUMNS,
+                     ARCHIVED_SEARCH_COLUMNS, ARCHIVED_MEDICINE_KEY, ARCHIVED_SEARCH_KEY, MEDICINE_KEY,
+                     SUPPLIER_KEY, SEARCH_KEY, MEDICINE_BY_ID,
+                     STATS_BREAKDOWNS, stats_query, convert_stats_rows)
+from versions import make_etag
+
+db_pool = None
+# aiomysql pools by replica name, and the replica (None: primary) the current request reads from
+replica_pools = {}
+read_replica = contextvars.ContextVar('read_replica', default=None)
+
+
+class DatabaseUnavailable(Exception):
+    """No pooled connection could be borrowed within POOL_CONFIG['timeout']"""
+
+
+# ==================== DATABASE ====================
+
+async def create_db_pool(config=DB_CONFIG):
+    # autocommit: a pooled connection must not keep reading from an old REPEATABLE READ snapshot
+    return await aiomysql.create_pool(
+        host=config['host'], port=config.get('port', 3306), db=config['database'], user=config['user'],
+        password=config['password'], charset=config['charset'], autocommit=True,
+        minsize=ASYNC_POOL_CONFIG['min_size'], maxsize=ASYNC_POOL_CONFIG['max_size'],
+        pool_recycle=POOL_CONFIG['recycle']
+    )
+
+
+def choose_replica(request):
+    """flask_backend.read_replica() for a native route (clients that wrote recently get None)"""
+    router = flask_backend.replica_router
+    if router is None or request.method not in ('GET', 'HEAD'):
+        return None
+    client = request.client.host if request.client else ''
+    # Memory lookup; a Redis-backed recent_writers is read in a thread by the caller
+    if flask_backend.recent_writers.get(client) is not MISSING:
+        return None
+    return router.choose(in_use=lambda replica: replica_pools[replica.name].size
+                         - replica_pools[replica.name].freesize)
+
+
+async def acquire():
+    """(pool, connection) for the current request: its replica's pool, or the primary's"""
+    replica = read_replica.get()
+    if replica is not None:
+        pool = replica_pools[replica.name]
+        try:
+            with metrics.phase('acquire'):
+                return pool, await asyncio.wait_for(pool.acquire(), POOL_CONFIG['timeout'])
+        except (asyncio.TimeoutError, aiomysql.Error, OSError) as e:
+            print(f"Error connecting to read replica {replica.name}: {e}")
+            flask_backend.replica_router.mark_down(replica, e)
+            read_replica.set(None)
+    try:
+        with metrics.phase('acquire'):
+            return db_pool, await asyncio.wait_for(db_pool.acquire(), POOL_CONFIG['timeout'])
+    except (asyncio.TimeoutError, aiomysql.Error, OSError) as e:
+        print(f"Error connecting to MySQL: {e}")
+        raise DatabaseUnavailable()
+
+
+async def fetch_all(query, params=(), dictionary=False):
+    """Run one read query on a pooled connection; returns (column_names, rows)"""
+    pool, connection = await acquire()
+    try:
+        async with connection.cursor(aiomysql.DictCursor if dictionary else aiomysql.Cursor) as cursor:
+            started = time.perf_counter()
+            await cursor.execute(query, params)
+            executed = time.perf_counter()
+            metrics.record_statement(query, executed - started)
+            rows = await cursor.fetchall()
+            metrics.record_statement(query, time.perf_counter() - executed, 'fetch')
+            return [column[0] for column in cursor.description], rows
+    finally:
+        pool.release(connection)
+
+
+# ==================== RESPONSES ====================
+
+def instrumented(handler):
+    """
+    Time an async handler like the Flask before/after_request hooks do.
+
+    Metrics use the same endpoint names as the Flask routes. The body is sent
+    after the handler returns, so the write phase is not measured here.
+    """
+    @wraps(handler)
+    async def wrapper(request):
+        timer = metrics.start_request(handler.__name__, request.method)
+        status = 500
+        if flask_backend.recent_writers.backend.name == 'memory':
+            replica = choose_replica(request)
+        else:
+            replica = await asyncio.to_thread(choose_replica, request)
+        token = read_replica.set(replica)
+        try:
+            response = compress_response(request, await handler(request))
+            status = response.status_code
+            response.headers['Server-Timing'] = timer.server_timing()
+            response.headers['Timing-Allow-Origin'] = '*'
+            return response
+        finally:
+            read_replica.reset(token)
+            metrics.finish_request(timer, status)
+    return wrapper
+
+
+def json_response(data, status=200):
+    """Same body as serialization.json_response(), as a Starlette response"""
+    body = data if isinstance(data, bytes) else dumps(data)
+    return Response(body, status_code=status, media_type='application/json')
+
+
+def list_format(request):
+    """The list format the request's Accept header asks for"""
+    return negotiate_list_format(request.headers.get('accept'))
+
+
+def list_response(columns, rows, fields, fmt):
+    """List rows encoded as ``fmt``, as the Flask list_response() builds them"""
+    response = Response(encode_list(columns, rows, fields, fmt), media_type=fmt)
+    response.headers.add_vary_header('Accept')
+    return response
+
+
+def compress_response(request, response):
+    """The Flask compress_response() hook for native routes"""
+    if response.media_type not in COMPRESSIBLE_TYPES:
+        return response
+    response.headers.add_vary_header('Accept-Encoding')
+    encoding = negotiate_encoding(request.headers.get('accept-encoding'))
+    if (encoding is None or response.status_code != 200 or 'content-encoding' in response.headers
+            or len(response.body) < COMPRESSION_CONFIG['MIN_SIZE']):
+        return response
+    response.body = compress(response.body, encoding, COMPRESSION_CONFIG)
+    response.headers['Content-Encoding'] = encoding
+    response.headers['Content-Length'] = str(len(response.body))
+    return response
+
+
+def error_response(message, status):
+    """jsonify({'error': message}) as the Flask routes send it, trailing newline included"""
+    body = flask_backend.app.json.response({'error': message}).get_data()
+    return Response(body, status_code=status, media_type='application/json')
+
+
+def int_arg(request, name, default):
+    """request.args.get(name, default, type=int) as Flask does it"""
+    try:
+        return int(request.query_params[name])
+    except (KeyError, ValueError):
+        return default
+
+
+def add_pagination_headers(response, request, next_cursor):
+    """Advertise the next page via X-Next-Cursor and an RFC 8288 Link header"""
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+        response.headers['Link'] = f'<{request.url.include_query_params(cursor=next_cursor)}>; rel="next"'
+    return response
+
+
+async def cache_get(cache, key):
+    # Memory lookups are cheap enough for the event loop; Redis round-trips are not
+    if cache.backend.name == 'memory':
+        return cache.get(key)
+    return await asyncio.to_thread(cache.get, key)
+
+
+async def cache_generation(cache, tables):
+    """flask_backend.cache_generation() for the current request's replica"""
+    replica = read_replica.get()
+    if replica is None:
+        return cache.generation
+    return await asyncio.to_thread(flask_backend.cache_generation, cache, tables, replica)
+
+
+async def cache_set(cache, key, value, generation):
+    if cache.backend.name == 'memory':
+        cache.set(key, value, generation)
+    else:
+        await asyncio.to_thread(cache.set, key, value, generation)
+
+
+# ==================== CONDITIONAL GET ====================
+
+async def read_versions():
+    """flask_backend.read_versions() for the current request"""
+    replica = read_replica.get()
+    if replica is not None:
+        return replica.versions
+    return await asyncio.to_thread(flask_backend.version_tracker.get)
+
+
+async def table_validators(request, tables, *parts):
+    """(etag, last_modified) for this URL; same values as the Flask endpoints produce"""
+    versions = await read_versions()
+    if versions is None or any(table not in versions for table in tables):
+        return None
+    # Flask's request.full_path, so both modes agree on the ETag
+    full_path = f'{request.url.path}?{request.url.query}'
+    encoding = negotiate_encoding(request.headers.get('accept-encoding'))
+    etag = make_etag(versions, tables, full_path, *parts, encoding)
+    return etag, max(versions[table][1] for table in tables)
+
+
+def is_not_modified(request, validators):
+    return validators is not None and parse_etags(request.headers.get('if-none-match')).contains(validators[0])
+
+
+def with_validators(response, validators):
+    if validators is not None:
+        response.headers['ETag'] = f'"{validators[0]}"'
+        response.headers['Last-Modified'] = http_date(validators[1])
+        response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+def not_modified_response(validators):
+    return with_validators(Response(status_code=304), validators)
+
+
+# ==================== SUPPLIER ENDPOINTS ====================
+
+@instrumented
+async def get_suppliers(request):
+    """Get suppliers (supports limit/cursor pagination and fields projection)"""
+    try:
+        fields = parse_fields(request.query_params.get('fields'), SUPPLIER_COLUMNS)
+        limit, after = parse_page(request.query_params, SUPPLIER_KEY)
+    except ValueError as e:
+        return error_response(str(e), 400)
+
+    validators = await table_validators(request, ('suppliers',))
+    if is_not_modified(request, validators):
+        return not_modified_response(validators)
+
+    supplier_cache = flask_backend.supplier_cache
+    cache_key = ','.join(fields)
+    if limit is None:
+        body = await cache_get(supplier_cache, cache_key)
+        if body is not MISSING:
+            return with_validators(json_response(body), validators)
+    generation = await cache_generation(supplier_cache, ('suppliers',))
+
+    query, params = store.supplier_page_query(fields, limit, after)
+    columns, rows = await fetch_all(query, params)
+    rows, next_cursor = paginate_rows(rows, limit, SUPPLIER_KEY, columns)
+    body = dumps(serialize_rows(columns, rows, fields))
+    if limit is None:
+        await cache_set(supplier_cache, cache_key, body, generation)
+
+    return with_validators(add_pagination_headers(json_response(body), request, next_cursor), validators)
+
+
+# ==================== MEDICINE ENDPOINTS ====================
+
+@instrumented
+async def get_medicines(request):
+    """Get medicines with supplier information (supports limit/cursor, fields and include_archived)"""
+    include_archived = request.query_params.get('include_archived', 'false').lower() in ('1', 'true', 'yes')
+    try:
+        fields = parse_fields(request.query_params.get('fields'),
+                              ARCHIVED_MEDICINE_COLUMNS if include_archived else MEDICINE_COLUMNS)
+        limit, after = parse_page(request.query_params, ARCHIVED_MEDICINE_KEY if include_archived else MEDICINE_KEY)
+    except ValueError as e:
+        return error_response(str(e), 400)
+
+    fmt = list_format(request)
+    validators = await table_validators(request, MEDICINE_TABLES, fmt)
+    versions = await read_versions()
+    change_seq = flask_backend.current_change_seq(versions) if versions is not None else None
+    if is_not_modified(request, validators):
+        return flask_backend.with_change_seq(not_modified_response(validators), change_seq)
+
+    query, params = store.medicine_page_query(fields, limit, after, include_archived)
+    columns, rows = await fetch_all(query, params)
+    key = ARCHIVED_MEDICINE_KEY if include_archived else MEDICINE_KEY
+    rows, next_cursor = paginate_rows(rows, limit, key, columns)
+
+    response = add_pagination_headers(list_response(columns, rows, fields, fmt), request, next_cursor)
+    return flask_backend.with_change_seq(with_validators(response, validators), change_seq)
+
+
+@instrumented
+async def get_medicine(request):
+    """Get a specific medicine by ID (read through the medicine cache)"""
+    medicine_id = request.path_params['medicine_id']
+    validators = await table_validators(request, MEDICINE_TABLES)
+    if is_not_modified(request, validators):
+        return not_modified_response(validators)
+
+    medicine_cache = flask_backend.medicine_cache
+    body = await cache_get(medicine_cache, medicine_id)
+    if body is not MISSING:
+        return with_validators(json_response(body), validators)
+    generation = await cache_generation(medicine_cache, MEDICINE_TABLES)
+
+    columns, rows = await fetch_all(MEDICINE_BY_ID, (medicine_id,))
+    if not rows:
+        return error_response('Medicine not found', 404)
+    body = dumps(serialize_rows(columns, rows[:1])[0])
+    await cache_set(medicine_cache, medicine_id, body, generation)
+    return with_validators(json_response(body), validators)
+
+
+@instrumented
+async def search_medicines(request):
+    """Search medicines by name, company, or supplier, best matches first"""
+    search_term = request.query_params.get('q', '').strip()
+    include_archived = request.query_params.get('include_archived', 'false').lower() in ('1', 'true', 'yes')
+    try:
+        fields = parse_fields(request.query_params.get('fields'),
+                              ARCHIVED_SEARCH_COLUMNS if include_archived else SEARCH_COLUMNS)
+        limit, after = parse_page(request.query_params, ARCHIVED_SEARCH_KEY if include_archived else SEARCH_KEY)
+    except ValueError as e:
+        return error_response(str(e), 400)
+    if not search_term:
+        return list_response(fields, [], fields, list_format(request))
+    limit = min(limit or SEARCH_CONFIG['MAX_RESULTS'], SEARCH_CONFIG['MAX_RESULTS'])
+
+    fmt = list_format(request)
+    validators = await table_validators(request, MEDICINE_TABLES, fmt)
+    if is_not_modified(request, validators):
+        return not_modified_response(validators)
+
+    query, params = store.search_query(search_term, fields, limit, after, include_archived)
+    columns, rows = await fetch_all(query, params)
+    key = ARCHIVED_SEARCH_KEY if include_archived else SEARCH_KEY
+    rows, next_cursor = paginate_rows(rows, limit, key, columns)
+    response = list_response(columns, rows, fields, fmt)
+
+    return with_validators(add_pagination_headers(response, request, next_cursor), validators)
+
+
+# ==================== STATISTICS ENDPOINTS ====================
+
+@instrumented
+async def get_stats(request):
+    """Dashboard totals computed with SQL aggregates (optionally broken down)"""
+    threshold = int_arg(request, 'low_stock_threshold', STATS_CONFIG['LOW_STOCK_THRESHOLD'])
+    group_by = request.query_params.get('group_by') or None
+    if group_by is not None and group_by not in STATS_BREAKDOWNS:
+        return error_response('group_by must be one of: supplier, company', 400)
+
+    stats_cache = flask_backend.stats_cache
+    cache_key = (threshold, group_by)
+    stats = stats_cache.get(cache_key)
+    if stats is not MISSING:
+        return json_response(stats)
+    generation = await cache_generation(stats_cache, MEDICINE_TABLES)
+
+    _, rows = await fetch_all(stats_query(), (threshold,), dictionary=True)
+    stats = convert_stats_rows(rows)[0]
+    stats['low_stock_threshold'] = threshold
+    if group_by is not None:
+        stats['group_by'] = group_by
+        _, rows = await fetch_all(stats_query(group_by), (threshold,), dictionary=True)
+        stats['breakdown'] = convert_stats_rows(list(rows))
+    stats_cache.set(cache_key, stats, generation)
+    return json_response(stats)
+
+
+# ==================== APPLICATION ====================
+
+async def database_unavailable(request, exc):
+    return error_response('Database connection failed', 500)
+
+
+async def database_error(request, exc):
+    return error_response(str(exc), 500)
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    global db_pool
+    if store.name != 'mysql':
+        yield
+        return
+    db_pool = await create_db_pool()
+    if flask_backend.replica_router is not None:
+        for replica in flask_backend.replica_router.replicas:
+            replica_pools[replica.name] = await create_db_pool(replica.storage.config)
+    try:
+        yield
+    finally:
+        for pool in [db_pool] + list(replica_pools.values()):
+            pool.close()
+            await pool.wait_closed()
+
+
+# The native routes query MySQL through aiomysql; other backends use Flask for everything
+native_routes = [
+    Route('/api/suppliers', get_suppliers, methods=['GET']),
+    Route('/api/medicines', get_medicines, methods=['GET']),
+    Route('/api/medicines/search', search_medicines, methods=['GET']),
+    Route('/api/medicines/{medicine_id:int}', get_medicine, methods=['GET']),
+    Route('/api/stats', get_stats, methods=['GET'])
+] if store.name == 'mysql' else []
+
+app = Starlette(
+    routes=native_routes + [
+        # Anything not matched above (including POST/PUT/DELETE on the same paths)
+        Mount('/', WSGIMiddleware(flask_backend.app))
+    ],
+    middleware=[
+        # Same policy as flask_cors in app.py; it also answers preflights for the Flask routes
+        Middleware(
+            CORSMiddleware, allow_origins=['*'], allow_methods=['*'], allow_headers=['*'],
+            expose_headers=['X-Next-Cursor', 'Link', 'ETag', 'Last-Modified', 'X-Change-Seq'], max_age=600
+        )
+    ],
+    exception_handlers={
+        DatabaseUnavailable: database_unavailable,
+        aiomysql.Error: database_error
+    },
+    lifespan=lifespan
+)
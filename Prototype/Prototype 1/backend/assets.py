@@ -0,0 +1,362 @@
+"""
+Frontend asset pipeline for Medical Storage Management System
+build_assets() minifies the CSS and JavaScript in frontend/, names each file
+after a hash of its content (css/style.1a2b3c4d.css), writes .gz and .br
+copies next to it and rewrites the pages to use those names. AssetServer lets
+app.py serve the result same-origin: fingerprinted files never change, so
+they are cached for a year, while pages are revalidated on every load.
+"""
+
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import shutil
+
+from flask import Response, abort, send_file
+from werkzeug.datastructures import Accept
+from werkzeug.http import parse_accept_header
+from werkzeug.security import safe_join
+
+try:
+    import brotli
+except ImportError:
+    # Optional: without it the build writes gzip copies only
+    brotli = None
+
+MANIFEST = 'manifest.json'
+
+# Hex digits of the content hash in fingerprinted names
+HASH_LENGTH = 8
+
+PRECOMPRESSED_TYPES = ('.html', '.css', '.js', '.svg', '.json')
+
+# (suffix, Content-Encoding) in server preference order
+VARIANTS = (('.br', 'br'), ('.gz', 'gzip'))
+
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+# Pages served by the API talk to it same-origin; app.js falls back to
+# http://localhost:5000/api when a page is opened from disk instead
+API_META = '<meta name="medvault-api" content="/api">'
+
+
+# ---- minification
+
+def _is_word(char):
+    return char.isalnum() or char in '_$\\' or ord(char) > 127
+
+
+# A '/' after one of these (or at the start) begins a regular expression, not a division
+_REGEX_AFTER = set('(,=:[!&|?{};+-*%<>~^')
+_REGEX_KEYWORDS = {'return', 'typeof', 'case', 'do', 'else', 'in', 'of', 'new', 'delete', 'void',
+                   'throw', 'instanceof', 'yield', 'await'}
+
+# A line break between these can end a statement (automatic semicolon insertion)
+_NEWLINE_BEFORE = set(')]}\'"`+-/')
+_NEWLINE_AFTER = set('([{\'"`+-!~/')
+
+
+def _string_end(source, i, quote):
+    j = i + 1
+    while j < len(source):
+        char = source[j]
+        if char == '\\':
+            j += 2
+            continue
+        if char == quote:
+            return j + 1
+        if char == '\n':
+            break
+        j += 1
+    raise ValueError(f'Unterminated string at offset {i}')
+
+
+def _template_end(source, i):
+    """End of a template literal chunk starting at ``i``: (index, True if it stopped at '${')"""
+    j = i
+    while j < len(source):
+        char = source[j]
+        if char == '\\':
+            j += 2
+        elif char == '`':
+            return j + 1, False
+        elif source.startswith('${', j):
+            return j + 2, True
+        else:
+            j += 1
+    raise ValueError(f'Unterminated template literal at offset {i}')
+
+
+def _regex_end(source, i):
+    j, in_class = i + 1, False
+    while j < len(source):
+        char = source[j]
+        if char == '\\':
+            j += 2
+            continue
+        if char == '\n':
+            break
+        if char == '[':
+            in_class = True
+        elif char == ']':
+            in_class = False
+        elif char == '/' and not in_class:
+            j += 1
+            while j < len(source) and _is_word(source[j]):
+                j += 1
+            return j
+        j += 1
+    raise ValueError(f'Unterminated regular expression at offset {i}')
+
+
+def _separator(before, after, newline):
+    """What must stay between two tokens that had whitespace between them"""
+    if newline and (_is_word(before) or before in _NEWLINE_BEFORE) and (_is_word(after) or after in _NEWLINE_AFTER):
+        return '\n'
+    if (_is_word(before) and _is_word(after)) or (before in '+-' and after in '+-') or before == after == '/':
+        return ' '
+    return ''
+
+
+def minify_js(source):
+    """
+    Strip comments and redundant whitespace from JavaScript.
+
+    A JSMin-style pass: strings, template literals and regular expression
+    literals are copied as they are, and a line break is kept wherever
+    automatic semicolon insertion could depend on it. Raises ValueError on
+    an unterminated literal.
+    """
+    out = []
+    last = ''
+    gap = ''
+    # Brace depth at each open ${ of a template literal
+    templates = []
+    depth = 0
+    i, n = 0, len(source)
+
+    def emit(token):
+        nonlocal last, gap
+        if gap and out:
+            out.append(_separator(out[-1][-1], token[0], gap == '\n'))
+        out.append(token)
+        last, gap = token, ''
+
+    while i < n:
+        char = source[i]
+        if char.isspace():
+            gap = '\n' if char == '\n' or gap == '\n' else ' '
+            i += 1
+        elif source.startswith('//', i):
+            end = source.find('\n', i)
+            i = n if end < 0 else end
+        elif source.startswith('/*', i):
+            end = source.find('*/', i + 2)
+            if end < 0:
+                raise ValueError(f'Unterminated comment at offset {i}')
+            gap = '\n' if gap == '\n' or '\n' in source[i:end] else ' '
+            i = end + 2
+        elif char in '\'"':
+            end = _string_end(source, i, char)
+            emit(source[i:end])
+            i = end
+        elif char == '`' or (char == '}' and templates and templates[-1] == depth):
+            if char == '}':
+                templates.pop()
+            end, opened = _template_end(source, i + 1)
+            emit(source[i:end])
+            if opened:
+                templates.append(depth)
+            i = end
+        elif char == '/' and (not last or last in _REGEX_KEYWORDS
+                              or (not _is_word(last[-1]) and last[-1] in _REGEX_AFTER)):
+            end = _regex_end(source, i)
+            emit(source[i:end])
+            i = end
+        elif _is_word(char):
+            end = i
+            while end < n and _is_word(source[end]):
+                end += 1
+            emit(source[i:end])
+            i = end
+        else:
+            if char == '{':
+                depth += 1
+            elif char == '}':
+                depth -= 1
+            emit(char)
+            i += 1
+    return ''.join(out) + '\n'
+
+
+_CSS_TOKENS = re.compile(r'/\*.*?\*/|"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'|[^"\'/]+|/', re.DOTALL)
+
+
+def minify_css(source):
+    """Drop comments and the whitespace around CSS punctuation; strings are left alone"""
+    parts = []
+    for token in _CSS_TOKENS.findall(source):
+        if token.startswith('/*'):
+            continue
+        if token[0] not in '"\'':
+            token = re.sub(r'\s+', ' ', token)
+            token = re.sub(r'\s*([{};,>])\s*', r'\1', token).replace(';}', '}')
+        parts.append(token)
+    return ''.join(parts).strip() + '\n'
+
+
+MINIFIERS = {'.js': minify_js, '.css': minify_css}
+
+
+# ---- build
+
+def fingerprint(path, content):
+    """'css/style.css' -> 'css/style.<hash>.css'"""
+    stem, ext = os.path.splitext(path)
+    return f'{stem}.{hashlib.sha256(content).hexdigest()[:HASH_LENGTH]}{ext}'
+
+
+def render_page(html, manifest):
+    """A page with asset references replaced by their fingerprinted names and API_META added"""
+    for logical, built in manifest.items():
+        html = re.sub(rf'((?:href|src)=")({re.escape(logical)})(")', rf'\g<1>{built}\g<3>', html)
+    if API_META not in html:
+        html = html.replace('</head>', f'    {API_META}\n</head>', 1)
+    return html
+
+
+def precompress(path):
+    """Write .gz (and .br) next to ``path`` where they are smaller; returns the suffixes written"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    variants = {'.gz': gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants['.br'] = brotli.compress(data, quality=11)
+    written = []
+    for suffix, body in variants.items():
+        if len(body) < len(data):
+            with open(path + suffix, 'wb') as f:
+                f.write(body)
+            written.append(suffix)
+    return written
+
+
+def build_assets(source_dir, build_dir):
+    """
+    Build ``source_dir`` into ``build_dir`` (replacing it).
+
+    Every file except the pages is minified where a minifier exists and
+    written under its fingerprinted name; pages keep their names. Returns
+    the manifest, {logical path: fingerprinted path}, also written to
+    manifest.json.
+    """
+    source_dir = os.path.abspath(source_dir)
+    build_dir = os.path.abspath(build_dir)
+    staging = build_dir + '.tmp'
+    shutil.rmtree(staging, ignore_errors=True)
+
+    pages, manifest = [], {}
+    for root, dirs, files in os.walk(source_dir):
+        # The build output may live inside the source tree
+        dirs[:] = sorted(d for d in dirs if os.path.join(root, d) not in (build_dir, staging))
+        for name in sorted(files):
+            logical = os.path.relpath(os.path.join(root, name), source_dir).replace(os.sep, '/')
+            if name.endswith('.html'):
+                pages.append(logical)
+                continue
+            with open(os.path.join(root, name), 'rb') as f:
+                content = f.read()
+            minify = MINIFIERS.get(os.path.splitext(name)[1])
+            if minify is not None:
+                content = minify(content.decode('utf-8')).encode('utf-8')
+            manifest[logical] = fingerprint(logical, content)
+            target = os.path.join(staging, manifest[logical])
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with open(target, 'wb') as f:
+                f.write(content)
+
+    os.makedirs(staging, exist_ok=True)
+    for logical in pages:
+        with open(os.path.join(source_dir, logical), encoding='utf-8') as f:
+            html = render_page(f.read(), manifest)
+        target = os.path.join(staging, logical)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target, 'w', encoding='utf-8') as f:
+            f.write(html)
+
+    for root, _, files in os.walk(staging):
+        for name in files:
+            if name.endswith(PRECOMPRESSED_TYPES):
+                precompress(os.path.join(root, name))
+    with open(os.path.join(staging, MANIFEST), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+    shutil.rmtree(build_dir, ignore_errors=True)
+    os.replace(staging, build_dir)
+    return manifest
+
+
+# ---- serving
+
+class AssetServer:
+    """
+    Serves the built frontend, or the source files as they are when no build exists.
+
+    Fingerprinted files are sent with Cache-Control: immutable and a year's
+    max-age; pages and unbuilt files with no-cache and an ETag, so browsers
+    revalidate them with a cheap conditional request. A .br or .gz copy is
+    sent when the client accepts it.
+    """
+
+    def __init__(self, source_dir, build_dir):
+        self.source_dir = os.path.abspath(source_dir)
+        self.build_dir = os.path.abspath(build_dir)
+        self.built = os.path.isfile(os.path.join(self.build_dir, MANIFEST))
+        self.immutable = set()
+        if self.built:
+            with open(os.path.join(self.build_dir, MANIFEST), encoding='utf-8') as f:
+                self.immutable = set(json.load(f).values())
+
+    @property
+    def root(self):
+        return self.build_dir if self.built else self.source_dir
+
+    def _encoding(self, path, accept_encoding):
+        """(suffix, Content-Encoding) of the best precompressed copy the client accepts, or (None, None)"""
+        if not accept_encoding:
+            return None, None
+        available = {encoding: suffix for suffix, encoding in VARIANTS if os.path.isfile(path + suffix)}
+        best = parse_accept_header(accept_encoding, Accept).best_match(list(available))
+        return (available[best], best) if best else (None, None)
+
+    def response(self, filename, accept_encoding):
+        """The response for GET /<filename>; aborts with 404 for anything outside the frontend"""
+        path = safe_join(self.root, filename)
+        if path is None or not os.path.isfile(path) or filename == MANIFEST:
+            abort(404)
+        mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+
+        if not self.built and filename.endswith('.html'):
+            # Unbuilt pages still get API_META so they call the API same-origin
+            with open(path, encoding='utf-8') as f:
+                response = Response(render_page(f.read(), {}), mimetype=mimetype)
+            response.add_etag()
+            response.cache_control.no_cache = True
+            return response
+
+        suffix, encoding = self._encoding(path, accept_encoding)
+        response = send_file(path + (suffix or ''), mimetype=mimetype, conditional=True, max_age=None)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        response.vary.add('Accept-Encoding')
+        if filename in self.immutable:
+            response.cache_control.no_cache = None
+            response.cache_control.public = True
+            response.cache_control.max_age = IMMUTABLE_MAX_AGE
+            response.cache_control.immutable = True
+        else:
+            response.cache_control.no_cache = True
+        return response
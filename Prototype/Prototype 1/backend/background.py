@@ -0,0 +1,42 @@
+"""
+Background maintenance threads for Medical Storage Management System
+"""
+
+import threading
+import traceback
+
+
+class PeriodicTask:
+    """Run ``func`` on a daemon thread every ``interval`` seconds"""
+
+    def __init__(self, name, interval, func, run_immediately=True):
+        self.name = name
+        self.interval = interval
+        self.func = func
+        self.run_immediately = run_immediately
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Start the thread (no-op if already running or interval is 0)"""
+        if self.interval <= 0 or (self._thread and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Ask the thread to exit after its current run"""
+        self._stop.set()
+
+    def _run(self):
+        if not self.run_immediately and self._stop.wait(self.interval):
+            return
+        while True:
+            try:
+                self.func()
+            except Exception:
+                print(f"Error in background task {self.name}:")
+                traceback.print_exc()
+            if self._stop.wait(self.interval):
+                return
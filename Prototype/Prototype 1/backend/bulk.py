@@ -0,0 +1,235 @@
+"""
+Bulk medicine import for Medical Storage Management System
+Parses JSON array, NDJSON or CSV input as a stream and inserts valid rows in
+batched executemany() calls inside a single transaction
+"""
+
+import codecs
+import csv
+import json
+
+from changes import record_changes
+from storage import INSERT_MEDICINE, OPENING_LOTS
+from validation import MEDICINE_FIELDS, validate_medicine
+from versions import bump_version
+
+FORMATS = {
+    'application/json': 'json',
+    'application/x-ndjson': 'ndjson',
+    'application/ndjson': 'ndjson',
+    'application/jsonl': 'ndjson',
+    'text/csv': 'csv'
+}
+
+READ_SIZE = 64 * 1024
+SUPPLIER_INDEX = MEDICINE_FIELDS.index('supplier_id')
+
+
+class BulkFormatError(ValueError):
+    """The input cannot be parsed any further (as opposed to one bad row)"""
+
+
+class RowError:
+    """Placeholder for an input row that could not be decoded"""
+
+    def __init__(self, message):
+        self.message = message
+
+
+def format_for(content_type):
+    """Map a Content-Type header to 'json', 'ndjson' or 'csv' (None if unsupported)"""
+    mimetype = (content_type or '').split(';')[0].strip().lower()
+    return FORMATS.get(mimetype)
+
+
+def _text_chunks(stream):
+    decoder = codecs.getincrementaldecoder('utf-8-sig')()
+    while True:
+        chunk = stream.read(READ_SIZE)
+        if not chunk:
+            tail = decoder.decode(b'', final=True)
+            if tail:
+                yield tail
+            return
+        text = decoder.decode(chunk)
+        if text:
+            yield text
+
+
+def _lines(stream):
+    buffer = ''
+    for text in _text_chunks(stream):
+        buffer += text
+        *lines, buffer = buffer.split('\n')
+        for line in lines:
+            yield line + '\n'
+    if buffer:
+        yield buffer
+
+
+def iter_json_array(stream):
+    """Yield the elements of a top-level JSON array without reading it all at once"""
+    decoder = json.JSONDecoder()
+    chunks = _text_chunks(stream)
+    buffer = ''
+    position = 0
+    started = False
+
+    def fill():
+        nonlocal buffer, position
+        text = next(chunks, None)
+        if text is None:
+            return False
+        buffer = buffer[position:] + text
+        position = 0
+        return True
+
+    while True:
+        # Skip whitespace and separators between elements
+        while True:
+            while position < len(buffer) and buffer[position] in ' \t\r\n,':
+                if buffer[position] == ',' and not started:
+                    raise BulkFormatError('Expected a JSON array')
+                position += 1
+            if position < len(buffer) or not fill():
+                break
+        if position >= len(buffer):
+            raise BulkFormatError('Unexpected end of JSON array')
+        if not started:
+            if buffer[position] != '[':
+                raise BulkFormatError('Expected a JSON array')
+            started = True
+            position += 1
+            continue
+        if buffer[position] == ']':
+            return
+        while True:
+            try:
+                item, end = decoder.raw_decode(buffer, position)
+                break
+            except ValueError:
+                if not fill():
+                    raise BulkFormatError('Malformed JSON array')
+        # A value must be followed by a separator; anything else is either a
+        # number cut off at the end of a chunk or malformed input
+        if end == len(buffer) or buffer[end] not in ' \t\r\n,]':
+            if fill():
+                continue
+            if end < len(buffer):
+                raise BulkFormatError('Malformed JSON array')
+        position = end
+        yield item
+
+
+def iter_ndjson(stream):
+    """Yield one decoded object per non-empty line (RowError for bad lines)"""
+    for line in _lines(stream):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as e:
+            yield RowError(f'Invalid JSON: {e}')
+
+
+def iter_csv(stream):
+    """Yield one dict per CSV record, keyed by the header row"""
+    reader = csv.DictReader(_lines(stream))
+    if reader.fieldnames is None:
+        return
+    missing = [field for field in MEDICINE_FIELDS if field not in reader.fieldnames]
+    if missing:
+        raise BulkFormatError(f"CSV header is missing column(s): {', '.join(missing)}")
+    for record in reader:
+        yield record
+
+
+def iter_records(stream, fmt):
+    """Decode ``stream`` in the given format ('json', 'ndjson' or 'csv')"""
+    if fmt == 'json':
+        return iter_json_array(stream)
+    if fmt == 'ndjson':
+        return iter_ndjson(stream)
+    if fmt == 'csv':
+        return iter_csv(stream)
+    raise BulkFormatError(f'Unsupported format: {fmt}')
+
+
+def import_medicines(connection, records, batch_size=1000, skip_invalid=False,
+                     max_errors=100, insert_batch=None):
+    """
+    Validate and insert medicine records in one transaction.
+
+    Every record is validated with the same rules as POST /api/medicines, and
+    supplier IDs are checked up front so one bad row cannot abort a batch
+    half-way. Invalid rows are reported with their 1-based row number. Unless
+    ``skip_invalid`` is set, any invalid row rolls the whole import back.
+    ``insert_batch(cursor, rows)`` can replace the default executemany().
+    Each imported quantity becomes the medicine's UNLOTTED lot.
+
+    Returns a summary dict; database errors propagate after rollback.
+    """
+    cursor = connection.cursor()
+    insert_batch = insert_batch or (lambda cur, rows: cur.executemany(INSERT_MEDICINE, rows))
+    try:
+        cursor.execute("SELECT supplier_id FROM suppliers")
+        supplier_ids = {row[0] for row in cursor.fetchall()}
+        cursor.execute("SELECT COALESCE(MAX(medicine_id), 0) FROM medicines")
+        last_id = cursor.fetchone()[0]
+
+        received = 0
+        inserted = 0
+        error_count = 0
+        errors = []
+        batch = []
+
+        for row_number, record in enumerate(records, start=1):
+            received += 1
+            if isinstance(record, RowError):
+                values, error = None, record.message
+            else:
+                values, error = validate_medicine(record)
+            if values is not None and values[SUPPLIER_INDEX] not in supplier_ids:
+                error = f'Unknown supplier_id: {values[SUPPLIER_INDEX]}'
+            if error:
+                error_count += 1
+                if len(errors) < max_errors:
+                    errors.append({'row': row_number, 'error': error})
+                continue
+            # After a failure in all-or-nothing mode keep validating, stop writing
+            if error_count and not skip_invalid:
+                continue
+            batch.append(values)
+            if len(batch) >= batch_size:
+                insert_batch(cursor, batch)
+                inserted += len(batch)
+                batch = []
+
+        committed = skip_invalid or error_count == 0
+        if committed and batch:
+            insert_batch(cursor, batch)
+            inserted += len(batch)
+        if committed:
+            if inserted:
+                cursor.execute(OPENING_LOTS, (last_id,))
+                bump_version(cursor, 'medicines')
+                # executemany() does not report the new ids: one entry tells readers to reload
+                record_changes(cursor, 'medicines', 'bulk', [0])
+            connection.commit()
+        else:
+            connection.rollback()
+            inserted = 0
+
+        return {
+            'received': received,
+            'inserted': inserted,
+            'failed': error_count,
+            'committed': committed,
+            'errors': errors
+        }
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
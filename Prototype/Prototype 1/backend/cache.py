@@ -0,0 +1,213 @@
+"""
+Caching for Medical Storage Management System
+Used for derived data (such as dashboard aggregates) and hot lookups that write
+handlers invalidate. Entries live in process memory or, when configured, in
+Redis so several API processes share them.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+MISSING = object()
+# Pass as set()'s generation when the value may predate a write; it is not stored
+STALE = object()
+
+
+class MemoryBackend:
+    """Bounded in-process store; the least recently used entry is evicted when full"""
+
+    name = 'memory'
+
+    def __init__(self, max_entries=128):
+        self.max_entries = max_entries
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return MISSING
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return MISSING
+            self._entries.move_to_end(key)
+            return value
+
+    def get_many(self, keys):
+        return [self.get(key) for key in keys]
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def delete_prefix(self, prefix):
+        with self._lock:
+            for key in [key for key in self._entries if key.startswith(prefix)]:
+                del self._entries[key]
+
+    def size(self):
+        with self._lock:
+            return len(self._entries)
+
+
+class RedisBackend:
+    """
+    Store in Redis (or a Redis-compatible server) shared by all API processes.
+
+    Values must be bytes or str. Redis expires entries itself and evicts under
+    its own maxmemory policy, so evictions are not counted here.
+    """
+
+    name = 'redis'
+    evictions = None
+
+    def __init__(self, client, key_prefix='medvault:'):
+        self.client = client
+        self.key_prefix = key_prefix
+
+    def get(self, key):
+        value = self.client.get(self.key_prefix + key)
+        return MISSING if value is None else value
+
+    def get_many(self, keys):
+        # One MGET round-trip instead of a GET per key
+        values = self.client.mget([self.key_prefix + key for key in keys])
+        return [MISSING if value is None else value for value in values]
+
+    def set(self, key, value, ttl):
+        self.client.set(self.key_prefix + key, value, ex=max(1, int(ttl)))
+
+    def delete(self, key):
+        self.client.delete(self.key_prefix + key)
+
+    def delete_prefix(self, prefix):
+        keys = list(self.client.scan_iter(match=self.key_prefix + prefix + '*', count=500))
+        if keys:
+            self.client.delete(*keys)
+
+    def size(self):
+        return None
+
+
+def create_backend(redis_url=None, max_entries=128):
+    """Redis backend when ``redis_url`` is set and redis-py is installed, else memory"""
+    if redis_url:
+        try:
+            import redis
+        except ImportError:
+            print("CACHE_REDIS_URL is set but the redis package is not installed; using memory cache")
+        else:
+            return RedisBackend(redis.Redis.from_url(redis_url))
+    return MemoryBackend(max_entries)
+
+
+class TTLCache:
+    """
+    Thread-safe cache whose entries expire after ``ttl`` seconds.
+
+    Write handlers call delete() or clear() so this process never serves stale
+    data; the TTL bounds staleness caused by writes from other processes.
+    Entries go to ``backend`` under ``namespace``; by default a private LRU
+    MemoryBackend holding at most ``max_entries``.
+    """
+
+    def __init__(self, ttl=60, max_entries=128, backend=None, namespace=''):
+        self.ttl = ttl
+        self.namespace = namespace
+        self._backend = backend or MemoryBackend(max_entries)
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._counters = {'hits': 0, 'misses': 0, 'invalidations': 0, 'errors': 0}
+
+    @property
+    def backend(self):
+        """The store entries live in (MemoryBackend or RedisBackend)"""
+        return self._backend
+
+    @property
+    def generation(self):
+        """Counter bumped by delete()/clear(); pass it to set() to avoid caching stale reads"""
+        return self._generation
+
+    def _count(self, name):
+        with self._lock:
+            self._counters[name] += 1
+
+    def _call(self, method, *args):
+        # A cache outage must not fail requests; it only costs a database read
+        try:
+            return getattr(self._backend, method)(*args)
+        except Exception as e:
+            self._count('errors')
+            print(f"Cache backend error ({self._backend.name}.{method}): {e}")
+            return MISSING
+
+    def get(self, key):
+        """Return the cached value, or MISSING if absent or expired"""
+        value = self._call('get', f'{self.namespace}{key}')
+        self._count('misses' if value is MISSING else 'hits')
+        return value
+
+    def get_many(self, keys):
+        """get() for several keys in one backend call; returns values in ``keys`` order"""
+        keys = list(keys)
+        if not keys:
+            return []
+        values = self._call('get_many', [f'{self.namespace}{key}' for key in keys])
+        if values is MISSING:
+            values = [MISSING] * len(keys)
+        misses = sum(1 for value in values if value is MISSING)
+        with self._lock:
+            self._counters['misses'] += misses
+            self._counters['hits'] += len(values) - misses
+        return values
+
+    def set(self, key, value, generation=None):
+        """
+        Store a value.
+
+        If ``generation`` is given and delete()/clear() ran since it was read,
+        the value may predate a write and is dropped instead of cached.
+        """
+        if generation is not None and generation != self._generation:
+            return
+        self._call('set', f'{self.namespace}{key}', value, self.ttl)
+
+    def delete(self, key):
+        """Drop one entry"""
+        with self._lock:
+            self._generation += 1
+            self._counters['invalidations'] += 1
+        self._call('delete', f'{self.namespace}{key}')
+
+    def clear(self):
+        """Drop every entry in this cache's namespace"""
+        with self._lock:
+            self._generation += 1
+            self._counters['invalidations'] += 1
+        self._call('delete_prefix', self.namespace)
+
+    def stats(self):
+        """Hit/miss/eviction counters for the health endpoint"""
+        with self._lock:
+            stats = dict(self._counters)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / lookups, 3) if lookups else None
+        stats['backend'] = self._backend.name
+        stats['evictions'] = self._backend.evictions
+        size = self._call('size')
+        stats['entries'] = None if size is MISSING else size
+        stats['ttl'] = self.ttl
+        return stats
@@ -0,0 +1,80 @@
+"""
+Change feed for Medical Storage Management System
+Write handlers append one change_log row per written medicine or supplier
+inside their transaction; clients read the log back in sequence order through
+/api/changes or its Server-Sent Events stream and patch their own copy
+"""
+
+import threading
+
+# Sequence numbers come from the change_log counter in table_versions. The
+# UPDATE locks that row until the writer commits, so writers commit in
+# sequence order and a reader that has seen seq N never misses a smaller one.
+ADVANCE_SEQ = "UPDATE table_versions SET version = version + %s WHERE table_name = 'change_log'"
+LAST_SEQ = "SELECT version FROM table_versions WHERE table_name = 'change_log'"
+INSERT_CHANGE = "INSERT INTO change_log (seq, table_name, row_id, action) VALUES (%s, %s, %s, %s)"
+
+# Rows per executemany() when a write logs many changes
+INSERT_CHUNK_SIZE = 1000
+
+
+def record_changes(cursor, table, action, ids):
+    """
+    Log ``action`` ('insert', 'update', 'delete' or 'bulk') on ``ids``.
+
+    Call it as the last statement before committing: the sequence counter
+    stays locked until then. Returns the last sequence number used, or None
+    when the database predates the change feed.
+    """
+    ids = list(ids)
+    if not ids:
+        return None
+    cursor.execute(ADVANCE_SEQ, (len(ids),))
+    cursor.execute(LAST_SEQ)
+    row = cursor.fetchone()
+    if row is None:
+        return None
+    last = int(row[0])
+    rows = [(last - len(ids) + position, table, row_id, action)
+            for position, row_id in enumerate(ids, start=1)]
+    for i in range(0, len(rows), INSERT_CHUNK_SIZE):
+        cursor.executemany(INSERT_CHANGE, rows[i:i + INSERT_CHUNK_SIZE])
+    return last
+
+
+def format_event(event, data, event_id=None):
+    """One Server-Sent Events frame; ``data`` is an already encoded JSON string"""
+    lines = [f'id: {event_id}'] if event_id is not None else []
+    lines.append(f'event: {event}')
+    lines.append(f'data: {data}')
+    return '\n'.join(lines) + '\n\n'
+
+
+class ChangeNotifier:
+    """
+    Wakes change streams when this process commits a write.
+
+    Streams also poll, at the version tracker's pace, for writes made by
+    other processes; the notifier only saves local writes that wait.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._generation = 0
+
+    @property
+    def generation(self):
+        with self._condition:
+            return self._generation
+
+    def notify(self, *args):
+        """Wake every waiting stream; usable directly as an events subscriber"""
+        with self._condition:
+            self._generation += 1
+            self._condition.notify_all()
+
+    def wait(self, generation, timeout):
+        """Block until notify() runs after ``generation`` was read, or ``timeout`` passes"""
+        with self._condition:
+            self._condition.wait_for(lambda: self._generation != generation, timeout)
+            return self._generation
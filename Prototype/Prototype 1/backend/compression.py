@@ -0,0 +1,40 @@
+"""
+Response compression for Medical Storage Management System
+JSON and columnar bodies of at least MIN_SIZE bytes are compressed with brotli
+(when installed) or gzip, whichever the client's Accept-Encoding prefers
+"""
+
+import gzip
+
+from werkzeug.datastructures import Accept
+from werkzeug.http import parse_accept_header
+
+try:
+    import brotli
+except ImportError:
+    # Optional: gzip alone already gives most of the saving on JSON
+    brotli = None
+
+import metrics
+from serialization import LIST_FORMATS
+
+# Server preference when the client accepts several equally
+ENCODINGS = (('br',) if brotli is not None else ()) + ('gzip',)
+
+# Streamed responses (export, change stream) are never compressed here
+COMPRESSIBLE_TYPES = frozenset(LIST_FORMATS) | {'application/json'}
+
+
+def negotiate_encoding(accept_encoding):
+    """'br', 'gzip' or None (send the body as is) for an Accept-Encoding header value"""
+    if not accept_encoding:
+        return None
+    return parse_accept_header(accept_encoding, Accept).best_match(ENCODINGS)
+
+
+def compress(body, encoding, config):
+    """``body`` compressed with ``encoding`` at the levels in ``config``"""
+    with metrics.phase('compress'):
+        if encoding == 'br':
+            return brotli.compress(body, quality=config['BROTLI_QUALITY'])
+        return gzip.compress(body, compresslevel=config['GZIP_LEVEL'], mtime=0)
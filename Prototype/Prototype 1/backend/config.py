@@ -20,10 +20,170 @@ DB_CONFIG = {
     'autocommit': False
 }
 
+# Storage backend: 'mysql' (DB_CONFIG) or 'sqlite', an embedded database file for
+# single-node deployments (created on first start; see database/sqlite_schema.sql)
+STORAGE_CONFIG = {
+    'BACKEND': os.getenv('STORAGE_BACKEND', 'mysql'),
+    'SQLITE_PATH': os.getenv('SQLITE_PATH', 'medvault.sqlite3'),
+    'SQLITE_TIMEOUT': float(os.getenv('SQLITE_TIMEOUT', 30))
+}
+
+# Connection pool settings for DB_CONFIG connections
+POOL_CONFIG = {
+    'pool_size': int(os.getenv('DB_POOL_SIZE', 5)),
+    'max_overflow': int(os.getenv('DB_POOL_MAX_OVERFLOW', 10)),
+    'timeout': float(os.getenv('DB_POOL_TIMEOUT', 30)),
+    'recycle': int(os.getenv('DB_POOL_RECYCLE', 3600)),
+    'pre_ping': os.getenv('DB_POOL_PRE_PING', 'True') == 'True'
+}
+
+# Read replicas for GET requests: comma-separated host[:port] entries (same
+# credentials as DB_CONFIG), or SQLite file paths with STORAGE_BACKEND=sqlite.
+# Each gets a pool sized by POOL_CONFIG. A client reads from the primary for
+# STICKY_SECONDS after each of its writes; keep it above MAX_LAG + CHECK_INTERVAL.
+REPLICA_CONFIG = {
+    'ADDRESSES': [entry.strip() for entry in os.getenv('DB_REPLICAS', '').split(',') if entry.strip()],
+    'CHECK_INTERVAL': float(os.getenv('REPLICA_CHECK_INTERVAL', 1)),
+    'MAX_LAG': float(os.getenv('REPLICA_MAX_LAG', 3)),
+    'STICKY_SECONDS': int(os.getenv('REPLICA_STICKY_SECONDS', 5))
+}
+
 # Flask Configuration
 FLASK_CONFIG = {
     'DEBUG': os.getenv('FLASK_DEBUG', 'True') == 'True',
     'PORT': int(os.getenv('FLASK_PORT', 5000)),
-    'HOST': os.getenv('FLASK_HOST', '0.0.0.0')
+    'HOST': os.getenv('FLASK_HOST', '0.0.0.0'),
+    # 'wsgi' runs Flask's server; 'asgi' serves asgi.py with uvicorn (see requirements-async.txt)
+    'SERVER_MODE': os.getenv('SERVER_MODE', 'wsgi')
+}
+
+# aiomysql pool used by the async (ASGI) entry point; POOL_CONFIG timeout/recycle apply too
+ASYNC_POOL_CONFIG = {
+    'min_size': int(os.getenv('ASYNC_DB_POOL_MIN_SIZE', 5)),
+    'max_size': int(os.getenv('ASYNC_DB_POOL_MAX_SIZE', 50))
+}
+
+# Dashboard statistics settings
+STATS_CONFIG = {
+    'LOW_STOCK_THRESHOLD': int(os.getenv('LOW_STOCK_THRESHOLD', 50)),
+    'CACHE_TTL': int(os.getenv('STATS_CACHE_TTL', 60))
+}
+
+# Medicine search settings (MIN_TOKEN_SIZE must match innodb_ft_min_token_size)
+SEARCH_CONFIG = {
+    'MAX_RESULTS': int(os.getenv('SEARCH_MAX_RESULTS', 50)),
+    'MIN_TOKEN_SIZE': int(os.getenv('SEARCH_MIN_TOKEN_SIZE', 3))
+}
+
+# Typeahead suggestion settings (REBUILD_INTERVAL 0 disables periodic rebuilds)
+SUGGEST_CONFIG = {
+    'LIMIT': int(os.getenv('SUGGEST_LIMIT', 10)),
+    'MAX_LIMIT': int(os.getenv('SUGGEST_MAX_LIMIT', 50)),
+    'REBUILD_INTERVAL': int(os.getenv('SUGGEST_REBUILD_INTERVAL', 300))
+}
+
+# Bulk import settings for POST /api/medicines/bulk and bulk_import.py
+BULK_CONFIG = {
+    'BATCH_SIZE': int(os.getenv('BULK_BATCH_SIZE', 1000)),
+    'MAX_ERRORS': int(os.getenv('BULK_MAX_ERRORS', 100))
+}
+
+# Streaming export settings (rows fetched and written per chunk)
+EXPORT_CONFIG = {
+    'BATCH_SIZE': int(os.getenv('EXPORT_BATCH_SIZE', 1000))
+}
+
+# Expiry alert index settings (REBUILD_INTERVAL 0 disables periodic rebuilds)
+EXPIRY_CONFIG = {
+    'REBUILD_INTERVAL': int(os.getenv('EXPIRY_REBUILD_INTERVAL', 3600))
+}
+
+# Lookup caches for single medicines and the supplier list
+# (CACHE_REDIS_URL shares them between processes through Redis)
+CACHE_CONFIG = {
+    'REDIS_URL': os.getenv('CACHE_REDIS_URL', ''),
+    'MEDICINE_TTL': int(os.getenv('MEDICINE_CACHE_TTL', 300)),
+    'MEDICINE_MAX_ENTRIES': int(os.getenv('MEDICINE_CACHE_MAX_ENTRIES', 10000)),
+    'SUPPLIER_TTL': int(os.getenv('SUPPLIER_CACHE_TTL', 3600))
 }
 
+# Stock movements (POST /api/medicines/movements)
+MOVEMENT_CONFIG = {
+    'MAX_BATCH': int(os.getenv('MOVEMENT_MAX_BATCH', 1000))
+}
+
+# First-expiry-first-out dispensing (POST /api/medicines/dispense)
+DISPENSE_CONFIG = {
+    'MAX_LINES': int(os.getenv('DISPENSE_MAX_LINES', 1000))
+}
+
+# Reorder points (INTERVAL 0 disables the in-process job; run compute_reorder.py instead)
+REORDER_CONFIG = {
+    'INTERVAL': int(os.getenv('REORDER_INTERVAL', 300)),
+    'FULL_INTERVAL': int(os.getenv('REORDER_FULL_INTERVAL', 86400)),
+    'WINDOW_DAYS': int(os.getenv('REORDER_WINDOW_DAYS', 30)),
+    'LEAD_TIME_DAYS': float(os.getenv('REORDER_LEAD_TIME_DAYS', 7)),
+    'SERVICE_Z': float(os.getenv('REORDER_SERVICE_Z', 1.65))
+}
+
+# Change feed (/api/changes and its event stream; PRUNE_INTERVAL 0 disables pruning)
+CHANGES_CONFIG = {
+    'PAGE_SIZE': int(os.getenv('CHANGES_PAGE_SIZE', 500)),
+    'RETENTION_HOURS': int(os.getenv('CHANGES_RETENTION_HOURS', 168)),
+    'PRUNE_INTERVAL': int(os.getenv('CHANGES_PRUNE_INTERVAL', 3600)),
+    'POLL_INTERVAL': float(os.getenv('CHANGES_POLL_INTERVAL', 2)),
+    'HEARTBEAT': int(os.getenv('CHANGES_HEARTBEAT', 15)),
+    'STREAM_MAX_SECONDS': int(os.getenv('CHANGES_STREAM_MAX_SECONDS', 300))
+}
+
+# Batch medicine lookups (POST /api/medicines/batch-get and GET ?ids=)
+BATCH_GET_CONFIG = {
+    'MAX_IDS': int(os.getenv('BATCH_GET_MAX_IDS', 500))
+}
+
+# Response compression (bodies smaller than MIN_SIZE bytes are sent as is)
+COMPRESSION_CONFIG = {
+    'MIN_SIZE': int(os.getenv('COMPRESS_MIN_SIZE', 1024)),
+    'GZIP_LEVEL': int(os.getenv('COMPRESS_GZIP_LEVEL', 6)),
+    'BROTLI_QUALITY': int(os.getenv('COMPRESS_BROTLI_QUALITY', 5))
+}
+
+# Conditional GET settings (seconds a table_versions snapshot is reused)
+ETAG_CONFIG = {
+    'VERSION_MAX_AGE': float(os.getenv('ETAG_VERSION_MAX_AGE', 1.0))
+}
+
+# Request instrumentation (PROFILE_INTERVAL_MS 0 disables the sampling profiler)
+METRICS_CONFIG = {
+    'PROFILE_INTERVAL_MS': int(os.getenv('PROFILE_INTERVAL_MS', 0))
+}
+
+# Background jobs (/api/jobs; WORKERS 0 leaves queued jobs to job_worker.py)
+JOBS_CONFIG = {
+    'WORKERS': int(os.getenv('JOBS_WORKERS', 2)),
+    'RESULT_DIR': os.getenv('JOBS_RESULT_DIR', 'job_results'),
+    'BATCH_SIZE': int(os.getenv('JOBS_BATCH_SIZE', 1000)),
+    'POLL_INTERVAL': float(os.getenv('JOBS_POLL_INTERVAL', 5)),
+    'HEARTBEAT': int(os.getenv('JOBS_HEARTBEAT', 15)),
+    'STALE_SECONDS': int(os.getenv('JOBS_STALE_SECONDS', 120)),
+    'MAX_ATTEMPTS': int(os.getenv('JOBS_MAX_ATTEMPTS', 2)),
+    'RETENTION_HOURS': int(os.getenv('JOBS_RETENTION_HOURS', 72))
+}
+
+# Archive tiering (INTERVAL 0 disables the scheduled mover of expired medicines)
+ARCHIVE_CONFIG = {
+    'INTERVAL': int(os.getenv('ARCHIVE_INTERVAL', 3600)),
+    'EXPIRED_DAYS': int(os.getenv('ARCHIVE_EXPIRED_DAYS', 90)),
+    'BATCH_SIZE': int(os.getenv('ARCHIVE_BATCH_SIZE', 500)),
+    'MAX_BATCHES': int(os.getenv('ARCHIVE_MAX_BATCHES', 100)),
+    'PAUSE': float(os.getenv('ARCHIVE_PAUSE', 0.1))
+}
+
+# Frontend served by the API (python build_assets.py writes BUILD_DIR; without
+# it the source pages are served unminified; SERVE False leaves them to another server)
+FRONTEND_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'frontend')
+ASSETS_CONFIG = {
+    'SERVE': os.getenv('ASSETS_SERVE', 'True') == 'True',
+    'SOURCE_DIR': os.getenv('ASSETS_SOURCE_DIR', FRONTEND_DIR),
+    'BUILD_DIR': os.getenv('ASSETS_BUILD_DIR', os.path.join(FRONTEND_DIR, 'dist'))
+}
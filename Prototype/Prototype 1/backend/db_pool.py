@@ -0,0 +1,253 @@
+"""
+Database connection pool for Medical Storage Management System
+Keeps a bounded set of open connections that request handlers borrow and return
+"""
+
+import threading
+import time
+from collections import deque
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection becomes available within the pool timeout"""
+
+
+class PooledConnection:
+    """Proxy around a raw connection that returns it to the pool on close()"""
+
+    def __init__(self, pool, record):
+        self._pool = pool
+        self._record = record
+
+    @property
+    def raw_connection(self):
+        """Underlying driver connection (None once returned to the pool)"""
+        return self._record.connection if self._record else None
+
+    def close(self):
+        """Return the connection to the pool (safe to call more than once)"""
+        record, self._record = self._record, None
+        if record is not None:
+            self._pool._release(record)
+
+    def invalidate(self):
+        """Discard the connection instead of returning it to the pool"""
+        record, self._record = self._record, None
+        if record is not None:
+            self._pool._release(record, discard=True)
+
+    def is_connected(self):
+        """
+        True while the connection is checked out.
+
+        The driver's own is_connected() pings the server; liveness is already
+        checked on borrow, so this avoids a round-trip in every finally block.
+        """
+        return self._record is not None
+
+    def __getattr__(self, name):
+        if self._record is None:
+            raise AttributeError(f"Connection already returned to pool: {name}")
+        return getattr(self._record.connection, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class _ConnectionRecord:
+    """Raw connection plus the bookkeeping the pool needs for recycling"""
+
+    __slots__ = ('connection', 'created_at')
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.created_at = time.monotonic()
+
+
+class ConnectionPool:
+    """
+    Thread-safe connection pool with overflow, pre-ping and max-age recycling.
+
+    ``pool_size`` connections are kept open once created; up to ``max_overflow``
+    extra connections are opened under load and closed again when returned.
+    Borrowers wait at most ``timeout`` seconds before ``PoolTimeout`` is raised.
+    """
+
+    def __init__(self, factory, pool_size=5, max_overflow=10, timeout=30.0,
+                 recycle=3600, pre_ping=True, ping=None):
+        if pool_size < 1:
+            raise ValueError('pool_size must be at least 1')
+        self._factory = factory
+        self._ping = ping or (lambda connection: connection.is_connected())
+        self.pool_size = pool_size
+        self.max_overflow = max(0, max_overflow)
+        self.timeout = timeout
+        self.recycle = recycle
+        self.pre_ping = pre_ping
+
+        self._idle = deque()
+        self._lock = threading.Lock()
+        self._available = threading.Condition(self._lock)
+        self._opened = 0
+        self._in_use = 0
+        self._closed = False
+
+        self._stats = {
+            'checkouts': 0,
+            'checkins': 0,
+            'connects': 0,
+            'connect_errors': 0,
+            'recycled': 0,
+            'invalidated': 0,
+            'timeouts': 0,
+            'waits': 0,
+            'wait_time_total': 0.0,
+            'wait_time_max': 0.0,
+        }
+
+    @property
+    def in_use(self):
+        """Connections currently borrowed (a lock-free read for routing decisions)"""
+        return self._in_use
+
+    def connect(self):
+        """Borrow a connection, opening or waiting for one as needed"""
+        started = time.monotonic()
+        deadline = started + self.timeout
+        waited = False
+
+        with self._available:
+            while True:
+                if self._closed:
+                    raise PoolTimeout('Connection pool has been disposed')
+                if self._idle:
+                    record = self._idle.pop()
+                    break
+                if self._opened < self.pool_size + self.max_overflow:
+                    record = None
+                    self._opened += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats['timeouts'] += 1
+                    raise PoolTimeout(
+                        f'No database connection available within {self.timeout}s '
+                        f'(pool_size={self.pool_size}, max_overflow={self.max_overflow})'
+                    )
+                waited = True
+                self._available.wait(remaining)
+            self._in_use += 1
+
+        try:
+            if record is not None:
+                record = self._validate(record)
+            if record is None:
+                record = self._open()
+        except Exception:
+            with self._available:
+                self._in_use -= 1
+                self._opened -= 1
+                self._available.notify()
+            raise
+
+        wait_time = time.monotonic() - started
+        with self._lock:
+            self._stats['checkouts'] += 1
+            self._stats['wait_time_total'] += wait_time
+            if waited:
+                self._stats['waits'] += 1
+            if wait_time > self._stats['wait_time_max']:
+                self._stats['wait_time_max'] = wait_time
+        return PooledConnection(self, record)
+
+    def _open(self):
+        """Open a new raw connection; counted against the pool by the caller"""
+        try:
+            connection = self._factory()
+        except Exception:
+            with self._lock:
+                self._stats['connect_errors'] += 1
+            raise
+        with self._lock:
+            self._stats['connects'] += 1
+        return _ConnectionRecord(connection)
+
+    def _validate(self, record):
+        """Return the record if still usable, otherwise close it and return None"""
+        if self.recycle and time.monotonic() - record.created_at > self.recycle:
+            self._close_raw(record)
+            with self._lock:
+                self._stats['recycled'] += 1
+            return None
+        if self.pre_ping:
+            try:
+                alive = self._ping(record.connection)
+            except Exception:
+                alive = False
+            if not alive:
+                self._close_raw(record)
+                with self._lock:
+                    self._stats['invalidated'] += 1
+                return None
+        return record
+
+    def _release(self, record, discard=False):
+        """Take a connection back, resetting any open transaction first"""
+        if not discard:
+            try:
+                # Ends the transaction so the next borrower never sees a stale
+                # snapshot or half-finished writes from this one.
+                record.connection.rollback()
+            except Exception:
+                discard = True
+
+        with self._available:
+            self._in_use -= 1
+            self._stats['checkins'] += 1
+            keep = (not discard and not self._closed
+                    and len(self._idle) < self.pool_size)
+            if keep:
+                self._idle.append(record)
+            else:
+                self._opened -= 1
+                if discard:
+                    self._stats['invalidated'] += 1
+            self._available.notify()
+
+        if not keep:
+            self._close_raw(record)
+
+    @staticmethod
+    def _close_raw(record):
+        try:
+            record.connection.close()
+        except Exception:
+            pass
+
+    def dispose(self):
+        """Close all idle connections and refuse further checkouts"""
+        with self._available:
+            self._closed = True
+            idle, self._idle = list(self._idle), deque()
+            self._opened -= len(idle)
+            self._available.notify_all()
+        for record in idle:
+            self._close_raw(record)
+
+    def stats(self):
+        """Snapshot of pool sizing and usage counters"""
+        with self._lock:
+            snapshot = dict(self._stats)
+            snapshot.update({
+                'pool_size': self.pool_size,
+                'max_overflow': self.max_overflow,
+                'opened': self._opened,
+                'in_use': self._in_use,
+                'idle': len(self._idle),
+            })
+        checkouts = snapshot['checkouts']
+        snapshot['wait_time_avg'] = snapshot['wait_time_total'] / checkouts if checkouts else 0.0
+        return snapshot
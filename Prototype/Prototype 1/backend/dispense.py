@@ -0,0 +1,143 @@
+"""
+First-expiry-first-out dispensing for Medical Storage Management System
+Allocates order lines across each medicine's lots (medicine_batches), soonest
+expiry first, and applies the whole order in one transaction
+"""
+
+from datetime import date
+
+from changes import record_changes
+from versions import bump_version
+
+DISPENSE_REASON = 'dispensed'
+
+
+class DispenseError(ValueError):
+    """A line in the order is malformed"""
+
+
+def validate_order(data, max_lines):
+    """
+    Check an order: a JSON array of {medicine_id, quantity}, or an object
+    holding it as "lines".
+
+    Returns [(medicine_id, quantity)] in request order. Raises DispenseError
+    naming the first bad line by its 1-based position.
+    """
+    if isinstance(data, dict):
+        data = data.get('lines')
+    if not isinstance(data, list) or not data:
+        raise DispenseError('Body must be a non-empty JSON array of order lines (or {"lines": [...]})')
+    if len(data) > max_lines:
+        raise DispenseError(f'At most {max_lines} lines per order')
+    lines = []
+    for position, line in enumerate(data, start=1):
+        if not isinstance(line, dict):
+            raise DispenseError(f'Line {position}: expected an object')
+        medicine_id = line.get('medicine_id')
+        quantity = line.get('quantity')
+        if not isinstance(medicine_id, int) or isinstance(medicine_id, bool) or medicine_id < 1:
+            raise DispenseError(f'Line {position}: medicine_id must be a positive integer')
+        if not isinstance(quantity, int) or isinstance(quantity, bool) or quantity < 1:
+            raise DispenseError(f'Line {position}: quantity must be a positive integer')
+        lines.append((medicine_id, quantity))
+    return lines
+
+
+def allocate_fefo(lines, lots):
+    """
+    Pick lots for each line, soonest expiry first.
+
+    ``lots`` are fefo_lots() rows, grouped by medicine in FEFO order. Lines
+    for the same medicine continue where the previous one stopped. Returns
+    (picks, shortages): picks[i] lists (batch_id, lot_number, exp_date,
+    quantity) for lines[i]; shortages maps medicine_id to the units that
+    no lot could cover.
+    """
+    queues = {}
+    for batch_id, medicine_id, lot_number, exp_date, quantity in lots:
+        queues.setdefault(medicine_id, []).append([batch_id, lot_number, exp_date, quantity])
+
+    positions = {}
+    picks = []
+    shortages = {}
+    for medicine_id, wanted in lines:
+        queue = queues.get(medicine_id, [])
+        position = positions.get(medicine_id, 0)
+        line_picks = []
+        while wanted and position < len(queue):
+            lot = queue[position]
+            taken = min(wanted, lot[3])
+            line_picks.append((lot[0], lot[1], lot[2], taken))
+            wanted -= taken
+            lot[3] -= taken
+            if not lot[3]:
+                position += 1
+        positions[medicine_id] = position
+        if wanted:
+            shortages[medicine_id] = shortages.get(medicine_id, 0) + wanted
+        picks.append(line_picks)
+    return picks, shortages
+
+
+def lot_amounts(picks):
+    """{batch_id: units taken} summed over allocate_fefo() picks"""
+    taken = {}
+    for line_picks in picks:
+        for batch_id, _, _, quantity in line_picks:
+            taken[batch_id] = taken.get(batch_id, 0) + quantity
+    return taken
+
+
+def dispense(store, connection, lines, today=None):
+    """
+    Allocate and apply validated order lines in one transaction.
+
+    The medicines are locked, then the lots of every medicine in the order
+    are read with one query per IN_CHUNK_SIZE medicines, allocated in
+    memory, and taken with one UPDATE per CASE_CHUNK_SIZE lots. Medicine
+    quantities are then resynced from their lots and each line is recorded
+    in the stock_movements ledger. Expired lots are never picked.
+
+    Returns (picks, errors) as allocate_fefo() picks; errors is empty when
+    the order was committed. Database errors propagate after rollback.
+    """
+    cursor = connection.cursor()
+    try:
+        demand = {}
+        for medicine_id, quantity in lines:
+            demand[medicine_id] = demand.get(medicine_id, 0) + quantity
+        # Medicines before lots, in id order, as every stock writer locks them
+        existing = store.medicine_quantities(cursor, demand, lock=True)
+        lots = store.fefo_lots(cursor, sorted(demand), today or date.today())
+        picks, shortages = allocate_fefo(lines, lots)
+
+        if shortages:
+            available = {}
+            for _, medicine_id, _, _, quantity in lots:
+                available[medicine_id] = available.get(medicine_id, 0) + quantity
+            connection.rollback()
+            return [], [
+                {'medicine_id': medicine_id, 'error': 'Medicine not found'} if medicine_id not in existing
+                else {'medicine_id': medicine_id, 'error': 'Insufficient stock',
+                      'requested': demand[medicine_id], 'available': available.get(medicine_id, 0)}
+                for medicine_id in sorted(shortages)
+            ]
+
+        taken = lot_amounts(picks)
+        if store.subtract_quantities(cursor, 'medicine_batches', taken) != len(taken):
+            connection.rollback()
+            return [], [{'error': 'Lot quantities changed while dispensing; retry the order'}]
+        store.sync_quantities(cursor, demand)
+
+        store.record_movements(cursor, [(medicine_id, -quantity, DISPENSE_REASON)
+                                        for medicine_id, quantity in lines])
+        bump_version(cursor, 'medicines')
+        record_changes(cursor, 'medicines', 'update', sorted(demand))
+        connection.commit()
+        return picks, []
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
@@ -0,0 +1,35 @@
+"""
+In-process notifications for committed writes
+Caches and in-memory indexes subscribe here so write handlers only publish
+what changed instead of knowing about every consumer
+"""
+
+import threading
+import traceback
+
+_subscribers = {}
+_lock = threading.Lock()
+
+
+def subscribe(table, callback):
+    """Call ``callback(action, ids)`` after every committed write to ``table``"""
+    with _lock:
+        _subscribers.setdefault(table, []).append(callback)
+
+
+def publish(table, action, ids=()):
+    """
+    Notify subscribers of a committed write.
+
+    ``action`` is 'insert', 'update', 'delete', 'bulk' or 'stock' (quantity
+    changes only) and ``ids`` the affected primary keys. A failing subscriber is logged and never fails the request.
+    """
+    with _lock:
+        callbacks = list(_subscribers.get(table, ()))
+    ids = list(ids)
+    for callback in callbacks:
+        try:
+            callback(action, ids)
+        except Exception:
+            print(f"Error in {table} write subscriber {getattr(callback, '__name__', callback)}:")
+            traceback.print_exc()
@@ -0,0 +1,145 @@
+"""
+Expiry alerts for Medical Storage Management System
+Keeps every medicine's expiry date in one sorted in-memory array so expiring
+and expired lists are answered with bisect instead of DATEDIFF scans
+"""
+
+import threading
+import time
+from bisect import bisect_left, bisect_right, insort
+from datetime import date, timedelta
+
+# Alert buckets in days from today; 'expired' covers everything before today
+BUCKET_DAYS = (7, 30, 90)
+
+
+class _ExpiryState:
+    """Sorted (exp_date, medicine_id) entries plus the current date of each medicine"""
+
+    def __init__(self):
+        self.entries = []
+        self.dates = {}
+
+    def upsert(self, medicine_id, exp_date):
+        old = self.dates.get(medicine_id)
+        if old == exp_date:
+            return
+        if old is not None:
+            self.remove(medicine_id)
+        self.dates[medicine_id] = exp_date
+        insort(self.entries, (exp_date, medicine_id))
+
+    def remove(self, medicine_id):
+        old = self.dates.pop(medicine_id, None)
+        if old is not None:
+            i = bisect_left(self.entries, (old, medicine_id))
+            if i < len(self.entries) and self.entries[i] == (old, medicine_id):
+                del self.entries[i]
+
+    def bulk_load(self, rows):
+        self.dates = {medicine_id: exp_date for medicine_id, exp_date in rows if exp_date is not None}
+        self.entries = sorted((exp_date, medicine_id) for medicine_id, exp_date in self.dates.items())
+
+
+class ExpiryIndex:
+    """
+    Thread-safe index of medicines ordered by expiry date.
+
+    Buckets are position ranges in the sorted array, found by bisecting on
+    today's date. They are computed once per day and after each write, so the
+    rollover at midnight needs no table scan. rebuild() reloads from the
+    database like SuggestIndex and replays writes made while it was loading.
+    """
+
+    def __init__(self):
+        self._state = _ExpiryState()
+        self._lock = threading.Lock()
+        self._rebuild_lock = threading.Lock()
+        self._pending = None
+        self._buckets = None
+        self.ready = False
+        self.built_at = None
+
+    def _apply(self, method, *args):
+        with self._lock:
+            getattr(self._state, method)(*args)
+            self._buckets = None
+            if self._pending is not None:
+                self._pending.append((method, args))
+
+    def upsert(self, medicine_id, exp_date):
+        self._apply('upsert', medicine_id, exp_date)
+
+    def remove(self, medicine_id):
+        self._apply('remove', medicine_id)
+
+    def rebuild(self, loader):
+        """Replace the index with ``loader()``, an iterable of (medicine_id, exp_date)"""
+        with self._rebuild_lock:
+            with self._lock:
+                self._pending = []
+            try:
+                state = _ExpiryState()
+                state.bulk_load(loader())
+            except Exception:
+                with self._lock:
+                    self._pending = None
+                raise
+            with self._lock:
+                for method, args in self._pending:
+                    getattr(state, method)(*args)
+                self._state = state
+                self._pending = None
+                self._buckets = None
+                self.ready = True
+                self.built_at = time.time()
+
+    def _bucket_bounds(self, today):
+        """Array positions where each bucket ends, cached until the next write or day"""
+        if self._buckets is None or self._buckets[0] != today:
+            entries = self._state.entries
+            bounds = {'expired': bisect_left(entries, (today,))}
+            for days in BUCKET_DAYS:
+                bounds[days] = bisect_left(entries, (today + timedelta(days=days + 1),))
+            self._buckets = (today, bounds)
+        return self._buckets[1]
+
+    def _slice(self, start, end, after=None, limit=None):
+        entries = self._state.entries
+        if after is not None:
+            start = max(start, bisect_right(entries, tuple(after)))
+        if limit is not None:
+            end = min(end, start + limit)
+        return entries[start:end]
+
+    def expiring(self, days, after=None, limit=None, today=None):
+        """(exp_date, medicine_id) entries expiring from today to ``days`` days ahead"""
+        today = today or date.today()
+        with self._lock:
+            start = self._bucket_bounds(today)['expired']
+            end = bisect_left(self._state.entries, (today + timedelta(days=days + 1),))
+            return self._slice(start, end, after, limit)
+
+    def expired(self, after=None, limit=None, today=None):
+        """(exp_date, medicine_id) entries that expired before today, oldest first"""
+        today = today or date.today()
+        with self._lock:
+            return self._slice(0, self._bucket_bounds(today)['expired'], after, limit)
+
+    def summary(self, today=None):
+        """Medicine counts for the expired and 7/30/90-day buckets (cumulative)"""
+        today = today or date.today()
+        with self._lock:
+            bounds = self._bucket_bounds(today)
+            counts = {'expired': bounds['expired']}
+            for days in BUCKET_DAYS:
+                counts[f'within_{days}_days'] = bounds[days] - bounds['expired']
+            return counts
+
+    def stats(self):
+        with self._lock:
+            return {
+                'ready': self.ready,
+                'built_at': self.built_at,
+                'medicines': len(self._state.dates)
+            }
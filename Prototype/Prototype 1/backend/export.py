@@ -0,0 +1,45 @@
+"""
+Streaming export for Medical Storage Management System
+Turns an unbuffered cursor into NDJSON or CSV chunks so the full inventory
+can be downloaded without holding it in memory
+"""
+
+import csv
+import io
+
+from serialization import serialize_rows, dumps
+
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv'
+}
+
+
+def iter_batches(cursor, batch_size=1000):
+    """Yield lists of up to ``batch_size`` tuple rows until the cursor is drained"""
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            return
+        yield rows
+
+
+def ndjson_chunks(batches, columns, fields):
+    """Encode each batch as one JSON object per line"""
+    for rows in batches:
+        yield b''.join(dumps(row) + b'\n' for row in serialize_rows(columns, rows, fields))
+
+
+def csv_chunks(batches, columns, fields):
+    """Encode batches as CSV, starting with a header line"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    writer.writerow(fields)
+    for rows in batches:
+        for row in serialize_rows(columns, rows, fields):
+            writer.writerow(['' if value is None else value for value in row.values()])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
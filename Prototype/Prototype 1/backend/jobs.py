@@ -0,0 +1,276 @@
+"""
+Background jobs for Medical Storage Management System
+POST /api/jobs records a job in the jobs table and returns at once; worker
+threads claim queued jobs, run them on a database connection of their own
+rather than a pooled request connection, and store the outcome and any result
+file. Jobs left running by a worker that died are queued again.
+"""
+
+import json
+import os
+import threading
+import time
+import traceback
+from contextlib import contextmanager
+from datetime import timedelta
+
+from background import PeriodicTask
+from db_pool import PoolTimeout
+from serialization import serialize_datetime
+from storage import Error, JOB_COLUMNS
+
+# Queued ids read per claim attempt; a worker takes the first one still queued
+CLAIM_BATCH = 10
+
+# Seconds between progress writes while a job runs
+PROGRESS_INTERVAL = 1.0
+
+
+class JobError(Exception):
+    """A job submission with an unknown kind or invalid parameters"""
+
+
+def no_params(params):
+    """parse_params for kinds that take no parameters"""
+    if params:
+        raise ValueError('This job kind takes no params')
+    return {}
+
+
+def job_document(row):
+    """A jobs row as the JSON returned by /api/jobs"""
+    job = dict(zip(JOB_COLUMNS, row))
+    job['params'] = json.loads(job['params'])
+    job['result'] = json.loads(job['result']) if job['result'] else None
+    for name in ('created_at', 'started_at', 'heartbeat_at', 'finished_at'):
+        job[name] = serialize_datetime(job[name])
+    has_file = job.pop('result_file') is not None and job['status'] == 'done'
+    job['result_url'] = f"/api/jobs/{job['job_id']}/result" if has_file else None
+    return job
+
+
+class JobContext:
+    """What a job handler gets: its params, its own connection and a result file"""
+
+    def __init__(self, queue, job_id, kind, params):
+        self.store = queue.store
+        self.job_id = job_id
+        self.kind = kind
+        self.params = params
+        self.batch_size = queue.config['BATCH_SIZE']
+        self.connection = None
+        self.result_file = None
+        self.count = 0
+        self._queue = queue
+        self._partial = None
+        self._reported = time.monotonic()
+
+    def open_result(self, extension):
+        """
+        Binary file for the job's result. It is written under a .part name and
+        only takes its final name once the handler has returned.
+        """
+        self.result_file = f'{self.kind}-{self.job_id}.{extension}'
+        self._partial = self._queue.result_path(self.result_file) + '.part'
+        os.makedirs(os.path.dirname(self._partial), exist_ok=True)
+        return open(self._partial, 'wb')
+
+    def progress(self, count):
+        """Record ``count`` rows processed; written at most every PROGRESS_INTERVAL seconds"""
+        self.count = count
+        now = time.monotonic()
+        if now - self._reported < PROGRESS_INTERVAL:
+            return
+        self._reported = now
+        try:
+            with self._queue.control() as cursor:
+                self.store.job_progress(cursor, self.job_id, count)
+        except Error + (PoolTimeout,) as e:
+            print(f"Error recording progress of job {self.job_id}: {e}")
+
+    def keep_result(self):
+        if self._partial is not None:
+            os.replace(self._partial, self._queue.result_path(self.result_file))
+
+    def discard_result(self):
+        self.result_file = None
+        if self._partial is not None and os.path.exists(self._partial):
+            os.remove(self._partial)
+
+    def close(self):
+        if self.connection is not None:
+            try:
+                self.connection.close()
+            except Error:
+                pass
+
+
+class JobQueue:
+    """
+    Runs queued jobs on worker threads.
+
+    ``connect()`` gives a connection for the short bookkeeping queries
+    (claiming, progress, results) and ``open_connection()`` one that a job
+    keeps to itself while it runs; the API passes its pool's connect() and
+    store.connect() respectively. Any number of processes may share the jobs
+    table and RESULT_DIR: claiming is an UPDATE that only succeeds on a job
+    that is still queued.
+    """
+
+    def __init__(self, store, connect, open_connection, config):
+        self.store = store
+        self.connect = connect
+        self.open_connection = open_connection
+        self.config = config
+        self._kinds = {}
+        # One permit per submitted job, so a submit wakes an idle worker early
+        self._wake = threading.Semaphore(0)
+        self._running = set()
+        self._lock = threading.Lock()
+        self._maintenance = None
+
+    def register(self, kind, handler, parse_params=no_params):
+        """
+        Add a job kind. ``parse_params(params)`` checks the submitted params
+        and returns the normalised dict to store, raising ValueError;
+        ``handler(context)`` runs the job and returns a JSON-ready summary.
+        """
+        self._kinds[kind] = (handler, parse_params)
+
+    @property
+    def kinds(self):
+        return sorted(self._kinds)
+
+    def result_path(self, name):
+        return os.path.join(os.path.abspath(self.config['RESULT_DIR']), name)
+
+    @contextmanager
+    def control(self):
+        """Cursor on a bookkeeping connection, committed on success"""
+        connection = self.connect()
+        try:
+            cursor = connection.cursor()
+            try:
+                yield cursor
+                connection.commit()
+            except Error:
+                connection.rollback()
+                raise
+            finally:
+                cursor.close()
+        finally:
+            connection.close()
+
+    # ---- submitting
+
+    def submit(self, cursor, kind, params):
+        """
+        Validate and queue a job with the caller's cursor; returns its id.
+        The caller commits and then calls notify(). Raises JobError.
+        """
+        if kind not in self._kinds:
+            raise JobError(f"Unknown job kind '{kind}'. Available: {', '.join(self.kinds)}")
+        if not isinstance(params, dict):
+            raise JobError('params must be an object')
+        try:
+            params = self._kinds[kind][1](params)
+        except ValueError as e:
+            raise JobError(str(e))
+        return self.store.add_job(cursor, kind, json.dumps(params))
+
+    def notify(self):
+        """Wake a worker for a newly committed job"""
+        self._wake.release()
+
+    # ---- running
+
+    def start(self, workers=None):
+        """Start the worker threads (WORKERS by default) and the maintenance task"""
+        count = self.config['WORKERS'] if workers is None else workers
+        for i in range(count):
+            threading.Thread(target=self._work, name=f'job-worker-{i + 1}', daemon=True).start()
+        if self._maintenance is None:
+            self._maintenance = PeriodicTask('job-maintenance', self.config['HEARTBEAT'], self.maintain)
+            self._maintenance.start()
+
+    def _work(self):
+        while True:
+            try:
+                if self.run_next():
+                    continue
+            except Error + (PoolTimeout,) as e:
+                print(f"Error claiming a job: {e}")
+            self._wake.acquire(timeout=self.config['POLL_INTERVAL'])
+
+    def run_next(self):
+        """Claim and run the oldest queued job; False when there was none"""
+        row = self._claim()
+        if row is None:
+            return False
+        try:
+            self._run(dict(zip(JOB_COLUMNS, row)))
+        finally:
+            with self._lock:
+                self._running.discard(row[0])
+        return True
+
+    def _claim(self):
+        with self.control() as cursor:
+            for job_id in self.store.queued_job_ids(cursor, CLAIM_BATCH):
+                if self.store.claim_job(cursor, job_id):
+                    with self._lock:
+                        self._running.add(job_id)
+                    return self.store.get_job(cursor, job_id)
+        return None
+
+    def _run(self, job):
+        job_id = job['job_id']
+        context = JobContext(self, job_id, job['kind'], json.loads(job['params']))
+        result = error = None
+        try:
+            if job['kind'] not in self._kinds:
+                raise JobError(f"Unknown job kind '{job['kind']}'")
+            context.connection = self.open_connection()
+            result = self._kinds[job['kind']][0](context)
+            context.keep_result()
+            status = 'done'
+        except Exception as e:
+            # Whatever the handler raised is recorded on the job; the worker carries on
+            print(f"Job {job_id} ({job['kind']}) failed:")
+            traceback.print_exc()
+            context.discard_result()
+            status, error = 'failed', str(e) or type(e).__name__
+        finally:
+            context.close()
+
+        with self.control() as cursor:
+            self.store.finish_job(cursor, job_id, status, context.count,
+                                  None if result is None else json.dumps(result),
+                                  context.result_file, error)
+
+    # ---- maintenance
+
+    def maintain(self):
+        """
+        Heartbeat the jobs this process is running, queue again (or fail)
+        jobs whose worker stopped heartbeating, and delete finished jobs and
+        their files after RETENTION_HOURS. Runs every HEARTBEAT seconds.
+        """
+        with self._lock:
+            running = list(self._running)
+        with self.control() as cursor:
+            if running:
+                self.store.heartbeat_jobs(cursor, running)
+            now = self.store.database_now(cursor)
+            requeued, failed = self.store.requeue_stale_jobs(
+                cursor, now - timedelta(seconds=self.config['STALE_SECONDS']), self.config['MAX_ATTEMPTS']
+            )
+            expired = self.store.finished_jobs(cursor, now - timedelta(hours=self.config['RETENTION_HOURS']))
+            for _, name in expired:
+                if name and os.path.exists(self.result_path(name)):
+                    os.remove(self.result_path(name))
+            self.store.delete_jobs(cursor, [job_id for job_id, _ in expired])
+        if requeued or failed:
+            print(f"Jobs with a stopped worker: {requeued} queued again, {failed} failed")
+        for _ in range(requeued):
+            self.notify()
@@ -0,0 +1,317 @@
+"""
+Request instrumentation for Medical Storage Management System
+Times each request by phase (connection acquire, query execute, fetch,
+serialize, compress, response write), counts SQL statements per endpoint, and renders
+everything in the Prometheus text format for /api/metrics
+"""
+
+import contextvars
+import re
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+PHASES = ('acquire', 'execute', 'fetch', 'serialize', 'compress', 'write')
+
+# Request duration histogram buckets in seconds
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Statements run outside a request (index rebuilds, version reloads) are filed here
+BACKGROUND = 'background'
+
+MAX_STATEMENT_LENGTH = 200
+
+_current_timer = contextvars.ContextVar('request_timer', default=None)
+
+# Column lists differ with ?fields=; the FROM/WHERE part identifies the statement
+_SELECT_LIST = re.compile(r'^SELECT (.+?) FROM ')
+_IN_LIST = re.compile(r'IN \((?:%s, )*%s\)')
+_VALUES_LIST = re.compile(r'VALUES (\([^()]*\))(?:, \([^()]*\))+')
+
+
+class RequestTimer:
+    """
+    Per-request phase durations, started when the request is routed.
+
+    ``thread_id`` is set only when the request has a thread to itself (WSGI
+    workers); requests on an event loop share its thread.
+    """
+
+    def __init__(self, endpoint, method='GET', thread_id=None):
+        self.endpoint = endpoint
+        self.method = method
+        self.started = time.perf_counter()
+        self.responded = None
+        self.phases = dict.fromkeys(PHASES, 0.0)
+        self.thread_id = thread_id
+
+    def add(self, phase, seconds):
+        self.phases[phase] += seconds
+
+    def server_timing(self):
+        """Server-Timing header value (milliseconds); 'app' is the handler's total time"""
+        self.responded = time.perf_counter()
+        timings = [f'{name};dur={self.phases[name] * 1000:.2f}' for name in PHASES[:-1] if self.phases[name]]
+        timings.append(f'app;dur={(self.responded - self.started) * 1000:.2f}')
+        return ', '.join(timings)
+
+
+def statement_label(sql):
+    """Collapse a SQL statement to a short label shared by all its parameter lists"""
+    sql = ' '.join(sql.split())
+    sql = _SELECT_LIST.sub('SELECT ... FROM ', sql, count=1)
+    sql = _IN_LIST.sub('IN (...)', sql)
+    sql = _VALUES_LIST.sub(r'VALUES \1, ...', sql)
+    if len(sql) > MAX_STATEMENT_LENGTH:
+        sql = sql[:MAX_STATEMENT_LENGTH - 3] + '...'
+    return sql
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_metric(name, kind, help_text, samples):
+    """
+    Prometheus text lines for one metric family.
+
+    ``samples`` are (labels, value) pairs; a name suffix such as '_bucket' may
+    be passed as labels['__suffix__'].
+    """
+    lines = [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}']
+    for labels, value in samples:
+        labels = dict(labels)
+        suffix = labels.pop('__suffix__', '')
+        label_text = ','.join(f'{key}="{_escape(val)}"' for key, val in labels.items())
+        lines.append(f'{name}{suffix}{{{label_text}}} {value}' if label_text else f'{name}{suffix} {value}')
+    return lines
+
+
+class MetricsRegistry:
+    """Thread-safe totals for finished requests and executed SQL statements"""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self._requests = {}
+        self._phases = {}
+        self._durations = {}
+        self._statements = {}
+        self._active = {}
+        self._lock = threading.Lock()
+
+    def start(self, timer):
+        with self._lock:
+            # Keyed per timer: concurrent async requests share one thread
+            self._active[id(timer)] = timer
+
+    def finish(self, timer, status):
+        """Record a finished request; write time is what passed since the headers were built"""
+        now = time.perf_counter()
+        if timer.responded is not None:
+            timer.add('write', now - timer.responded)
+        total = now - timer.started
+        endpoint = timer.endpoint
+        with self._lock:
+            self._active.pop(id(timer), None)
+            key = (endpoint, timer.method, str(status))
+            self._requests[key] = self._requests.get(key, 0) + 1
+            for phase, seconds in timer.phases.items():
+                self._phases[(endpoint, phase)] = self._phases.get((endpoint, phase), 0.0) + seconds
+            histogram = self._durations.get(endpoint)
+            if histogram is None:
+                histogram = self._durations[endpoint] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if total <= bound:
+                    histogram[0][i] += 1
+            histogram[1] += total
+            histogram[2] += 1
+
+    def record_statement(self, endpoint, statement, seconds, count=1):
+        key = (endpoint, statement)
+        with self._lock:
+            totals = self._statements.get(key)
+            if totals is None:
+                totals = self._statements[key] = [0, 0.0]
+            totals[0] += count
+            totals[1] += seconds
+
+    def active_requests(self):
+        """{thread id: endpoint} for requests being handled right now on a thread of their own"""
+        with self._lock:
+            return {timer.thread_id: timer.endpoint for timer in self._active.values()
+                    if timer.thread_id is not None}
+
+    def render(self):
+        """Prometheus text lines for everything recorded so far"""
+        with self._lock:
+            requests = sorted(self._requests.items())
+            phases = sorted(self._phases.items())
+            durations = sorted((endpoint, [list(h[0]), h[1], h[2]]) for endpoint, h in self._durations.items())
+            statements = sorted(self._statements.items())
+            in_flight = len(self._active)
+
+        histogram = []
+        for endpoint, (counts, total, count) in durations:
+            for bound, bucket_count in zip(self.buckets, counts):
+                histogram.append(({'__suffix__': '_bucket', 'endpoint': endpoint, 'le': bound}, bucket_count))
+            histogram.append(({'__suffix__': '_bucket', 'endpoint': endpoint, 'le': '+Inf'}, count))
+            histogram.append(({'__suffix__': '_sum', 'endpoint': endpoint}, f'{total:.6f}'))
+            histogram.append(({'__suffix__': '_count', 'endpoint': endpoint}, count))
+
+        lines = format_metric(
+            'medvault_requests_total', 'counter', 'Requests handled, by endpoint, method and status',
+            [({'endpoint': e, 'method': m, 'status': s}, n) for (e, m, s), n in requests]
+        )
+        lines += format_metric(
+            'medvault_requests_in_flight', 'gauge', 'Requests being handled, threaded or async', [({}, in_flight)]
+        )
+        lines += format_metric(
+            'medvault_request_duration_seconds', 'histogram', 'Request wall time including response write',
+            histogram
+        )
+        lines += format_metric(
+            'medvault_request_phase_seconds_total', 'counter', 'Request time spent in each phase',
+            [({'endpoint': e, 'phase': p}, f'{seconds:.6f}') for (e, p), seconds in phases]
+        )
+        lines += format_metric(
+            'medvault_sql_statements_total', 'counter', 'SQL statements executed, by endpoint and statement',
+            [({'endpoint': e, 'statement': s}, totals[0]) for (e, s), totals in statements]
+        )
+        lines += format_metric(
+            'medvault_sql_seconds_total', 'counter', 'Time spent executing and fetching each SQL statement',
+            [({'endpoint': e, 'statement': s}, f'{totals[1]:.6f}') for (e, s), totals in statements]
+        )
+        return lines
+
+
+registry = MetricsRegistry()
+
+
+# ==================== CURRENT REQUEST ====================
+
+def start_request(endpoint, method='GET', thread_id=None):
+    """
+    Begin timing a request in the current thread or task.
+
+    Pass the thread's id when the request has the thread to itself, so the
+    sampling profiler can attribute that thread's stack to it.
+    """
+    timer = RequestTimer(endpoint, method, thread_id)
+    _current_timer.set(timer)
+    registry.start(timer)
+    return timer
+
+
+def finish_request(timer, status):
+    registry.finish(timer, status)
+    if _current_timer.get() is timer:
+        _current_timer.set(None)
+
+
+def current_timer():
+    return _current_timer.get()
+
+
+@contextmanager
+def phase(name):
+    """Add the time spent in the block to the current request's ``name`` phase"""
+    timer = _current_timer.get()
+    if timer is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timer.add(name, time.perf_counter() - started)
+
+
+def timed_phase(name):
+    """Decorator form of phase()"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            timer = _current_timer.get()
+            if timer is None:
+                return func(*args, **kwargs)
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                timer.add(name, time.perf_counter() - started)
+        return wrapper
+    return decorator
+
+
+def record_statement(sql, seconds, phase_name='execute'):
+    """Charge a statement's execute (counted) or fetch time to the current request"""
+    timer = _current_timer.get()
+    if timer is not None:
+        timer.add(phase_name, seconds)
+    registry.record_statement(
+        timer.endpoint if timer is not None else BACKGROUND, statement_label(sql), seconds,
+        count=1 if phase_name == 'execute' else 0
+    )
+
+
+# ==================== DRIVER WRAPPERS ====================
+
+class TimedCursor:
+    """Cursor proxy that records execute and fetch time against the last statement"""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self._statement = None
+
+    def _fetch(self, method, *args):
+        started = time.perf_counter()
+        try:
+            return getattr(self._cursor, method)(*args)
+        finally:
+            if self._statement is not None:
+                record_statement(self._statement, time.perf_counter() - started, 'fetch')
+
+    def execute(self, operation, params=None, *args, **kwargs):
+        self._statement = operation
+        started = time.perf_counter()
+        try:
+            return self._cursor.execute(operation, params, *args, **kwargs)
+        finally:
+            record_statement(operation, time.perf_counter() - started)
+
+    def executemany(self, operation, seq_params):
+        self._statement = operation
+        started = time.perf_counter()
+        try:
+            return self._cursor.executemany(operation, seq_params)
+        finally:
+            record_statement(operation, time.perf_counter() - started)
+
+    def fetchone(self):
+        return self._fetch('fetchone')
+
+    def fetchmany(self, size=1):
+        return self._fetch('fetchmany', size)
+
+    def fetchall(self):
+        return self._fetch('fetchall')
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class TimedConnection:
+    """Driver connection proxy whose cursors are TimedCursors"""
+
+    def __init__(self, connection):
+        self._connection = connection
+
+    def cursor(self, *args, **kwargs):
+        return TimedCursor(self._connection.cursor(*args, **kwargs))
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
@@ -0,0 +1,126 @@
+"""
+Stock movements for Medical Storage Management System
+Applies batches of quantity deltas to the medicines' lots in one transaction
+and records each movement in the stock_movements ledger
+"""
+
+from changes import record_changes
+from dispense import allocate_fefo, lot_amounts
+from versions import bump_version
+
+REASON_MAX_LENGTH = 50
+
+# Ledger reason for a quantity set by PUT /api/medicines/<id>
+ADJUSTED_REASON = 'adjusted'
+
+
+class MovementError(ValueError):
+    """A movement in the request body is malformed"""
+
+
+def validate_movements(data, max_batch):
+    """
+    Check a movement batch: a JSON array of {medicine_id, delta, reason}, or
+    an object holding it as "movements".
+
+    Returns [(medicine_id, delta, reason)] in request order. Raises
+    MovementError naming the first bad movement by its 1-based position.
+    """
+    if isinstance(data, dict):
+        data = data.get('movements')
+    if not isinstance(data, list) or not data:
+        raise MovementError('Body must be a non-empty JSON array of movements (or {"movements": [...]})')
+    if len(data) > max_batch:
+        raise MovementError(f'At most {max_batch} movements per request')
+    movements = []
+    for position, movement in enumerate(data, start=1):
+        if not isinstance(movement, dict):
+            raise MovementError(f'Movement {position}: expected an object')
+        medicine_id = movement.get('medicine_id')
+        delta = movement.get('delta')
+        reason = movement.get('reason')
+        if not isinstance(medicine_id, int) or isinstance(medicine_id, bool) or medicine_id < 1:
+            raise MovementError(f'Movement {position}: medicine_id must be a positive integer')
+        if not isinstance(delta, int) or isinstance(delta, bool) or delta == 0:
+            raise MovementError(f'Movement {position}: delta must be a non-zero integer')
+        if not isinstance(reason, str) or not reason.strip():
+            raise MovementError(f'Movement {position}: reason is required')
+        if len(reason.strip()) > REASON_MAX_LENGTH:
+            raise MovementError(f'Movement {position}: reason is longer than {REASON_MAX_LENGTH} characters')
+        movements.append((medicine_id, delta, reason.strip()))
+    return movements
+
+
+def net_deltas(movements):
+    """{medicine_id: summed delta}, in medicine_id order"""
+    totals = {}
+    for medicine_id, delta, _ in movements:
+        totals[medicine_id] = totals.get(medicine_id, 0) + delta
+    return dict(sorted(totals.items()))
+
+
+def adjust_lots(store, cursor, totals, quantities):
+    """
+    Apply {medicine_id: delta} to the medicines' lots and resync their quantities.
+
+    ``quantities`` are the locked medicine_quantities() of the same ids.
+    Increases go to the medicine's UNLOTTED lot; decreases are taken from
+    its lots soonest expiry first, expired lots included, so a write-off
+    clears expired stock before good stock. Returns errors; nothing is
+    written unless it is empty.
+    """
+    decreases = [(medicine_id, -delta) for medicine_id, delta in totals.items() if delta < 0]
+    lots = store.fefo_lots(cursor, [medicine_id for medicine_id, _ in decreases]) if decreases else []
+    picks, shortages = allocate_fefo(decreases, lots)
+    if shortages:
+        return [{'medicine_id': medicine_id, 'error': 'Insufficient stock',
+                 'quantity': quantities[medicine_id], 'delta': totals[medicine_id]}
+                for medicine_id in sorted(shortages)]
+
+    taken = lot_amounts(picks)
+    if store.subtract_quantities(cursor, 'medicine_batches', taken) != len(taken):
+        return [{'error': 'Lot quantities changed while applying movements; retry the request'}]
+    for medicine_id, delta in totals.items():
+        if delta > 0:
+            store.receive_unlotted(cursor, medicine_id, delta)
+    store.sync_quantities(cursor, totals)
+    return []
+
+
+def apply_movements(store, connection, movements):
+    """
+    Apply validated movements in one transaction.
+
+    Deltas are summed per medicine and applied to its lots with
+    adjust_lots(). Medicine rows are locked in medicine_id order before
+    their lots, so concurrent batches take locks in the same order instead
+    of deadlocking. If any medicine is missing or short of stock the whole
+    batch is rolled back.
+
+    Returns ({medicine_id: new quantity}, errors); errors is empty when the
+    batch was committed. Database errors propagate after rollback.
+    """
+    cursor = connection.cursor()
+    try:
+        totals = net_deltas(movements)
+        quantities = store.medicine_quantities(cursor, totals, lock=True)
+        errors = [{'medicine_id': medicine_id, 'error': 'Medicine not found'}
+                  for medicine_id in totals if medicine_id not in quantities]
+        if not errors:
+            errors = adjust_lots(store, cursor, {medicine_id: delta for medicine_id, delta in totals.items()
+                                                 if delta}, quantities)
+        if errors:
+            connection.rollback()
+            return {}, errors
+
+        quantities = store.medicine_quantities(cursor, totals)
+        store.record_movements(cursor, movements)
+        bump_version(cursor, 'medicines')
+        record_changes(cursor, 'medicines', 'update', sorted(quantities))
+        connection.commit()
+        return quantities, []
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
@@ -0,0 +1,177 @@
+"""
+Keyset pagination and field projection helpers for list endpoints
+Cursors are opaque tokens holding the sort-key values of the last row served
+"""
+
+import base64
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+from flask import request, url_for
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+def parse_fields(raw, allowed):
+    """
+    Parse a comma-separated ``fields=`` value against the allowed field names.
+
+    Returns the requested names in the order of ``allowed`` (all of them when
+    ``raw`` is empty). Raises ValueError for unknown fields.
+    """
+    if not raw:
+        return list(allowed)
+    requested = {name.strip() for name in raw.split(',') if name.strip()}
+    unknown = requested.difference(allowed)
+    if unknown:
+        raise ValueError(f"Unknown field(s): {', '.join(sorted(unknown))}")
+    return [name for name in allowed if name in requested]
+
+
+def parse_page(args, key_fields=None):
+    """
+    Read ``limit`` and ``cursor`` query parameters.
+
+    Returns (limit, cursor_values); limit is None when the client asked for no
+    pagination at all, which keeps the legacy full-list response. With
+    ``key_fields`` a cursor must hold one value per key field, so a cursor
+    from another list (or another include_archived setting) is a ValueError.
+    """
+    raw_limit = args.get('limit')
+    token = args.get('cursor')
+    if raw_limit is None and token is None:
+        return None, None
+    try:
+        limit = int(raw_limit) if raw_limit is not None else DEFAULT_PAGE_SIZE
+    except ValueError:
+        raise ValueError('limit must be an integer')
+    if limit < 1:
+        raise ValueError('limit must be at least 1')
+    limit = min(limit, MAX_PAGE_SIZE)
+    after = decode_cursor(token) if token else None
+    if after is not None and key_fields is not None and len(after) != len(key_fields):
+        raise ValueError('Invalid cursor')
+    return limit, after
+
+
+def _cursor_value(value):
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def encode_cursor(values):
+    """Encode the sort-key values of a row as an opaque URL-safe token"""
+    payload = json.dumps([_cursor_value(v) for v in values], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token):
+    """Decode a token produced by encode_cursor(); raises ValueError if malformed"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, TypeError):
+        raise ValueError('Invalid cursor')
+    if not isinstance(values, list) or not values:
+        raise ValueError('Invalid cursor')
+    if any(isinstance(value, (list, dict)) for value in values):
+        raise ValueError('Invalid cursor')
+    return values
+
+
+def keyset_condition(columns, values, descending=()):
+    """
+    SQL predicate selecting rows strictly after ``values`` in ``columns`` order.
+
+    Expanded as ``a > %s OR (a = %s AND b > %s)`` rather than a row
+    constructor so MySQL can range-scan the (a, primary key) index. Columns
+    whose position is in ``descending`` compare with ``<`` instead.
+    """
+    if len(columns) != len(values):
+        raise ValueError('Invalid cursor')
+    clauses = []
+    params = []
+    for i, column in enumerate(columns):
+        operator = '<' if i in descending else '>'
+        equal = [f"{prev} = %s" for prev in columns[:i]]
+        clauses.append('(' + ' AND '.join(equal + [f"{column} {operator} %s"]) + ')')
+        params.extend(values[:i])
+        params.append(values[i])
+    return '(' + ' OR '.join(clauses) + ')', params
+
+
+def _split_keys(key_fields):
+    """Split '-field' (descending) markers off the key field names"""
+    names = [name.lstrip('-') for name in key_fields]
+    descending = {i for i, name in enumerate(key_fields) if name.startswith('-')}
+    return names, descending
+
+
+def select_list(columns, fields, required=()):
+    """Build the SELECT list for ``fields`` plus any keys needed for the cursor"""
+    names = list(fields) + [name for name in required if name not in fields]
+    return ', '.join(f"{columns[name]} AS {name}" for name in names)
+
+
+def build_page_query(columns, fields, key_fields, from_clause, conditions=(),
+                     params=(), limit=None, after=None):
+    """
+    Assemble a SELECT for ``fields`` ordered by ``key_fields``.
+
+    A key field written as ``'-name'`` sorts descending. ``after`` holds
+    decoded cursor values; ``limit`` fetches one extra row so paginate_rows()
+    can tell whether another page exists.
+    """
+    conditions = list(conditions)
+    params = list(params)
+    key_names, descending = _split_keys(key_fields)
+    key_columns = [columns[name] for name in key_names]
+    if after is not None:
+        condition, cursor_params = keyset_condition(key_columns, after, descending)
+        conditions.append(condition)
+        params.extend(cursor_params)
+    query = f"SELECT {select_list(columns, fields, key_names)} FROM {from_clause}"
+    if conditions:
+        query += " WHERE " + " AND ".join(f"({condition})" for condition in conditions)
+    query += " ORDER BY " + ", ".join(
+        f"{column} DESC" if i in descending else column
+        for i, column in enumerate(key_columns)
+    )
+    if limit is not None:
+        query += " LIMIT %s"
+        params.append(limit + 1)
+    return query, params
+
+
+def paginate_rows(rows, limit, key_fields, columns):
+    """
+    Trim a ``limit + 1`` fetch of tuple rows to one page.
+
+    ``columns`` are the cursor's column names. Returns (page, next_cursor);
+    serialize_rows() drops key columns the client did not ask for.
+    """
+    key_names, _ = _split_keys(key_fields)
+    next_cursor = None
+    if limit is not None and len(rows) > limit:
+        rows = rows[:limit]
+        positions = [columns.index(key) for key in key_names]
+        next_cursor = encode_cursor([rows[-1][i] for i in positions])
+    return rows, next_cursor
+
+
+def add_pagination_headers(response, next_cursor):
+    """Advertise the next page via X-Next-Cursor and an RFC 8288 Link header"""
+    if next_cursor:
+        # Path parameters (such as a medicine id) are part of the URL too
+        args = dict(request.view_args or {}, **request.args.to_dict())
+        args['cursor'] = next_cursor
+        response.headers['X-Next-Cursor'] = next_cursor
+        response.headers['Link'] = f'<{url_for(request.endpoint, _external=True, **args)}>; rel="next"'
+    return response
@@ -0,0 +1,79 @@
+"""
+Sampling profiler for Medical Storage Management System
+Periodically records the Python stack of every thread that is handling a
+request and aggregates them as collapsed stacks (one 'frame;frame;... count'
+line per distinct stack), the input format of flamegraph.pl and speedscope
+"""
+
+import os
+import sys
+import threading
+from collections import Counter
+
+from background import PeriodicTask
+
+MAX_DEPTH = 64
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f'{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})'
+
+
+class SamplingProfiler:
+    """
+    Stack sampler driven by a PeriodicTask.
+
+    ``active_requests()`` returns {thread id: endpoint}; only those threads are
+    sampled, and each stack is rooted at its endpoint name. Only WSGI worker
+    threads are listed: an event loop thread runs many requests at once, so
+    its stack cannot be attributed to one of them. An ``interval`` of 0
+    disables sampling entirely.
+    """
+
+    def __init__(self, interval, active_requests, max_depth=MAX_DEPTH):
+        self.interval = interval
+        self.active_requests = active_requests
+        self.max_depth = max_depth
+        self.samples = 0
+        self._stacks = Counter()
+        self._lock = threading.Lock()
+        self._task = PeriodicTask('sampling-profiler', interval, self.sample)
+
+    @property
+    def enabled(self):
+        return self.interval > 0
+
+    def start(self):
+        self._task.start()
+
+    def stop(self):
+        self._task.stop()
+
+    def sample(self):
+        """Record one stack per thread currently handling a request"""
+        active = self.active_requests()
+        if not active:
+            return
+        frames = sys._current_frames()
+        stacks = []
+        for thread_id, endpoint in active.items():
+            frame = frames.get(thread_id)
+            labels = []
+            while frame is not None and len(labels) < self.max_depth:
+                labels.append(_frame_label(frame))
+                frame = frame.f_back
+            labels.append(endpoint)
+            stacks.append(';'.join(reversed(labels)))
+        with self._lock:
+            self._stacks.update(stacks)
+            self.samples += 1
+
+    def collapsed(self, reset=False):
+        """Collapsed-stack text, most frequent stacks first"""
+        with self._lock:
+            stacks = self._stacks.most_common()
+            if reset:
+                self._stacks = Counter()
+                self.samples = 0
+        return ''.join(f'{stack} {count}\n' for stack, count in stacks)
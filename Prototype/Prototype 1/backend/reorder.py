@@ -0,0 +1,137 @@
+"""
+Reorder points for Medical Storage Management System
+Derives each medicine's daily consumption from the stock_movements ledger and
+computes days of cover and a reorder point for the whole catalog at once,
+vectorized with NumPy (in requirements.txt), or in plain Python without it
+"""
+
+import math
+import time
+from datetime import timedelta
+
+try:
+    import numpy
+except ImportError:
+    # Fallback only: the pure-Python path gives the same results, just more slowly
+    numpy = None
+
+from versions import bump_version
+
+# A write that started shortly before the previous run may have committed after it
+WATERMARK_SLACK = timedelta(seconds=60)
+
+
+def _demand_vectors(ids, demand):
+    """(units, squared daily units) arrays aligned with the sorted ``ids``"""
+    ids = numpy.asarray(ids, dtype=numpy.int64)
+    units = numpy.zeros(len(ids))
+    squares = numpy.zeros(len(ids))
+    if demand:
+        demand_ids, demand_units, demand_squares = zip(*demand)
+        demand_ids = numpy.asarray(demand_ids, dtype=numpy.int64)
+        positions = numpy.minimum(numpy.searchsorted(ids, demand_ids), len(ids) - 1)
+        # Movements of medicines added after the stock was read are left for the next run
+        found = ids[positions] == demand_ids
+        units[positions[found]] = numpy.asarray(demand_units, dtype=numpy.float64)[found]
+        squares[positions[found]] = numpy.asarray(demand_squares, dtype=numpy.float64)[found]
+    return units, squares
+
+
+def _compute_numpy(ids, quantities, demand, window_days, lead_time_days, service_z):
+    units, squares = _demand_vectors(ids, demand)
+    stock = numpy.asarray(quantities, dtype=numpy.float64)
+    rate = units / window_days
+    deviation = numpy.sqrt(numpy.maximum(squares / window_days - rate * rate, 0.0))
+    reorder_point = numpy.ceil(rate * lead_time_days + service_z * deviation * math.sqrt(lead_time_days) - 1e-9)
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        cover = numpy.where(rate > 0, stock / rate, numpy.nan)
+    return rate.tolist(), deviation.tolist(), cover.tolist(), reorder_point.tolist()
+
+
+def _compute_python(ids, quantities, demand, window_days, lead_time_days, service_z):
+    by_id = {medicine_id: (units, squares) for medicine_id, units, squares in demand}
+    rates, deviations, covers, reorder_points = [], [], [], []
+    for medicine_id, quantity in zip(ids, quantities):
+        units, squares = by_id.get(medicine_id, (0, 0))
+        rate = float(units) / window_days
+        deviation = math.sqrt(max(float(squares) / window_days - rate * rate, 0.0))
+        rates.append(rate)
+        deviations.append(deviation)
+        covers.append(quantity / rate if rate > 0 else math.nan)
+        reorder_points.append(math.ceil(rate * lead_time_days + service_z * deviation * math.sqrt(lead_time_days)
+                                        - 1e-9))
+    return rates, deviations, covers, reorder_points
+
+
+def compute_reorder_points(ids, quantities, demand, window_days, lead_time_days, service_z):
+    """
+    Reorder point rows for the medicines ``ids`` (sorted) holding ``quantities``.
+
+    ``demand`` holds daily_demand() rows. Consumption is averaged over every
+    day of the window, so days without movements count as zero demand. The
+    reorder point covers the mean demand over the lead time plus
+    ``service_z`` standard deviations of it; a medicine needs reordering
+    when its quantity is at or below a non-zero reorder point. Returns rows
+    in INSERT_REORDER_POINT column order.
+    """
+    if not ids:
+        return []
+    compute = _compute_numpy if numpy is not None else _compute_python
+    rates, deviations, covers, reorder_points = compute(
+        ids, quantities, demand, window_days, lead_time_days, service_z
+    )
+    return [
+        (medicine_id, quantity, round(rate, 4), round(deviation, 4),
+         None if math.isnan(cover) else round(cover, 2), int(reorder_point),
+         0 < reorder_point and quantity <= reorder_point)
+        for medicine_id, quantity, rate, deviation, cover, reorder_point
+        in zip(ids, quantities, rates, deviations, covers, reorder_points)
+    ]
+
+
+def run_reorder(store, connection, config, full=False):
+    """
+    Recompute reorder points and commit them with a reorder_runs entry.
+
+    Only medicines written since the previous run are revisited, unless
+    ``full`` is set, there has been no run yet, or the last full run is
+    older than FULL_INTERVAL. Full runs also catch demand that has aged out
+    of the window for medicines nobody touched. Returns a summary dict.
+    """
+    started = time.perf_counter()
+    cursor = connection.cursor()
+    try:
+        now = store.database_now(cursor)
+        last, last_full = store.last_reorder_runs(cursor)
+        full = (full or last is None or last_full is None
+                or (now - last_full).total_seconds() >= config['FULL_INTERVAL'])
+        ids = None if full else sorted(store.medicines_changed_since(cursor, last - WATERMARK_SLACK))
+        if ids == []:
+            connection.rollback()
+            return {'full_run': False, 'medicines': 0, 'due': 0, 'seconds': round(time.perf_counter() - started, 3)}
+
+        stock = sorted(store.medicine_stock(cursor, ids))
+        demand = store.daily_demand(cursor, now - timedelta(days=config['WINDOW_DAYS']), ids)
+        rows = compute_reorder_points(
+            [medicine_id for medicine_id, _ in stock], [quantity for _, quantity in stock], demand,
+            config['WINDOW_DAYS'], config['LEAD_TIME_DAYS'], config['SERVICE_Z']
+        )
+        store.save_reorder_points(cursor, rows, ids)
+        bump_version(cursor, 'reorder_points')
+        seconds = time.perf_counter() - started
+        store.record_reorder_run(cursor, now, full, len(rows), int(seconds * 1000))
+        connection.commit()
+        return {'full_run': full, 'medicines': len(rows), 'due': sum(1 for row in rows if row[6]),
+                'seconds': round(seconds, 3)}
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def reorder_job(config):
+    """Handler for the 'reorder_points' background job (see jobs.py): a full run"""
+    def run(context):
+        return run_reorder(context.store, context.connection, config, full=True)
+    return run
@@ -0,0 +1,144 @@
+"""
+Read replicas for Medical Storage Management System
+GET handlers read from the healthy replica with the best latency; writes, and
+reads by clients that wrote in the last few seconds, stay on the primary
+"""
+
+import threading
+import time
+from collections import deque
+
+from db_pool import PoolTimeout
+from storage import Error
+
+# Weight of the newest health-check round-trip in a replica's latency average
+LATENCY_SMOOTHING = 0.3
+
+
+def versions_cover(versions, target, tables):
+    """True when snapshot ``versions`` holds every write ``target`` records for ``tables``"""
+    if versions is None or target is None:
+        return False
+    return all(table in versions and table in target and versions[table][0] >= target[table][0]
+               for table in tables)
+
+
+class Replica:
+    """One read replica: its Storage, its connection pool and what the last health check found"""
+
+    def __init__(self, name, storage, pool):
+        self.name = name
+        self.storage = storage
+        self.pool = pool
+        # No reads until the first check has passed
+        self.healthy = False
+        self.lagging = False
+        self.latency = None
+        # table_versions as of the last check; reads from this replica are at least this new
+        self.versions = None
+        self.error = None
+
+    @property
+    def usable(self):
+        return self.healthy and not self.lagging
+
+    def status(self):
+        """Summary for /api/health"""
+        if not self.healthy:
+            state = 'down'
+        else:
+            state = 'lagging' if self.lagging else 'up'
+        return {
+            'name': self.name,
+            'status': state,
+            'latency_ms': round(self.latency * 1000, 2) if self.latency is not None else None,
+            'in_use': self.pool.in_use,
+            'error': self.error
+        }
+
+
+class ReplicaRouter:
+    """
+    Chooses the replica each read uses.
+
+    check() runs on a background thread every REPLICA_CHECK_INTERVAL seconds.
+    It reads each replica's table_versions through ``load_versions(cursor)``,
+    which times the round-trip and records the snapshot that ETags for reads
+    from that replica are built from. A replica that still lacks writes the
+    primary (``primary_versions()``) had ``max_lag`` seconds ago is skipped as
+    lagging; one that fails a check or a checkout is skipped until a later
+    check succeeds.
+    """
+
+    def __init__(self, replicas, load_versions, primary_versions, max_lag):
+        self.replicas = replicas
+        self.load_versions = load_versions
+        self.primary_versions = primary_versions
+        self.max_lag = max_lag
+        # (monotonic time, primary snapshot) pairs covering the last max_lag seconds
+        self._history = deque()
+        self._lock = threading.Lock()
+
+    def choose(self, in_use=None):
+        """
+        The usable replica with the lowest latency, scaled by the connections
+        it already has in use, or None when every replica is down or lagging.
+
+        ``in_use(replica)`` counts connections for callers with their own
+        pools (the ASGI entry point); by default the replica's pool is used.
+        """
+        best, best_score = None, None
+        for replica in self.replicas:
+            if not replica.usable:
+                continue
+            busy = in_use(replica) if in_use is not None else replica.pool.in_use
+            score = replica.latency * (1 + busy)
+            if best_score is None or score < best_score:
+                best, best_score = replica, score
+        return best
+
+    def mark_down(self, replica, error):
+        """Stop routing to ``replica`` until its next successful check"""
+        replica.healthy = False
+        replica.error = str(error)
+
+    def _baseline(self, now):
+        """The newest primary snapshot at least max_lag seconds old, or None"""
+        primary = self.primary_versions()
+        with self._lock:
+            if primary is not None:
+                self._history.append((now, primary))
+            cutoff = now - self.max_lag
+            while len(self._history) > 1 and self._history[1][0] <= cutoff:
+                self._history.popleft()
+            if self._history and self._history[0][0] <= cutoff:
+                return self._history[0][1]
+        return None
+
+    def check(self):
+        """Measure every replica once; run by the replica-health task"""
+        baseline = self._baseline(time.monotonic())
+        for replica in self.replicas:
+            started = time.perf_counter()
+            try:
+                connection = replica.pool.connect()
+                try:
+                    cursor = connection.cursor()
+                    versions = self.load_versions(cursor)
+                    cursor.close()
+                finally:
+                    connection.close()
+            except Error + (PoolTimeout,) as e:
+                if replica.healthy:
+                    print(f"Read replica {replica.name} is down: {e}")
+                self.mark_down(replica, e)
+                continue
+            sample = time.perf_counter() - started
+            if replica.latency is None:
+                replica.latency = sample
+            else:
+                replica.latency += LATENCY_SMOOTHING * (sample - replica.latency)
+            replica.versions = versions
+            replica.lagging = baseline is not None and not versions_cover(versions, baseline, baseline)
+            replica.error = None
+            replica.healthy = True
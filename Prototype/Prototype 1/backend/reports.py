@@ -0,0 +1,146 @@
+"""
+Report jobs for Medical Storage Management System
+Each report reads its rows through an unbuffered (server-side) cursor in
+JOBS_BATCH_SIZE batches and streams them into the job's result file as CSV or
+NDJSON, so memory use stays flat however large the inventory is
+"""
+
+from datetime import date, timedelta
+from decimal import Decimal
+
+from export import EXPORT_FORMATS, iter_batches, ndjson_chunks, csv_chunks
+from pagination import parse_fields
+from storage import MEDICINE_COLUMNS
+
+VALUATION_COLUMNS = ('medicine_id', 'name', 'company', 'supplier_name', 'quantity', 'price', 'value')
+
+EXPIRY_COLUMNS = ('supplier_id', 'supplier_name', 'contact_no', 'medicine_id', 'name', 'company',
+                  'exp_date', 'days_until_expiry', 'quantity', 'price', 'value')
+
+MAX_EXPIRY_DAYS = 3650
+
+
+def parse_format(params):
+    fmt = params.get('format', 'csv')
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError('format must be ndjson or csv')
+    return fmt
+
+
+def parse_report_params(params):
+    """Params for the valuation report: format only"""
+    unknown = set(params).difference({'format'})
+    if unknown:
+        raise ValueError(f"Unknown param(s): {', '.join(sorted(unknown))}")
+    return {'format': parse_format(params)}
+
+
+def parse_expiry_params(params):
+    """Params for the expiry report: format and days ahead (default 90)"""
+    unknown = set(params).difference({'format', 'days'})
+    if unknown:
+        raise ValueError(f"Unknown param(s): {', '.join(sorted(unknown))}")
+    days = params.get('days', 90)
+    if not isinstance(days, int) or isinstance(days, bool) or not 0 <= days <= MAX_EXPIRY_DAYS:
+        raise ValueError(f'days must be an integer from 0 to {MAX_EXPIRY_DAYS}')
+    return {'format': parse_format(params), 'days': days}
+
+
+def parse_export_params(params):
+    """Params for the inventory export: format and fields (list or comma-separated)"""
+    unknown = set(params).difference({'format', 'fields'})
+    if unknown:
+        raise ValueError(f"Unknown param(s): {', '.join(sorted(unknown))}")
+    raw = params.get('fields')
+    if isinstance(raw, list):
+        raw = ','.join(str(name) for name in raw)
+    elif raw is not None and not isinstance(raw, str):
+        raise ValueError('fields must be a list or a comma-separated string')
+    return {'format': parse_format(params), 'fields': parse_fields(raw, MEDICINE_COLUMNS)}
+
+
+def write_report(context, columns, batches, fields=None):
+    """Stream ``batches`` into the job's result file; returns the number of rows"""
+    fmt = context.params['format']
+    fields = list(columns) if fields is None else fields
+    total = 0
+
+    def counted():
+        nonlocal total
+        for rows in batches:
+            yield rows
+            total += len(rows)
+            context.progress(total)
+
+    chunks = csv_chunks if fmt == 'csv' else ndjson_chunks
+    with context.open_result(fmt) as f:
+        for chunk in chunks(counted(), columns, fields):
+            f.write(chunk.encode('utf-8') if isinstance(chunk, str) else chunk)
+    context.count = total
+    return total
+
+
+def valuation_report(context):
+    """Every medicine with its stock value (quantity x price), plus totals"""
+    totals = {'quantity': 0, 'value': Decimal('0')}
+
+    def with_value(batches):
+        for rows in batches:
+            out = [row + (row[4] * row[5],) for row in rows]
+            totals['quantity'] += sum(row[4] for row in out)
+            totals['value'] += sum(row[6] for row in out)
+            yield out
+
+    cursor = context.connection.cursor(buffered=False)
+    context.store.valuation_report(cursor)
+    rows = write_report(context, VALUATION_COLUMNS, with_value(iter_batches(cursor, context.batch_size)))
+    cursor.close()
+    return {'rows': rows, 'total_quantity': totals['quantity'], 'total_value': str(totals['value'])}
+
+
+def expiry_report(context):
+    """Medicines expiring within ``days`` (or already expired), grouped by supplier"""
+    today = date.today()
+    until = today + timedelta(days=context.params['days'])
+    summary = {'expired': 0, 'suppliers': 0, 'value': Decimal('0')}
+    last_supplier = None
+
+    def with_days(batches):
+        nonlocal last_supplier
+        for rows in batches:
+            out = []
+            for supplier_id, name, contact, medicine_id, medicine, company, exp_date, quantity, price in rows:
+                days = (exp_date - today).days
+                value = quantity * price
+                out.append((supplier_id, name, contact, medicine_id, medicine, company,
+                            exp_date, days, quantity, price, value))
+                summary['expired'] += days < 0
+                summary['value'] += value
+                if supplier_id != last_supplier:
+                    summary['suppliers'] += 1
+                    last_supplier = supplier_id
+            yield out
+
+    cursor = context.connection.cursor(buffered=False)
+    context.store.expiry_report(cursor, until)
+    rows = write_report(context, EXPIRY_COLUMNS, with_days(iter_batches(cursor, context.batch_size)))
+    cursor.close()
+    return {'rows': rows, 'expired': summary['expired'], 'suppliers': summary['suppliers'],
+            'value_at_risk': str(summary['value']), 'until': until.isoformat()}
+
+
+def inventory_export(context):
+    """The GET /api/medicines/export stream, written to a file instead"""
+    fields = context.params['fields']
+    cursor = context.connection.cursor(buffered=False)
+    context.store.export_medicines(cursor, fields)
+    rows = write_report(context, cursor.column_names, iter_batches(cursor, context.batch_size), fields)
+    cursor.close()
+    return {'rows': rows}
+
+
+def register_reports(queue):
+    """Add the report job kinds to a JobQueue"""
+    queue.register('valuation_report', valuation_report, parse_report_params)
+    queue.register('expiry_report', expiry_report, parse_expiry_params)
+    queue.register('inventory_export', inventory_export, parse_export_params)
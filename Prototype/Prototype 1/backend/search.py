@@ -0,0 +1,127 @@
+"""
+Medicine search for Medical Storage Management System
+Builds ranked FULLTEXT queries over medicine name/company and supplier name
+(MySQL), or FTS5 queries over the same columns (SQLite, see storage.py)
+"""
+
+import re
+
+from config import SEARCH_CONFIG
+
+# Relevance weights: a hit on the medicine itself outranks a supplier-name hit
+MEDICINE_WEIGHT = 2
+SUPPLIER_WEIGHT = 1
+
+_WORD = re.compile(r'\w+', re.UNICODE)
+
+# Branches over one medicines table ({table}); medicines_archive has the same
+# columns and indexes, so archived rows are searched by repeating them
+FULLTEXT_BRANCHES = """
+        SELECT m.medicine_id,
+               MATCH(m.name, m.company) AGAINST (%s IN BOOLEAN MODE) * {medicine_weight} AS score
+        FROM {table} m
+        WHERE MATCH(m.name, m.company) AGAINST (%s IN BOOLEAN MODE)
+        UNION ALL
+        SELECT m.medicine_id,
+               MATCH(s.supplier_name) AGAINST (%s IN BOOLEAN MODE) * {supplier_weight} AS score
+        FROM suppliers s
+        JOIN {table} m ON m.supplier_id = s.supplier_id
+        WHERE MATCH(s.supplier_name) AGAINST (%s IN BOOLEAN MODE)"""
+
+# Used when every word is shorter than the FULLTEXT minimum token size; each
+# branch is a prefix match that can range-scan its own index.
+PREFIX_BRANCHES = """
+        SELECT medicine_id, {medicine_weight} AS score FROM {table} WHERE name LIKE %s
+        UNION ALL
+        SELECT medicine_id, {medicine_weight} AS score FROM {table} WHERE company LIKE %s
+        UNION ALL
+        SELECT m.medicine_id, {supplier_weight} AS score
+        FROM suppliers s
+        JOIN {table} m ON m.supplier_id = s.supplier_id
+        WHERE s.supplier_name LIKE %s"""
+
+# SQLite: medicines_fts, medicines_archive_fts and suppliers_fts mirror the
+# FULLTEXT indexes. bm25() is lower for better matches, so it is negated to
+# rank like MATCH() AGAINST.
+FTS5_BRANCHES = """
+        SELECT {fts_medicine_id} AS medicine_id, -bm25({table}_fts) * {medicine_weight} AS score
+        FROM {table}_fts
+        WHERE {table}_fts MATCH %s
+        UNION ALL
+        SELECT m.medicine_id, -bm25(suppliers_fts) * {supplier_weight} AS score
+        FROM suppliers_fts
+        JOIN {table} m ON m.supplier_id = suppliers_fts.rowid
+        WHERE suppliers_fts MATCH %s"""
+
+# Tables searched without and with ?include_archived=true
+HOT_TABLES = ('medicines',)
+ALL_TABLES = ('medicines', 'medicines_archive')
+
+# medicine_id in each FTS5 table (the archive's rowid is archive_id)
+FTS5_MEDICINE_IDS = {'medicines': 'rowid', 'medicines_archive': 'medicine_id'}
+
+
+def hits_query(branches, tables):
+    """(medicine_id, relevance) rows over ``branches`` repeated for each table in ``tables``"""
+    union = '\n        UNION ALL'.join(
+        branches.format(table=table, medicine_weight=MEDICINE_WEIGHT, supplier_weight=SUPPLIER_WEIGHT,
+                        fts_medicine_id=FTS5_MEDICINE_IDS[table])
+        for table in tables
+    )
+    return f"""
+    SELECT medicine_id, MAX(score) AS relevance FROM ({union}
+    ) scored
+    GROUP BY medicine_id
+"""
+
+
+FULLTEXT_HITS = {tables: hits_query(FULLTEXT_BRANCHES, tables) for tables in (HOT_TABLES, ALL_TABLES)}
+PREFIX_HITS = {tables: hits_query(PREFIX_BRANCHES, tables) for tables in (HOT_TABLES, ALL_TABLES)}
+FTS5_HITS = {tables: hits_query(FTS5_BRANCHES, tables) for tables in (HOT_TABLES, ALL_TABLES)}
+
+NO_HITS = "SELECT NULL AS medicine_id, NULL AS relevance WHERE 0"
+
+
+def fulltext_query(term):
+    """
+    Turn free text into a BOOLEAN MODE query requiring every word as a prefix.
+
+    Words shorter than the server's minimum token size are never indexed, so
+    they are dropped; an empty result means FULLTEXT cannot answer the term.
+    """
+    words = [word for word in _WORD.findall(term.lower())
+             if len(word) >= SEARCH_CONFIG['MIN_TOKEN_SIZE']]
+    return ' '.join(f'+{word}*' for word in words)
+
+
+def escape_like(term):
+    """Escape LIKE wildcards so user input is matched literally"""
+    return term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def search_hits(term, include_archived=False):
+    """
+    Derived table of (medicine_id, relevance) rows matching ``term``.
+
+    Returns (sql, params) for use as ``(<sql>) hits`` in a FROM clause.
+    """
+    tables = ALL_TABLES if include_archived else HOT_TABLES
+    query = fulltext_query(term)
+    if query:
+        return FULLTEXT_HITS[tables], [query] * 4 * len(tables)
+    pattern = escape_like(term.strip()) + '%'
+    return PREFIX_HITS[tables], [pattern] * 3 * len(tables)
+
+
+def fts5_query(term):
+    """FTS5 counterpart of fulltext_query(): every word as a quoted prefix, no minimum length"""
+    return ' '.join(f'"{word}"*' for word in _WORD.findall(term.lower()))
+
+
+def fts5_hits(term, include_archived=False):
+    """search_hits() for SQLite; FTS5 indexes every token, so no LIKE fallback is needed"""
+    tables = ALL_TABLES if include_archived else HOT_TABLES
+    query = fts5_query(term)
+    if query:
+        return FTS5_HITS[tables], [query] * 2 * len(tables)
+    return NO_HITS, []
@@ -0,0 +1,194 @@
+"""
+Response serialization for Medical Storage Management System
+Converts tuple rows column by column and encodes JSON with orjson when it is
+installed, falling back to the standard library. List endpoints can also send
+a columnar document, as JSON or MessagePack, chosen by the Accept header.
+"""
+
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+from flask import Response
+from werkzeug.datastructures import MIMEAccept
+from werkzeug.http import parse_accept_header
+
+from metrics import timed_phase
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    # Optional: without it only the two JSON list formats are offered
+    msgpack = None
+
+# List formats in server preference order, so */* and unknown types get plain JSON
+JSON_FORMAT = 'application/json'
+COLUMNAR_JSON_FORMAT = 'application/vnd.medvault.columnar+json'
+COLUMNAR_MSGPACK_FORMAT = 'application/vnd.medvault.columnar+msgpack'
+LIST_FORMATS = (JSON_FORMAT, COLUMNAR_JSON_FORMAT) + ((COLUMNAR_MSGPACK_FORMAT,) if msgpack else ())
+
+# Joined supplier columns the columnar format sends once per supplier
+SUPPLIER_SIDE_COLUMNS = ('supplier_name', 'contact_no')
+
+
+def serialize_date(date_obj):
+    """Convert date objects to string format"""
+    if date_obj is None:
+        return None
+    if isinstance(date_obj, datetime):
+        return date_obj.strftime('%Y-%m-%d')
+    if isinstance(date_obj, str):
+        return date_obj
+    return str(date_obj)
+
+
+def serialize_datetime(datetime_obj):
+    """Convert datetime objects to string format"""
+    if datetime_obj is None:
+        return None
+    if isinstance(datetime_obj, datetime):
+        return datetime_obj.strftime('%Y-%m-%d %H:%M:%S')
+    return str(datetime_obj)
+
+
+def _date_column(values):
+    # Plain DATE columns are the common case; isoformat() is much cheaper than strftime()
+    return [value.isoformat() if type(value) is date else serialize_date(value) for value in values]
+
+
+def _datetime_column(values):
+    # isoformat(' ', 'seconds') gives the same text as strftime('%Y-%m-%d %H:%M:%S')
+    return [value.isoformat(' ', 'seconds') if type(value) is datetime else serialize_datetime(value)
+            for value in values]
+
+
+def _decimal_column(values):
+    return [str(value) if type(value) is Decimal else value for value in values]
+
+
+def _bool_column(values):
+    # BOOLEAN columns come back as 0/1 from both backends
+    return [None if value is None else bool(value) for value in values]
+
+
+# Column converters by result column name; anything else is passed through
+COLUMN_CONVERTERS = {
+    'mfg_date': _date_column,
+    'exp_date': _date_column,
+    'created_at': _datetime_column,
+    'updated_at': _datetime_column,
+    'archived_at': _datetime_column,
+    'price': _decimal_column,
+    'value': _decimal_column,
+    'needs_reorder': _bool_column
+}
+
+
+def _convert_columns(columns, rows, fields):
+    """JSON-ready value sequences, one per name in ``fields``; each column is converted in one pass"""
+    data = list(zip(*rows))
+    position = {name: i for i, name in enumerate(columns)}
+    output = []
+    for name in fields:
+        values = data[position[name]]
+        convert = COLUMN_CONVERTERS.get(name)
+        output.append(convert(values) if convert else values)
+    return output
+
+
+@timed_phase('serialize')
+def serialize_rows(columns, rows, fields=None):
+    """
+    Turn tuple rows into JSON-ready dicts.
+
+    ``columns`` are the cursor's column names. Only ``fields`` (all columns by
+    default) are kept. Each converted column is processed in one pass instead
+    of once per row.
+    """
+    if fields is None:
+        fields = list(columns)
+    if not rows:
+        return []
+    return [dict(zip(fields, values)) for values in zip(*_convert_columns(columns, rows, fields))]
+
+
+@timed_phase('serialize')
+def columnar_document(columns, rows, fields=None):
+    """
+    serialize_rows() output as {"columns": [...], "rows": [[...], ...]}.
+
+    Field names are sent once instead of on every row. When supplier_id is
+    among the fields, supplier_name and contact_no leave the rows for a
+    "suppliers" side table with one row per supplier, in the same
+    columns/rows shape and keyed by its first column, supplier_id.
+    """
+    if fields is None:
+        fields = list(columns)
+    values = _convert_columns(columns, rows, fields) if rows else [()] * len(fields)
+    by_name = dict(zip(fields, values))
+    side = [name for name in SUPPLIER_SIDE_COLUMNS if name in by_name] if 'supplier_id' in by_name else []
+    kept = [name for name in fields if name not in side]
+    document = {'columns': kept, 'rows': list(zip(*[by_name[name] for name in kept]))}
+    if side:
+        suppliers = {}
+        for supplier in zip(by_name['supplier_id'], *[by_name[name] for name in side]):
+            suppliers.setdefault(supplier[0], supplier)
+        document['suppliers'] = {'columns': ['supplier_id'] + side, 'rows': list(suppliers.values())}
+    return document
+
+
+def negotiate_list_format(accept):
+    """The LIST_FORMATS entry an Accept header value prefers; plain JSON when it names none"""
+    return parse_accept_header(accept, MIMEAccept).best_match(LIST_FORMATS, default=JSON_FORMAT)
+
+
+def _default(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, datetime):
+        return serialize_datetime(value)
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+if orjson is not None:
+    @timed_phase('serialize')
+    def dumps(obj):
+        """Encode ``obj`` as compact UTF-8 JSON bytes"""
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_PASSTHROUGH_DATETIME)
+else:
+    _encoder = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'), default=_default)
+
+    @timed_phase('serialize')
+    def dumps(obj):
+        """Encode ``obj`` as compact UTF-8 JSON bytes"""
+        return _encoder.encode(obj).encode('utf-8')
+
+
+if msgpack is not None:
+    @timed_phase('serialize')
+    def packb(obj):
+        """Encode ``obj`` as MessagePack bytes"""
+        return msgpack.packb(obj, use_bin_type=True)
+
+
+def encode_list(columns, rows, fields, list_format):
+    """Body bytes for list rows in one of LIST_FORMATS"""
+    if list_format == JSON_FORMAT:
+        return dumps(serialize_rows(columns, rows, fields))
+    document = columnar_document(columns, rows, fields)
+    if list_format == COLUMNAR_MSGPACK_FORMAT:
+        return packb(document)
+    return dumps(document)
+
+
+def json_response(data, status=200):
+    """Build a JSON response with dumps() instead of jsonify() (bytes are sent as-is)"""
+    body = data if isinstance(data, bytes) else dumps(data)
+    return Response(body, status=status, mimetype='application/json')
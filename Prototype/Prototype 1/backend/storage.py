@@ -0,0 +1,1007 @@
+"""
+Storage backends for Medical Storage Management System
+The medicine and supplier queries are repository methods on a Storage object.
+Methods take a cursor from the object's connect(), so handlers keep their own
+transaction handling. MySQLStorage uses mysql.connector; SQLiteStorage runs the
+same API on an embedded SQLite file (WAL mode) for single-node deployments.
+"""
+
+import os
+import sqlite3
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from pathlib import Path
+
+try:
+    import mysql.connector
+except ImportError:
+    # Optional: a SQLite-only deployment does not need the MySQL driver
+    mysql = None
+
+from pagination import select_list, build_page_query
+from search import search_hits, fts5_hits
+
+# Every driver exception a repository call can raise; handlers catch ``except Error``
+Error = (sqlite3.Error,) + ((mysql.connector.Error,) if mysql else ())
+# Constraint violations (duplicate keys, missing foreign keys), a subset of Error
+IntegrityError = (sqlite3.IntegrityError,) + ((mysql.connector.IntegrityError,) if mysql else ())
+
+SQLITE_SCHEMA_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                  'database', 'sqlite_schema.sql')
+
+# Selectable fields for ?fields= projection, mapped to their SQL expressions
+SUPPLIER_COLUMNS = {
+    'supplier_id': 'supplier_id',
+    'supplier_name': 'supplier_name',
+    'contact_no': 'contact_no',
+    'created_at': 'created_at',
+    'updated_at': 'updated_at'
+}
+
+MEDICINE_COLUMNS = {
+    'medicine_id': 'm.medicine_id',
+    'name': 'm.name',
+    'company': 'm.company',
+    'mfg_date': 'm.mfg_date',
+    'exp_date': 'm.exp_date',
+    'quantity': 'm.quantity',
+    'price': 'm.price',
+    'supplier_id': 'm.supplier_id',
+    'created_at': 'm.created_at',
+    'updated_at': 'm.updated_at',
+    'supplier_name': 's.supplier_name',
+    'contact_no': 's.contact_no'
+}
+
+SEARCH_COLUMNS = dict(MEDICINE_COLUMNS, relevance='hits.relevance')
+
+# ?include_archived=true adds when and why a row left the hot table (null for live rows)
+ARCHIVE_FIELDS = {'archived_at': 'm.archived_at', 'archive_reason': 'm.archive_reason'}
+ARCHIVED_MEDICINE_COLUMNS = dict(MEDICINE_COLUMNS, **ARCHIVE_FIELDS)
+ARCHIVED_SEARCH_COLUMNS = dict(SEARCH_COLUMNS, **ARCHIVE_FIELDS)
+# Sort key only: a medicine_id reissued after archiving appears both live and
+# archived, and archive_rank (0 for live rows) tells the two apart
+ARCHIVE_RANK = 'COALESCE(m.archive_id, 0)'
+ARCHIVED_MEDICINE_SORT_COLUMNS = dict(ARCHIVED_MEDICINE_COLUMNS, archive_rank=ARCHIVE_RANK)
+ARCHIVED_SEARCH_SORT_COLUMNS = dict(ARCHIVED_SEARCH_COLUMNS, archive_rank=ARCHIVE_RANK)
+
+MOVEMENT_COLUMNS = {
+    'movement_id': 'movement_id',
+    'medicine_id': 'medicine_id',
+    'delta': 'delta',
+    'reason': 'reason',
+    'created_at': 'created_at'
+}
+
+BATCH_COLUMNS = {
+    'batch_id': 'batch_id',
+    'medicine_id': 'medicine_id',
+    'lot_number': 'lot_number',
+    'mfg_date': 'mfg_date',
+    'exp_date': 'exp_date',
+    'quantity': 'quantity',
+    'created_at': 'created_at',
+    'updated_at': 'updated_at'
+}
+
+REORDER_COLUMNS = {
+    'medicine_id': 'r.medicine_id',
+    'name': 'm.name',
+    'quantity': 'r.quantity',
+    'daily_rate': 'r.daily_rate',
+    'demand_stddev': 'r.demand_stddev',
+    'days_of_cover': 'r.days_of_cover',
+    'reorder_point': 'r.reorder_point',
+    'needs_reorder': 'r.needs_reorder',
+    'computed_at': 'r.computed_at'
+}
+# Sort key only: medicines with no demand (no days_of_cover) come last
+REORDER_SORT_COLUMNS = dict(REORDER_COLUMNS, cover_rank='COALESCE(r.days_of_cover, 1e18)')
+
+# Keyset sort orders; each ends in the primary key so the order is total
+SUPPLIER_KEY = ('supplier_name', 'supplier_id')
+MEDICINE_KEY = ('name', 'medicine_id')
+SEARCH_KEY = ('-relevance', 'name', 'medicine_id')
+ARCHIVED_MEDICINE_KEY = MEDICINE_KEY + ('archive_rank',)
+ARCHIVED_SEARCH_KEY = SEARCH_KEY + ('archive_rank',)
+MOVEMENT_KEY = ('-movement_id',)
+BATCH_KEY = ('exp_date', 'batch_id')
+REORDER_KEY = ('cover_rank', 'medicine_id')
+
+PRIMARY_KEYS = {'medicines': 'medicine_id', 'suppliers': 'supplier_id', 'medicine_batches': 'batch_id'}
+
+# Largest IN (...) list sent in one statement
+IN_CHUNK_SIZE = 1000
+# Rows per subtract_quantities() UPDATE; its CASE is matched branch by branch
+CASE_CHUNK_SIZE = 250
+
+MEDICINE_BY_ID = """
+    SELECT m.*, s.supplier_name, s.contact_no
+    FROM medicines m
+    JOIN suppliers s ON m.supplier_id = s.supplier_id
+    WHERE m.medicine_id = %s
+"""
+
+MEDICINES_BY_IDS = """
+    SELECT m.*, s.supplier_name, s.contact_no
+    FROM medicines m
+    JOIN suppliers s ON m.supplier_id = s.supplier_id
+    WHERE m.medicine_id IN ({placeholders})
+"""
+
+INSERT_SUPPLIER = "INSERT INTO suppliers (supplier_name, contact_no) VALUES (%s, %s)"
+
+INSERT_MEDICINE = """
+    INSERT INTO medicines (name, company, mfg_date, exp_date, quantity, price, supplier_id)
+    VALUES (%s, %s, %s, %s, %s, %s, %s)
+"""
+
+# quantity is left to sync_quantities(): it is the sum of the medicine's lots
+UPDATE_MEDICINE = """
+    UPDATE medicines
+    SET name = %s, company = %s, mfg_date = %s, exp_date = %s, price = %s, supplier_id = %s
+    WHERE medicine_id = %s
+"""
+
+# Index of quantity in validate_medicine() values
+QUANTITY_INDEX = 4
+
+# Columns medicines and medicines_archive share
+MEDICINE_TABLE_COLUMNS = ('medicine_id, name, company, mfg_date, exp_date, quantity, price, supplier_id, '
+                          'created_at, updated_at')
+
+# Live and archived medicines as one derived table, for ?include_archived=true
+ALL_MEDICINES = f"""(
+    SELECT {MEDICINE_TABLE_COLUMNS}, NULL AS archive_id, NULL AS archived_at, NULL AS archive_reason
+    FROM medicines
+    UNION ALL
+    SELECT {MEDICINE_TABLE_COLUMNS}, archive_id, archived_at, archive_reason FROM medicines_archive
+)"""
+
+ARCHIVE_MEDICINES = f"""
+    INSERT INTO medicines_archive ({MEDICINE_TABLE_COLUMNS}, archive_reason)
+    SELECT {MEDICINE_TABLE_COLUMNS}, %s FROM medicines WHERE medicine_id IN ({{placeholders}})
+"""
+
+# Lots and ledger entries follow their medicine to the archive row just
+# written for it: the newest archive_id of its medicine_id
+ARCHIVE_CHILDREN = """
+    INSERT INTO {table}_archive (archive_id, {columns})
+    SELECT a.archive_id, {child_columns}
+    FROM {table} c
+    JOIN (
+        SELECT medicine_id, MAX(archive_id) AS archive_id FROM medicines_archive
+        WHERE medicine_id IN ({placeholders})
+        GROUP BY medicine_id
+    ) a ON a.medicine_id = c.medicine_id
+"""
+
+ARCHIVED_CHILD_COLUMNS = {
+    'medicine_batches': ('batch_id', 'medicine_id', 'lot_number', 'mfg_date', 'exp_date', 'quantity',
+                         'created_at', 'updated_at'),
+    'stock_movements': ('movement_id', 'medicine_id', 'delta', 'reason', 'created_at')
+}
+
+# Oldest expiry first (idx_exp_date), locked until the batch is moved
+EXPIRED_MEDICINES = """
+    SELECT medicine_id FROM medicines
+    WHERE exp_date < %s
+    ORDER BY exp_date, medicine_id
+    LIMIT %s{lock}
+"""
+
+INSERT_MOVEMENT = "INSERT INTO stock_movements (medicine_id, delta, reason) VALUES (%s, %s, %s)"
+
+INSERT_BATCH = """
+    INSERT INTO medicine_batches (medicine_id, lot_number, mfg_date, exp_date, quantity)
+    VALUES (%s, %s, %s, %s, %s)
+"""
+
+# Lots with stock, in first-expiry-first-out order (idx_batch_fefo)
+FEFO_LOTS = """
+    SELECT batch_id, medicine_id, lot_number, exp_date, quantity
+    FROM medicine_batches
+    WHERE medicine_id IN ({placeholders}){unexpired} AND quantity > 0
+    ORDER BY medicine_id, exp_date, batch_id{lock}
+"""
+
+# Lots are the stock: medicines.quantity is the sum of a medicine's lots.
+# Stock recorded without a lot number (opening balances, movements that add
+# stock) is held in one lot per medicine under this number, dated like the medicine.
+UNLOTTED = 'UNLOTTED'
+
+LOT_TOTAL = "COALESCE((SELECT SUM(b.quantity) FROM medicine_batches b WHERE b.medicine_id = m.medicine_id), 0)"
+
+# An UNLOTTED lot for whatever quantity of medicines above ``%s`` no lot
+# accounts for; medicines inserted with a quantity but no lots get one here
+OPENING_LOTS = f"""
+    INSERT INTO medicine_batches (medicine_id, lot_number, mfg_date, exp_date, quantity)
+    SELECT m.medicine_id, '{UNLOTTED}', m.mfg_date, m.exp_date, m.quantity - {LOT_TOTAL}
+    FROM medicines m
+    WHERE m.medicine_id > %s AND m.quantity > {LOT_TOTAL}
+      AND NOT EXISTS (SELECT 1 FROM medicine_batches u WHERE u.medicine_id = m.medicine_id
+                      AND u.lot_number = '{UNLOTTED}')
+"""
+
+SYNC_QUANTITIES = """
+    UPDATE medicines SET quantity = COALESCE(
+        (SELECT SUM(b.quantity) FROM medicine_batches b WHERE b.medicine_id = medicines.medicine_id), 0
+    )
+    WHERE medicine_id IN ({placeholders})
+"""
+
+RECEIVE_UNLOTTED = f"""
+    UPDATE medicine_batches SET quantity = quantity + %s
+    WHERE medicine_id = %s AND lot_number = '{UNLOTTED}'
+"""
+
+INSERT_UNLOTTED = f"""
+    INSERT INTO medicine_batches (medicine_id, lot_number, mfg_date, exp_date, quantity)
+    SELECT medicine_id, '{UNLOTTED}', mfg_date, exp_date, %s FROM medicines WHERE medicine_id = %s
+"""
+
+UNLOTTED_DATES = f"""
+    UPDATE medicine_batches SET mfg_date = %s, exp_date = %s
+    WHERE medicine_id = %s AND lot_number = '{UNLOTTED}'
+"""
+
+# Per medicine: units consumed over the window and the sum of squared daily
+# consumption, from which the reorder job derives the mean and deviation
+DAILY_DEMAND = """
+    SELECT medicine_id, SUM(units), SUM(units * units)
+    FROM (
+        SELECT medicine_id, DATE(created_at) AS day, SUM(-delta) AS units
+        FROM stock_movements
+        WHERE delta < 0 AND created_at >= %s{condition}
+        GROUP BY medicine_id, DATE(created_at)
+    ) daily
+    GROUP BY medicine_id
+"""
+
+INSERT_REORDER_POINT = """
+    INSERT INTO reorder_points
+        (medicine_id, quantity, daily_rate, demand_stddev, days_of_cover, reorder_point, needs_reorder)
+    VALUES (%s, %s, %s, %s, %s, %s, %s)
+"""
+
+INSERT_REORDER_RUN = """
+    INSERT INTO reorder_runs (started_at, full_run, medicines, duration_ms) VALUES (%s, %s, %s, %s)
+"""
+
+# Change feed entries up to the counter value read at the start of the request
+LIST_CHANGES = """
+    SELECT seq, table_name, row_id, action, created_at
+    FROM change_log
+    WHERE seq > %s AND seq <= %s
+    ORDER BY seq
+    LIMIT %s
+"""
+
+STATS_BREAKDOWNS = {
+    'supplier': (
+        "s.supplier_id, s.supplier_name",
+        "medicines m JOIN suppliers s ON m.supplier_id = s.supplier_id",
+        "s.supplier_id, s.supplier_name",
+        "s.supplier_name"
+    ),
+    'company': ("m.company", "medicines m", "m.company", "m.company")
+}
+
+STATS_AGGREGATES = """
+    COUNT(*) AS total_medicines,
+    COALESCE(SUM(m.quantity), 0) AS total_quantity,
+    COALESCE(SUM(m.price * m.quantity), 0) AS inventory_value,
+    COALESCE(SUM(CASE WHEN m.quantity < %s THEN 1 ELSE 0 END), 0) AS low_stock_count
+"""
+
+
+def medicines_from_clause(fields, include_archived=False):
+    """FROM clause for medicine queries, joining suppliers only when needed"""
+    source = ALL_MEDICINES if include_archived else "medicines"
+    if 'supplier_name' in fields or 'contact_no' in fields:
+        return f"{source} m JOIN suppliers s ON m.supplier_id = s.supplier_id"
+    return f"{source} m"
+
+
+def stats_query(group_by=None):
+    """Aggregate query for the whole inventory or one STATS_BREAKDOWNS grouping"""
+    if group_by is None:
+        return f"SELECT {STATS_AGGREGATES} FROM medicines m"
+    columns, from_clause, group, order = STATS_BREAKDOWNS[group_by]
+    return f"SELECT {columns}, {STATS_AGGREGATES} FROM {from_clause} GROUP BY {group} ORDER BY {order}"
+
+
+def convert_stats_rows(rows):
+    """Turn SQL aggregate values (Decimal sums) into JSON numbers"""
+    for row in rows:
+        row['total_medicines'] = int(row['total_medicines'])
+        row['total_quantity'] = int(row['total_quantity'])
+        row['inventory_value'] = round(float(row['inventory_value']), 2)
+        row['low_stock_count'] = int(row['low_stock_count'])
+    return rows
+
+
+# Report rows for the background jobs (see reports.py), read with an unbuffered cursor
+VALUATION_REPORT = """
+    SELECT m.medicine_id, m.name, m.company, s.supplier_name, m.quantity, m.price
+    FROM medicines m
+    JOIN suppliers s ON m.supplier_id = s.supplier_id
+    ORDER BY m.medicine_id
+"""
+
+EXPIRY_REPORT = """
+    SELECT s.supplier_id, s.supplier_name, s.contact_no, m.medicine_id, m.name, m.company,
+           m.exp_date, m.quantity, m.price
+    FROM medicines m
+    JOIN suppliers s ON m.supplier_id = s.supplier_id
+    WHERE m.exp_date <= %s
+    ORDER BY s.supplier_name, s.supplier_id, m.exp_date, m.medicine_id
+"""
+
+JOB_COLUMNS = ('job_id', 'kind', 'params', 'status', 'attempts', 'progress', 'result', 'result_file',
+               'error', 'created_at', 'started_at', 'heartbeat_at', 'finished_at')
+
+# Only a still-queued job is claimed, so two workers never run the same one
+CLAIM_JOB = """
+    UPDATE jobs
+    SET status = 'running', attempts = attempts + 1, progress = 0,
+        started_at = CURRENT_TIMESTAMP, heartbeat_at = CURRENT_TIMESTAMP
+    WHERE job_id = %s AND status = 'queued'
+"""
+
+FINISH_JOB = """
+    UPDATE jobs
+    SET status = %s, progress = %s, result = %s, result_file = %s, error = %s,
+        finished_at = CURRENT_TIMESTAMP
+    WHERE job_id = %s
+"""
+
+
+def placeholders(values):
+    return ', '.join(['%s'] * len(values))
+
+
+def as_datetime(value):
+    """A TIMESTAMP from an expression; SQLite returns those as text"""
+    return datetime.fromisoformat(value) if isinstance(value, str) else value
+
+
+class Storage:
+    """
+    Repository methods shared by both backends.
+
+    Subclasses provide connect(), search_hits(), VERSIONS_QUERY and
+    LOCK_ROWS for what the SQL dialects do differently. Read methods return
+    (column_names, rows).
+    """
+
+    name = None
+    VERSIONS_QUERY = None
+    # Appended to a SELECT whose rows the transaction is about to update
+    LOCK_ROWS = ''
+
+    def connect(self):
+        raise NotImplementedError
+
+    def search_hits(self, search_term, include_archived=False):
+        raise NotImplementedError
+
+    # ---- suppliers
+
+    def supplier_page_query(self, fields, limit=None, after=None):
+        return build_page_query(SUPPLIER_COLUMNS, fields, SUPPLIER_KEY, "suppliers", limit=limit, after=after)
+
+    def list_suppliers(self, cursor, fields, limit=None, after=None):
+        """Suppliers ordered by SUPPLIER_KEY; one extra row when ``limit`` is set"""
+        cursor.execute(*self.supplier_page_query(fields, limit, after))
+        return cursor.column_names, cursor.fetchall()
+
+    def add_supplier(self, cursor, supplier_name, contact_no):
+        """Insert a supplier; returns its id"""
+        cursor.execute(INSERT_SUPPLIER, (supplier_name, contact_no))
+        return cursor.lastrowid
+
+    # ---- medicines
+
+    def medicine_page_query(self, fields, limit=None, after=None, include_archived=False):
+        if include_archived:
+            columns, key = ARCHIVED_MEDICINE_SORT_COLUMNS, ARCHIVED_MEDICINE_KEY
+        else:
+            columns, key = MEDICINE_COLUMNS, MEDICINE_KEY
+        return build_page_query(columns, fields, key, medicines_from_clause(fields, include_archived),
+                                limit=limit, after=after)
+
+    def list_medicines(self, cursor, fields, limit=None, after=None, include_archived=False):
+        """Medicines ordered by MEDICINE_KEY (ARCHIVED_MEDICINE_KEY); one extra row when ``limit`` is set"""
+        cursor.execute(*self.medicine_page_query(fields, limit, after, include_archived))
+        return cursor.column_names, cursor.fetchall()
+
+    def get_medicine(self, cursor, medicine_id):
+        """(column_names, row) for one medicine with its supplier; row is None if missing"""
+        cursor.execute(MEDICINE_BY_ID, (medicine_id,))
+        return cursor.column_names, cursor.fetchone()
+
+    def get_medicines(self, cursor, ids):
+        """get_medicine() for several ids in one query; rows for missing ids are absent"""
+        cursor.execute(MEDICINES_BY_IDS.format(placeholders=placeholders(ids)), list(ids))
+        return cursor.column_names, cursor.fetchall()
+
+    def medicines_by_ids(self, cursor, fields, ids):
+        """Rows of ``fields`` (plus medicine_id) for ``ids``, in no particular order"""
+        query = (f"SELECT {select_list(MEDICINE_COLUMNS, fields, ('medicine_id',))} "
+                 f"FROM {medicines_from_clause(fields)} WHERE m.medicine_id IN ")
+        columns, rows = None, []
+        for i in range(0, len(ids), IN_CHUNK_SIZE):
+            chunk = ids[i:i + IN_CHUNK_SIZE]
+            cursor.execute(f"{query}({placeholders(chunk)})", chunk)
+            columns = cursor.column_names
+            rows.extend(cursor.fetchall())
+        return columns, rows
+
+    def search_query(self, search_term, fields, limit, after, include_archived=False):
+        """Keyset-paginated search query and params, best matches first"""
+        hits_query, hits_params = self.search_hits(search_term, include_archived)
+        return build_page_query(
+            ARCHIVED_SEARCH_SORT_COLUMNS if include_archived else SEARCH_COLUMNS, fields,
+            ARCHIVED_SEARCH_KEY if include_archived else SEARCH_KEY,
+            f"({hits_query}) hits "
+            f"JOIN {ALL_MEDICINES if include_archived else 'medicines'} m ON m.medicine_id = hits.medicine_id "
+            "JOIN suppliers s ON m.supplier_id = s.supplier_id",
+            params=hits_params,
+            limit=limit, after=after
+        )
+
+    def search_medicines(self, cursor, search_term, fields, limit, after=None, include_archived=False):
+        """Medicines matching ``search_term`` ordered by SEARCH_KEY (ARCHIVED_SEARCH_KEY)"""
+        cursor.execute(*self.search_query(search_term, fields, limit, after, include_archived))
+        return cursor.column_names, cursor.fetchall()
+
+    def export_medicines(self, cursor, fields):
+        """Start reading every medicine in id order; the caller fetches from ``cursor``"""
+        cursor.execute(
+            f"SELECT {select_list(MEDICINE_COLUMNS, fields)} "
+            f"FROM {medicines_from_clause(fields)} ORDER BY m.medicine_id"
+        )
+
+    def insert_medicine(self, cursor, values):
+        """Insert a medicine from validate_medicine() values, its quantity as an UNLOTTED lot; returns its id"""
+        cursor.execute(INSERT_MEDICINE, values)
+        medicine_id = cursor.lastrowid
+        if values[QUANTITY_INDEX]:
+            self.receive_unlotted(cursor, medicine_id, values[QUANTITY_INDEX])
+        return medicine_id
+
+    def update_medicine(self, cursor, medicine_id, values):
+        """
+        Overwrite a medicine from validate_medicine() values, except its
+        quantity (see movements.adjust_lots()). The UNLOTTED lot keeps the
+        medicine's dates.
+        """
+        values = tuple(values)
+        cursor.execute(UPDATE_MEDICINE, values[:QUANTITY_INDEX] + values[QUANTITY_INDEX + 1:] + (medicine_id,))
+        cursor.execute(UNLOTTED_DATES, (values[2], values[3], medicine_id))
+
+    def delete_medicine(self, cursor, medicine_id):
+        """Move a medicine to medicines_archive (reason 'deleted'); returns the number of rows removed"""
+        return self.archive_medicines(cursor, [medicine_id], 'deleted')
+
+    # ---- archive
+
+    def expired_medicine_ids(self, cursor, before, limit):
+        """Up to ``limit`` ids of medicines that expired before ``before``, locked for archiving"""
+        cursor.execute(EXPIRED_MEDICINES.format(lock=self.LOCK_ROWS), (before, limit))
+        return [row[0] for row in cursor.fetchall()]
+
+    def archive_medicines(self, cursor, ids, reason):
+        """
+        Move medicines to medicines_archive, and their lots and stock ledger to
+        medicine_batches_archive and stock_movements_archive, in the caller's
+        transaction. Reorder points are derived from live stock and are
+        dropped. Returns the number of medicines removed.
+        """
+        ids = list(ids)
+        marks = placeholders(ids)
+        cursor.execute(ARCHIVE_MEDICINES.format(placeholders=marks), [reason] + ids)
+        for table, columns in ARCHIVED_CHILD_COLUMNS.items():
+            cursor.execute(ARCHIVE_CHILDREN.format(
+                table=table, columns=', '.join(columns),
+                child_columns=', '.join(f'c.{column}' for column in columns), placeholders=marks
+            ), ids)
+            cursor.execute(f"DELETE FROM {table} WHERE medicine_id IN ({marks})", ids)
+        cursor.execute(f"DELETE FROM reorder_points WHERE medicine_id IN ({marks})", ids)
+        cursor.execute(f"DELETE FROM medicines WHERE medicine_id IN ({marks})", ids)
+        return cursor.rowcount
+
+    # ---- stock movements
+
+    def medicine_quantities(self, cursor, ids, lock=False):
+        """
+        {medicine_id: quantity} for the ids that exist.
+
+        With ``lock`` the rows are locked for update where the backend
+        supports it; writers lock medicines before their lots, in id order.
+        """
+        ids = sorted(ids)
+        quantities = {}
+        for i in range(0, len(ids), IN_CHUNK_SIZE):
+            chunk = ids[i:i + IN_CHUNK_SIZE]
+            cursor.execute(
+                f"SELECT medicine_id, quantity FROM medicines WHERE medicine_id IN ({placeholders(chunk)}) "
+                f"ORDER BY medicine_id{self.LOCK_ROWS if lock else ''}", chunk
+            )
+            quantities.update(cursor.fetchall())
+        return quantities
+
+    def sync_quantities(self, cursor, ids):
+        """Set each medicine's quantity to the sum of its lots"""
+        ids = sorted(ids)
+        for i in range(0, len(ids), IN_CHUNK_SIZE):
+            chunk = ids[i:i + IN_CHUNK_SIZE]
+            cursor.execute(SYNC_QUANTITIES.format(placeholders=placeholders(chunk)), chunk)
+
+    def open_lots(self, cursor, after_id=0):
+        """Give medicines above ``after_id`` an UNLOTTED lot for stock no lot accounts for"""
+        cursor.execute(OPENING_LOTS, (after_id,))
+        return cursor.rowcount
+
+    def record_movements(self, cursor, movements):
+        """Append (medicine_id, delta, reason) rows to the stock_movements ledger"""
+        cursor.executemany(INSERT_MOVEMENT, movements)
+
+    def list_movements(self, cursor, medicine_id, fields, limit=None, after=None):
+        """A medicine's ledger entries, newest first"""
+        cursor.execute(*build_page_query(
+            MOVEMENT_COLUMNS, fields, MOVEMENT_KEY, "stock_movements",
+            conditions=["medicine_id = %s"], params=[medicine_id], limit=limit, after=after
+        ))
+        return cursor.column_names, cursor.fetchall()
+
+    def subtract_quantities(self, cursor, table, amounts):
+        """
+        Take {primary key: amount} from the quantity column of ``table``.
+
+        One UPDATE per CASE_CHUNK_SIZE rows. A row holding less than its amount
+        is left alone; returns the number of rows changed, so a short count
+        means some row did not have enough.
+        """
+        key = PRIMARY_KEYS[table]
+        items = list(amounts.items())
+        changed = 0
+        for i in range(0, len(items), CASE_CHUNK_SIZE):
+            chunk = items[i:i + CASE_CHUNK_SIZE]
+            case = f"CASE {key} {' '.join(['WHEN %s THEN %s'] * len(chunk))} END"
+            case_params = [value for item in chunk for value in item]
+            ids = [row_id for row_id, _ in chunk]
+            cursor.execute(
+                f"UPDATE {table} SET quantity = quantity - {case} "
+                f"WHERE {key} IN ({placeholders(ids)}) AND quantity >= {case}",
+                case_params + ids + case_params
+            )
+            changed += cursor.rowcount
+        return changed
+
+    # ---- lots
+
+    def add_batch(self, cursor, medicine_id, values):
+        """Insert a lot from validate_batch() values; returns its id"""
+        cursor.execute(INSERT_BATCH, (medicine_id,) + tuple(values))
+        return cursor.lastrowid
+
+    def receive_unlotted(self, cursor, medicine_id, quantity):
+        """Add stock without a lot number to the medicine's UNLOTTED lot, creating it when needed"""
+        cursor.execute(RECEIVE_UNLOTTED, (quantity, medicine_id))
+        if not cursor.rowcount:
+            cursor.execute(INSERT_UNLOTTED, (quantity, medicine_id))
+
+    def list_batches(self, cursor, medicine_id, fields, limit=None, after=None):
+        """A medicine's lots, soonest expiry first"""
+        cursor.execute(*build_page_query(
+            BATCH_COLUMNS, fields, BATCH_KEY, "medicine_batches",
+            conditions=["medicine_id = %s"], params=[medicine_id], limit=limit, after=after
+        ))
+        return cursor.column_names, cursor.fetchall()
+
+    def fefo_lots(self, cursor, medicine_ids, today=None):
+        """
+        (batch_id, medicine_id, lot_number, exp_date, quantity) for every lot
+        with stock, ordered by medicine then expiry. Given ``today``, lots
+        that expired before it are left out.
+
+        ``medicine_ids`` must be sorted for the order to hold across chunks.
+        Rows are locked for update where the backend supports it.
+        """
+        rows = []
+        for i in range(0, len(medicine_ids), IN_CHUNK_SIZE):
+            chunk = medicine_ids[i:i + IN_CHUNK_SIZE]
+            cursor.execute(FEFO_LOTS.format(placeholders=placeholders(chunk), lock=self.LOCK_ROWS,
+                                            unexpired='' if today is None else ' AND exp_date >= %s'),
+                           list(chunk) + ([] if today is None else [today]))
+            rows.extend(cursor.fetchall())
+        return rows
+
+    def index_rows(self, cursor, table, columns, ids=None):
+        """
+        Tuples of ``columns`` from ``table`` for the in-memory indexes.
+
+        Reads the whole table, or only the rows whose primary key is in ``ids``.
+        """
+        query = f"SELECT {', '.join(columns)} FROM {table}"
+        if ids is None:
+            cursor.execute(query)
+            return cursor.fetchall()
+        ids = list(ids)
+        rows = []
+        for i in range(0, len(ids), IN_CHUNK_SIZE):
+            chunk = ids[i:i + IN_CHUNK_SIZE]
+            cursor.execute(f"{query} WHERE {PRIMARY_KEYS[table]} IN ({placeholders(chunk)})", chunk)
+            rows.extend(cursor.fetchall())
+        return rows
+
+    # ---- reorder points
+
+    def _select_chunked(self, cursor, query, params, column, ids):
+        """Rows of ``query`` (with a {condition} slot), for every id or only ``ids``"""
+        if ids is None:
+            cursor.execute(query.format(condition=''), params)
+            return cursor.fetchall()
+        ids = list(ids)
+        rows = []
+        for i in range(0, len(ids), IN_CHUNK_SIZE):
+            chunk = ids[i:i + IN_CHUNK_SIZE]
+            cursor.execute(query.format(condition=f" AND {column} IN ({placeholders(chunk)})"),
+                           list(params) + chunk)
+            rows.extend(cursor.fetchall())
+        return rows
+
+    def database_now(self, cursor):
+        """The database clock, comparable with its TIMESTAMP columns"""
+        cursor.execute("SELECT CURRENT_TIMESTAMP")
+        return as_datetime(cursor.fetchone()[0])
+
+    def last_reorder_runs(self, cursor):
+        """(start of the last run, start of the last full run); None where there was none"""
+        cursor.execute(
+            "SELECT MAX(started_at), MAX(CASE WHEN full_run THEN started_at END) FROM reorder_runs"
+        )
+        last, last_full = cursor.fetchone()
+        return as_datetime(last), as_datetime(last_full)
+
+    def medicines_changed_since(self, cursor, since):
+        """Ids of medicines written at or after ``since``; stock movements touch updated_at too"""
+        cursor.execute("SELECT medicine_id FROM medicines WHERE updated_at >= %s", (since,))
+        return [row[0] for row in cursor.fetchall()]
+
+    def medicine_stock(self, cursor, ids=None):
+        """(medicine_id, quantity) for every medicine, or only ``ids``"""
+        return self._select_chunked(cursor, "SELECT medicine_id, quantity FROM medicines WHERE 1 = 1{condition}",
+                                    (), 'medicine_id', ids)
+
+    def daily_demand(self, cursor, since, ids=None):
+        """(medicine_id, units, sum of squared daily units) consumed since ``since``"""
+        return self._select_chunked(cursor, DAILY_DEMAND, (since,), 'medicine_id', ids)
+
+    def save_reorder_points(self, cursor, rows, ids=None):
+        """Replace every reorder point, or those of ``ids``, with ``rows``"""
+        if ids is None:
+            cursor.execute("DELETE FROM reorder_points")
+        else:
+            ids = list(ids)
+            for i in range(0, len(ids), IN_CHUNK_SIZE):
+                chunk = ids[i:i + IN_CHUNK_SIZE]
+                cursor.execute(f"DELETE FROM reorder_points WHERE medicine_id IN ({placeholders(chunk)})", chunk)
+        for i in range(0, len(rows), IN_CHUNK_SIZE):
+            cursor.executemany(INSERT_REORDER_POINT, rows[i:i + IN_CHUNK_SIZE])
+
+    def record_reorder_run(self, cursor, started_at, full_run, medicines, duration_ms):
+        """Log a finished run; its start is the next incremental run's watermark"""
+        cursor.execute(INSERT_REORDER_RUN, (started_at, full_run, medicines, duration_ms))
+
+    def list_reorder_points(self, cursor, fields, due_only=False, limit=None, after=None):
+        """Reorder points ordered by REORDER_KEY, fewest days of cover first"""
+        cursor.execute(*build_page_query(
+            REORDER_SORT_COLUMNS, fields, REORDER_KEY,
+            "reorder_points r JOIN medicines m ON m.medicine_id = r.medicine_id",
+            conditions=["r.needs_reorder = 1"] if due_only else (), limit=limit, after=after
+        ))
+        return cursor.column_names, cursor.fetchall()
+
+    # ---- change feed
+
+    def last_change_seq(self, cursor):
+        """The last sequence number handed out, or None when the change feed is not migrated"""
+        cursor.execute("SELECT version FROM table_versions WHERE table_name = 'change_log'")
+        row = cursor.fetchone()
+        return int(row[0]) if row is not None else None
+
+    def list_changes(self, cursor, since, until, limit):
+        """Up to ``limit`` change_log rows with since < seq <= until, in sequence order"""
+        cursor.execute(LIST_CHANGES, (since, until, limit))
+        return cursor.fetchall()
+
+    def prune_changes(self, cursor, before):
+        """Delete change_log rows written before ``before``; returns how many"""
+        cursor.execute("DELETE FROM change_log WHERE created_at < %s", (before,))
+        return cursor.rowcount
+
+    # ---- reports and jobs
+
+    def valuation_report(self, cursor):
+        """Start reading every medicine's stock and price in id order; the caller fetches"""
+        cursor.execute(VALUATION_REPORT)
+
+    def expiry_report(self, cursor, until):
+        """Start reading medicines expiring on or before ``until``, grouped by supplier"""
+        cursor.execute(EXPIRY_REPORT, (until,))
+
+    def add_job(self, cursor, kind, params):
+        """Queue a job (``params`` already JSON-encoded); returns its id"""
+        cursor.execute("INSERT INTO jobs (kind, params) VALUES (%s, %s)", (kind, params))
+        return cursor.lastrowid
+
+    def get_job(self, cursor, job_id):
+        """One jobs row in JOB_COLUMNS order, or None"""
+        cursor.execute(f"SELECT {', '.join(JOB_COLUMNS)} FROM jobs WHERE job_id = %s", (job_id,))
+        return cursor.fetchone()
+
+    def queued_job_ids(self, cursor, limit):
+        """Oldest queued job ids first"""
+        cursor.execute("SELECT job_id FROM jobs WHERE status = 'queued' ORDER BY job_id LIMIT %s", (limit,))
+        return [row[0] for row in cursor.fetchall()]
+
+    def claim_job(self, cursor, job_id):
+        """Mark a queued job running; False when another worker got it first"""
+        cursor.execute(CLAIM_JOB, (job_id,))
+        return cursor.rowcount == 1
+
+    def job_progress(self, cursor, job_id, progress):
+        cursor.execute("UPDATE jobs SET progress = %s, heartbeat_at = CURRENT_TIMESTAMP WHERE job_id = %s",
+                       (progress, job_id))
+
+    def heartbeat_jobs(self, cursor, ids):
+        """Show that this process is still running ``ids``"""
+        ids = list(ids)
+        cursor.execute(f"UPDATE jobs SET heartbeat_at = CURRENT_TIMESTAMP "
+                       f"WHERE status = 'running' AND job_id IN ({placeholders(ids)})", ids)
+
+    def finish_job(self, cursor, job_id, status, progress, result, result_file, error):
+        cursor.execute(FINISH_JOB, (status, progress, result, result_file, error, job_id))
+
+    def requeue_stale_jobs(self, cursor, before, max_attempts):
+        """
+        Running jobs without a heartbeat since ``before`` lost their worker:
+        queue them again, or fail those that used up ``max_attempts``.
+        Returns (requeued, failed).
+        """
+        cursor.execute(
+            "UPDATE jobs SET status = 'failed', error = 'The worker running this job stopped', "
+            "finished_at = CURRENT_TIMESTAMP "
+            "WHERE status = 'running' AND heartbeat_at < %s AND attempts >= %s",
+            (before, max_attempts)
+        )
+        failed = cursor.rowcount
+        cursor.execute("UPDATE jobs SET status = 'queued' WHERE status = 'running' AND heartbeat_at < %s",
+                       (before,))
+        return cursor.rowcount, failed
+
+    def finished_jobs(self, cursor, before):
+        """(job_id, result_file) of jobs that finished before ``before``"""
+        cursor.execute("SELECT job_id, result_file FROM jobs WHERE finished_at < %s", (before,))
+        return cursor.fetchall()
+
+    def delete_jobs(self, cursor, ids):
+        ids = list(ids)
+        for i in range(0, len(ids), IN_CHUNK_SIZE):
+            chunk = ids[i:i + IN_CHUNK_SIZE]
+            cursor.execute(f"DELETE FROM jobs WHERE job_id IN ({placeholders(chunk)})", chunk)
+
+    # ---- statistics and versions
+
+    def inventory_stats(self, cursor, threshold, group_by=None):
+        """Inventory aggregates, optionally grouped by supplier or company (dictionary cursor)"""
+        cursor.execute(stats_query(group_by), (threshold,))
+        rows = [cursor.fetchone()] if group_by is None else cursor.fetchall()
+        return convert_stats_rows(rows)
+
+    def table_versions(self, cursor):
+        """Read {table: (version, last_modified)} from table_versions"""
+        cursor.execute(self.VERSIONS_QUERY)
+        return {
+            table: (int(version), datetime.fromtimestamp(int(updated_at), timezone.utc))
+            for table, version, updated_at in cursor.fetchall()
+        }
+
+
+class MySQLStorage(Storage):
+    """The MySQL server configured by DB_CONFIG (schema from database/schema.sql)"""
+
+    name = 'mysql'
+    VERSIONS_QUERY = "SELECT table_name, version, UNIX_TIMESTAMP(updated_at) FROM table_versions"
+    LOCK_ROWS = ' FOR UPDATE'
+
+    def __init__(self, config):
+        if mysql is None:
+            raise RuntimeError('STORAGE_BACKEND=mysql needs mysql-connector-python installed')
+        self.config = config
+
+    def connect(self):
+        return mysql.connector.connect(**self.config)
+
+    def search_hits(self, search_term, include_archived=False):
+        return search_hits(search_term, include_archived)
+
+
+# ==================== SQLITE ====================
+
+# Declared column types converted to the Python types mysql.connector returns
+sqlite3.register_converter('DATE', lambda value: date.fromisoformat(value.decode()))
+sqlite3.register_converter('TIMESTAMP', lambda value: datetime.fromisoformat(value.decode()))
+sqlite3.register_converter('DECIMAL', lambda value: Decimal(value.decode()).quantize(Decimal('0.01')))
+sqlite3.register_adapter(date, date.isoformat)
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(' '))
+sqlite3.register_adapter(Decimal, str)
+
+
+class SQLiteCursor:
+    """
+    The part of the mysql.connector cursor API the backend uses (%s placeholders).
+
+    Integers beyond 64 bits raise OverflowError in sqlite3, outside its Error
+    hierarchy; they are reported as sqlite3.DataError, a storage Error as on
+    MySQL.
+    """
+
+    def __init__(self, connection, dictionary=False):
+        self._cursor = connection.cursor()
+        self._dictionary = dictionary
+
+    def execute(self, operation, params=()):
+        try:
+            self._cursor.execute(operation.replace('%s', '?'), tuple(params or ()))
+        except OverflowError as e:
+            raise sqlite3.DataError(str(e)) from e
+
+    def executemany(self, operation, seq_params):
+        try:
+            self._cursor.executemany(operation.replace('%s', '?'), (tuple(params) for params in seq_params))
+        except OverflowError as e:
+            raise sqlite3.DataError(str(e)) from e
+
+    def _rows(self, rows):
+        if not self._dictionary:
+            return rows
+        names = self.column_names
+        return [dict(zip(names, row)) for row in rows]
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        return None if row is None else self._rows([row])[0]
+
+    def fetchmany(self, size=1):
+        return self._rows(self._cursor.fetchmany(size))
+
+    def fetchall(self):
+        return self._rows(self._cursor.fetchall())
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+    @property
+    def column_names(self):
+        return tuple(column[0] for column in self._cursor.description or ())
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    def close(self):
+        self._cursor.close()
+
+
+class SQLiteConnection:
+    """The part of the mysql.connector connection API the backend uses"""
+
+    def __init__(self, path, timeout, read_only=False):
+        if read_only:
+            path, uri = Path(path).resolve().as_uri() + '?mode=ro', True
+        else:
+            uri = False
+        self._connection = sqlite3.connect(
+            path, timeout=timeout, detect_types=sqlite3.PARSE_DECLTYPES, check_same_thread=False, uri=uri
+        )
+        self._connection.execute("PRAGMA foreign_keys = ON")
+        # Durable at each WAL checkpoint rather than each commit
+        self._connection.execute("PRAGMA synchronous = NORMAL")
+
+    def cursor(self, dictionary=False, **kwargs):
+        return SQLiteCursor(self._connection, dictionary)
+
+    def commit(self):
+        self._connection.commit()
+
+    def rollback(self):
+        self._connection.rollback()
+
+    def is_connected(self):
+        return True
+
+    def close(self):
+        self._connection.close()
+
+
+class SQLiteStorage(Storage):
+    """
+    An embedded SQLite database file.
+
+    The schema (database/sqlite_schema.sql) is created or completed when the
+    storage is opened, unless it is a ``read_only`` replica. WAL mode lets
+    readers run alongside the single writer; ``timeout`` is how long a
+    writer waits for the lock.
+    """
+
+    name = 'sqlite'
+    # Seconds since the epoch, as UNIX_TIMESTAMP() returns them
+    VERSIONS_QUERY = """
+        SELECT table_name, version, CAST(ROUND((julianday(updated_at) - 2440587.5) * 86400) AS INTEGER)
+        FROM table_versions
+    """
+    # No row locks: one writer at a time, and subtract_quantities() refuses a
+    # lot that another transaction emptied after it was read
+    LOCK_ROWS = ''
+
+    def __init__(self, path, timeout=30, read_only=False):
+        self.path = path
+        self.timeout = timeout
+        # A read replica's file is maintained by whatever copies it; it is never written here
+        self.read_only = read_only
+        if not read_only:
+            self.ensure_schema()
+
+    def ensure_schema(self):
+        with open(SQLITE_SCHEMA_FILE, encoding='utf-8') as f:
+            script = f.read()
+        connection = sqlite3.connect(self.path, timeout=self.timeout)
+        try:
+            # WAL mode is stored in the file, so later connections inherit it
+            connection.execute("PRAGMA journal_mode = WAL")
+            connection.executescript(script)
+            connection.commit()
+        finally:
+            connection.close()
+
+    def connect(self):
+        return SQLiteConnection(self.path, self.timeout, self.read_only)
+
+    def search_hits(self, search_term, include_archived=False):
+        return fts5_hits(search_term, include_archived)
+
+
+def create_storage(config, db_config):
+    """Storage for STORAGE_CONFIG: 'mysql' (DB_CONFIG) or 'sqlite' (SQLITE_PATH)"""
+    backend = config['BACKEND']
+    if backend == 'mysql':
+        return MySQLStorage(db_config)
+    if backend == 'sqlite':
+        return SQLiteStorage(config['SQLITE_PATH'], config['SQLITE_TIMEOUT'])
+    raise ValueError(f"Unknown STORAGE_BACKEND: {backend} (expected mysql or sqlite)")
+
+
+def create_replica_storage(config, db_config, address):
+    """
+    Storage for one DB_REPLICAS entry: ``host[:port]`` of a MySQL replica
+    (credentials from DB_CONFIG), or the path of a SQLite file opened read-only.
+    """
+    if config['BACKEND'] == 'sqlite':
+        return SQLiteStorage(address, config['SQLITE_TIMEOUT'], read_only=True)
+    host, _, port = address.partition(':')
+    replica_config = dict(db_config, host=host)
+    if port:
+        replica_config['port'] = int(port)
+    return create_storage(config, replica_config)
@@ -0,0 +1,227 @@
+"""
+Typeahead suggestions for Medical Storage Management System
+Sorted in-memory arrays of medicine names, companies and supplier names,
+searched by prefix with bisect
+"""
+
+import threading
+import time
+from bisect import bisect_left, insort
+
+MEDICINE = 0
+COMPANY = 1
+SUPPLIER = 2
+KIND_NAMES = {MEDICINE: 'medicine', COMPANY: 'company', SUPPLIER: 'supplier'}
+
+# Only the first few words of a label are indexed as inner-word prefixes
+MAX_INDEXED_WORDS = 4
+
+
+def normalize(text):
+    """Case-folded form used for prefix comparisons"""
+    return ' '.join(text.casefold().split())
+
+
+def _word_starts(key):
+    starts = [0]
+    for i in range(1, len(key)):
+        if key[i].isalnum() and not key[i - 1].isalnum():
+            starts.append(i)
+            if len(starts) == MAX_INDEXED_WORDS:
+                break
+    return starts
+
+
+class _IndexState:
+    """
+    The arrays behind one generation of the index.
+
+    ``primary`` holds whole labels and ``secondary`` the same labels from each
+    later word start, so "500" finds "Paracetamol 500mg" but whole-label
+    matches are always offered first. Entries are (key, kind, ref, label).
+    """
+
+    def __init__(self):
+        self.primary = []
+        self.secondary = []
+        self.medicines = {}
+        self.suppliers = {}
+        self.companies = {}
+
+    def _entries(self, kind, ref, label):
+        key = normalize(label)
+        if not key:
+            return None, []
+        primary = (key, kind, ref, label)
+        secondary = [(key[i:], kind, ref, label) for i in _word_starts(key)[1:]]
+        return primary, secondary
+
+    def _add_label(self, kind, ref, label):
+        primary, secondary = self._entries(kind, ref, label)
+        if primary is None:
+            return
+        insort(self.primary, primary)
+        for entry in secondary:
+            insort(self.secondary, entry)
+
+    def _remove_label(self, kind, ref, label):
+        primary, secondary = self._entries(kind, ref, label)
+        if primary is None:
+            return
+        for entries, entry in [(self.primary, primary)] + [(self.secondary, e) for e in secondary]:
+            i = bisect_left(entries, entry)
+            if i < len(entries) and entries[i] == entry:
+                del entries[i]
+
+    def _add_company(self, company):
+        count = self.companies.get(company, 0)
+        self.companies[company] = count + 1
+        if count == 0:
+            self._add_label(COMPANY, 0, company)
+
+    def _remove_company(self, company):
+        count = self.companies.get(company, 0)
+        if count <= 1:
+            self.companies.pop(company, None)
+            self._remove_label(COMPANY, 0, company)
+        else:
+            self.companies[company] = count - 1
+
+    def upsert_medicine(self, medicine_id, name, company):
+        old = self.medicines.get(medicine_id)
+        if old == (name, company):
+            return
+        if old is not None:
+            self.remove_medicine(medicine_id)
+        self.medicines[medicine_id] = (name, company)
+        self._add_label(MEDICINE, medicine_id, name)
+        self._add_company(company)
+
+    def remove_medicine(self, medicine_id):
+        old = self.medicines.pop(medicine_id, None)
+        if old is not None:
+            self._remove_label(MEDICINE, medicine_id, old[0])
+            self._remove_company(old[1])
+
+    def upsert_supplier(self, supplier_id, supplier_name):
+        old = self.suppliers.get(supplier_id)
+        if old == supplier_name:
+            return
+        if old is not None:
+            self._remove_label(SUPPLIER, supplier_id, old)
+        self.suppliers[supplier_id] = supplier_name
+        self._add_label(SUPPLIER, supplier_id, supplier_name)
+
+    def bulk_load(self, medicines, suppliers):
+        """Fill an empty state in one pass, sorting once instead of per insert"""
+        for medicine_id, name, company in medicines:
+            self.medicines[medicine_id] = (name, company)
+            self.companies[company] = self.companies.get(company, 0) + 1
+        self.suppliers = {supplier_id: name for supplier_id, name in suppliers}
+        labels = [(MEDICINE, medicine_id, name) for medicine_id, (name, _) in self.medicines.items()]
+        labels += [(COMPANY, 0, company) for company in self.companies]
+        labels += [(SUPPLIER, supplier_id, name) for supplier_id, name in self.suppliers.items()]
+        for kind, ref, label in labels:
+            primary, secondary = self._entries(kind, ref, label)
+            if primary is not None:
+                self.primary.append(primary)
+                self.secondary.extend(secondary)
+        self.primary.sort()
+        self.secondary.sort()
+
+
+class SuggestIndex:
+    """
+    Thread-safe prefix index answering typeahead queries from memory.
+
+    Write handlers apply incremental changes; rebuild() reloads everything
+    from the database to pick up writes made by other processes. Changes that
+    arrive while a rebuild is loading are replayed onto the new arrays.
+    """
+
+    def __init__(self):
+        self._state = _IndexState()
+        self._lock = threading.Lock()
+        self._rebuild_lock = threading.Lock()
+        self._pending = None
+        self.ready = False
+        self.built_at = None
+
+    def _apply(self, method, *args):
+        with self._lock:
+            getattr(self._state, method)(*args)
+            if self._pending is not None:
+                self._pending.append((method, args))
+
+    def upsert_medicine(self, medicine_id, name, company):
+        self._apply('upsert_medicine', medicine_id, name, company)
+
+    def remove_medicine(self, medicine_id):
+        self._apply('remove_medicine', medicine_id)
+
+    def upsert_supplier(self, supplier_id, supplier_name):
+        self._apply('upsert_supplier', supplier_id, supplier_name)
+
+    def rebuild(self, loader):
+        """
+        Replace the index with a fresh load.
+
+        ``loader()`` returns (medicines, suppliers) as iterables of
+        (medicine_id, name, company) and (supplier_id, supplier_name).
+        """
+        with self._rebuild_lock:
+            with self._lock:
+                self._pending = []
+            try:
+                medicines, suppliers = loader()
+                state = _IndexState()
+                state.bulk_load(medicines, suppliers)
+            except Exception:
+                with self._lock:
+                    self._pending = None
+                raise
+            with self._lock:
+                for method, args in self._pending:
+                    getattr(state, method)(*args)
+                self._state = state
+                self._pending = None
+                self.ready = True
+                self.built_at = time.time()
+
+    def suggest(self, prefix, limit=10):
+        """Up to ``limit`` matches as dicts with type, id and label"""
+        key = normalize(prefix)
+        if not key:
+            return []
+        results = []
+        seen = set()
+        with self._lock:
+            for entries in (self._state.primary, self._state.secondary):
+                i = bisect_left(entries, (key,))
+                while i < len(entries) and len(results) < limit:
+                    entry_key, kind, ref, label = entries[i]
+                    if not entry_key.startswith(key):
+                        break
+                    identity = (kind, ref, label)
+                    if identity not in seen:
+                        seen.add(identity)
+                        results.append({
+                            'type': KIND_NAMES[kind],
+                            'id': ref if kind != COMPANY else None,
+                            'label': label
+                        })
+                    i += 1
+                if len(results) >= limit:
+                    break
+        return results
+
+    def stats(self):
+        with self._lock:
+            return {
+                'ready': self.ready,
+                'built_at': self.built_at,
+                'medicines': len(self._state.medicines),
+                'companies': len(self._state.companies),
+                'suppliers': len(self._state.suppliers),
+                'entries': len(self._state.primary) + len(self._state.secondary)
+            }
@@ -0,0 +1,102 @@
+"""
+Request payload validation shared by the single-row and bulk write endpoints
+"""
+
+from datetime import datetime
+
+MEDICINE_FIELDS = ['name', 'company', 'mfg_date', 'exp_date', 'quantity', 'price', 'supplier_id']
+
+
+def _parse_date(value):
+    """Normalize a YYYY-MM-DD value; raises ValueError otherwise"""
+    return datetime.strptime(str(value).strip(), '%Y-%m-%d').strftime('%Y-%m-%d')
+
+
+def validate_medicine(data):
+    """
+    Check a medicine payload.
+
+    Returns (values, None) with values in MEDICINE_FIELDS order, ready for
+    INSERT/UPDATE, or (None, error message).
+    """
+    if not isinstance(data, dict):
+        return None, 'Medicine must be a JSON object'
+
+    # Validate required fields
+    for field in MEDICINE_FIELDS:
+        if field not in data:
+            return None, f'Missing required field: {field}'
+
+    # Validate numeric fields
+    try:
+        quantity = int(data['quantity'])
+        price = float(data['price'])
+        supplier_id = int(data['supplier_id'])
+    except (ValueError, TypeError):
+        return None, 'Invalid numeric value'
+    if quantity < 0:
+        return None, 'Quantity must be non-negative'
+    if price < 0:
+        return None, 'Price must be non-negative'
+
+    # Validate dates
+    dates = {}
+    for field in ('mfg_date', 'exp_date'):
+        try:
+            dates[field] = _parse_date(data[field])
+        except (ValueError, TypeError):
+            return None, f'Invalid date for {field}: expected YYYY-MM-DD'
+
+    values = (
+        data['name'],
+        data['company'],
+        dates['mfg_date'],
+        dates['exp_date'],
+        quantity,
+        price,
+        supplier_id
+    )
+    return values, None
+
+
+BATCH_FIELDS = ['lot_number', 'mfg_date', 'exp_date', 'quantity']
+LOT_NUMBER_MAX_LENGTH = 50
+
+
+def validate_batch(data):
+    """
+    Check a lot payload.
+
+    Returns (values, None) with values in BATCH_FIELDS order, or
+    (None, error message).
+    """
+    if not isinstance(data, dict):
+        return None, 'Lot must be a JSON object'
+
+    for field in BATCH_FIELDS:
+        if field not in data:
+            return None, f'Missing required field: {field}'
+
+    lot_number = str(data['lot_number']).strip()
+    if not lot_number:
+        return None, 'lot_number must not be empty'
+    if len(lot_number) > LOT_NUMBER_MAX_LENGTH:
+        return None, f'lot_number is longer than {LOT_NUMBER_MAX_LENGTH} characters'
+
+    try:
+        quantity = int(data['quantity'])
+    except (ValueError, TypeError):
+        return None, 'Invalid numeric value'
+    if quantity < 1:
+        return None, 'Quantity must be positive'
+
+    dates = {}
+    for field in ('mfg_date', 'exp_date'):
+        try:
+            dates[field] = _parse_date(data[field])
+        except (ValueError, TypeError):
+            return None, f'Invalid date for {field}: expected YYYY-MM-DD'
+    if dates['exp_date'] < dates['mfg_date']:
+        return None, 'exp_date must not be before mfg_date'
+
+    return (lot_number, dates['mfg_date'], dates['exp_date'], quantity), None
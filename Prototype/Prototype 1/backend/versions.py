@@ -0,0 +1,73 @@
+"""
+Table change versions for Medical Storage Management System
+Write handlers bump a counter in table_versions inside their transaction; read
+endpoints turn the counters into ETags so unchanged data is answered with 304
+"""
+
+import hashlib
+import threading
+import time
+
+BUMP_VERSION = "UPDATE table_versions SET version = version + 1 WHERE table_name = %s"
+
+
+def bump_version(cursor, table):
+    """Mark ``table`` as changed; call before committing the write"""
+    cursor.execute(BUMP_VERSION, (table,))
+
+
+def make_etag(versions, tables, *parts):
+    """Strong ETag value for a representation built from ``tables`` plus request ``parts``"""
+    key = '|'.join([f'{table}:{versions[table][0]}' for table in tables] + [str(part) for part in parts])
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+
+class VersionTracker:
+    """
+    Process-wide snapshot of table_versions.
+
+    The snapshot is reloaded when older than ``max_age`` seconds, so a
+    conditional GET usually costs no query at all. Writes made by this
+    process call invalidate() so they are visible at once; writes from other
+    processes show up within ``max_age``. ``on_change(table)`` is called when a
+    reload finds more changes to a table than this process made itself.
+    """
+
+    def __init__(self, loader, max_age=1.0, on_change=None):
+        self.loader = loader
+        self.max_age = max_age
+        self.on_change = on_change
+        self._versions = None
+        self._loaded_at = None
+        self._local_writes = {}
+        self._lock = threading.Lock()
+
+    def invalidate(self, table):
+        """Record a committed local write to ``table`` and force the next get() to reload"""
+        with self._lock:
+            self._local_writes[table] = self._local_writes.get(table, 0) + 1
+            self._loaded_at = None
+
+    def get(self):
+        """{table: (version, updated_at)}, or None if the versions cannot be read"""
+        with self._lock:
+            if self._loaded_at is not None and time.monotonic() - self._loaded_at < self.max_age:
+                return self._versions
+        try:
+            versions = self.loader()
+        except Exception as e:
+            # Serve without validators until the next reload (e.g. table not migrated yet)
+            print(f"Error reading table versions: {e}")
+            with self._lock:
+                self._versions = None
+                self._loaded_at = time.monotonic()
+            return None
+        with self._lock:
+            previous, self._versions = self._versions, versions
+            local_writes, self._local_writes = self._local_writes, {}
+            self._loaded_at = time.monotonic()
+        if previous is not None and self.on_change is not None:
+            for table, (version, _) in versions.items():
+                if table in previous and version - previous[table][0] > local_writes.get(table, 0):
+                    self.on_change(table)
+        return versions
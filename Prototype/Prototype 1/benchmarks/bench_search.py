@@ -0,0 +1,144 @@
+"""
+Search latency benchmark: leading-wildcard LIKE vs FULLTEXT
+Seeds a scratch database with synthetic medicines and reports p50/p99 latency
+for the old LIKE query and the ranked FULLTEXT query used by /api/medicines/search.
+
+Usage: python benchmarks/bench_search.py [--rows 100000] [--queries 300]
+       [--database medvault_bench] [--keep]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(BASE_DIR, 'backend'))
+
+import mysql.connector
+from config import DB_CONFIG, SEARCH_CONFIG
+from search import search_hits
+from workload import STEMS, SUFFIXES, STRENGTHS, COMPANIES, make_suppliers, search_terms, percentile
+
+SCHEMA_FILE = os.path.join(BASE_DIR, 'database', 'schema.sql')
+
+LIKE_QUERY = """
+    SELECT m.*, s.supplier_name, s.contact_no
+    FROM medicines m
+    JOIN suppliers s ON m.supplier_id = s.supplier_id
+    WHERE m.name LIKE %s OR m.company LIKE %s OR s.supplier_name LIKE %s
+    ORDER BY m.name
+"""
+
+FULLTEXT_QUERY = """
+    SELECT m.*, s.supplier_name, s.contact_no, hits.relevance
+    FROM ({hits}) hits
+    JOIN medicines m ON m.medicine_id = hits.medicine_id
+    JOIN suppliers s ON m.supplier_id = s.supplier_id
+    ORDER BY hits.relevance DESC, m.name, m.medicine_id
+    LIMIT %s
+"""
+
+
+def schema_statements():
+    """CREATE TABLE statements from database/schema.sql (no sample data)"""
+    with open(SCHEMA_FILE, encoding='utf-8') as f:
+        lines = [line for line in f if not line.strip().startswith('--')]
+    statements = [stmt.strip() for stmt in ''.join(lines).split(';') if stmt.strip()]
+    return [stmt for stmt in statements if stmt.upper().startswith(('CREATE TABLE', 'DROP TABLE'))]
+
+
+def seed(cursor, rows, rng):
+    """Insert ``rows`` synthetic medicines spread over a few hundred suppliers"""
+    suppliers = make_suppliers(500, rng)
+    cursor.executemany("INSERT INTO suppliers (supplier_name, contact_no) VALUES (%s, %s)", suppliers)
+
+    batch = []
+    for _ in range(rows):
+        name = f"{rng.choice(STEMS)}{rng.choice(SUFFIXES)} {rng.choice(STRENGTHS)}".capitalize()
+        batch.append((name, rng.choice(COMPANIES), '2024-01-01', '2026-01-01',
+                      rng.randint(0, 1000), round(rng.uniform(1, 200), 2), rng.randint(1, len(suppliers))))
+        if len(batch) == 5000:
+            insert_medicines(cursor, batch)
+            batch = []
+    if batch:
+        insert_medicines(cursor, batch)
+
+
+def insert_medicines(cursor, batch):
+    cursor.executemany(
+        """INSERT INTO medicines (name, company, mfg_date, exp_date, quantity, price, supplier_id)
+           VALUES (%s, %s, %s, %s, %s, %s, %s)""",
+        batch
+    )
+
+
+def run_like(cursor, term):
+    pattern = f'%{term}%'
+    cursor.execute(LIKE_QUERY, (pattern, pattern, pattern))
+    return cursor.fetchall()
+
+
+def run_fulltext(cursor, term):
+    hits, params = search_hits(term)
+    cursor.execute(FULLTEXT_QUERY.format(hits=hits), params + [SEARCH_CONFIG['MAX_RESULTS']])
+    return cursor.fetchall()
+
+
+def measure(cursor, runner, terms):
+    timings = []
+    rows = 0
+    for term in terms:
+        started = time.perf_counter()
+        rows += len(runner(cursor, term))
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings, rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--queries', type=int, default=300)
+    parser.add_argument('--database', default='medvault_bench')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--keep', action='store_true', help='keep the scratch database afterwards')
+    args = parser.parse_args()
+
+    if args.database == DB_CONFIG['database']:
+        sys.exit("Refusing to benchmark against the application database; pick another --database")
+
+    rng = random.Random(args.seed)
+    config = {key: value for key, value in DB_CONFIG.items() if key != 'database'}
+    connection = mysql.connector.connect(**config)
+    cursor = connection.cursor()
+    try:
+        cursor.execute(f"CREATE DATABASE IF NOT EXISTS `{args.database}`")
+        cursor.execute(f"USE `{args.database}`")
+        for statement in schema_statements():
+            cursor.execute(statement)
+        print(f"Seeding {args.rows:,} medicines into {args.database}...")
+        seed(cursor, args.rows, rng)
+        connection.commit()
+        cursor.execute("ANALYZE TABLE medicines, suppliers")
+        cursor.fetchall()
+
+        terms = search_terms(args.queries, rng)
+        # Warm the buffer pool so both variants are measured from memory
+        measure(cursor, run_like, terms[:10])
+        measure(cursor, run_fulltext, terms[:10])
+
+        print(f"\n{'query':<10} {'p50 ms':>10} {'p99 ms':>10} {'max ms':>10} {'avg rows':>10}")
+        for label, runner in (('LIKE', run_like), ('FULLTEXT', run_fulltext)):
+            timings, rows = measure(cursor, runner, terms)
+            print(f"{label:<10} {percentile(timings, 50):>10.2f} {percentile(timings, 99):>10.2f} "
+                  f"{max(timings):>10.2f} {rows / len(terms):>10.1f}")
+    finally:
+        if not args.keep:
+            cursor.execute(f"DROP DATABASE IF EXISTS `{args.database}`")
+        cursor.close()
+        connection.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""
+Row serialization benchmark: per-row dict loop + jsonify vs column-wise serialize_rows()
+Builds synthetic medicine rows shaped like MySQL results (date, datetime and
+Decimal values) and times turning them into a JSON response body both ways.
+No database is needed.
+
+Usage: python benchmarks/bench_serialization.py [--rows 10000 100000] [--repeat 5]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(BASE_DIR, 'backend'))
+
+from flask import Flask, jsonify
+import serialization
+from serialization import serialize_date, serialize_datetime, serialize_rows, json_response
+
+COLUMNS = ('medicine_id', 'name', 'company', 'mfg_date', 'exp_date', 'quantity', 'price',
+           'supplier_id', 'created_at', 'updated_at', 'supplier_name', 'contact_no')
+
+
+def make_rows(count, rng):
+    """Tuples as a non-dictionary cursor returns them for GET /api/medicines"""
+    today = date(2025, 1, 1)
+    stamp = datetime(2025, 1, 1, 9, 30, 0)
+    rows = []
+    for i in range(1, count + 1):
+        mfg = today - timedelta(days=rng.randint(0, 700))
+        rows.append((
+            i, f"Medicine {i} {rng.choice(['5mg', '10mg', '500mg'])}", f"Company {i % 50}",
+            mfg, mfg + timedelta(days=rng.randint(30, 1500)), rng.randint(0, 1000),
+            Decimal(f"{rng.uniform(1, 500):.2f}"), i % 200 + 1,
+            stamp + timedelta(seconds=i), stamp + timedelta(seconds=2 * i),
+            f"Supplier {i % 200}", f"555-{i % 10000:04d}"
+        ))
+    return rows
+
+
+def old_path(app, rows):
+    """What the list endpoints did before: dictionary rows, four calls per row, jsonify"""
+    medicines = [dict(zip(COLUMNS, row)) for row in rows]
+    for medicine in medicines:
+        for field in ('mfg_date', 'exp_date'):
+            if field in medicine:
+                medicine[field] = serialize_date(medicine[field])
+        for field in ('created_at', 'updated_at'):
+            if field in medicine:
+                medicine[field] = serialize_datetime(medicine[field])
+    with app.app_context():
+        return jsonify(medicines).get_data()
+
+
+def new_path(app, rows):
+    """serialize_rows() column-wise conversion plus json_response()"""
+    return json_response(serialize_rows(COLUMNS, rows)).get_data()
+
+
+def best_of(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        body = func()
+        timings.append((time.perf_counter() - started) * 1000)
+    return min(timings), len(body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    rng = random.Random(args.seed)
+    backend = 'orjson' if serialization.orjson is not None else 'json (stdlib)'
+    print(f"JSON backend: {backend}; best of {args.repeat} runs\n")
+    print(f"{'rows':>8} {'old ms':>10} {'new ms':>10} {'speedup':>8} {'old KB':>10} {'new KB':>10}")
+    for count in args.rows:
+        rows = make_rows(count, rng)
+        old_ms, old_size = best_of(lambda: old_path(app, rows), args.repeat)
+        new_ms, new_size = best_of(lambda: new_path(app, rows), args.repeat)
+        print(f"{count:>8} {old_ms:>10.1f} {new_ms:>10.1f} {old_ms / new_ms:>7.1f}x "
+              f"{old_size / 1024:>10.0f} {new_size / 1024:>10.0f}")
+
+
+if __name__ == '__main__':
+    main()
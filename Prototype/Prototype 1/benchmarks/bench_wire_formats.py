@@ -0,0 +1,142 @@
+"""
+Wire format benchmark: plain JSON vs the columnar list formats, raw and compressed
+Encodes synthetic GET /api/medicines rows (see bench_serialization.py) in every
+list format, reports the body size raw, gzipped and brotli-compressed, the
+server's encode time, and the client's time to parse the body back into an
+array of objects. Client parsing is timed in Python and, when node is on PATH,
+with the decodeColumnarList() that frontend/js/app.js ships. No database is needed.
+
+Usage: python benchmarks/bench_wire_formats.py [--rows 1000 10000] [--repeat 5] [--no-node]
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(BASE_DIR, 'backend'))
+
+import compression
+import serialization
+from bench_serialization import COLUMNS, best_of, make_rows
+from config import COMPRESSION_CONFIG
+from serialization import (JSON_FORMAT, COLUMNAR_JSON_FORMAT, COLUMNAR_MSGPACK_FORMAT,
+                           LIST_FORMATS, encode_list)
+
+LABELS = {
+    JSON_FORMAT: 'json',
+    COLUMNAR_JSON_FORMAT: 'columnar json',
+    COLUMNAR_MSGPACK_FORMAT: 'columnar msgpack'
+}
+
+APP_JS = os.path.join(BASE_DIR, 'frontend', 'js', 'app.js')
+
+# Times JSON.parse alone and JSON.parse + decodeColumnarList() on each file
+NODE_SCRIPT = """
+const fs = require('fs');
+const [decoderSource, repeatArg, filesArg] = process.argv.slice(-3);
+const decodeColumnarList = new Function(decoderSource + '\\nreturn decodeColumnarList;')();
+const repeat = Number(repeatArg);
+for (const [path, columnar] of JSON.parse(filesArg)) {
+    const text = fs.readFileSync(path, 'utf8');
+    let best = Infinity;
+    for (let i = 0; i < repeat; i++) {
+        const started = process.hrtime.bigint();
+        const body = JSON.parse(text);
+        const items = columnar ? decodeColumnarList(body) : body;
+        best = Math.min(best, Number(process.hrtime.bigint() - started) / 1e6);
+        if (!items.length) throw new Error('empty list');
+    }
+    console.log(best.toFixed(2));
+}
+"""
+
+
+def decode_columnar(document):
+    """Python equivalent of decodeColumnarList() in frontend/js/app.js"""
+    columns = document['columns']
+    items = [dict(zip(columns, row)) for row in document['rows']]
+    if 'suppliers' in document:
+        side = document['suppliers']['columns'][1:]
+        suppliers = {row[0]: dict(zip(side, row[1:])) for row in document['suppliers']['rows']}
+        for item in items:
+            item.update(suppliers[item['supplier_id']])
+    return items
+
+
+def python_decoder(list_format):
+    if list_format == JSON_FORMAT:
+        return json.loads
+    if list_format == COLUMNAR_MSGPACK_FORMAT:
+        return lambda body: decode_columnar(serialization.msgpack.unpackb(body))
+    return lambda body: decode_columnar(json.loads(body))
+
+
+def node_timings(bodies, repeat):
+    """Client parse ms per JSON-based format under node, or {} when unavailable"""
+    node = shutil.which('node')
+    if node is None:
+        return {}
+    with open(APP_JS, encoding='utf-8') as f:
+        decoder = re.search(r'function decodeColumnarList[\s\S]*?\n}\n', f.read()).group(0)
+    formats = [fmt for fmt in bodies if fmt != COLUMNAR_MSGPACK_FORMAT]
+    with tempfile.TemporaryDirectory() as tmp:
+        files = []
+        for i, fmt in enumerate(formats):
+            path = os.path.join(tmp, f'{i}.json')
+            with open(path, 'wb') as f:
+                f.write(bodies[fmt])
+            files.append((path, fmt != JSON_FORMAT))
+        output = subprocess.run([node, '-e', NODE_SCRIPT, decoder, str(repeat), json.dumps(files)],
+                                check=True, capture_output=True, text=True).stdout
+    return dict(zip(formats, (float(line) for line in output.split())))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[1000, 10000])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--no-node', action='store_true', help='skip the node client timings')
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    backend = 'orjson' if serialization.orjson is not None else 'json (stdlib)'
+    skipped = [name for name, module in (('msgpack', serialization.msgpack), ('brotli', compression.brotli))
+               if module is None]
+    print(f"JSON backend: {backend}; best of {args.repeat} runs")
+    if skipped:
+        print(f"Not installed, skipped: {', '.join(skipped)}")
+    print()
+    print(f"{'rows':>7} {'format':<17} {'raw KB':>8} {'gzip KB':>8} {'br KB':>8} "
+          f"{'encode ms':>10} {'py parse ms':>12} {'node parse ms':>14}")
+    for count in args.rows:
+        rows = make_rows(count, rng)
+        bodies = {}
+        results = []
+        for fmt in LIST_FORMATS:
+            encode_ms, _ = best_of(lambda: encode_list(COLUMNS, rows, COLUMNS, fmt), args.repeat)
+            body = bodies[fmt] = encode_list(COLUMNS, rows, COLUMNS, fmt)
+            decode = python_decoder(fmt)
+            parse_ms, _ = best_of(lambda: decode(body), args.repeat)
+            sizes = [len(body), len(compression.compress(body, 'gzip', COMPRESSION_CONFIG))]
+            if compression.brotli is not None:
+                sizes.append(len(compression.compress(body, 'br', COMPRESSION_CONFIG)))
+            results.append((fmt, sizes, encode_ms, parse_ms))
+        node = {} if args.no_node else node_timings(bodies, args.repeat)
+        for fmt, sizes, encode_ms, parse_ms in results:
+            raw, gz = sizes[0] / 1024, sizes[1] / 1024
+            br = f"{sizes[2] / 1024:>8.0f}" if len(sizes) > 2 else f"{'-':>8}"
+            node_ms = f"{node[fmt]:>14.1f}" if fmt in node else f"{'-':>14}"
+            print(f"{count:>7} {LABELS[fmt]:<17} {raw:>8.0f} {gz:>8.0f} {br} "
+                  f"{encode_ms:>10.1f} {parse_ms:>12.1f} {node_ms}")
+
+
+if __name__ == '__main__':
+    main()
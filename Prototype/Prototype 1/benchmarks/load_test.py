@@ -0,0 +1,286 @@
+"""
+Load driver for the REST API
+Runs --concurrency workers against a running server for --duration seconds
+with a seeded mix of reads (list pages, single medicines, search, expiry list,
+stats, suppliers) and writes (updates and inserts), then reports throughput
+and p50/p95/p99 latency per request type.
+
+Usage: python benchmarks/load_test.py [--url http://127.0.0.1:5000/api | --sqlite bench.sqlite3]
+       [--duration 30] [--warmup 5] [--concurrency 16] [--write-ratio 0.1]
+       [--seed 42] [--json report.json]
+
+Seed the database first with seed_inventory.py. With --sqlite the API is
+started on that file (STORAGE_BACKEND=sqlite) and stopped afterwards.
+"""
+
+import argparse
+import http.client
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from urllib.parse import quote, urlsplit
+
+from workload import make_medicine, search_terms, percentile
+
+# Relative weights within reads and within writes
+READ_MIX = {
+    'list_page': 30,
+    'get_medicine': 30,
+    'search': 15,
+    'expiring': 10,
+    'suppliers': 10,
+    'stats': 5
+}
+WRITE_MIX = {
+    'update_medicine': 80,
+    'add_medicine': 20
+}
+
+PAGE_SIZE = 50
+EXPIRY_WINDOWS = (7, 30, 90)
+
+
+class Client:
+    """Keep-alive HTTP client for one worker; reconnects once if the server closed the socket"""
+
+    def __init__(self, base_url, timeout=60):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.prefix = parts.path.rstrip('/')
+        self.timeout = timeout
+        self._connection = None
+
+    def request(self, method, path, body=None):
+        """Returns (status, headers, body bytes)"""
+        payload = json.dumps(body).encode('utf-8') if body is not None else None
+        headers = {'Content-Type': 'application/json'} if payload is not None else {}
+        for attempt in range(2):
+            try:
+                if self._connection is None:
+                    self._connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+                self._connection.request(method, self.prefix + path, payload, headers)
+                response = self._connection.getresponse()
+                data = response.read()
+                if response.will_close:
+                    self.close()
+                return response.status, response.headers, data
+            except (http.client.HTTPException, OSError):
+                self.close()
+                if attempt:
+                    raise
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+
+class Worker(threading.Thread):
+    """Issues requests until the deadline and keeps its own latency samples"""
+
+    def __init__(self, index, args, inventory, start_at, record_from, stop_at):
+        super().__init__(name=f'load-worker-{index}', daemon=True)
+        self.args = args
+        self.inventory = inventory
+        self.rng = random.Random(args.seed * 1000 + index)
+        self.client = Client(args.url)
+        self.start_at = start_at
+        self.record_from = record_from
+        self.stop_at = stop_at
+        self.samples = {}
+        self.errors = {}
+        self.page_cursor = None
+        self.terms = search_terms(200, self.rng)
+
+    def pick(self):
+        mix = WRITE_MIX if self.rng.random() < self.args.write_ratio else READ_MIX
+        return self.rng.choices(list(mix), weights=list(mix.values()))[0]
+
+    def medicine_payload(self):
+        name, company, mfg_date, exp_date, quantity, price, supplier_id = make_medicine(
+            self.rng, self.inventory['suppliers']
+        )
+        return {'name': name, 'company': company, 'mfg_date': mfg_date, 'exp_date': exp_date,
+                'quantity': quantity, 'price': price, 'supplier_id': supplier_id}
+
+    def call(self, scenario):
+        """Run one request of type ``scenario``; returns True on a 2xx/304 response"""
+        rng = self.rng
+        if scenario == 'list_page':
+            path = f'/medicines?limit={PAGE_SIZE}'
+            if self.page_cursor:
+                path += f'&cursor={self.page_cursor}'
+            status, headers, _ = self.client.request('GET', path)
+            self.page_cursor = headers.get('X-Next-Cursor')
+        elif scenario == 'get_medicine':
+            status, _, _ = self.client.request('GET', f"/medicines/{rng.randint(1, self.inventory['medicines'])}")
+        elif scenario == 'search':
+            status, _, _ = self.client.request('GET', f'/medicines/search?q={quote(rng.choice(self.terms))}')
+        elif scenario == 'expiring':
+            status, _, _ = self.client.request(
+                'GET', f'/medicines/expiring?days={rng.choice(EXPIRY_WINDOWS)}&limit={PAGE_SIZE}'
+            )
+        elif scenario == 'suppliers':
+            status, _, _ = self.client.request('GET', '/suppliers')
+        elif scenario == 'stats':
+            status, _, _ = self.client.request('GET', '/stats')
+        elif scenario == 'update_medicine':
+            status, _, _ = self.client.request(
+                'PUT', f"/medicines/{rng.randint(1, self.inventory['medicines'])}", self.medicine_payload()
+            )
+        else:
+            status, _, _ = self.client.request('POST', '/medicines', self.medicine_payload())
+        return 200 <= status < 300 or status == 304
+
+    def run(self):
+        while time.perf_counter() < self.start_at:
+            time.sleep(0.001)
+        try:
+            while True:
+                started = time.perf_counter()
+                if started >= self.stop_at:
+                    break
+                scenario = self.pick()
+                try:
+                    ok = self.call(scenario)
+                except (http.client.HTTPException, OSError):
+                    ok = False
+                elapsed = (time.perf_counter() - started) * 1000
+                if started >= self.record_from:
+                    self.samples.setdefault(scenario, []).append(elapsed)
+                    if not ok:
+                        self.errors[scenario] = self.errors.get(scenario, 0) + 1
+        finally:
+            self.client.close()
+
+
+def discover_inventory(url):
+    """Medicine and supplier counts, used to pick valid ids for reads and writes"""
+    client = Client(url)
+    try:
+        status, _, body = client.request('GET', '/stats')
+        if status != 200:
+            sys.exit(f"GET /stats returned {status}; is the database seeded?")
+        medicines = json.loads(body)['total_medicines']
+        status, _, body = client.request('GET', '/suppliers?fields=supplier_id')
+        suppliers = len(json.loads(body))
+    finally:
+        client.close()
+    if not medicines or not suppliers:
+        sys.exit("The database is empty; seed it with benchmarks/seed_inventory.py first")
+    return {'medicines': medicines, 'suppliers': suppliers}
+
+
+def summarize(workers, duration):
+    """Per-scenario and overall throughput and latency percentiles"""
+    samples, errors = {}, {}
+    for worker in workers:
+        for scenario, timings in worker.samples.items():
+            samples.setdefault(scenario, []).extend(timings)
+        for scenario, count in worker.errors.items():
+            errors[scenario] = errors.get(scenario, 0) + count
+    samples['total'] = [timing for scenario in list(samples) for timing in samples[scenario]]
+    errors['total'] = sum(errors.values())
+
+    report = {}
+    for scenario, timings in samples.items():
+        if not timings:
+            continue
+        report[scenario] = {
+            'requests': len(timings),
+            'errors': errors.get(scenario, 0),
+            'throughput': round(len(timings) / duration, 1),
+            'p50_ms': round(percentile(timings, 50), 2),
+            'p95_ms': round(percentile(timings, 95), 2),
+            'p99_ms': round(percentile(timings, 99), 2),
+            'max_ms': round(max(timings), 2)
+        }
+    return report
+
+
+def print_report(report):
+    print(f"\n{'request':<16} {'count':>8} {'errors':>7} {'req/s':>9} "
+          f"{'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for scenario, row in report.items():
+        print(f"{scenario:<16} {row['requests']:>8} {row['errors']:>7} {row['throughput']:>9.1f} "
+              f"{row['p50_ms']:>9.2f} {row['p95_ms']:>9.2f} {row['p99_ms']:>9.2f} {row['max_ms']:>9.2f}")
+
+
+def start_sqlite_server(database):
+    """Start the API on a SQLite file and a free port; returns (process, base url)"""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    backend = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend')
+    env = dict(os.environ, STORAGE_BACKEND='sqlite', SQLITE_PATH=database, FLASK_HOST='127.0.0.1',
+               FLASK_PORT=str(port), FLASK_DEBUG='False')
+    process = subprocess.Popen([sys.executable, 'app.py'], cwd=backend, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f'http://127.0.0.1:{port}/api'
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            sys.exit("The API server exited during startup")
+        try:
+            client = Client(url, timeout=5)
+            client.request('GET', '/health')
+            client.close()
+            return process, url
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    sys.exit("The API server did not start within 60 seconds")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument('--url', default='http://127.0.0.1:5000/api', help='API base URL')
+    target.add_argument('--sqlite', help='start the API on this seeded SQLite file and test it')
+    parser.add_argument('--duration', type=float, default=30, help='measured seconds')
+    parser.add_argument('--warmup', type=float, default=5, help='unmeasured seconds before that')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--write-ratio', type=float, default=0.1, help='fraction of requests that write')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--json', help='also write the report to this file')
+    args = parser.parse_args()
+
+    process = None
+    if args.sqlite:
+        process, args.url = start_sqlite_server(os.path.abspath(args.sqlite))
+    try:
+        inventory = discover_inventory(args.url)
+        print(f"Target {args.url}: {inventory['medicines']:,} medicines, {inventory['suppliers']:,} suppliers")
+        print(f"{args.concurrency} workers, {args.write_ratio:.0%} writes, "
+              f"{args.warmup:g}s warm-up + {args.duration:g}s measured, seed {args.seed}")
+
+        start_at = time.perf_counter() + 0.5
+        record_from = start_at + args.warmup
+        stop_at = record_from + args.duration
+        workers = [Worker(i, args, inventory, start_at, record_from, stop_at) for i in range(args.concurrency)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    report = summarize(workers, args.duration)
+    print_report(report)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'config': {key: value for key, value in vars(args).items() if key != 'json'},
+                       'inventory': inventory, 'results': report}, f, indent=2)
+        print(f"\nReport written to {args.json}")
+
+
+if __name__ == '__main__':
+    main()
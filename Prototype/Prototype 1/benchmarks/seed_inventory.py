@@ -0,0 +1,130 @@
+"""
+Seed a benchmark database with a synthetic inventory
+Generates --medicines rows (10k to 1M) across --suppliers suppliers from a
+fixed --seed and bulk-loads them into a scratch MySQL database or a SQLite
+file for the embedded storage backend. Point the API at it and run load_test.py.
+
+Usage: python benchmarks/seed_inventory.py --medicines 100000 [--suppliers 2000]
+       [--seed 42] (--database medvault_bench | --sqlite bench.sqlite3)
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(BASE_DIR, 'backend'))
+
+from workload import make_suppliers, iter_medicine_batches
+
+SCHEMA_FILE = os.path.join(BASE_DIR, 'database', 'schema.sql')
+
+INSERT_SUPPLIER = "INSERT INTO suppliers (supplier_name, contact_no) VALUES (%s, %s)"
+INSERT_MEDICINE = """
+    INSERT INTO medicines (name, company, mfg_date, exp_date, quantity, price, supplier_id)
+    VALUES (%s, %s, %s, %s, %s, %s, %s)
+"""
+# Lots are the stock: each seeded quantity becomes its medicine's UNLOTTED lot
+OPENING_LOTS = """
+    INSERT INTO medicine_batches (medicine_id, lot_number, mfg_date, exp_date, quantity)
+    SELECT medicine_id, 'UNLOTTED', mfg_date, exp_date, quantity FROM medicines
+    WHERE medicine_id > %s AND quantity > 0
+"""
+
+
+def schema_statements():
+    """Table definitions and table_versions rows from database/schema.sql (no sample data)"""
+    with open(SCHEMA_FILE, encoding='utf-8') as f:
+        lines = [line for line in f if not line.strip().startswith('--')]
+    statements = [stmt.strip() for stmt in ''.join(lines).split(';') if stmt.strip()]
+    return [stmt for stmt in statements
+            if stmt.upper().startswith(('CREATE TABLE', 'DROP TABLE', 'INSERT INTO TABLE_VERSIONS'))]
+
+
+def load(connection, cursor, args, rng):
+    """Insert suppliers then medicines and their UNLOTTED lots in batches, committing once per batch"""
+    cursor.executemany(INSERT_SUPPLIER, make_suppliers(args.suppliers, rng))
+    connection.commit()
+    loaded = 0
+    cursor.execute("SELECT COALESCE(MAX(medicine_id), 0) FROM medicines")
+    last_id = cursor.fetchone()[0]
+    for batch in iter_medicine_batches(args.medicines, args.suppliers, rng, args.batch_size):
+        cursor.executemany(INSERT_MEDICINE, batch)
+        cursor.execute(OPENING_LOTS, (last_id,))
+        cursor.execute("SELECT MAX(medicine_id) FROM medicines")
+        last_id = cursor.fetchone()[0]
+        connection.commit()
+        loaded += len(batch)
+        print(f"\r  {loaded:,} / {args.medicines:,} medicines", end='', flush=True)
+    print()
+
+
+def seed_mysql(args, rng):
+    import mysql.connector
+    from config import DB_CONFIG
+
+    if args.database == DB_CONFIG['database']:
+        sys.exit("Refusing to seed the application database; pick another --database")
+    config = {key: value for key, value in DB_CONFIG.items() if key != 'database'}
+    connection = mysql.connector.connect(**config)
+    cursor = connection.cursor()
+    try:
+        cursor.execute(f"CREATE DATABASE IF NOT EXISTS `{args.database}`")
+        cursor.execute(f"USE `{args.database}`")
+        for statement in schema_statements():
+            cursor.execute(statement)
+        # Generated rows are known to be valid; skip per-row checks during the load
+        cursor.execute("SET unique_checks = 0, foreign_key_checks = 0")
+        load(connection, cursor, args, rng)
+        cursor.execute("SET unique_checks = 1, foreign_key_checks = 1")
+        cursor.execute("ANALYZE TABLE medicines, suppliers")
+        cursor.fetchall()
+    finally:
+        cursor.close()
+        connection.close()
+    print(f"Start the API with DB_NAME={args.database} to benchmark it")
+
+
+def seed_sqlite(args, rng):
+    from storage import SQLiteStorage
+
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(args.sqlite + suffix):
+            os.remove(args.sqlite + suffix)
+    connection = SQLiteStorage(args.sqlite).connect()
+    cursor = connection.cursor()
+    try:
+        load(connection, cursor, args, rng)
+        cursor.execute("ANALYZE")
+    finally:
+        cursor.close()
+        connection.close()
+    print(f"Start the API with STORAGE_BACKEND=sqlite SQLITE_PATH={os.path.abspath(args.sqlite)} "
+          f"to benchmark it")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--medicines', type=int, default=100000)
+    parser.add_argument('--suppliers', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--batch-size', type=int, default=5000)
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('--database', help='scratch MySQL database (recreated)')
+    target.add_argument('--sqlite', help='SQLite file for STORAGE_BACKEND=sqlite (recreated)')
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    started = time.perf_counter()
+    print(f"Seeding {args.medicines:,} medicines across {args.suppliers:,} suppliers (seed {args.seed})")
+    if args.sqlite:
+        seed_sqlite(args, rng)
+    else:
+        seed_mysql(args, rng)
+    print(f"Done in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
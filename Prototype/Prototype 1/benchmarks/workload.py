@@ -0,0 +1,76 @@
+"""
+Synthetic inventory data shared by the benchmarks
+Seeded generators for suppliers, medicines and search terms, so a run with the
+same --seed always produces the same rows and the same request mix.
+"""
+
+from datetime import date, timedelta
+
+STEMS = ['para', 'amoxi', 'ibu', 'aspi', 'ceti', 'ome', 'atorva', 'metfor', 'cipro',
+         'azithro', 'losar', 'panto', 'amlo', 'levo', 'clopi', 'dox', 'fluco', 'predni']
+SUFFIXES = ['cetamol', 'cillin', 'profen', 'rin', 'rizine', 'prazole', 'statin',
+            'min', 'floxacin', 'mycin', 'tan', 'dipine', 'thyroxine', 'dogrel', 'zole']
+STRENGTHS = ['5mg', '10mg', '20mg', '50mg', '100mg', '250mg', '400mg', '500mg']
+COMPANIES = ['PharmaCorp', 'MediCare Labs', 'HealthPlus', 'Global Meds', 'Apex Biotech',
+             'Sunrise Pharma', 'Novalis', 'Zenith Drugs', 'Orion Health', 'Vertex Remedies']
+SUPPLIER_WORDS = ['Med', 'Pharma', 'Health', 'Care', 'Global', 'City', 'Rural', 'Prime']
+
+
+def make_suppliers(count, rng):
+    """(supplier_name, contact_no) tuples; supplier ids will be 1..count"""
+    return [
+        (f"{rng.choice(SUPPLIER_WORDS)} {rng.choice(SUPPLIER_WORDS)} Supplies {i}", f"555-{i % 10000:04d}")
+        for i in range(1, count + 1)
+    ]
+
+
+def make_medicine(rng, supplier_count, today=None):
+    """
+    One (name, company, mfg_date, exp_date, quantity, price, supplier_id) tuple.
+
+    Expiry dates run from two months ago to about three years ahead, so the
+    expired and 7/30/90-day buckets all have rows; about 10% are low stock.
+    """
+    today = today or date.today()
+    name = f"{rng.choice(STEMS)}{rng.choice(SUFFIXES)} {rng.choice(STRENGTHS)}".capitalize()
+    exp_date = today + timedelta(days=rng.randint(-60, 1100))
+    mfg_date = exp_date - timedelta(days=rng.randint(365, 1095))
+    quantity = rng.randint(0, 49) if rng.random() < 0.1 else rng.randint(50, 2000)
+    return (name, rng.choice(COMPANIES), mfg_date.isoformat(), exp_date.isoformat(), quantity,
+            round(rng.uniform(1, 500), 2), rng.randint(1, supplier_count))
+
+
+def iter_medicine_batches(count, supplier_count, rng, batch_size=5000, today=None):
+    """Yield ``count`` generated medicines in lists of at most ``batch_size``"""
+    batch = []
+    for _ in range(count):
+        batch.append(make_medicine(rng, supplier_count, today))
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def search_terms(count, rng):
+    """Mix of the inputs search_medicine.html sends: word prefixes, full names, companies"""
+    terms = []
+    for _ in range(count):
+        kind = rng.random()
+        if kind < 0.4:
+            word = rng.choice(STEMS) + rng.choice(SUFFIXES)
+            terms.append(word[:rng.randint(3, len(word))])
+        elif kind < 0.7:
+            terms.append(f"{rng.choice(STEMS)}{rng.choice(SUFFIXES)} {rng.choice(STRENGTHS)}")
+        elif kind < 0.9:
+            terms.append(rng.choice(COMPANIES))
+        else:
+            terms.append(rng.choice(SUPPLIER_WORDS))
+    return terms
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a non-empty list"""
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[index]
@@ -0,0 +1,42 @@
+"""
+Asset Build Script for Medical Storage Management System
+Minifies and fingerprints the frontend's CSS and JavaScript, writes gzip (and,
+with the brotli package, Brotli) copies of every text file and rewrites the
+pages to the fingerprinted names. The API serves the result from
+ASSETS_BUILD_DIR at http://localhost:5000/.
+
+Usage: python build_assets.py
+
+Run it again after changing anything in frontend/; restart the API to pick up
+the new build.
+"""
+
+import os
+import sys
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BASE_DIR, 'backend'))
+
+from assets import brotli, build_assets
+from config import ASSETS_CONFIG
+
+
+def main():
+    source_dir, build_dir = ASSETS_CONFIG['SOURCE_DIR'], ASSETS_CONFIG['BUILD_DIR']
+    try:
+        manifest = build_assets(source_dir, build_dir)
+    except (OSError, ValueError) as e:
+        print(f"✗ Asset build failed: {e}")
+        return 1
+
+    for logical, built in sorted(manifest.items()):
+        before = os.path.getsize(os.path.join(source_dir, logical))
+        after = os.path.getsize(os.path.join(build_dir, built))
+        print(f"  {logical} -> {built} ({before:,} -> {after:,} bytes)")
+    variants = 'gzip and Brotli' if brotli is not None else 'gzip (pip install brotli for .br)'
+    print(f"✓ Built {len(manifest)} asset(s) into {build_dir} with {variants} copies")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
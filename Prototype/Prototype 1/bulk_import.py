@@ -0,0 +1,128 @@
+"""
+Bulk Import Script for Medical Storage Management System
+Loads medicines from a CSV, JSON array or NDJSON file using the same
+validation as POST /api/medicines/bulk.
+
+Usage: python bulk_import.py <file.csv|file.json|file.ndjson> [--batch-size 1000]
+       [--skip-invalid] [--load-data]
+
+--load-data writes each validated batch to a temporary CSV file and loads it
+with LOAD DATA LOCAL INFILE, which is much faster than INSERT for large files.
+The MySQL server must have local_infile enabled.
+
+Rows go to the configured storage backend, so STORAGE_BACKEND=sqlite imports
+into the embedded database file (--load-data is MySQL only).
+"""
+
+import argparse
+import csv
+import os
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BASE_DIR, 'backend'))
+
+from bulk import BulkFormatError, iter_records, import_medicines
+from config import DB_CONFIG, STORAGE_CONFIG, BULK_CONFIG
+from storage import Error, create_storage
+
+EXTENSIONS = {
+    '.json': 'json',
+    '.ndjson': 'ndjson',
+    '.jsonl': 'ndjson',
+    '.csv': 'csv'
+}
+
+LOAD_DATA_QUERY = """
+    LOAD DATA LOCAL INFILE %s INTO TABLE medicines
+    CHARACTER SET utf8mb4
+    FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '"' ESCAPED BY ''
+    LINES TERMINATED BY '\\n'
+    (name, company, mfg_date, exp_date, quantity, price, supplier_id)
+"""
+
+
+def load_data_batch(cursor, rows):
+    """Insert one batch through a temporary CSV file and LOAD DATA LOCAL INFILE"""
+    handle, path = tempfile.mkstemp(suffix='.csv')
+    try:
+        with os.fdopen(handle, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f, quoting=csv.QUOTE_ALL, lineterminator='\n')
+            writer.writerows(rows)
+        cursor.execute(LOAD_DATA_QUERY, (path,))
+    finally:
+        os.remove(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Bulk-load medicines into MedVault')
+    parser.add_argument('file', help='CSV, JSON array or NDJSON file')
+    parser.add_argument('--format', choices=sorted(set(EXTENSIONS.values())),
+                        help='input format (default: from the file extension)')
+    parser.add_argument('--batch-size', type=int, default=None,
+                        help='rows per INSERT batch (default: BULK_BATCH_SIZE, 50000 with --load-data)')
+    parser.add_argument('--skip-invalid', action='store_true',
+                        help='import the valid rows even if some rows are invalid')
+    parser.add_argument('--load-data', action='store_true',
+                        help='use LOAD DATA LOCAL INFILE instead of INSERT')
+    args = parser.parse_args()
+
+    fmt = args.format or EXTENSIONS.get(os.path.splitext(args.file)[1].lower())
+    if fmt is None:
+        print("✗ Cannot tell the format from the file extension; pass --format")
+        return 1
+    batch_size = args.batch_size or (50000 if args.load_data else BULK_CONFIG['BATCH_SIZE'])
+    if args.load_data and STORAGE_CONFIG['BACKEND'] != 'mysql':
+        print("✗ --load-data needs STORAGE_BACKEND=mysql")
+        return 1
+
+    config = dict(DB_CONFIG)
+    if args.load_data:
+        config['allow_local_infile'] = True
+
+    try:
+        connection = create_storage(STORAGE_CONFIG, config).connect()
+    except Error as e:
+        print(f"✗ Error connecting to the database: {e}")
+        return 1
+
+    started = time.perf_counter()
+    try:
+        with open(args.file, 'rb') as f:
+            summary = import_medicines(
+                connection,
+                iter_records(f, fmt),
+                batch_size=batch_size,
+                skip_invalid=args.skip_invalid,
+                max_errors=BULK_CONFIG['MAX_ERRORS'],
+                insert_batch=load_data_batch if args.load_data else None
+            )
+    except (BulkFormatError,) + Error as e:
+        print(f"✗ Import failed: {e}")
+        return 1
+    finally:
+        connection.close()
+    elapsed = time.perf_counter() - started
+
+    for error in summary['errors']:
+        print(f"  row {error['row']}: {error['error']}")
+    if summary['failed'] > len(summary['errors']):
+        print(f"  ... and {summary['failed'] - len(summary['errors'])} more invalid row(s)")
+
+    if not summary['committed']:
+        print(f"✗ {summary['failed']} of {summary['received']} row(s) invalid; nothing was imported")
+        print("  Fix the rows above or rerun with --skip-invalid")
+        return 1
+
+    rate = summary['inserted'] / elapsed if elapsed > 0 else 0
+    print(f"✓ Imported {summary['inserted']} of {summary['received']} row(s) "
+          f"in {elapsed:.2f}s ({rate:.0f} rows/s)")
+    if summary['failed']:
+        print(f"  Skipped {summary['failed']} invalid row(s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
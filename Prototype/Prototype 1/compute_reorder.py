@@ -0,0 +1,54 @@
+"""
+Reorder Point Script for Medical Storage Management System
+Recomputes consumption rates, days of cover and reorder points from the stock
+movement ledger, the same job the API runs every REORDER_INTERVAL seconds.
+
+Usage: python compute_reorder.py [--full]
+
+Schedule this from cron and set REORDER_INTERVAL=0 when several API workers
+would otherwise each run the job. Without --full only medicines changed since
+the previous run are recomputed, plus a full run every REORDER_FULL_INTERVAL.
+"""
+
+import argparse
+import os
+import sys
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BASE_DIR, 'backend'))
+
+from config import DB_CONFIG, STORAGE_CONFIG, REORDER_CONFIG
+from reorder import numpy, run_reorder
+from storage import Error, create_storage
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Recompute MedVault reorder points')
+    parser.add_argument('--full', action='store_true',
+                        help='recompute every medicine, not only those changed since the last run')
+    args = parser.parse_args()
+
+    try:
+        store = create_storage(STORAGE_CONFIG, DB_CONFIG)
+        connection = store.connect()
+    except Error as e:
+        print(f"✗ Error connecting to the database: {e}")
+        return 1
+
+    try:
+        summary = run_reorder(store, connection, REORDER_CONFIG, full=args.full)
+    except Error as e:
+        print(f"✗ Reorder run failed: {e}")
+        return 1
+    finally:
+        connection.close()
+
+    kind = 'Full' if summary['full_run'] else 'Incremental'
+    engine = 'NumPy' if numpy is not None else 'pure Python; pip install -r backend/requirements.txt for NumPy'
+    print(f"✓ {kind} run: {summary['medicines']:,} medicine(s), {summary['due']:,} at or below "
+          f"their reorder point ({summary['seconds']:.2f}s, {engine})")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
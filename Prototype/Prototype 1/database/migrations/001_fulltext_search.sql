@@ -0,0 +1,8 @@
+-- Migration 001: FULLTEXT indexes for medicine search
+-- Lets /api/medicines/search use ranked MATCH ... AGAINST lookups instead of
+-- leading-wildcard LIKE scans, which cannot use idx_name/idx_company.
+
+USE medvault_db;
+
+ALTER TABLE medicines ADD FULLTEXT INDEX ft_medicine_search (name, company);
+ALTER TABLE suppliers ADD FULLTEXT INDEX ft_supplier_search (supplier_name);
@@ -0,0 +1,14 @@
+-- Migration 002: per-table change versions for conditional GETs
+-- Write handlers bump a table's version in the same transaction as the write.
+-- The API derives ETags from these rows and answers If-None-Match with 304
+-- without running the list query.
+
+USE medvault_db;
+
+CREATE TABLE IF NOT EXISTS table_versions (
+    table_name VARCHAR(64) PRIMARY KEY,
+    version BIGINT UNSIGNED NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+INSERT IGNORE INTO table_versions (table_name) VALUES ('medicines'), ('suppliers');
@@ -0,0 +1,15 @@
+-- Migration 003: stock movement ledger
+-- POST /api/medicines/movements changes quantities with atomic deltas and
+-- records every movement here in the same transaction.
+
+USE medvault_db;
+
+CREATE TABLE IF NOT EXISTS stock_movements (
+    movement_id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    medicine_id INT NOT NULL,
+    delta INT NOT NULL,
+    reason VARCHAR(50) NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (medicine_id) REFERENCES medicines(medicine_id) ON DELETE CASCADE,
+    INDEX idx_movement_medicine (medicine_id, movement_id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
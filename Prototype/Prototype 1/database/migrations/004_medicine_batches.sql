@@ -0,0 +1,33 @@
+-- Migration 004: lot tracking for first-expiry-first-out dispensing
+-- Each row is one lot of a medicine. POST /api/medicines/dispense reads a
+-- medicine's lots in (medicine_id, exp_date) order from idx_batch_fefo.
+-- Lots are the stock: medicines.quantity is kept equal to the sum of its lots,
+-- and stock without a lot number is held in the medicine's UNLOTTED lot.
+
+USE medvault_db;
+
+CREATE TABLE IF NOT EXISTS medicine_batches (
+    batch_id INT AUTO_INCREMENT PRIMARY KEY,
+    medicine_id INT NOT NULL,
+    lot_number VARCHAR(50) NOT NULL,
+    mfg_date DATE NOT NULL,
+    exp_date DATE NOT NULL,
+    quantity INT NOT NULL CHECK (quantity >= 0),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    FOREIGN KEY (medicine_id) REFERENCES medicines(medicine_id) ON DELETE CASCADE,
+    UNIQUE KEY uq_batch_lot (medicine_id, lot_number),
+    INDEX idx_batch_fefo (medicine_id, exp_date)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- Opening lots: quantity that no lot accounts for becomes the UNLOTTED lot,
+-- and a quantity below its lots is raised to match them
+INSERT INTO medicine_batches (medicine_id, lot_number, mfg_date, exp_date, quantity)
+SELECT m.medicine_id, 'UNLOTTED', m.mfg_date, m.exp_date,
+       m.quantity - COALESCE((SELECT SUM(b.quantity) FROM medicine_batches b WHERE b.medicine_id = m.medicine_id), 0)
+FROM medicines m
+WHERE m.quantity > COALESCE((SELECT SUM(b.quantity) FROM medicine_batches b WHERE b.medicine_id = m.medicine_id), 0)
+  AND NOT EXISTS (SELECT 1 FROM medicine_batches u WHERE u.medicine_id = m.medicine_id AND u.lot_number = 'UNLOTTED');
+UPDATE medicines
+SET quantity = (SELECT SUM(b.quantity) FROM medicine_batches b WHERE b.medicine_id = medicines.medicine_id)
+WHERE quantity < COALESCE((SELECT SUM(b.quantity) FROM medicine_batches b WHERE b.medicine_id = medicines.medicine_id), 0);
@@ -0,0 +1,33 @@
+-- Migration 005: precomputed reorder points
+-- The reorder job (backend/reorder.py) derives consumption rates from the
+-- stock_movements ledger and stores one row per medicine in reorder_points;
+-- reorder_runs records each run so the next one only revisits medicines
+-- changed since then.
+
+USE medvault_db;
+
+-- Covers the per-medicine daily demand query of the reorder job
+ALTER TABLE stock_movements ADD INDEX idx_movement_demand (medicine_id, created_at, delta);
+
+CREATE TABLE IF NOT EXISTS reorder_points (
+    medicine_id INT PRIMARY KEY,
+    quantity INT NOT NULL,
+    daily_rate DOUBLE NOT NULL,
+    demand_stddev DOUBLE NOT NULL,
+    days_of_cover DOUBLE NULL,
+    reorder_point INT NOT NULL,
+    needs_reorder BOOLEAN NOT NULL,
+    computed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (medicine_id) REFERENCES medicines(medicine_id) ON DELETE CASCADE,
+    INDEX idx_reorder_due (needs_reorder, days_of_cover)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS reorder_runs (
+    run_id INT AUTO_INCREMENT PRIMARY KEY,
+    started_at TIMESTAMP NOT NULL,
+    full_run BOOLEAN NOT NULL,
+    medicines INT NOT NULL,
+    duration_ms INT NOT NULL
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+INSERT IGNORE INTO table_versions (table_name) VALUES ('reorder_points');
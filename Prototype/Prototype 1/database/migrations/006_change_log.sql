@@ -0,0 +1,18 @@
+-- Migration 006: change feed
+-- Write handlers append one change_log row per written medicine or supplier;
+-- clients read them back in order through /api/changes and its event stream.
+-- Sequence numbers come from the 'change_log' row of table_versions, which
+-- writers lock for the rest of their transaction, so they commit in order.
+
+USE medvault_db;
+
+CREATE TABLE IF NOT EXISTS change_log (
+    seq BIGINT UNSIGNED PRIMARY KEY,
+    table_name VARCHAR(32) NOT NULL,
+    row_id INT NOT NULL,
+    action VARCHAR(10) NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_change_created (created_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+INSERT IGNORE INTO table_versions (table_name) VALUES ('change_log');
@@ -0,0 +1,25 @@
+-- Migration 007: background jobs
+-- POST /api/jobs queues reports and maintenance tasks here; API worker threads
+-- (or job_worker.py) claim queued rows, stream reports into files under
+-- JOBS_RESULT_DIR and record the outcome. heartbeat_at lets a surviving
+-- worker requeue jobs whose process stopped.
+
+USE medvault_db;
+
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id INT AUTO_INCREMENT PRIMARY KEY,
+    kind VARCHAR(32) NOT NULL,
+    params TEXT NOT NULL,
+    status VARCHAR(10) NOT NULL DEFAULT 'queued',
+    attempts INT NOT NULL DEFAULT 0,
+    progress INT NOT NULL DEFAULT 0,
+    result TEXT NULL,
+    result_file VARCHAR(255) NULL,
+    error TEXT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    started_at TIMESTAMP NULL DEFAULT NULL,
+    heartbeat_at TIMESTAMP NULL DEFAULT NULL,
+    finished_at TIMESTAMP NULL DEFAULT NULL,
+    INDEX idx_job_status (status, job_id),
+    INDEX idx_job_finished (finished_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
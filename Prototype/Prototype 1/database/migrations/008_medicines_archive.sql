@@ -0,0 +1,60 @@
+-- Migration 008: medicines archive
+-- Deleted medicines, and medicines expired for longer than ARCHIVE_EXPIRED_DAYS,
+-- are moved here so the hot medicines table only holds live stock. Rows keep
+-- their medicine_id; lists and search read them with ?include_archived=true.
+-- archive_id is the key because a medicine_id can be archived twice: MySQL 5.7
+-- reissues the highest AUTO_INCREMENT values after a restart once those rows
+-- have left the medicines table. An archived medicine's lots and stock ledger
+-- move with it into the two tables below, keyed by archive_id.
+-- The tables are not partitioned: MySQL partitioned tables support neither the
+-- FULLTEXT index archived search uses nor foreign keys.
+
+USE medvault_db;
+
+CREATE TABLE IF NOT EXISTS medicines_archive (
+    archive_id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    medicine_id INT NOT NULL,
+    name VARCHAR(100) NOT NULL,
+    company VARCHAR(100) NOT NULL,
+    mfg_date DATE NOT NULL,
+    exp_date DATE NOT NULL,
+    quantity INT NOT NULL,
+    price DECIMAL(10, 2) NOT NULL,
+    supplier_id INT NOT NULL,
+    created_at TIMESTAMP NULL DEFAULT NULL,
+    updated_at TIMESTAMP NULL DEFAULT NULL,
+    archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    archive_reason VARCHAR(10) NOT NULL,
+    FOREIGN KEY (supplier_id) REFERENCES suppliers(supplier_id) ON DELETE RESTRICT,
+    INDEX idx_archive_medicine (medicine_id),
+    INDEX idx_archive_name (name),
+    INDEX idx_archive_company (company),
+    INDEX idx_archive_exp_date (exp_date),
+    INDEX idx_archive_supplier (supplier_id),
+    FULLTEXT INDEX ft_archive_search (name, company)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS medicine_batches_archive (
+    archive_id BIGINT NOT NULL,
+    batch_id INT NOT NULL,
+    medicine_id INT NOT NULL,
+    lot_number VARCHAR(50) NOT NULL,
+    mfg_date DATE NOT NULL,
+    exp_date DATE NOT NULL,
+    quantity INT NOT NULL,
+    created_at TIMESTAMP NULL DEFAULT NULL,
+    updated_at TIMESTAMP NULL DEFAULT NULL,
+    PRIMARY KEY (archive_id, batch_id),
+    FOREIGN KEY (archive_id) REFERENCES medicines_archive(archive_id) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS stock_movements_archive (
+    archive_id BIGINT NOT NULL,
+    movement_id BIGINT NOT NULL,
+    medicine_id INT NOT NULL,
+    delta INT NOT NULL,
+    reason VARCHAR(50) NOT NULL,
+    created_at TIMESTAMP NULL DEFAULT NULL,
+    PRIMARY KEY (archive_id, movement_id),
+    FOREIGN KEY (archive_id) REFERENCES medicines_archive(archive_id) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
@@ -20,3 +20,10 @@ INSERT INTO medicines (name, company, mfg_date, exp_date, quantity, price, suppl
 ('Levothyroxine 50mcg', 'Rural Health Distributors', '2024-06-05', '2025-12-05', 150, 85.00, 7),
 ('Clopidogrel 75mg', 'Emergency Meds Ltd.', '2024-08-01', '2026-08-01', 160, 95.50, 8);
 
+-- Lots are the stock: each new quantity becomes its medicine's UNLOTTED lot
+INSERT INTO medicine_batches (medicine_id, lot_number, mfg_date, exp_date, quantity)
+SELECT m.medicine_id, 'UNLOTTED', m.mfg_date, m.exp_date,
+       m.quantity - COALESCE((SELECT SUM(b.quantity) FROM medicine_batches b WHERE b.medicine_id = m.medicine_id), 0)
+FROM medicines m
+WHERE m.quantity > COALESCE((SELECT SUM(b.quantity) FROM medicine_batches b WHERE b.medicine_id = m.medicine_id), 0)
+  AND NOT EXISTS (SELECT 1 FROM medicine_batches u WHERE u.medicine_id = m.medicine_id AND u.lot_number = 'UNLOTTED');
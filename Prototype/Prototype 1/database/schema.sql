@@ -7,8 +7,19 @@ CREATE DATABASE IF NOT EXISTS medvault_db;
 USE medvault_db;
 
 -- Drop tables if they exist (for clean setup)
+DROP TABLE IF EXISTS jobs;
+DROP TABLE IF EXISTS stock_movements_archive;
+DROP TABLE IF EXISTS medicine_batches_archive;
+DROP TABLE IF EXISTS medicines_archive;
+DROP TABLE IF EXISTS change_log;
+DROP TABLE IF EXISTS reorder_runs;
+DROP TABLE IF EXISTS reorder_points;
+DROP TABLE IF EXISTS medicine_batches;
+DROP TABLE IF EXISTS stock_movements;
 DROP TABLE IF EXISTS medicines;
 DROP TABLE IF EXISTS suppliers;
+DROP TABLE IF EXISTS schema_migrations;
+DROP TABLE IF EXISTS table_versions;
 
 -- Table: suppliers
 -- Purpose: Store supplier information
@@ -19,7 +30,8 @@ CREATE TABLE suppliers (
     contact_no VARCHAR(20) NOT NULL,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-    INDEX idx_supplier_name (supplier_name)
+    INDEX idx_supplier_name (supplier_name),
+    FULLTEXT INDEX ft_supplier_search (supplier_name)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
 
 -- Table: medicines
@@ -40,9 +52,183 @@ CREATE TABLE medicines (
     INDEX idx_name (name),
     INDEX idx_company (company),
     INDEX idx_exp_date (exp_date),
-    INDEX idx_supplier (supplier_id)
+    INDEX idx_supplier (supplier_id),
+    FULLTEXT INDEX ft_medicine_search (name, company)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
 
+-- Table: stock_movements
+-- Purpose: Ledger of quantity changes made through POST /api/medicines/movements
+CREATE TABLE stock_movements (
+    movement_id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    medicine_id INT NOT NULL,
+    delta INT NOT NULL,
+    reason VARCHAR(50) NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (medicine_id) REFERENCES medicines(medicine_id) ON DELETE CASCADE,
+    INDEX idx_movement_medicine (medicine_id, movement_id),
+    INDEX idx_movement_demand (medicine_id, created_at, delta)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- Table: medicine_batches
+-- Purpose: Lots of each medicine; POST /api/medicines/dispense takes stock
+-- from them first-expiry-first-out using idx_batch_fefo. medicines.quantity
+-- is the sum of its lots; stock without a lot number is the UNLOTTED lot
+CREATE TABLE medicine_batches (
+    batch_id INT AUTO_INCREMENT PRIMARY KEY,
+    medicine_id INT NOT NULL,
+    lot_number VARCHAR(50) NOT NULL,
+    mfg_date DATE NOT NULL,
+    exp_date DATE NOT NULL,
+    quantity INT NOT NULL CHECK (quantity >= 0),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    FOREIGN KEY (medicine_id) REFERENCES medicines(medicine_id) ON DELETE CASCADE,
+    UNIQUE KEY uq_batch_lot (medicine_id, lot_number),
+    INDEX idx_batch_fefo (medicine_id, exp_date)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- Tables: reorder_points, reorder_runs
+-- Purpose: Consumption rates, days of cover and reorder points computed from
+-- stock_movements by backend/reorder.py, and a log of its runs
+CREATE TABLE reorder_points (
+    medicine_id INT PRIMARY KEY,
+    quantity INT NOT NULL,
+    daily_rate DOUBLE NOT NULL,
+    demand_stddev DOUBLE NOT NULL,
+    days_of_cover DOUBLE NULL,
+    reorder_point INT NOT NULL,
+    needs_reorder BOOLEAN NOT NULL,
+    computed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (medicine_id) REFERENCES medicines(medicine_id) ON DELETE CASCADE,
+    INDEX idx_reorder_due (needs_reorder, days_of_cover)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE reorder_runs (
+    run_id INT AUTO_INCREMENT PRIMARY KEY,
+    started_at TIMESTAMP NOT NULL,
+    full_run BOOLEAN NOT NULL,
+    medicines INT NOT NULL,
+    duration_ms INT NOT NULL
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- Table: change_log
+-- Purpose: Append-only feed of medicine and supplier writes behind
+-- /api/changes; seq is allocated from table_versions in commit order
+CREATE TABLE change_log (
+    seq BIGINT UNSIGNED PRIMARY KEY,
+    table_name VARCHAR(32) NOT NULL,
+    row_id INT NOT NULL,
+    action VARCHAR(10) NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_change_created (created_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- Table: jobs
+-- Purpose: Queue and history of background reports and maintenance tasks
+-- (POST /api/jobs); workers claim queued rows and write results to files
+CREATE TABLE jobs (
+    job_id INT AUTO_INCREMENT PRIMARY KEY,
+    kind VARCHAR(32) NOT NULL,
+    params TEXT NOT NULL,
+    status VARCHAR(10) NOT NULL DEFAULT 'queued',
+    attempts INT NOT NULL DEFAULT 0,
+    progress INT NOT NULL DEFAULT 0,
+    result TEXT NULL,
+    result_file VARCHAR(255) NULL,
+    error TEXT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    started_at TIMESTAMP NULL DEFAULT NULL,
+    heartbeat_at TIMESTAMP NULL DEFAULT NULL,
+    finished_at TIMESTAMP NULL DEFAULT NULL,
+    INDEX idx_job_status (status, job_id),
+    INDEX idx_job_finished (finished_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- Table: medicines_archive
+-- Purpose: Deleted medicines and those expired for longer than
+-- ARCHIVE_EXPIRED_DAYS, moved out of the hot table (?include_archived=true).
+-- Keyed by archive_id, since MySQL 5.7 can reissue an archived medicine_id
+CREATE TABLE medicines_archive (
+    archive_id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    medicine_id INT NOT NULL,
+    name VARCHAR(100) NOT NULL,
+    company VARCHAR(100) NOT NULL,
+    mfg_date DATE NOT NULL,
+    exp_date DATE NOT NULL,
+    quantity INT NOT NULL,
+    price DECIMAL(10, 2) NOT NULL,
+    supplier_id INT NOT NULL,
+    created_at TIMESTAMP NULL DEFAULT NULL,
+    updated_at TIMESTAMP NULL DEFAULT NULL,
+    archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    archive_reason VARCHAR(10) NOT NULL,
+    FOREIGN KEY (supplier_id) REFERENCES suppliers(supplier_id) ON DELETE RESTRICT,
+    INDEX idx_archive_medicine (medicine_id),
+    INDEX idx_archive_name (name),
+    INDEX idx_archive_company (company),
+    INDEX idx_archive_exp_date (exp_date),
+    INDEX idx_archive_supplier (supplier_id),
+    FULLTEXT INDEX ft_archive_search (name, company)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- Table: medicine_batches_archive
+-- Purpose: Lots of archived medicines, moved in the same transaction
+CREATE TABLE medicine_batches_archive (
+    archive_id BIGINT NOT NULL,
+    batch_id INT NOT NULL,
+    medicine_id INT NOT NULL,
+    lot_number VARCHAR(50) NOT NULL,
+    mfg_date DATE NOT NULL,
+    exp_date DATE NOT NULL,
+    quantity INT NOT NULL,
+    created_at TIMESTAMP NULL DEFAULT NULL,
+    updated_at TIMESTAMP NULL DEFAULT NULL,
+    PRIMARY KEY (archive_id, batch_id),
+    FOREIGN KEY (archive_id) REFERENCES medicines_archive(archive_id) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- Table: stock_movements_archive
+-- Purpose: Stock ledger of archived medicines, moved in the same transaction
+CREATE TABLE stock_movements_archive (
+    archive_id BIGINT NOT NULL,
+    movement_id BIGINT NOT NULL,
+    medicine_id INT NOT NULL,
+    delta INT NOT NULL,
+    reason VARCHAR(50) NOT NULL,
+    created_at TIMESTAMP NULL DEFAULT NULL,
+    PRIMARY KEY (archive_id, movement_id),
+    FOREIGN KEY (archive_id) REFERENCES medicines_archive(archive_id) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- Table: table_versions
+-- Purpose: Change counter per table, bumped by every API write; the API
+-- derives ETags from it for conditional GETs
+CREATE TABLE table_versions (
+    table_name VARCHAR(64) PRIMARY KEY,
+    version BIGINT UNSIGNED NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+INSERT INTO table_versions (table_name) VALUES ('medicines'), ('suppliers'), ('reorder_points'), ('change_log');
+
+-- Table: schema_migrations
+-- Purpose: Record which files in database/migrations are already applied
+-- (this schema already includes every migration listed below)
+CREATE TABLE schema_migrations (
+    name VARCHAR(100) PRIMARY KEY,
+    applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+INSERT INTO schema_migrations (name) VALUES
+('001_fulltext_search'),
+('002_table_versions'),
+('003_stock_movements'),
+('004_medicine_batches'),
+('005_reorder_points'),
+('006_change_log'),
+('007_jobs'),
+('008_medicines_archive');
+
 -- Sample data insertion
 INSERT INTO suppliers (supplier_name, contact_no) VALUES
 ('MedSupply Co.', '123-456-7890'),
@@ -61,3 +247,7 @@ INSERT INTO medicines (name, company, mfg_date, exp_date, quantity, price, suppl
 ('Atorvastatin 10mg', 'HealthPlus', '2024-03-15', '2026-09-15', 150, 80.75, 5),
 ('Metformin 500mg', 'Global Meds', '2024-01-20', '2025-07-20', 450, 35.25, 3);
 
+-- Lots are the stock: each sample quantity is its medicine's UNLOTTED lot
+INSERT INTO medicine_batches (medicine_id, lot_number, mfg_date, exp_date, quantity)
+SELECT medicine_id, 'UNLOTTED', mfg_date, exp_date, quantity FROM medicines WHERE quantity > 0;
+
@@ -0,0 +1,237 @@
+-- Medical Storage Management System - SQLite Schema
+-- Used by the embedded storage backend (STORAGE_BACKEND=sqlite). The API runs
+-- this script on startup, so every statement must be safe to repeat.
+-- Tables and indexes mirror schema.sql; FTS5 tables stand in for the FULLTEXT
+-- indexes and triggers for ON UPDATE CURRENT_TIMESTAMP.
+
+-- Table: suppliers
+CREATE TABLE IF NOT EXISTS suppliers (
+    supplier_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    supplier_name VARCHAR(100) NOT NULL,
+    contact_no VARCHAR(20) NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS idx_supplier_name ON suppliers (supplier_name);
+
+-- Table: medicines
+CREATE TABLE IF NOT EXISTS medicines (
+    medicine_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name VARCHAR(100) NOT NULL,
+    company VARCHAR(100) NOT NULL,
+    mfg_date DATE NOT NULL,
+    exp_date DATE NOT NULL,
+    quantity INT NOT NULL CHECK (quantity >= 0),
+    price DECIMAL(10, 2) NOT NULL CHECK (price >= 0),
+    supplier_id INT NOT NULL REFERENCES suppliers (supplier_id) ON DELETE RESTRICT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS idx_name ON medicines (name);
+CREATE INDEX IF NOT EXISTS idx_company ON medicines (company);
+CREATE INDEX IF NOT EXISTS idx_exp_date ON medicines (exp_date);
+CREATE INDEX IF NOT EXISTS idx_supplier ON medicines (supplier_id);
+
+-- Table: stock_movements
+CREATE TABLE IF NOT EXISTS stock_movements (
+    movement_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    medicine_id INT NOT NULL REFERENCES medicines (medicine_id) ON DELETE CASCADE,
+    delta INT NOT NULL,
+    reason VARCHAR(50) NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS idx_movement_medicine ON stock_movements (medicine_id, movement_id);
+CREATE INDEX IF NOT EXISTS idx_movement_demand ON stock_movements (medicine_id, created_at, delta);
+
+-- Table: medicine_batches
+CREATE TABLE IF NOT EXISTS medicine_batches (
+    batch_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    medicine_id INT NOT NULL REFERENCES medicines (medicine_id) ON DELETE CASCADE,
+    lot_number VARCHAR(50) NOT NULL,
+    mfg_date DATE NOT NULL,
+    exp_date DATE NOT NULL,
+    quantity INT NOT NULL CHECK (quantity >= 0),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE (medicine_id, lot_number)
+);
+CREATE INDEX IF NOT EXISTS idx_batch_fefo ON medicine_batches (medicine_id, exp_date);
+
+-- Lots are the stock: quantity that no lot accounts for becomes the
+-- medicine's UNLOTTED lot, and a quantity below its lots is raised to match
+-- them. A no-op once they agree, as the API keeps them.
+INSERT INTO medicine_batches (medicine_id, lot_number, mfg_date, exp_date, quantity)
+SELECT m.medicine_id, 'UNLOTTED', m.mfg_date, m.exp_date,
+       m.quantity - COALESCE((SELECT SUM(b.quantity) FROM medicine_batches b WHERE b.medicine_id = m.medicine_id), 0)
+FROM medicines m
+WHERE m.quantity > COALESCE((SELECT SUM(b.quantity) FROM medicine_batches b WHERE b.medicine_id = m.medicine_id), 0)
+  AND NOT EXISTS (SELECT 1 FROM medicine_batches u WHERE u.medicine_id = m.medicine_id AND u.lot_number = 'UNLOTTED');
+UPDATE medicines
+SET quantity = (SELECT SUM(b.quantity) FROM medicine_batches b WHERE b.medicine_id = medicines.medicine_id)
+WHERE quantity < COALESCE((SELECT SUM(b.quantity) FROM medicine_batches b WHERE b.medicine_id = medicines.medicine_id), 0);
+
+-- Tables: reorder_points, reorder_runs
+CREATE TABLE IF NOT EXISTS reorder_points (
+    medicine_id INTEGER PRIMARY KEY REFERENCES medicines (medicine_id) ON DELETE CASCADE,
+    quantity INT NOT NULL,
+    daily_rate DOUBLE NOT NULL,
+    demand_stddev DOUBLE NOT NULL,
+    days_of_cover DOUBLE NULL,
+    reorder_point INT NOT NULL,
+    needs_reorder BOOLEAN NOT NULL,
+    computed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS idx_reorder_due ON reorder_points (needs_reorder, days_of_cover);
+
+CREATE TABLE IF NOT EXISTS reorder_runs (
+    run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    started_at TIMESTAMP NOT NULL,
+    full_run BOOLEAN NOT NULL,
+    medicines INT NOT NULL,
+    duration_ms INT NOT NULL
+);
+
+-- Table: change_log
+CREATE TABLE IF NOT EXISTS change_log (
+    seq INTEGER PRIMARY KEY,
+    table_name VARCHAR(32) NOT NULL,
+    row_id INT NOT NULL,
+    action VARCHAR(10) NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS idx_change_created ON change_log (created_at);
+
+-- Table: jobs
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind VARCHAR(32) NOT NULL,
+    params TEXT NOT NULL,
+    status VARCHAR(10) NOT NULL DEFAULT 'queued',
+    attempts INT NOT NULL DEFAULT 0,
+    progress INT NOT NULL DEFAULT 0,
+    result TEXT NULL,
+    result_file VARCHAR(255) NULL,
+    error TEXT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    started_at TIMESTAMP NULL,
+    heartbeat_at TIMESTAMP NULL,
+    finished_at TIMESTAMP NULL
+);
+CREATE INDEX IF NOT EXISTS idx_job_status ON jobs (status, job_id);
+CREATE INDEX IF NOT EXISTS idx_job_finished ON jobs (finished_at);
+
+-- Table: medicines_archive
+CREATE TABLE IF NOT EXISTS medicines_archive (
+    archive_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    medicine_id INT NOT NULL,
+    name VARCHAR(100) NOT NULL,
+    company VARCHAR(100) NOT NULL,
+    mfg_date DATE NOT NULL,
+    exp_date DATE NOT NULL,
+    quantity INT NOT NULL,
+    price DECIMAL(10, 2) NOT NULL,
+    supplier_id INT NOT NULL REFERENCES suppliers (supplier_id) ON DELETE RESTRICT,
+    created_at TIMESTAMP NULL,
+    updated_at TIMESTAMP NULL,
+    archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    archive_reason VARCHAR(10) NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_archive_medicine ON medicines_archive (medicine_id);
+CREATE INDEX IF NOT EXISTS idx_archive_name ON medicines_archive (name);
+CREATE INDEX IF NOT EXISTS idx_archive_company ON medicines_archive (company);
+CREATE INDEX IF NOT EXISTS idx_archive_exp_date ON medicines_archive (exp_date);
+CREATE INDEX IF NOT EXISTS idx_archive_supplier ON medicines_archive (supplier_id);
+
+-- Tables: medicine_batches_archive, stock_movements_archive
+CREATE TABLE IF NOT EXISTS medicine_batches_archive (
+    archive_id INT NOT NULL REFERENCES medicines_archive (archive_id) ON DELETE CASCADE,
+    batch_id INT NOT NULL,
+    medicine_id INT NOT NULL,
+    lot_number VARCHAR(50) NOT NULL,
+    mfg_date DATE NOT NULL,
+    exp_date DATE NOT NULL,
+    quantity INT NOT NULL,
+    created_at TIMESTAMP NULL,
+    updated_at TIMESTAMP NULL,
+    PRIMARY KEY (archive_id, batch_id)
+);
+
+CREATE TABLE IF NOT EXISTS stock_movements_archive (
+    archive_id INT NOT NULL REFERENCES medicines_archive (archive_id) ON DELETE CASCADE,
+    movement_id INT NOT NULL,
+    medicine_id INT NOT NULL,
+    delta INT NOT NULL,
+    reason VARCHAR(50) NOT NULL,
+    created_at TIMESTAMP NULL,
+    PRIMARY KEY (archive_id, movement_id)
+);
+
+-- Table: table_versions
+CREATE TABLE IF NOT EXISTS table_versions (
+    table_name VARCHAR(64) PRIMARY KEY,
+    version INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+INSERT OR IGNORE INTO table_versions (table_name) VALUES ('medicines'), ('suppliers'), ('reorder_points'), ('change_log');
+
+-- ON UPDATE CURRENT_TIMESTAMP
+CREATE TRIGGER IF NOT EXISTS suppliers_updated_at AFTER UPDATE ON suppliers BEGIN
+    UPDATE suppliers SET updated_at = CURRENT_TIMESTAMP WHERE supplier_id = NEW.supplier_id;
+END;
+CREATE TRIGGER IF NOT EXISTS medicines_updated_at AFTER UPDATE ON medicines BEGIN
+    UPDATE medicines SET updated_at = CURRENT_TIMESTAMP WHERE medicine_id = NEW.medicine_id;
+END;
+CREATE TRIGGER IF NOT EXISTS medicine_batches_updated_at AFTER UPDATE ON medicine_batches BEGIN
+    UPDATE medicine_batches SET updated_at = CURRENT_TIMESTAMP WHERE batch_id = NEW.batch_id;
+END;
+CREATE TRIGGER IF NOT EXISTS table_versions_updated_at AFTER UPDATE ON table_versions BEGIN
+    UPDATE table_versions SET updated_at = CURRENT_TIMESTAMP WHERE table_name = NEW.table_name;
+END;
+
+-- Full-text search (ft_medicine_search, ft_supplier_search), kept in sync by triggers
+CREATE VIRTUAL TABLE IF NOT EXISTS medicines_fts USING fts5 (
+    name, company, content='medicines', content_rowid='medicine_id', prefix='2 3'
+);
+CREATE TRIGGER IF NOT EXISTS medicines_fts_insert AFTER INSERT ON medicines BEGIN
+    INSERT INTO medicines_fts (rowid, name, company) VALUES (NEW.medicine_id, NEW.name, NEW.company);
+END;
+CREATE TRIGGER IF NOT EXISTS medicines_fts_delete AFTER DELETE ON medicines BEGIN
+    INSERT INTO medicines_fts (medicines_fts, rowid, name, company)
+    VALUES ('delete', OLD.medicine_id, OLD.name, OLD.company);
+END;
+CREATE TRIGGER IF NOT EXISTS medicines_fts_update AFTER UPDATE OF name, company ON medicines BEGIN
+    INSERT INTO medicines_fts (medicines_fts, rowid, name, company)
+    VALUES ('delete', OLD.medicine_id, OLD.name, OLD.company);
+    INSERT INTO medicines_fts (rowid, name, company) VALUES (NEW.medicine_id, NEW.name, NEW.company);
+END;
+
+-- Archived rows are only inserted and deleted, never updated. The rowid is
+-- archive_id; medicine_id is stored unindexed so search can return it
+CREATE VIRTUAL TABLE IF NOT EXISTS medicines_archive_fts USING fts5 (
+    name, company, medicine_id UNINDEXED,
+    content='medicines_archive', content_rowid='archive_id', prefix='2 3'
+);
+CREATE TRIGGER IF NOT EXISTS medicines_archive_fts_insert AFTER INSERT ON medicines_archive BEGIN
+    INSERT INTO medicines_archive_fts (rowid, name, company, medicine_id)
+    VALUES (NEW.archive_id, NEW.name, NEW.company, NEW.medicine_id);
+END;
+CREATE TRIGGER IF NOT EXISTS medicines_archive_fts_delete AFTER DELETE ON medicines_archive BEGIN
+    INSERT INTO medicines_archive_fts (medicines_archive_fts, rowid, name, company, medicine_id)
+    VALUES ('delete', OLD.archive_id, OLD.name, OLD.company, OLD.medicine_id);
+END;
+
+CREATE VIRTUAL TABLE IF NOT EXISTS suppliers_fts USING fts5 (
+    supplier_name, content='suppliers', content_rowid='supplier_id', prefix='2 3'
+);
+CREATE TRIGGER IF NOT EXISTS suppliers_fts_insert AFTER INSERT ON suppliers BEGIN
+    INSERT INTO suppliers_fts (rowid, supplier_name) VALUES (NEW.supplier_id, NEW.supplier_name);
+END;
+CREATE TRIGGER IF NOT EXISTS suppliers_fts_delete AFTER DELETE ON suppliers BEGIN
+    INSERT INTO suppliers_fts (suppliers_fts, rowid, supplier_name)
+    VALUES ('delete', OLD.supplier_id, OLD.supplier_name);
+END;
+CREATE TRIGGER IF NOT EXISTS suppliers_fts_update AFTER UPDATE OF supplier_name ON suppliers BEGIN
+    INSERT INTO suppliers_fts (suppliers_fts, rowid, supplier_name)
+    VALUES ('delete', OLD.supplier_id, OLD.supplier_name);
+    INSERT INTO suppliers_fts (rowid, supplier_name) VALUES (NEW.supplier_id, NEW.supplier_name);
+END;
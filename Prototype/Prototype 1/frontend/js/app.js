@@ -1,6 +1,7 @@
 // Medical Storage Management System - Enhanced JavaScript
 
-const API_BASE_URL = 'http://localhost:5000/api';
+// Pages served by the API carry <meta name="medvault-api">, so requests stay same-origin
+const API_BASE_URL = document.querySelector('meta[name="medvault-api"]')?.content || 'http://localhost:5000/api';
 
 // Utility Functions
 function showAlert(message, type = 'success') {
@@ -65,25 +66,145 @@ function showLoading(containerId) {
     }
 }
 
-// API Functions with better error handling
-async function fetchMedicines() {
+// Page size used when loading the medicine list incrementally
+const MEDICINE_PAGE_SIZE = 200;
+
+// Conditional GET: remember each URL's ETag and body for this tab, send the
+// ETag back as If-None-Match, and reuse the stored body when the API says 304.
+// Entries are kept per Accept value too, since the body differs by format.
+const VALIDATOR_STORAGE_PREFIX = 'medvault:etag:';
+const VALIDATOR_HEADERS = ['Content-Type', 'X-Next-Cursor', 'ETag', 'X-Change-Seq'];
+
+async function fetchWithValidators(url, accept = 'application/json') {
+    const key = VALIDATOR_STORAGE_PREFIX + accept + ' ' + url;
+    let stored = null;
     try {
-        const response = await fetch(`${API_BASE_URL}/medicines`);
-        if (!response.ok) {
-            const error = await response.json();
-            throw new Error(error.error || 'Failed to fetch medicines');
+        stored = JSON.parse(sessionStorage.getItem(key));
+    } catch (error) {
+        stored = null;
+    }
+
+    const headers = { 'Accept': accept };
+    if (stored && stored.etag) {
+        headers['If-None-Match'] = stored.etag;
+    }
+    // The browser cache is bypassed so this code sees the 304 itself
+    const response = await fetch(url, { headers: headers, cache: 'no-store' });
+    if (response.status === 304 && stored) {
+        // The stored body is still current, so the live change-feed position applies to it
+        const changeSeq = response.headers.get('X-Change-Seq');
+        return new Response(stored.body, {
+            status: 200,
+            headers: {
+                'Content-Type': 'application/json',
+                ...stored.headers,
+                ...(changeSeq ? { 'X-Change-Seq': changeSeq } : {})
+            }
+        });
+    }
+
+    const etag = response.headers.get('ETag');
+    if (response.ok && etag) {
+        const saved = {};
+        VALIDATOR_HEADERS.forEach(name => {
+            const value = response.headers.get(name);
+            if (value) {
+                saved[name] = value;
+            }
+        });
+        try {
+            const body = await response.clone().text();
+            sessionStorage.setItem(key, JSON.stringify({ etag: etag, body: body, headers: saved }));
+        } catch (error) {
+            // Storage full or unavailable: any older entry still pairs its ETag
+            // with its own body, so it stays safe to revalidate
+            console.warn('Could not store response for revalidation:', error);
         }
-        return await response.json();
+    }
+    return response;
+}
+
+// Columnar list format: field names once, then one array per row, with supplier
+// name and contact sent once per supplier in a side table. List requests ask for
+// it and readList() turns it back into the usual array of objects; an API that
+// only speaks plain JSON answers with that instead, which readList() passes through.
+const COLUMNAR_JSON = 'application/vnd.medvault.columnar+json';
+
+function decodeColumnarList(list) {
+    const columns = list.columns;
+    const width = columns.length;
+    let suppliers = null;
+    let supplierColumns = [];
+    let supplierPosition = -1;
+    if (list.suppliers) {
+        suppliers = new Map(list.suppliers.rows.map(row => [row[0], row]));
+        supplierColumns = list.suppliers.columns;
+        supplierPosition = columns.indexOf('supplier_id');
+    }
+    return list.rows.map(row => {
+        const item = {};
+        for (let i = 0; i < width; i++) {
+            item[columns[i]] = row[i];
+        }
+        if (suppliers) {
+            const supplier = suppliers.get(row[supplierPosition]);
+            for (let i = 1; i < supplierColumns.length; i++) {
+                item[supplierColumns[i]] = supplier[i];
+            }
+        }
+        return item;
+    });
+}
+
+async function readList(response) {
+    const body = await response.json();
+    const type = response.headers.get('Content-Type') || '';
+    return type.startsWith(COLUMNAR_JSON) ? decodeColumnarList(body) : body;
+}
+
+// API Functions with better error handling
+async function fetchMedicinePage(cursor = null, limit = MEDICINE_PAGE_SIZE) {
+    const params = new URLSearchParams({ limit: limit });
+    if (cursor) {
+        params.set('cursor', cursor);
+    }
+    const response = await fetchWithValidators(`${API_BASE_URL}/medicines?${params}`, COLUMNAR_JSON);
+    if (!response.ok) {
+        const error = await response.json();
+        throw new Error(error.error || 'Failed to fetch medicines');
+    }
+    return {
+        items: await readList(response),
+        nextCursor: response.headers.get('X-Next-Cursor'),
+        changeSeq: response.headers.get('X-Change-Seq')
+    };
+}
+
+// Loads every page in turn; onPage(items, isFirstPage, changeSeq) lets callers render as pages
+// arrive. The first page's changeSeq is where subscribeToChanges() should start.
+async function fetchMedicines(onPage = null) {
+    const medicines = [];
+    try {
+        let cursor = null;
+        do {
+            const page = await fetchMedicinePage(cursor);
+            page.items.forEach(item => medicines.push(item));
+            if (onPage) {
+                onPage(page.items, cursor === null, page.changeSeq);
+            }
+            cursor = page.nextCursor;
+        } while (cursor);
+        return medicines;
     } catch (error) {
         console.error('Error fetching medicines:', error);
         showAlert('Error loading medicines: ' + error.message, 'error');
-        return [];
+        return medicines;
     }
 }
 
 async function fetchMedicine(id) {
     try {
-        const response = await fetch(`${API_BASE_URL}/medicines/${id}`);
+        const response = await fetchWithValidators(`${API_BASE_URL}/medicines/${id}`);
         if (!response.ok) {
             const error = await response.json();
             throw new Error(error.error || 'Failed to fetch medicine');
@@ -101,12 +222,14 @@ async function searchMedicines(query) {
         if (!query || query.trim() === '') {
             return [];
         }
-        const response = await fetch(`${API_BASE_URL}/medicines/search?q=${encodeURIComponent(query)}`);
+        const response = await fetchWithValidators(
+            `${API_BASE_URL}/medicines/search?q=${encodeURIComponent(query)}`, COLUMNAR_JSON
+        );
         if (!response.ok) {
             const error = await response.json();
             throw new Error(error.error || 'Search failed');
         }
-        return await response.json();
+        return await readList(response);
     } catch (error) {
         console.error('Error searching medicines:', error);
         showAlert('Error searching medicines: ' + error.message, 'error');
@@ -114,6 +237,22 @@ async function searchMedicines(query) {
     }
 }
 
+async function fetchSuggestions(prefix, limit = 10) {
+    try {
+        if (!prefix || prefix.trim() === '') {
+            return [];
+        }
+        const response = await fetch(`${API_BASE_URL}/medicines/suggest?q=${encodeURIComponent(prefix)}&limit=${limit}`);
+        if (!response.ok) {
+            return [];
+        }
+        return await response.json();
+    } catch (error) {
+        console.error('Error fetching suggestions:', error);
+        return [];
+    }
+}
+
 async function addMedicine(medicineData) {
     try {
         const response = await fetch(`${API_BASE_URL}/medicines`, {
@@ -164,9 +303,42 @@ async function deleteMedicine(id) {
     }
 }
 
+async function fetchStats(lowStockThreshold = null) {
+    try {
+        const query = lowStockThreshold !== null ? `?low_stock_threshold=${lowStockThreshold}` : '';
+        const response = await fetch(`${API_BASE_URL}/stats${query}`);
+        if (!response.ok) {
+            const error = await response.json();
+            throw new Error(error.error || 'Failed to fetch statistics');
+        }
+        return await response.json();
+    } catch (error) {
+        console.error('Error fetching statistics:', error);
+        showAlert('Error loading statistics: ' + error.message, 'error');
+        return { total_medicines: 0, total_quantity: 0, inventory_value: 0, low_stock_count: 0 };
+    }
+}
+
+// Medicines at or below their computed reorder point, fewest days of cover first; null if unavailable
+async function fetchReorderDue() {
+    try {
+        const response = await fetchWithValidators(
+            `${API_BASE_URL}/medicines/reorder?due=true&fields=medicine_id,name,quantity,days_of_cover,reorder_point`
+        );
+        if (!response.ok) {
+            const error = await response.json();
+            throw new Error(error.error || 'Failed to fetch reorder points');
+        }
+        return await response.json();
+    } catch (error) {
+        console.error('Error fetching reorder points:', error);
+        return null;
+    }
+}
+
 async function fetchSuppliers() {
     try {
-        const response = await fetch(`${API_BASE_URL}/suppliers`);
+        const response = await fetchWithValidators(`${API_BASE_URL}/suppliers`);
         if (!response.ok) {
             const error = await response.json();
             throw new Error(error.error || 'Failed to fetch suppliers');
@@ -178,6 +350,58 @@ async function fetchSuppliers() {
     }
 }
 
+// Live updates: follow the change feed from `since` (the X-Change-Seq of the data on screen).
+// onChange(change) runs once per change in order; onResync() when the page must reload its data.
+// EventSource reconnects by itself and resumes after the last event it received.
+function subscribeToChanges(since, onChange, onResync) {
+    if (typeof EventSource === 'undefined') {
+        return null;
+    }
+    const params = since !== null && since !== undefined ? `?since=${encodeURIComponent(since)}` : '';
+    const source = new EventSource(`${API_BASE_URL}/changes/stream${params}`);
+    source.addEventListener('change', event => {
+        const change = JSON.parse(event.data);
+        if (change.action === 'bulk') {
+            source.close();
+            onResync();
+            return;
+        }
+        onChange(change);
+    });
+    source.addEventListener('resync', () => {
+        source.close();
+        onResync();
+    });
+    return source;
+}
+
+// Apply one medicine change to the expired/good tables rendered by renderMedicineTable()
+function applyMedicineChange(change, expiredContainerId, goodContainerId) {
+    if (change.table !== 'medicines') return;
+    const rows = document.querySelectorAll(`tr[data-medicine-id="${change.id}"]`);
+    if (!change.data) {
+        rows.forEach(row => row.remove());
+        return;
+    }
+
+    const isExpired = checkExpiryStatus(change.data.exp_date).status === 'expired';
+    const containerId = isExpired ? expiredContainerId : goodContainerId;
+    const container = document.getElementById(containerId);
+    let replaced = false;
+    rows.forEach(row => {
+        if (!replaced && container && container.contains(row)) {
+            // Updated in place so the row keeps its position
+            row.outerHTML = renderMedicineRow(change.data, 0);
+            replaced = true;
+        } else {
+            row.remove();
+        }
+    });
+    if (!replaced) {
+        renderMedicineTable([change.data], containerId, isExpired, true);
+    }
+}
+
 // Supplier Dropdown Population
 async function populateSupplierDropdown(selectElement, selectedId = null) {
     try {
@@ -200,10 +424,18 @@ async function populateSupplierDropdown(selectElement, selectedId = null) {
 
 // Enhanced Medicine Table Rendering with animations
 // isExpired: true for expired medicines table, false for good medicines table
-function renderMedicineTable(medicines, containerId, isExpired = false) {
+// append: add rows to an already rendered table (incremental page loading)
+function renderMedicineTable(medicines, containerId, isExpired = false, append = false) {
     const container = document.getElementById(containerId);
     if (!container) return;
     
+    const existingBody = append ? container.querySelector('tbody') : null;
+    if (existingBody) {
+        existingBody.insertAdjacentHTML('beforeend', medicines.map(renderMedicineRow).join(''));
+        return;
+    }
+    if (append && medicines.length === 0) return;
+    
     if (medicines.length === 0) {
         const emptyMessage = isExpired 
             ? '<div class="empty-state"><p>✅ Great! No expired medicines</p><p style="font-size: 0.9em; margin-top: 10px; color: #94a3b8;">All medicines are valid</p></div>'
@@ -231,51 +463,7 @@ function renderMedicineTable(medicines, containerId, isExpired = false) {
                 <tbody>
     `;
     
-    medicines.forEach((medicine, index) => {
-        const expiryStatus = checkExpiryStatus(medicine.exp_date);
-        const rowClass = expiryStatus.class ? expiryStatus.class : '';
-        const badgeHTML = expiryStatus.status === 'expired' 
-            ? '<span class="badge badge-danger">Expired</span>' 
-            : expiryStatus.status === 'expiring' 
-            ? `<span class="badge badge-warning">${expiryStatus.days} days</span>` 
-            : '';
-        
-        // Ensure all fields have values
-        const medicineId = medicine.medicine_id || 'N/A';
-        const name = medicine.name || 'N/A';
-        const company = medicine.company || 'N/A';
-        const mfgDate = medicine.mfg_date || '';
-        const expDate = medicine.exp_date || '';
-        const quantity = medicine.quantity !== undefined ? medicine.quantity : 'N/A';
-        const price = medicine.price !== undefined ? medicine.price : 0;
-        const supplierName = medicine.supplier_name || 'N/A';
-        
-        tableHTML += `
-            <tr class="${rowClass}" style="animation: fadeInUp 0.5s ease-out ${index * 0.05}s both;">
-                <td><strong>#${medicineId}</strong></td>
-                <td><strong>${escapeHtml(String(name))}</strong></td>
-                <td>${escapeHtml(String(company))}</td>
-                <td>${formatDate(mfgDate)}</td>
-                <td>
-                    ${formatDate(expDate)} 
-                    ${badgeHTML}
-                </td>
-                <td><strong>${quantity}</strong></td>
-                <td><strong>${formatCurrency(parseFloat(price))}</strong></td>
-                <td>${escapeHtml(String(supplierName))}</td>
-                <td>
-                    <div class="action-buttons" style="margin: 0; justify-content: center;">
-                        <button class="btn btn-warning" onclick="editMedicine(${medicineId})" style="padding: 8px 14px; font-size: 13px;">
-                            ✏️ Edit
-                        </button>
-                        <button class="btn btn-danger" onclick="confirmDelete(${medicineId})" style="padding: 8px 14px; font-size: 13px;">
-                            🗑️ Delete
-                        </button>
-                    </div>
-                </td>
-            </tr>
-        `;
-    });
+    tableHTML += medicines.map(renderMedicineRow).join('');
     
     tableHTML += `
                 </tbody>
@@ -286,6 +474,52 @@ function renderMedicineTable(medicines, containerId, isExpired = false) {
     container.innerHTML = tableHTML;
 }
 
+function renderMedicineRow(medicine, index) {
+    const expiryStatus = checkExpiryStatus(medicine.exp_date);
+    const rowClass = expiryStatus.class ? expiryStatus.class : '';
+    const badgeHTML = expiryStatus.status === 'expired' 
+        ? '<span class="badge badge-danger">Expired</span>' 
+        : expiryStatus.status === 'expiring' 
+        ? `<span class="badge badge-warning">${expiryStatus.days} days</span>` 
+        : '';
+    
+    // Ensure all fields have values
+    const medicineId = medicine.medicine_id || 'N/A';
+    const name = medicine.name || 'N/A';
+    const company = medicine.company || 'N/A';
+    const mfgDate = medicine.mfg_date || '';
+    const expDate = medicine.exp_date || '';
+    const quantity = medicine.quantity !== undefined ? medicine.quantity : 'N/A';
+    const price = medicine.price !== undefined ? medicine.price : 0;
+    const supplierName = medicine.supplier_name || 'N/A';
+    
+    return `
+        <tr class="${rowClass}" data-medicine-id="${medicineId}" style="animation: fadeInUp 0.5s ease-out ${Math.min(index, 20) * 0.05}s both;">
+            <td><strong>#${medicineId}</strong></td>
+            <td><strong>${escapeHtml(String(name))}</strong></td>
+            <td>${escapeHtml(String(company))}</td>
+            <td>${formatDate(mfgDate)}</td>
+            <td>
+                ${formatDate(expDate)} 
+                ${badgeHTML}
+            </td>
+            <td><strong>${quantity}</strong></td>
+            <td><strong>${formatCurrency(parseFloat(price))}</strong></td>
+            <td>${escapeHtml(String(supplierName))}</td>
+            <td>
+                <div class="action-buttons" style="margin: 0; justify-content: center;">
+                    <button class="btn btn-warning" onclick="editMedicine(${medicineId})" style="padding: 8px 14px; font-size: 13px;">
+                        ✏️ Edit
+                    </button>
+                    <button class="btn btn-danger" onclick="confirmDelete(${medicineId})" style="padding: 8px 14px; font-size: 13px;">
+                        🗑️ Delete
+                    </button>
+                </div>
+            </td>
+        </tr>
+    `;
+}
+
 // Enhanced Delete Confirmation with modal-style
 function confirmDelete(id) {
     const medicineName = prompt('Are you sure you want to delete this medicine?\n\nType "DELETE" to confirm:');
@@ -0,0 +1,70 @@
+"""
+Job Worker Script for Medical Storage Management System
+Runs queued background jobs (POST /api/jobs) outside the API process, for
+deployments that set JOBS_WORKERS=0 on the API so long reports never compete
+with request handling.
+
+Usage: python job_worker.py [--workers N] [--once]
+
+Workers must share JOBS_RESULT_DIR with the API so it can serve result files.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BASE_DIR, 'backend'))
+
+from archive import archive_job
+from config import DB_CONFIG, STORAGE_CONFIG, REORDER_CONFIG, JOBS_CONFIG, ARCHIVE_CONFIG
+from jobs import JobQueue
+from reorder import reorder_job
+from reports import register_reports
+from storage import Error, create_storage
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run MedVault background jobs')
+    parser.add_argument('--workers', type=int, default=max(JOBS_CONFIG['WORKERS'], 1),
+                        help='worker threads (default: JOBS_WORKERS, at least 1)')
+    parser.add_argument('--once', action='store_true',
+                        help='run the jobs queued now, one at a time, then exit')
+    args = parser.parse_args()
+
+    try:
+        store = create_storage(STORAGE_CONFIG, DB_CONFIG)
+        store.connect().close()
+    except Error as e:
+        print(f"✗ Error connecting to the database: {e}")
+        return 1
+
+    queue = JobQueue(store, store.connect, store.connect, JOBS_CONFIG)
+    register_reports(queue)
+    queue.register('reorder_points', reorder_job(REORDER_CONFIG))
+    queue.register('archive_medicines', archive_job(ARCHIVE_CONFIG))
+
+    if args.once:
+        count = 0
+        try:
+            while queue.run_next():
+                count += 1
+        except Error as e:
+            print(f"✗ Error claiming a job: {e}")
+            return 1
+        print(f"✓ Ran {count} job(s)")
+        return 0
+
+    queue.start(args.workers)
+    print(f"✓ {args.workers} job worker(s) running; Ctrl+C to stop")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -23,6 +23,72 @@ DB_CONFIG = {
     'charset': 'utf8mb4'
 }
 
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'database', 'migrations')
+
+
+def read_migrations():
+    """Return (name, statements) for each file in database/migrations, in order"""
+    migrations = []
+    if not os.path.isdir(MIGRATIONS_DIR):
+        return migrations
+    for filename in sorted(os.listdir(MIGRATIONS_DIR)):
+        if not filename.endswith('.sql'):
+            continue
+        with open(os.path.join(MIGRATIONS_DIR, filename), encoding='utf-8') as f:
+            lines = [line for line in f if not line.strip().startswith('--')]
+        statements = [stmt.strip() for stmt in ''.join(lines).split(';') if stmt.strip()]
+        # The database is selected by the caller; USE lines are for manual runs
+        statements = [stmt for stmt in statements if not stmt.upper().startswith('USE ')]
+        migrations.append((filename[:-4], statements))
+    return migrations
+
+
+def create_migrations_table(cursor):
+    """Create the table that records applied migrations"""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            name VARCHAR(100) PRIMARY KEY,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """)
+
+
+def apply_migrations():
+    """Bring an existing medvault_db up to date without dropping any data"""
+    connection = None
+    
+    try:
+        print("Connecting to MySQL server...")
+        connection = mysql.connector.connect(**DB_CONFIG)
+        cursor = connection.cursor()
+        cursor.execute("USE medvault_db")
+        create_migrations_table(cursor)
+        
+        cursor.execute("SELECT name FROM schema_migrations")
+        applied = {row[0] for row in cursor.fetchall()}
+        pending = [(name, stmts) for name, stmts in read_migrations() if name not in applied]
+        
+        if not pending:
+            print("[OK] Database schema is up to date")
+        for name, statements in pending:
+            print(f"Applying migration {name}...")
+            for statement in statements:
+                cursor.execute(statement)
+            cursor.execute("INSERT INTO schema_migrations (name) VALUES (%s)", (name,))
+            connection.commit()
+            print(f"[OK] {name} applied")
+        
+    except Error as e:
+        print(f"\nERROR: {e}")
+        print("\nMigrations stop at the first failure; fix the error and run again.")
+        
+    finally:
+        if connection and connection.is_connected():
+            cursor.close()
+            connection.close()
+            print("\nMySQL connection closed.")
+
+
 def setup_database():
     """Create database and tables"""
     connection = None
@@ -46,8 +112,19 @@ def setup_database():
         
         # Drop existing tables
         print("Dropping existing tables (if any)...")
+        cursor.execute("DROP TABLE IF EXISTS jobs")
+        cursor.execute("DROP TABLE IF EXISTS stock_movements_archive")
+        cursor.execute("DROP TABLE IF EXISTS medicine_batches_archive")
+        cursor.execute("DROP TABLE IF EXISTS medicines_archive")
+        cursor.execute("DROP TABLE IF EXISTS change_log")
+        cursor.execute("DROP TABLE IF EXISTS reorder_runs")
+        cursor.execute("DROP TABLE IF EXISTS reorder_points")
+        cursor.execute("DROP TABLE IF EXISTS medicine_batches")
+        cursor.execute("DROP TABLE IF EXISTS stock_movements")
         cursor.execute("DROP TABLE IF EXISTS medicines")
         cursor.execute("DROP TABLE IF EXISTS suppliers")
+        cursor.execute("DROP TABLE IF EXISTS schema_migrations")
+        cursor.execute("DROP TABLE IF EXISTS table_versions")
         
         # Create suppliers table
         print("Creating suppliers table...")
@@ -58,7 +135,8 @@ def setup_database():
                 contact_no VARCHAR(20) NOT NULL,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-                INDEX idx_supplier_name (supplier_name)
+                INDEX idx_supplier_name (supplier_name),
+                FULLTEXT INDEX ft_supplier_search (supplier_name)
             ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
         """)
         print("[OK] Suppliers table created")
@@ -81,11 +159,185 @@ def setup_database():
                 INDEX idx_name (name),
                 INDEX idx_company (company),
                 INDEX idx_exp_date (exp_date),
-                INDEX idx_supplier (supplier_id)
+                INDEX idx_supplier (supplier_id),
+                FULLTEXT INDEX ft_medicine_search (name, company)
             ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
         """)
         print("[OK] Medicines table created")
         
+        # Create stock_movements (ledger for POST /api/medicines/movements)
+        print("Creating stock_movements table...")
+        cursor.execute("""
+            CREATE TABLE stock_movements (
+                movement_id BIGINT AUTO_INCREMENT PRIMARY KEY,
+                medicine_id INT NOT NULL,
+                delta INT NOT NULL,
+                reason VARCHAR(50) NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (medicine_id) REFERENCES medicines(medicine_id) ON DELETE CASCADE,
+                INDEX idx_movement_medicine (medicine_id, movement_id),
+                INDEX idx_movement_demand (medicine_id, created_at, delta)
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+        """)
+        print("[OK] Stock movements table created")
+        
+        # Create medicine_batches (lots dispensed first-expiry-first-out)
+        print("Creating medicine_batches table...")
+        cursor.execute("""
+            CREATE TABLE medicine_batches (
+                batch_id INT AUTO_INCREMENT PRIMARY KEY,
+                medicine_id INT NOT NULL,
+                lot_number VARCHAR(50) NOT NULL,
+                mfg_date DATE NOT NULL,
+                exp_date DATE NOT NULL,
+                quantity INT NOT NULL CHECK (quantity >= 0),
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+                FOREIGN KEY (medicine_id) REFERENCES medicines(medicine_id) ON DELETE CASCADE,
+                UNIQUE KEY uq_batch_lot (medicine_id, lot_number),
+                INDEX idx_batch_fefo (medicine_id, exp_date)
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+        """)
+        print("[OK] Medicine batches table created")
+        
+        # Create reorder_points and reorder_runs (written by backend/reorder.py)
+        print("Creating reorder tables...")
+        cursor.execute("""
+            CREATE TABLE reorder_points (
+                medicine_id INT PRIMARY KEY,
+                quantity INT NOT NULL,
+                daily_rate DOUBLE NOT NULL,
+                demand_stddev DOUBLE NOT NULL,
+                days_of_cover DOUBLE NULL,
+                reorder_point INT NOT NULL,
+                needs_reorder BOOLEAN NOT NULL,
+                computed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (medicine_id) REFERENCES medicines(medicine_id) ON DELETE CASCADE,
+                INDEX idx_reorder_due (needs_reorder, days_of_cover)
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+        """)
+        cursor.execute("""
+            CREATE TABLE reorder_runs (
+                run_id INT AUTO_INCREMENT PRIMARY KEY,
+                started_at TIMESTAMP NOT NULL,
+                full_run BOOLEAN NOT NULL,
+                medicines INT NOT NULL,
+                duration_ms INT NOT NULL
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+        """)
+        print("[OK] Reorder tables created")
+        
+        # Create change_log (the feed behind /api/changes)
+        print("Creating change_log table...")
+        cursor.execute("""
+            CREATE TABLE change_log (
+                seq BIGINT UNSIGNED PRIMARY KEY,
+                table_name VARCHAR(32) NOT NULL,
+                row_id INT NOT NULL,
+                action VARCHAR(10) NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                INDEX idx_change_created (created_at)
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+        """)
+        print("[OK] Change log table created")
+        
+        # Create jobs (queue behind /api/jobs)
+        print("Creating jobs table...")
+        cursor.execute("""
+            CREATE TABLE jobs (
+                job_id INT AUTO_INCREMENT PRIMARY KEY,
+                kind VARCHAR(32) NOT NULL,
+                params TEXT NOT NULL,
+                status VARCHAR(10) NOT NULL DEFAULT 'queued',
+                attempts INT NOT NULL DEFAULT 0,
+                progress INT NOT NULL DEFAULT 0,
+                result TEXT NULL,
+                result_file VARCHAR(255) NULL,
+                error TEXT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                started_at TIMESTAMP NULL DEFAULT NULL,
+                heartbeat_at TIMESTAMP NULL DEFAULT NULL,
+                finished_at TIMESTAMP NULL DEFAULT NULL,
+                INDEX idx_job_status (status, job_id),
+                INDEX idx_job_finished (finished_at)
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+        """)
+        print("[OK] Jobs table created")
+        
+        # Create medicines_archive (deleted and long-expired medicines)
+        print("Creating medicines_archive table...")
+        cursor.execute("""
+            CREATE TABLE medicines_archive (
+                archive_id BIGINT AUTO_INCREMENT PRIMARY KEY,
+                medicine_id INT NOT NULL,
+                name VARCHAR(100) NOT NULL,
+                company VARCHAR(100) NOT NULL,
+                mfg_date DATE NOT NULL,
+                exp_date DATE NOT NULL,
+                quantity INT NOT NULL,
+                price DECIMAL(10, 2) NOT NULL,
+                supplier_id INT NOT NULL,
+                created_at TIMESTAMP NULL DEFAULT NULL,
+                updated_at TIMESTAMP NULL DEFAULT NULL,
+                archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                archive_reason VARCHAR(10) NOT NULL,
+                FOREIGN KEY (supplier_id) REFERENCES suppliers(supplier_id) ON DELETE RESTRICT,
+                INDEX idx_archive_medicine (medicine_id),
+                INDEX idx_archive_name (name),
+                INDEX idx_archive_company (company),
+                INDEX idx_archive_exp_date (exp_date),
+                INDEX idx_archive_supplier (supplier_id),
+                FULLTEXT INDEX ft_archive_search (name, company)
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+        """)
+        cursor.execute("""
+            CREATE TABLE medicine_batches_archive (
+                archive_id BIGINT NOT NULL,
+                batch_id INT NOT NULL,
+                medicine_id INT NOT NULL,
+                lot_number VARCHAR(50) NOT NULL,
+                mfg_date DATE NOT NULL,
+                exp_date DATE NOT NULL,
+                quantity INT NOT NULL,
+                created_at TIMESTAMP NULL DEFAULT NULL,
+                updated_at TIMESTAMP NULL DEFAULT NULL,
+                PRIMARY KEY (archive_id, batch_id),
+                FOREIGN KEY (archive_id) REFERENCES medicines_archive(archive_id) ON DELETE CASCADE
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+        """)
+        cursor.execute("""
+            CREATE TABLE stock_movements_archive (
+                archive_id BIGINT NOT NULL,
+                movement_id BIGINT NOT NULL,
+                medicine_id INT NOT NULL,
+                delta INT NOT NULL,
+                reason VARCHAR(50) NOT NULL,
+                created_at TIMESTAMP NULL DEFAULT NULL,
+                PRIMARY KEY (archive_id, movement_id),
+                FOREIGN KEY (archive_id) REFERENCES medicines_archive(archive_id) ON DELETE CASCADE
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+        """)
+        print("[OK] Medicines archive tables created")
+        
+        # Create table_versions (change counters behind the API's ETags)
+        print("Creating table_versions table...")
+        cursor.execute("""
+            CREATE TABLE table_versions (
+                table_name VARCHAR(64) PRIMARY KEY,
+                version BIGINT UNSIGNED NOT NULL DEFAULT 0,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+        """)
+        cursor.execute("INSERT INTO table_versions (table_name) VALUES ('medicines'), ('suppliers'), ('reorder_points'), ('change_log')")
+        print("[OK] Table versions table created")
+        
+        # The tables above already include every migration; record them as applied
+        create_migrations_table(cursor)
+        cursor.executemany(
+            "INSERT INTO schema_migrations (name) VALUES (%s)",
+            [(name,) for name, _ in read_migrations()]
+        )
+        
         # Insert sample suppliers
         print("Inserting sample suppliers...")
         suppliers = [
@@ -119,6 +371,13 @@ def setup_database():
             medicines
         )
         print(f"[OK] Inserted {len(medicines)} medicines")
+
+        # Lots are the stock: each sample quantity is its medicine's UNLOTTED lot
+        cursor.execute(
+            """INSERT INTO medicine_batches (medicine_id, lot_number, mfg_date, exp_date, quantity)
+               SELECT medicine_id, 'UNLOTTED', mfg_date, exp_date, quantity FROM medicines WHERE quantity > 0"""
+        )
+        print(f"[OK] Opened {cursor.rowcount} UNLOTTED lots")
         
         # Commit changes
         connection.commit()
@@ -159,6 +418,11 @@ if __name__ == "__main__":
     import sys
     password = None
     
+    # --migrate upgrades an existing database instead of recreating it
+    migrate_only = '--migrate' in sys.argv
+    if migrate_only:
+        sys.argv.remove('--migrate')
+    
     # Try to get from environment
     password = os.environ.get('DB_PASSWORD') or os.getenv('DB_PASSWORD')
     
@@ -185,4 +449,7 @@ if __name__ == "__main__":
     print(f"  Password: {'*' * len(DB_CONFIG['password']) if DB_CONFIG['password'] else '(empty)'}")
     print()
     
-    setup_database()
+    if migrate_only:
+        apply_migrations()
+    else:
+        setup_database()
@@ -0,0 +1,285 @@
+"""
+Shared fixtures for the API tests
+Every test runs once per storage backend (SQLite in a temporary file, and
+MySQL in a scratch database when a server is reachable) and once per server
+mode: the Flask app through its test client and the Starlette app in asgi.py
+through starlette.testclient. app.py reads its configuration and opens its
+storage at import time, so the backend modules are imported afresh for each
+storage backend.
+
+MySQL settings come from the usual DB_HOST/DB_USER/DB_PASSWORD variables; the
+scratch database is TEST_DB_NAME (medvault_test), dropped and recreated.
+"""
+
+import importlib
+import json
+import os
+import random
+import string
+import sys
+from datetime import date, timedelta
+
+import pytest
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BACKEND_DIR = os.path.join(BASE_DIR, 'backend')
+SCHEMA_FILE = os.path.join(BASE_DIR, 'database', 'schema.sql')
+sys.path.insert(0, BACKEND_DIR)
+
+TEST_DB_NAME = os.getenv('TEST_DB_NAME', 'medvault_test')
+
+# Background threads off: jobs are run by the tests with job_queue.run_next()
+TEST_ENV = {
+    'JOBS_WORKERS': '0',
+    'ARCHIVE_INTERVAL': '0',
+    'REORDER_INTERVAL': '0',
+    'SUGGEST_REBUILD_INTERVAL': '0',
+    'EXPIRY_REBUILD_INTERVAL': '0',
+    'CHANGES_PRUNE_INTERVAL': '0',
+    'CHANGES_POLL_INTERVAL': '0.05',
+    'CHANGES_STREAM_MAX_SECONDS': '1',
+    'PROFILE_INTERVAL_MS': '0',
+    'ASSETS_SERVE': 'False',
+    'DB_REPLICAS': '',
+    'CACHE_REDIS_URL': '',
+    'SERVER_MODE': 'wsgi'
+}
+
+# Sample rows of database/schema.sql; the tests create their own
+SAMPLE_DATA = ('INSERT INTO SUPPLIERS', 'INSERT INTO MEDICINES', 'INSERT INTO MEDICINE_BATCHES')
+
+
+def unique_word(length=10):
+    """A letters-only token no other test uses, so full-text search finds exactly one test's rows"""
+    return 'zq' + ''.join(random.choice(string.ascii_lowercase) for _ in range(length))
+
+
+def days_from_today(days):
+    return (date.today() + timedelta(days=days)).isoformat()
+
+
+# ==================== DATABASES ====================
+
+def schema_statements():
+    """Table definitions of database/schema.sql, without its database selection and sample data"""
+    with open(SCHEMA_FILE, encoding='utf-8') as f:
+        lines = [line for line in f if not line.strip().startswith('--')]
+    statements = [stmt.strip() for stmt in ''.join(lines).split(';') if stmt.strip()]
+    return [stmt for stmt in statements
+            if not stmt.upper().startswith(('CREATE DATABASE', 'USE ') + SAMPLE_DATA)]
+
+
+def mysql_settings():
+    """Connection settings for the scratch database; skips the test when no server answers"""
+    try:
+        import mysql.connector
+    except ImportError:
+        pytest.skip('mysql-connector-python is not installed')
+    settings = {
+        'host': os.getenv('DB_HOST', 'localhost'),
+        'user': os.getenv('DB_USER', 'root'),
+        'password': os.getenv('DB_PASSWORD', '')
+    }
+    try:
+        connection = mysql.connector.connect(connection_timeout=3, **settings)
+    except mysql.connector.Error as e:
+        pytest.skip(f'No MySQL server: {e}')
+    try:
+        cursor = connection.cursor()
+        cursor.execute(f"DROP DATABASE IF EXISTS {TEST_DB_NAME}")
+        cursor.execute(f"CREATE DATABASE {TEST_DB_NAME}")
+        cursor.execute(f"USE {TEST_DB_NAME}")
+        for statement in schema_statements():
+            cursor.execute(statement)
+        connection.commit()
+        cursor.close()
+    finally:
+        connection.close()
+    return {'STORAGE_BACKEND': 'mysql', 'DB_NAME': TEST_DB_NAME}
+
+
+def drop_mysql_database():
+    import mysql.connector
+
+    connection = mysql.connector.connect(
+        host=os.getenv('DB_HOST', 'localhost'), user=os.getenv('DB_USER', 'root'),
+        password=os.getenv('DB_PASSWORD', '')
+    )
+    try:
+        connection.cursor().execute(f"DROP DATABASE IF EXISTS {TEST_DB_NAME}")
+    finally:
+        connection.close()
+
+
+def forget_backend_modules():
+    """Drop the backend modules from sys.modules so the next import reads the environment again"""
+    for name, module in list(sys.modules.items()):
+        path = getattr(module, '__file__', None) or ''
+        if os.path.dirname(os.path.abspath(path)) == BACKEND_DIR:
+            del sys.modules[name]
+
+
+# ==================== FIXTURES ====================
+
+@pytest.fixture(scope='session', params=['sqlite', 'mysql'])
+def api(request, tmp_path_factory):
+    """The app module, imported against a fresh database of one storage backend"""
+    tmp = tmp_path_factory.mktemp(request.param)
+    if request.param == 'sqlite':
+        env = {'STORAGE_BACKEND': 'sqlite', 'SQLITE_PATH': str(tmp / 'medvault.sqlite3')}
+    else:
+        env = mysql_settings()
+    env = dict(TEST_ENV, JOBS_RESULT_DIR=str(tmp / 'job_results'), **env)
+
+    saved = {name: os.environ.get(name) for name in env}
+    os.environ.update(env)
+    forget_backend_modules()
+    try:
+        module = importlib.import_module('app')
+        yield module
+    finally:
+        module = sys.modules.get('app')
+        if module is not None:
+            module.db_pool.dispose()
+        forget_backend_modules()
+        for name, value in saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+        if request.param == 'mysql':
+            drop_mysql_database()
+
+
+class Reply:
+    """The parts of a Flask or httpx response the tests look at"""
+
+    def __init__(self, status_code, headers, content):
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+
+    def json(self):
+        return json.loads(self.content)
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8')
+
+
+class ApiClient:
+    """request() plus the verbs; subclasses adapt one test client"""
+
+    def get(self, path, **kwargs):
+        return self.request('GET', path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request('POST', path, **kwargs)
+
+    def put(self, path, **kwargs):
+        return self.request('PUT', path, **kwargs)
+
+    def delete(self, path, **kwargs):
+        return self.request('DELETE', path, **kwargs)
+
+
+class FlaskClient(ApiClient):
+    mode = 'flask'
+
+    def __init__(self, app):
+        self._client = app.test_client()
+
+    def request(self, method, path, json=None, data=None, headers=None):
+        kwargs = {'json': json} if json is not None else {'data': data}
+        response = self._client.open(path, method=method, headers=headers or {}, **kwargs)
+        return Reply(response.status_code, response.headers, response.get_data())
+
+
+class StarletteClient(ApiClient):
+    mode = 'asgi'
+
+    def __init__(self, client):
+        self._client = client
+
+    def request(self, method, path, json=None, data=None, headers=None):
+        # Like the Flask test client: no Accept-Encoding unless asked for, and
+        # the body as sent (httpx would decode a compressed one)
+        headers = dict({'Accept-Encoding': 'identity'}, **(headers or {}))
+        with self._client.stream(method, path, json=json, content=data, headers=headers) as response:
+            content = b''.join(response.iter_raw())
+        return Reply(response.status_code, response.headers, content)
+
+
+@pytest.fixture(scope='session')
+def asgi_app(api):
+    """The Starlette app for the current backend, with its lifespan (aiomysql pool) running"""
+    pytest.importorskip('starlette')
+    pytest.importorskip('httpx')
+    from starlette.testclient import TestClient
+
+    asgi = importlib.import_module('asgi')
+    with TestClient(asgi.app) as client:
+        yield client
+
+
+@pytest.fixture(params=['flask', 'asgi'])
+def client(request, api):
+    """An API client for the Flask app or for the Starlette app in front of it"""
+    if request.param == 'flask':
+        return FlaskClient(api.app)
+    return StarletteClient(request.getfixturevalue('asgi_app'))
+
+
+@pytest.fixture
+def flask_client(api):
+    return FlaskClient(api.app)
+
+
+@pytest.fixture
+def asgi_client(asgi_app):
+    return StarletteClient(asgi_app)
+
+
+@pytest.fixture
+def supplier(flask_client):
+    """A new supplier's id"""
+    response = flask_client.post('/api/suppliers', json={'supplier_name': f'Supplier {unique_word()}',
+                                                         'contact_no': '555-0100'})
+    assert response.status_code == 201
+    return response.json()['id']
+
+
+@pytest.fixture
+def make_medicine(flask_client, supplier):
+    """Add a medicine (defaults overridable per field); returns its id"""
+    def make(**fields):
+        medicine = {
+            'name': f'Medicine {unique_word()}', 'company': 'Test Pharma', 'mfg_date': days_from_today(-30),
+            'exp_date': days_from_today(365), 'quantity': 100, 'price': 2.5, 'supplier_id': supplier
+        }
+        medicine.update(fields)
+        response = flask_client.post('/api/medicines', json=medicine)
+        assert response.status_code == 201, response.json()
+        return response.json()['id']
+    return make
+
+
+def run_jobs(api):
+    """Run every queued job in this process; what the workers would do"""
+    while api.job_queue.run_next():
+        pass
+
+
+def walk_pages(client, path):
+    """Every row of a paged list, following X-Next-Cursor; asserts each page is a 200"""
+    rows = []
+    separator = '&' if '?' in path else '?'
+    url = path
+    while True:
+        response = client.get(url)
+        assert response.status_code == 200, response.content
+        rows.extend(response.json())
+        cursor = response.headers.get('X-Next-Cursor')
+        if not cursor:
+            return rows
+        url = f'{path}{separator}cursor={cursor}'
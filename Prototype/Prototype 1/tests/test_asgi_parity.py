@@ -0,0 +1,115 @@
+"""
+The Starlette app in asgi.py answers exactly as the Flask app does
+
+Each request goes to both apps with the same headers, and the status,
+body bytes, validators and the other headers clients rely on must be
+equal. With STORAGE_BACKEND=mysql the reads in asgi.native_routes run on
+aiomysql; with SQLite every route crosses the WSGI bridge, which must not
+change the responses either. Link is left out: it repeats the request URL,
+which differs between the two test clients.
+"""
+
+import sys
+
+import pytest
+from flask import jsonify
+
+from conftest import unique_word
+
+COMPARED_HEADERS = ('Content-Type', 'Content-Encoding', 'ETag', 'Last-Modified', 'Cache-Control',
+                    'X-Next-Cursor', 'X-Change-Seq')
+
+COLUMNAR = {'Accept': 'application/vnd.medvault.columnar+json'}
+
+
+@pytest.fixture
+def catalog(make_medicine, supplier):
+    """A search word and the ids of three medicines whose names contain it"""
+    word = unique_word()
+    ids = [make_medicine(name=f'{word} Capsules {i}', company=f'{word} Labs', quantity=i * 4, price=1.25 + i)
+           for i in range(3)]
+    return word, ids
+
+
+def empty_caches(api):
+    # Otherwise the second app would serve the body the first one cached
+    for cache in (api.medicine_cache, api.supplier_cache, api.stats_cache):
+        cache.clear()
+
+
+def assert_same_response(api, flask_client, asgi_client, path, headers=None):
+    headers = dict({'Accept-Encoding': 'identity'}, **(headers or {}))
+    empty_caches(api)
+    expected = flask_client.get(path, headers=headers)
+    empty_caches(api)
+    actual = asgi_client.get(path, headers=headers)
+
+    assert actual.status_code == expected.status_code, path
+    assert actual.content == expected.content, path
+    for name in COMPARED_HEADERS:
+        assert actual.headers.get(name) == expected.headers.get(name), (path, name)
+    vary = {value.strip() for value in (expected.headers.get('Vary') or '').split(',') if value.strip()}
+    assert {value.strip() for value in (actual.headers.get('Vary') or '').split(',') if value.strip()} == vary
+    return expected
+
+
+def native_paths(word, medicine_id):
+    """GET requests covering every route in asgi.native_routes, including their error answers"""
+    return [
+        '/api/suppliers',
+        '/api/suppliers?limit=2&fields=supplier_id,supplier_name',
+        '/api/suppliers?fields=bogus',
+        '/api/medicines',
+        '/api/medicines?limit=2',
+        '/api/medicines?limit=2&fields=medicine_id,name,quantity,price,supplier_name',
+        '/api/medicines?include_archived=true&fields=medicine_id,archive_reason',
+        '/api/medicines?cursor=nonsense',
+        f'/api/medicines/{medicine_id}',
+        '/api/medicines/999999999',
+        f'/api/medicines/search?q={word}',
+        f'/api/medicines/search?q={word}&limit=1&fields=medicine_id,relevance',
+        f'/api/medicines/search?q={word}&include_archived=true',
+        '/api/medicines/search?q=',
+        '/api/stats',
+        '/api/stats?group_by=supplier&low_stock_threshold=5',
+        '/api/stats?group_by=company',
+        '/api/stats?group_by=shelf'
+    ]
+
+
+def test_native_reads_match_flask(api, flask_client, asgi_client, catalog):
+    word, ids = catalog
+    for path in native_paths(word, ids[0]):
+        assert_same_response(api, flask_client, asgi_client, path)
+
+
+def test_columnar_and_compressed_reads_match_flask(api, flask_client, asgi_client, catalog):
+    word, _ = catalog
+    for path in ('/api/medicines?fields=medicine_id,supplier_id,supplier_name', f'/api/medicines/search?q={word}'):
+        assert_same_response(api, flask_client, asgi_client, path, COLUMNAR)
+    # gzip is written with mtime=0, so compressed bodies are reproducible too
+    response = assert_same_response(api, flask_client, asgi_client, '/api/medicines', {'Accept-Encoding': 'gzip'})
+    assert response.headers.get('Content-Encoding') == 'gzip'
+
+
+def test_next_pages_match_flask(api, flask_client, asgi_client, catalog):
+    word, _ = catalog
+    for path in ('/api/medicines?limit=1', f'/api/medicines/search?q={word}&limit=1', '/api/suppliers?limit=1'):
+        cursor = flask_client.get(path).headers['X-Next-Cursor']
+        assert_same_response(api, flask_client, asgi_client, f'{path}&cursor={cursor}')
+
+
+def test_not_modified_matches_flask(api, flask_client, asgi_client, catalog):
+    word, ids = catalog
+    for path in ('/api/medicines', f'/api/medicines/{ids[1]}', f'/api/medicines/search?q={word}', '/api/suppliers'):
+        etag = flask_client.get(path, headers={'Accept-Encoding': 'identity'}).headers['ETag']
+        response = assert_same_response(api, flask_client, asgi_client, path, {'If-None-Match': etag})
+        assert response.status_code == 304
+
+
+def test_error_bodies_match_jsonify(api, asgi_app):
+    asgi = sys.modules['asgi']
+    with api.app.app_context():
+        expected = jsonify({'error': 'Medicine not found'}).get_data()
+    response = asgi.error_response('Medicine not found', 404)
+    assert (response.status_code, response.body, response.media_type) == (404, expected, 'application/json')
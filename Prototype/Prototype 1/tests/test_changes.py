@@ -0,0 +1,52 @@
+"""
+Change feed: /api/changes paging and resync, and its event stream
+"""
+
+import json
+
+
+def test_changes_after_a_position(client, make_medicine):
+    start = client.get('/api/changes').json()
+    assert start['changes'] == [] and start['more'] is False
+
+    medicine_id = make_medicine(quantity=3)
+    client.post('/api/medicines/movements', json=[{'medicine_id': medicine_id, 'delta': 2, 'reason': 'return'}])
+    # Changes carry the row as it is now
+    feed = client.get(f"/api/changes?since={start['last_seq']}").json()
+    assert [change['data']['quantity'] for change in feed['changes'] if change['table'] == 'medicines'] == [5, 5]
+
+    client.delete(f'/api/medicines/{medicine_id}')
+    feed = client.get(f"/api/changes?since={start['last_seq']}").json()
+    changes = [change for change in feed['changes'] if change['table'] == 'medicines']
+    assert [(change['id'], change['action']) for change in changes] == \
+        [(medicine_id, 'insert'), (medicine_id, 'update'), (medicine_id, 'delete')]
+    assert [change['data'] for change in changes] == [None, None, None]
+    seqs = [change['seq'] for change in feed['changes']]
+    assert seqs == sorted(seqs) and seqs[-1] == feed['last_seq']
+
+    page = client.get(f"/api/changes?since={start['last_seq']}&limit=1").json()
+    assert len(page['changes']) == 1 and page['more'] is True
+    assert page['last_seq'] == page['changes'][0]['seq']
+
+
+def test_changes_errors(client):
+    last_seq = client.get('/api/changes').json()['last_seq']
+    response = client.get(f'/api/changes?since={last_seq + 1000}')
+    assert response.status_code == 410
+    assert response.json()['resync'] is True
+    assert client.get('/api/changes?since=-1').status_code == 400
+
+
+def test_change_stream(client, make_medicine):
+    since = client.get('/api/changes').json()['last_seq']
+    medicine_id = make_medicine()
+
+    response = client.get(f'/api/changes/stream?since={since}')
+    assert response.status_code == 200
+    assert response.headers['Content-Type'].startswith('text/event-stream')
+    events = [dict(line.split(': ', 1) for line in block.splitlines())
+              for block in response.text.split('\n\n') if 'event: change' in block]
+    assert [event['event'] for event in events] == ['change']
+    change = json.loads(events[0]['data'])
+    assert (change['table'], change['id'], change['action']) == ('medicines', medicine_id, 'insert')
+    assert int(events[0]['id']) == change['seq']
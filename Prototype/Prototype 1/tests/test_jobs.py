@@ -0,0 +1,74 @@
+"""
+Background jobs (reports, exports, archiving) and archived medicines in lists
+"""
+
+import csv
+import io
+import json
+
+from conftest import days_from_today, run_jobs, walk_pages
+
+
+def submit(client, kind, params=None):
+    response = client.post('/api/jobs', json={'kind': kind, 'params': params or {}})
+    assert response.status_code == 202, response.json()
+    assert response.json()['status'] == 'queued'
+    return response.headers['Location']
+
+
+def test_report_jobs(client, api, make_medicine):
+    medicine_id = make_medicine(quantity=4, price=2.5, exp_date=days_from_today(10))
+    valuation = submit(client, 'valuation_report', {'format': 'csv'})
+    expiry = submit(client, 'expiry_report', {'days': 30, 'format': 'ndjson'})
+    export = submit(client, 'inventory_export', {'format': 'ndjson', 'fields': ['medicine_id', 'quantity']})
+    assert client.get(f'{valuation}/result').status_code == 409
+
+    run_jobs(api)
+
+    job = client.get(valuation).json()
+    assert job['status'] == 'done' and job['result']['rows'] >= 1
+    rows = list(csv.DictReader(io.StringIO(client.get(job['result_url']).text)))
+    assert [row for row in rows if row['medicine_id'] == str(medicine_id)]
+
+    job = client.get(expiry).json()
+    assert job['status'] == 'done' and job['params'] == {'format': 'ndjson', 'days': 30}
+    lines = [json.loads(line) for line in client.get(job['result_url']).text.splitlines()]
+    assert medicine_id in [line['medicine_id'] for line in lines]
+
+    job = client.get(export).json()
+    lines = [json.loads(line) for line in client.get(job['result_url']).text.splitlines()]
+    assert {'medicine_id': medicine_id, 'quantity': 4} in lines
+
+
+def test_job_errors(client):
+    assert client.post('/api/jobs', json={}).status_code == 400
+    assert client.post('/api/jobs', json={'kind': 'nope'}).status_code == 400
+    assert client.post('/api/jobs', json={'kind': 'expiry_report', 'params': {'days': -1}}).status_code == 400
+    assert client.post('/api/jobs', json={'kind': 'reorder_points', 'params': {'x': 1}}).status_code == 400
+    assert client.get('/api/jobs/999999999').status_code == 404
+    assert client.get('/api/jobs/999999999/result').status_code == 404
+
+
+def test_archive_job_and_include_archived(client, api, make_medicine):
+    old = make_medicine(mfg_date=days_from_today(-900), exp_date=days_from_today(-200), quantity=6)
+    recent = make_medicine(mfg_date=days_from_today(-300), exp_date=days_from_today(-5))
+    deleted = make_medicine()
+    client.post('/api/medicines/movements', json=[{'medicine_id': old, 'delta': -1, 'reason': 'sale'}])
+    assert client.delete(f'/api/medicines/{deleted}').status_code == 200
+
+    location = submit(client, 'archive_medicines')
+    run_jobs(api)
+    assert client.get(location).json()['result']['archived'] >= 1
+
+    assert client.get(f'/api/medicines/{old}').status_code == 404
+    assert client.get(f'/api/medicines/{recent}').status_code == 200
+    live = {row['medicine_id'] for row in client.get('/api/medicines?fields=medicine_id').json()}
+    assert old not in live and deleted not in live and recent in live
+
+    fields = 'medicine_id,quantity,archived_at,archive_reason'
+    rows = walk_pages(client, f'/api/medicines?include_archived=true&limit=2&fields={fields}')
+    by_id = {row['medicine_id']: row for row in rows}
+    assert by_id[old]['archive_reason'] == 'expired' and by_id[old]['quantity'] == 5
+    assert by_id[deleted]['archive_reason'] == 'deleted' and by_id[deleted]['archived_at']
+    assert by_id[recent]['archive_reason'] is None
+    assert client.get('/api/medicines?fields=archive_reason').status_code == 400
@@ -0,0 +1,239 @@
+"""
+Medicine endpoints: CRUD, keyset paging, projections, conditional GETs,
+batch-get, expiry lists, export and bulk import
+"""
+
+import csv
+import io
+import json
+
+from conftest import days_from_today, unique_word, walk_pages
+
+
+def test_add_get_update_medicine(client, make_medicine, supplier):
+    medicine_id = make_medicine(name='Amoxicillin 250mg', quantity=30, price=4.25)
+
+    response = client.get(f'/api/medicines/{medicine_id}')
+    assert response.status_code == 200
+    medicine = response.json()
+    assert medicine['medicine_id'] == medicine_id
+    assert medicine['name'] == 'Amoxicillin 250mg'
+    assert medicine['quantity'] == 30
+    assert medicine['supplier_id'] == supplier
+    assert medicine['supplier_name'].startswith('Supplier ')
+
+    updated = dict(medicine, name='Amoxicillin 500mg', quantity=45)
+    updated = {key: updated[key] for key in
+               ('name', 'company', 'mfg_date', 'exp_date', 'quantity', 'price', 'supplier_id')}
+    assert client.put(f'/api/medicines/{medicine_id}', json=updated).status_code == 200
+    medicine = client.get(f'/api/medicines/{medicine_id}').json()
+    assert (medicine['name'], medicine['quantity']) == ('Amoxicillin 500mg', 45)
+
+
+def test_missing_and_invalid_medicines(client, supplier):
+    assert client.get('/api/medicines/999999999').status_code == 404
+    assert client.delete('/api/medicines/999999999').status_code == 404
+    medicine = {'name': 'X', 'company': 'Y', 'mfg_date': '2024-01-01', 'exp_date': '2030-01-01',
+                'quantity': 1, 'price': 1, 'supplier_id': supplier}
+    assert client.post('/api/medicines', json=dict(medicine, quantity=-1)).status_code == 400
+    assert client.post('/api/medicines', json=dict(medicine, exp_date='soon')).status_code == 400
+    assert client.post('/api/medicines', json={'name': 'X'}).status_code == 400
+    assert client.put('/api/medicines/999999999', json=medicine).status_code == 404
+
+
+def test_out_of_range_integers_get_json_answers(client, make_medicine, supplier):
+    medicine_id = make_medicine()
+    huge = 10 ** 30
+    medicine = {'name': 'X', 'company': 'Y', 'mfg_date': '2024-01-01', 'exp_date': '2030-01-01',
+                'quantity': 1, 'price': 1, 'supplier_id': supplier}
+    requests = [
+        ('POST', '/api/medicines/batch-get', {'ids': [huge]}),
+        ('POST', '/api/medicines/movements', [{'medicine_id': huge, 'delta': 1, 'reason': 'count'}]),
+        ('POST', '/api/medicines/movements', [{'medicine_id': medicine_id, 'delta': huge, 'reason': 'count'}]),
+        ('POST', '/api/medicines/dispense', [{'medicine_id': huge, 'quantity': 1}]),
+        ('POST', '/api/medicines', dict(medicine, quantity=huge)),
+        ('GET', f'/api/medicines/{huge}', None)
+    ]
+    # SQLite cannot bind them and MySQL may not store them; either way the answer is JSON
+    for method, path, body in requests:
+        response = client.request(method, path, json=body)
+        assert response.headers['Content-Type'] == 'application/json', (method, path)
+        if response.status_code >= 400:
+            assert 'error' in response.json(), (method, path)
+    assert client.get(f'/api/medicines/{medicine_id}').json()['quantity'] == 100
+
+
+def test_medicine_list_pages_with_cursors(client, make_medicine):
+    word = unique_word()
+    ids = [make_medicine(name=f'{word} {i}') for i in range(5)]
+
+    rows = walk_pages(client, '/api/medicines?limit=2&fields=medicine_id,name')
+    assert all(set(row) == {'medicine_id', 'name'} for row in rows)
+    keys = [(row['name'], row['medicine_id']) for row in rows]
+    assert keys == sorted(keys)
+    assert len(keys) == len(set(keys))
+    assert [row['medicine_id'] for row in rows if row['name'].startswith(word)] == ids
+
+    full = client.get('/api/medicines')
+    assert full.headers.get('X-Next-Cursor') is None
+    assert [row['medicine_id'] for row in full.json()] == [row['medicine_id'] for row in rows]
+
+
+def test_medicine_list_headers_and_errors(client, make_medicine):
+    make_medicine()
+    make_medicine()
+    response = client.get('/api/medicines?limit=1')
+    assert response.headers['X-Next-Cursor']
+    assert 'rel="next"' in response.headers['Link']
+    assert response.headers['X-Change-Seq'].isdigit()
+
+    assert client.get('/api/medicines?limit=0').status_code == 400
+    assert client.get('/api/medicines?cursor=not-a-cursor').status_code == 400
+    assert client.get('/api/medicines?fields=medicine_id,password').status_code == 400
+
+
+def test_cursor_from_another_list_is_rejected(client, make_medicine):
+    medicine_id = make_medicine()
+    make_medicine()
+    archived = client.get('/api/medicines?include_archived=true&limit=1').headers['X-Next-Cursor']
+    live = client.get('/api/medicines?limit=1').headers['X-Next-Cursor']
+
+    for path in (f'/api/medicines?cursor={archived}', f'/api/medicines?include_archived=true&cursor={live}',
+                 f'/api/medicines/search?q=medicine&cursor={live}'):
+        response = client.get(path)
+        assert response.status_code == 400, path
+        assert response.json() == {'error': 'Invalid cursor'}
+
+    # WzFd is [1], one value short of these keys
+    for path in ('/api/medicines', '/api/suppliers', f'/api/medicines/{medicine_id}/batches',
+                 '/api/medicines/reorder'):
+        assert client.get(f'{path}?cursor=WzFd').status_code == 400, path
+    assert client.get('/api/suppliers?cursor=W1sxXSwxXQ').status_code == 400
+
+
+def test_medicine_list_columnar_format(client, make_medicine, supplier):
+    make_medicine()
+    response = client.get(f'/api/medicines?fields=medicine_id,supplier_id,supplier_name',
+                          headers={'Accept': 'application/vnd.medvault.columnar+json'})
+    assert response.status_code == 200
+    document = response.json()
+    assert document['columns'] == ['medicine_id', 'supplier_id']
+    assert document['suppliers']['columns'] == ['supplier_id', 'supplier_name']
+    assert supplier in [row[0] for row in document['suppliers']['rows']]
+
+
+def test_conditional_get_until_a_write(client, make_medicine):
+    medicine_id = make_medicine()
+    response = client.get(f'/api/medicines/{medicine_id}')
+    etag = response.headers['ETag']
+    assert client.get(f'/api/medicines/{medicine_id}', headers={'If-None-Match': etag}).status_code == 304
+
+    listing = client.get('/api/medicines')
+    assert client.get('/api/medicines', headers={'If-None-Match': listing.headers['ETag']}).status_code == 304
+
+    make_medicine()
+    assert client.get(f'/api/medicines/{medicine_id}', headers={'If-None-Match': etag}).status_code == 200
+    assert client.get('/api/medicines', headers={'If-None-Match': listing.headers['ETag']}).status_code == 200
+
+
+def test_batch_get(client, make_medicine):
+    first, second = make_medicine(), make_medicine()
+
+    path = f'/api/medicines/batch-get?ids={second},{first},999999999,{second}'
+    response = client.get(path)
+    assert response.status_code == 200
+    body = response.json()
+    assert list(body['medicines']) == [str(second), str(first)]
+    assert body['medicines'][str(first)] == client.get(f'/api/medicines/{first}').json()
+    assert body['missing'] == [999999999]
+    etag = response.headers['ETag']
+    assert client.get(path, headers={'If-None-Match': etag}).status_code == 304
+
+    posted = client.post('/api/medicines/batch-get', json={'ids': [first, second]})
+    assert posted.status_code == 200
+    assert set(posted.json()['medicines']) == {str(first), str(second)}
+
+    assert client.get('/api/medicines/batch-get?ids=1,abc').status_code == 400
+    assert client.post('/api/medicines/batch-get', json={'ids': []}).status_code == 400
+
+
+def test_delete_removes_from_live_list(client, make_medicine):
+    medicine_id = make_medicine()
+    assert client.delete(f'/api/medicines/{medicine_id}').status_code == 200
+    assert client.get(f'/api/medicines/{medicine_id}').status_code == 404
+    assert medicine_id not in [row['medicine_id'] for row in client.get('/api/medicines?fields=medicine_id').json()]
+
+
+def test_expiry_lists(client, make_medicine):
+    soon = make_medicine(exp_date=days_from_today(5))
+    later = make_medicine(exp_date=days_from_today(60))
+    gone = make_medicine(mfg_date=days_from_today(-100), exp_date=days_from_today(-3))
+
+    expiring = client.get('/api/medicines/expiring?days=30&fields=medicine_id,days_until_expiry').json()
+    by_id = {row['medicine_id']: row for row in expiring}
+    assert by_id[soon]['days_until_expiry'] == 5
+    assert later not in by_id and gone not in by_id
+    for days in (-1, 3651, 99999999, -99999999):
+        response = client.get(f'/api/medicines/expiring?days={days}')
+        assert response.status_code == 400
+        assert response.json()['error'].startswith('days must be')
+
+    expired = walk_pages(client, '/api/medicines/expired?limit=1&fields=medicine_id,exp_date')
+    assert gone in [row['medicine_id'] for row in expired]
+    dates = [row['exp_date'] for row in expired]
+    assert dates == sorted(dates)
+
+    summary = client.get('/api/medicines/expiry-summary').json()
+    assert summary['expired'] >= 1
+    assert summary['within_7_days'] >= 1
+    assert summary['within_90_days'] >= summary['within_30_days'] >= summary['within_7_days']
+
+
+def test_export_ndjson_and_csv(client, make_medicine):
+    medicine_id = make_medicine(quantity=12)
+
+    response = client.get('/api/medicines/export?fields=medicine_id,quantity')
+    assert response.status_code == 200
+    rows = [json.loads(line) for line in response.text.splitlines() if line]
+    assert {'medicine_id': medicine_id, 'quantity': 12} in rows
+    assert [row['medicine_id'] for row in rows] == sorted(row['medicine_id'] for row in rows)
+
+    response = client.get('/api/medicines/export?format=csv&fields=medicine_id,name')
+    assert response.status_code == 200
+    reader = list(csv.DictReader(io.StringIO(response.text)))
+    assert str(medicine_id) in [row['medicine_id'] for row in reader]
+
+    assert client.get('/api/medicines/export?format=xml').status_code == 400
+
+
+def test_bulk_import(client, supplier):
+    word = unique_word()
+    record = {'company': 'Bulk Pharma', 'mfg_date': '2024-01-01', 'exp_date': days_from_today(400),
+              'quantity': 7, 'price': 1.5, 'supplier_id': supplier}
+    records = [dict(record, name=f'{word} {i}') for i in range(3)]
+
+    response = client.post('/api/medicines/bulk', json=records)
+    assert response.status_code == 201
+    assert response.json()['inserted'] == 3
+
+    ndjson = '\n'.join(json.dumps(dict(record, name=f'{word} nd')) for _ in range(2))
+    response = client.post('/api/medicines/bulk', data=ndjson, headers={'Content-Type': 'application/x-ndjson'})
+    assert response.status_code == 201 and response.json()['inserted'] == 2
+
+    rows = [dict(record, name=f'{word} csv'), dict(record, name=f'{word} bad', exp_date='nope')]
+    out = io.StringIO()
+    writer = csv.DictWriter(out, fieldnames=list(rows[0]))
+    writer.writeheader()
+    writer.writerows(rows)
+    response = client.post('/api/medicines/bulk', data=out.getvalue(), headers={'Content-Type': 'text/csv'})
+    assert response.status_code == 422
+    assert response.json()['errors'][0]['row'] == 2
+    response = client.post('/api/medicines/bulk?on_error=skip', data=out.getvalue(),
+                           headers={'Content-Type': 'text/csv'})
+    assert response.status_code == 201 and response.json()['inserted'] == 1
+
+    imported = [row for row in client.get('/api/medicines?fields=name,quantity').json() if row['name'].startswith(word)]
+    assert len(imported) == 6
+    assert {row['quantity'] for row in imported} == {7}
+
+    assert client.post('/api/medicines/bulk', data='x', headers={'Content-Type': 'text/plain'}).status_code == 415
@@ -0,0 +1,60 @@
+"""
+Full-text search (with archived rows) and typeahead suggestions
+"""
+
+from conftest import unique_word, walk_pages
+
+
+def test_search_ranks_and_pages(client, make_medicine):
+    word = unique_word()
+    ids = {make_medicine(name=f'{word} Tablets {i}') for i in range(3)}
+    other = make_medicine(company=f'{word} Labs')
+
+    rows = walk_pages(client, f'/api/medicines/search?q={word}&limit=2')
+    assert {row['medicine_id'] for row in rows} == ids | {other}
+    keys = [(-row['relevance'], row['name'], row['medicine_id']) for row in rows]
+    assert keys == sorted(keys)
+
+    response = client.get(f'/api/medicines/search?q={word}&fields=medicine_id,relevance')
+    assert all(set(row) == {'medicine_id', 'relevance'} for row in response.json())
+    assert client.get(f'/api/medicines/search?q={word}',
+                      headers={'If-None-Match': response.headers['ETag']}).status_code == 200
+    assert client.get(f'/api/medicines/search?q={word}&fields=medicine_id,relevance',
+                      headers={'If-None-Match': response.headers['ETag']}).status_code == 304
+
+
+def test_search_edge_cases(client):
+    assert client.get('/api/medicines/search?q=').json() == []
+    assert client.get(f'/api/medicines/search?q={unique_word()}').json() == []
+    assert client.get('/api/medicines/search?q=x&cursor=bogus').status_code == 400
+
+
+def test_search_include_archived(client, make_medicine):
+    word = unique_word()
+    kept = make_medicine(name=f'{word} Kept')
+    gone = make_medicine(name=f'{word} Gone')
+    assert client.delete(f'/api/medicines/{gone}').status_code == 200
+
+    live = client.get(f'/api/medicines/search?q={word}').json()
+    assert [row['medicine_id'] for row in live] == [kept]
+
+    rows = walk_pages(client, f'/api/medicines/search?q={word}&include_archived=true&limit=1')
+    by_id = {row['medicine_id']: row for row in rows}
+    assert set(by_id) == {kept, gone}
+    assert by_id[kept]['archive_reason'] is None and by_id[kept]['archived_at'] is None
+    assert by_id[gone]['archive_reason'] == 'deleted' and by_id[gone]['archived_at']
+
+
+def test_suggest(client, make_medicine, supplier):
+    word = unique_word()
+    medicine_id = make_medicine(name=f'{word.capitalize()} Syrup', company=f'{word} Labs')
+
+    suggestions = client.get(f'/api/medicines/suggest?q={word[:6]}').json()
+    assert {'type': 'medicine', 'id': medicine_id, 'label': f'{word.capitalize()} Syrup'} in suggestions
+    assert {'type': 'company', 'id': None, 'label': f'{word} Labs'} in suggestions
+
+    assert len(client.get(f'/api/medicines/suggest?q={word[:2]}&limit=1').json()) == 1
+    assert client.get('/api/medicines/suggest?q=').json() == []
+
+    assert client.delete(f'/api/medicines/{medicine_id}').status_code == 200
+    assert client.get(f'/api/medicines/suggest?q={word}').json() == []
@@ -0,0 +1,55 @@
+"""
+Dashboard statistics, health checks and metrics
+"""
+
+import pytest
+
+from conftest import unique_word
+
+
+def test_stats_follow_writes(client, make_medicine):
+    before = client.get('/api/stats?low_stock_threshold=10').json()
+    make_medicine(quantity=3, price=2)
+    make_medicine(quantity=50, price=1)
+
+    after = client.get('/api/stats?low_stock_threshold=10').json()
+    assert after['total_medicines'] == before['total_medicines'] + 2
+    assert after['total_quantity'] == before['total_quantity'] + 53
+    assert after['inventory_value'] == pytest.approx(before['inventory_value'] + 56)
+    assert after['low_stock_count'] == before['low_stock_count'] + 1
+    assert after['low_stock_threshold'] == 10
+
+
+def test_stats_breakdowns(client, make_medicine, supplier):
+    company = f'{unique_word()} Labs'
+    make_medicine(company=company, quantity=2, price=3)
+    make_medicine(company=company, quantity=4, price=1)
+
+    by_company = client.get('/api/stats?group_by=company').json()
+    assert by_company['group_by'] == 'company'
+    row = next(row for row in by_company['breakdown'] if row['company'] == company)
+    assert (row['total_medicines'], row['total_quantity'], row['inventory_value']) == (2, 6, 10)
+
+    by_supplier = client.get('/api/stats?group_by=supplier').json()
+    row = next(row for row in by_supplier['breakdown'] if row['supplier_id'] == supplier)
+    assert row['total_quantity'] == 6
+
+    assert client.get('/api/stats?group_by=shelf').status_code == 400
+
+
+def test_health(client):
+    health = client.get('/api/health')
+    assert health.status_code == 200
+    assert health.json()['database']['status'] == 'up'
+    assert 'in_use' in client.get('/api/health/pool').json()
+    assert set(client.get('/api/health/cache').json()) == {'medicines', 'suppliers', 'stats'}
+
+
+def test_metrics(client):
+    client.get('/api/stats')
+    response = client.get('/api/metrics')
+    assert response.status_code == 200
+    assert response.headers['Content-Type'].startswith('text/plain')
+    assert 'medvault_requests_in_flight' in response.text
+    assert 'medvault_db_pool_in_use' in response.text
+    assert client.get('/api/metrics/profile').status_code == 404
@@ -0,0 +1,114 @@
+"""
+Lots, stock movements, FEFO dispensing and reorder points
+"""
+
+from conftest import days_from_today, run_jobs, walk_pages
+
+
+def quantity_of(client, medicine_id):
+    return client.get(f'/api/medicines/{medicine_id}').json()['quantity']
+
+
+def lots_of(client, medicine_id):
+    return {lot['lot_number']: lot['quantity'] for lot in client.get(f'/api/medicines/{medicine_id}/batches').json()}
+
+
+def test_receive_lots(client, make_medicine):
+    medicine_id = make_medicine(quantity=10)
+    lot = {'lot_number': 'A-1', 'mfg_date': days_from_today(-10), 'exp_date': days_from_today(90), 'quantity': 25}
+
+    response = client.post(f'/api/medicines/{medicine_id}/batches', json=lot)
+    assert response.status_code == 201
+    assert quantity_of(client, medicine_id) == 35
+    assert lots_of(client, medicine_id) == {'A-1': 25, 'UNLOTTED': 10}
+
+    assert client.post(f'/api/medicines/{medicine_id}/batches', json=lot).status_code == 409
+    assert client.post('/api/medicines/999999999/batches', json=lot).status_code == 404
+    assert client.post(f'/api/medicines/{medicine_id}/batches', json=dict(lot, quantity=0)).status_code == 400
+
+    client.post(f'/api/medicines/{medicine_id}/batches',
+                json=dict(lot, lot_number='A-2', exp_date=days_from_today(30)))
+    batches = walk_pages(client, f'/api/medicines/{medicine_id}/batches?limit=1&fields=batch_id,exp_date')
+    keys = [(row['exp_date'], row['batch_id']) for row in batches]
+    assert len(keys) == 3 and keys == sorted(keys)
+
+
+def test_movements_apply_atomically(client, make_medicine):
+    first, second = make_medicine(quantity=10), make_medicine(quantity=5)
+
+    response = client.post('/api/medicines/movements', json=[
+        {'medicine_id': first, 'delta': -4, 'reason': 'sale'},
+        {'medicine_id': second, 'delta': 3, 'reason': 'return'}
+    ])
+    assert response.status_code == 201
+    assert response.json()['quantities'] == [{'medicine_id': first, 'quantity': 6},
+                                             {'medicine_id': second, 'quantity': 8}]
+    assert lots_of(client, first) == {'UNLOTTED': 6}
+
+    response = client.post('/api/medicines/movements', json={'movements': [
+        {'medicine_id': first, 'delta': -1, 'reason': 'sale'},
+        {'medicine_id': second, 'delta': -50, 'reason': 'sale'}
+    ]})
+    assert response.status_code == 409
+    assert response.json()['errors']
+    assert (quantity_of(client, first), quantity_of(client, second)) == (6, 8)
+
+    assert client.post('/api/medicines/movements', json=[{'medicine_id': first, 'delta': 0,
+                                                          'reason': 'x'}]).status_code == 400
+    assert client.post('/api/medicines/movements', json=[]).status_code == 400
+
+    ledger = walk_pages(client, f'/api/medicines/{first}/movements?limit=1&fields=movement_id,delta,reason')
+    assert [(row['delta'], row['reason']) for row in ledger] == [(-4, 'sale')]
+    assert client.get(f'/api/medicines/{first}/movements?fields=bogus').status_code == 400
+
+
+def test_dispense_first_expiry_first(client, make_medicine):
+    medicine_id = make_medicine(quantity=0)
+    for lot_number, days, quantity in (('LATE', 200, 10), ('SOON', 20, 4), ('MID', 60, 5)):
+        client.post(f'/api/medicines/{medicine_id}/batches', json={
+            'lot_number': lot_number, 'mfg_date': days_from_today(-5), 'exp_date': days_from_today(days),
+            'quantity': quantity
+        })
+
+    response = client.post('/api/medicines/dispense', json=[{'medicine_id': medicine_id, 'quantity': 7}])
+    assert response.status_code == 201
+    line = response.json()['lines'][0]
+    assert [(lot['lot_number'], lot['quantity']) for lot in line['lots']] == [('SOON', 4), ('MID', 3)]
+    assert quantity_of(client, medicine_id) == 12
+    assert lots_of(client, medicine_id) == {'SOON': 0, 'MID': 2, 'LATE': 10}
+
+    response = client.post('/api/medicines/dispense', json={'lines': [{'medicine_id': medicine_id, 'quantity': 50}]})
+    assert response.status_code == 409
+    assert quantity_of(client, medicine_id) == 12
+    assert client.post('/api/medicines/dispense', json=[{'medicine_id': medicine_id}]).status_code == 400
+
+
+def test_put_quantity_goes_through_lots(client, make_medicine):
+    medicine_id = make_medicine(quantity=10)
+    medicine = client.get(f'/api/medicines/{medicine_id}').json()
+    fields = {key: medicine[key] for key in
+              ('name', 'company', 'mfg_date', 'exp_date', 'quantity', 'price', 'supplier_id')}
+
+    assert client.put(f'/api/medicines/{medicine_id}', json=dict(fields, quantity=4)).status_code == 200
+    assert lots_of(client, medicine_id) == {'UNLOTTED': 4}
+    ledger = client.get(f'/api/medicines/{medicine_id}/movements?fields=delta,reason').json()
+    assert ledger[0] == {'delta': -6, 'reason': 'adjusted'}
+
+
+def test_reorder_points(client, api, make_medicine):
+    busy = make_medicine(quantity=100)
+    idle = make_medicine(quantity=100)
+    client.post('/api/medicines/movements', json=[{'medicine_id': busy, 'delta': -90, 'reason': 'sale'}])
+
+    response = client.post('/api/jobs', json={'kind': 'reorder_points'})
+    assert response.status_code == 202
+    run_jobs(api)
+    assert client.get(response.headers['Location']).json()['status'] == 'done'
+
+    points = {row['medicine_id']: row for row in client.get('/api/medicines/reorder').json()}
+    assert points[busy]['needs_reorder'] and points[busy]['quantity'] == 10
+    assert points[busy]['daily_rate'] == 3
+    assert not points[idle]['needs_reorder'] and points[idle]['days_of_cover'] is None
+
+    due = [row['medicine_id'] for row in walk_pages(client, '/api/medicines/reorder?due=true&limit=1')]
+    assert busy in due and idle not in due
@@ -0,0 +1,37 @@
+"""
+Supplier endpoints
+"""
+
+from conftest import unique_word, walk_pages
+
+
+def test_add_and_list_suppliers(client):
+    name = f'Supplier {unique_word()}'
+    response = client.post('/api/suppliers', json={'supplier_name': name, 'contact_no': '555-0199'})
+    assert response.status_code == 201
+    supplier_id = response.json()['id']
+
+    suppliers = client.get('/api/suppliers').json()
+    assert {'supplier_id': supplier_id, 'supplier_name': name, 'contact_no': '555-0199'}.items() <= \
+        next(row for row in suppliers if row['supplier_id'] == supplier_id).items()
+
+    assert client.post('/api/suppliers', json={'supplier_name': name}).status_code == 400
+
+
+def test_supplier_pages_and_projection(client, supplier):
+    client.post('/api/suppliers', json={'supplier_name': f'Supplier {unique_word()}', 'contact_no': '1'})
+    rows = walk_pages(client, '/api/suppliers?limit=1&fields=supplier_id,supplier_name')
+    assert all(set(row) == {'supplier_id', 'supplier_name'} for row in rows)
+    keys = [(row['supplier_name'], row['supplier_id']) for row in rows]
+    assert keys == sorted(keys)
+    assert [row['supplier_id'] for row in rows] == [row['supplier_id'] for row in client.get('/api/suppliers').json()]
+    assert client.get('/api/suppliers?fields=nope').status_code == 400
+
+
+def test_supplier_list_is_conditional(client, supplier):
+    etag = client.get('/api/suppliers').headers['ETag']
+    assert client.get('/api/suppliers', headers={'If-None-Match': etag}).status_code == 304
+    client.post('/api/suppliers', json={'supplier_name': f'Supplier {unique_word()}', 'contact_no': '1'})
+    response = client.get('/api/suppliers', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag